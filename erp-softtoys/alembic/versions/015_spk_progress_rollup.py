@@ -0,0 +1,83 @@
+"""create spk_progress_rollup table
+
+Revision ID: 015_spk_progress_rollup
+Revises: 014_po_reference_system
+Create Date: 2026-03-02 09:00:00.000000
+
+Per-SPK progress totals (confirmed / pending / cumulative qty, days tracked,
+last entry date) maintained in the same transaction as daily input.
+The table is backfilled from spk_daily_production during upgrade; it can be
+rebuilt at any time with scripts/reconcile_spk_progress_rollup.py.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import func
+
+
+# revision identifiers, used by Alembic.
+revision = '015_spk_progress_rollup'
+down_revision = '014_po_reference_system'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create and backfill spk_progress_rollup"""
+    op.create_table(
+        'spk_progress_rollup',
+        sa.Column('spk_id', sa.Integer(), nullable=False),
+        sa.Column('confirmed_qty', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pending_qty', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cumulative_qty', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('days_tracked', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('first_entry_date', sa.Date(), nullable=True),
+        sa.Column('last_entry_date', sa.Date(), nullable=True),
+        sa.Column('completed_date', sa.Date(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, server_default=func.now()),
+        sa.PrimaryKeyConstraint('spk_id'),
+        sa.ForeignKeyConstraint(['spk_id'], ['spks.id'], ondelete='CASCADE'),
+        sa.CheckConstraint('days_tracked >= 0', name='ck_rollup_days_positive'),
+    )
+    op.create_index('ix_spk_progress_rollup_last_entry_date', 'spk_progress_rollup', ['last_entry_date'])
+
+    # Backfill from raw daily production rows
+    op.execute("""
+        INSERT INTO spk_progress_rollup (
+            spk_id, confirmed_qty, pending_qty, cumulative_qty, days_tracked,
+            first_entry_date, last_entry_date, completed_date, updated_at
+        )
+        SELECT
+            t.spk_id,
+            t.confirmed_qty,
+            t.pending_qty,
+            COALESCE(l.cumulative_qty, t.total_input),
+            t.days_tracked,
+            t.first_entry_date,
+            t.last_entry_date,
+            CASE WHEN s.production_status = 'COMPLETED' THEN s.completion_date END,
+            NOW()
+        FROM (
+            SELECT
+                spk_id,
+                SUM(CASE WHEN status = 'CONFIRMED' THEN input_qty ELSE 0 END) AS confirmed_qty,
+                SUM(CASE WHEN status = 'PENDING' THEN input_qty ELSE 0 END) AS pending_qty,
+                SUM(input_qty) AS total_input,
+                COUNT(*) AS days_tracked,
+                MIN(production_date) AS first_entry_date,
+                MAX(production_date) AS last_entry_date
+            FROM spk_daily_production
+            GROUP BY spk_id
+        ) t
+        JOIN (
+            SELECT DISTINCT ON (spk_id) spk_id, cumulative_qty
+            FROM spk_daily_production
+            ORDER BY spk_id, production_date DESC, id DESC
+        ) l ON l.spk_id = t.spk_id
+        JOIN spks s ON s.id = t.spk_id
+    """)
+
+
+def downgrade():
+    """Drop spk_progress_rollup"""
+    op.drop_index('ix_spk_progress_rollup_last_entry_date', table_name='spk_progress_rollup')
+    op.drop_table('spk_progress_rollup')
@@ -0,0 +1,41 @@
+"""create document_sequences table
+
+Revision ID: 016_document_sequences
+Revises: 015_spk_progress_rollup
+Create Date: 2026-03-09 09:00:00.000000
+
+Per-prefix / per-period counters for document numbers (pallet barcodes,
+kanban cards, purchase orders, lots). Rows are created lazily by the
+sequence service, seeded from the highest existing number of each family.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import func
+
+
+# revision identifiers, used by Alembic.
+revision = '016_document_sequences'
+down_revision = '015_spk_progress_rollup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create document_sequences"""
+    op.create_table(
+        'document_sequences',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prefix', sa.String(length=30), nullable=False),
+        sa.Column('period', sa.String(length=10), nullable=False),
+        sa.Column('next_value', sa.BigInteger(), nullable=False, server_default='1'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, server_default=func.now()),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('prefix', 'period', name='uq_document_sequence_prefix_period'),
+    )
+    op.create_index('ix_document_sequences_id', 'document_sequences', ['id'])
+
+
+def downgrade():
+    """Drop document_sequences"""
+    op.drop_index('ix_document_sequences_id', table_name='document_sequences')
+    op.drop_table('document_sequences')
@@ -0,0 +1,55 @@
+"""unique indexes on dashboard materialized views
+
+Revision ID: 017_dashboard_mv_unique_indexes
+Revises: 016_document_sequences
+Create Date: 2026-03-16 09:00:00.000000
+
+REFRESH MATERIALIZED VIEW CONCURRENTLY needs a unique index on the view.
+The dashboard views are created by scripts/create_dashboard_mvs_fixed.sql,
+so indexes are only (re)created for views that exist in this database.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '017_dashboard_mv_unique_indexes'
+down_revision = '016_document_sequences'
+branch_labels = None
+depends_on = None
+
+# (view, index, column)
+UNIQUE_INDEXES = [
+    ('mv_dashboard_stats', 'idx_mv_dashboard_stats_refreshed', 'refreshed_at'),
+    ('mv_production_dept_status', 'idx_mv_production_dept_status_dept', 'dept'),
+    ('mv_qc_pass_rate', 'idx_mv_qc_pass_rate_dept', 'dept'),
+    ('mv_inventory_status', 'idx_mv_inventory_status_product', 'product_id'),
+]
+
+
+def _for_existing_view(view: str, statements: str):
+    op.execute(f"""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_matviews WHERE matviewname = '{view}') THEN
+                {statements}
+            END IF;
+        END $$;
+    """)
+
+
+def upgrade():
+    """Replace the lookup indexes with unique ones"""
+    for view, index, column in UNIQUE_INDEXES:
+        _for_existing_view(view, f"""
+                DROP INDEX IF EXISTS {index};
+                CREATE UNIQUE INDEX {index} ON {view} ({column});
+        """)
+
+
+def downgrade():
+    """Back to plain lookup indexes"""
+    for view, index, column in UNIQUE_INDEXES:
+        _for_existing_view(view, f"""
+                DROP INDEX IF EXISTS {index};
+                CREATE INDEX {index} ON {view} ({column});
+        """)
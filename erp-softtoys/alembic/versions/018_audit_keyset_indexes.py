@@ -0,0 +1,39 @@
+"""composite indexes for audit log keyset pagination
+
+Revision ID: 018_audit_keyset_indexes
+Revises: 017_dashboard_mv_unique_indexes
+Create Date: 2026-03-18 09:00:00.000000
+
+The audit endpoints page newest-first with WHERE (timestamp, id) < cursor.
+(timestamp, id), (module, timestamp, id) and (user_id, timestamp, id) let
+PostgreSQL read each page straight off an index, for any page depth.
+Built CONCURRENTLY so audit writes are not blocked on a large table.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '018_audit_keyset_indexes'
+down_revision = '017_dashboard_mv_unique_indexes'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('idx_audit_time_id', ['timestamp', 'id']),
+    ('idx_audit_module_time_id', ['module', 'timestamp', 'id']),
+    ('idx_audit_user_time_id', ['user_id', 'timestamp', 'id']),
+]
+
+
+def upgrade():
+    """Create the keyset indexes without locking audit_logs"""
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'audit_logs', columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    """Drop the keyset indexes"""
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name='audit_logs', postgresql_concurrently=True, if_exists=True)
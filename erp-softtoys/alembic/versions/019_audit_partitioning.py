@@ -0,0 +1,123 @@
+"""monthly range partitioning of audit_logs, security_logs, user_activity_logs
+
+Revision ID: 019_audit_partitioning
+Revises: 018_audit_keyset_indexes
+Create Date: 2026-03-25 09:00:00.000000
+
+Each table is rebuilt as PARTITION BY RANGE ("timestamp") with one
+partition per month from its oldest row up to three months ahead, plus a
+DEFAULT partition. The primary key becomes (id, "timestamp") because a
+partitioned table's unique constraints must contain the partition key; the id sequence, foreign keys and secondary
+indexes are carried over. Later months are created by
+app/core/audit_partitions.py.
+
+The rows are copied in one transaction: run this in a maintenance window
+on large tables. PostgreSQL only - other dialects are left unchanged.
+"""
+from datetime import date
+
+from alembic import op
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision = '019_audit_partitioning'
+down_revision = '018_audit_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+TABLES = {
+    'audit_logs': 'timestamp',
+    'security_logs': 'timestamp',
+    'user_activity_logs': 'timestamp',
+}
+MONTHS_AHEAD = 3
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _is_partitioned(conn, table):
+    return bool(conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+             "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"),
+        {"table": table}
+    ).scalar())
+
+
+def _table_exists(conn, table):
+    return conn.execute(text("SELECT to_regclass(:table)"), {"table": table}).scalar() is not None
+
+
+def _carried_over(conn, table):
+    """(secondary index DDL, foreign key DDL, serial sequence) of `table`"""
+    indexes = conn.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE tablename = :table AND indexname NOT IN "
+             "(SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:table) AND contype IN ('p', 'u'))"),
+        {"table": table}
+    ).scalars().all()
+    foreign_keys = conn.execute(
+        text("SELECT format('ALTER TABLE %I ADD CONSTRAINT %I %s', :table, conname, pg_get_constraintdef(oid)) "
+             "FROM pg_constraint WHERE conrelid = to_regclass(:table) AND contype = 'f'"),
+        {"table": table}
+    ).scalars().all()
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+    return indexes, foreign_keys, sequence
+
+
+def _rebuild(conn, table, column, partitioned):
+    """Copy `table` into a new (partitioned or plain) table of the same name"""
+    indexes, foreign_keys, sequence = _carried_over(conn, table)
+    legacy = f"{table}_legacy"
+    conn.execute(text(f'ALTER TABLE "{table}" RENAME TO "{legacy}"'))
+
+    if partitioned:
+        conn.execute(text(
+            f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ("{column}")'
+        ))
+        oldest = conn.execute(text(f'SELECT min("{column}") FROM "{legacy}"')).scalar()
+        last = _add_months(date.today(), MONTHS_AHEAD)
+        month = _add_months(oldest.date(), 0) if oldest else _add_months(date.today(), 0)
+        while month <= last:
+            # Same naming as app/core/audit_partitions.partition_name
+            conn.execute(text(
+                f'CREATE TABLE "{table}_y{month.year}m{month.month:02d}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            ))
+            month = _add_months(month, 1)
+        conn.execute(text(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT'))
+    else:
+        conn.execute(text(f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+
+    conn.execute(text(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"'))
+    if sequence:
+        conn.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id'))
+    conn.execute(text(f'DROP TABLE "{legacy}" CASCADE'))
+
+    primary_key = f'id, "{column}"' if partitioned else 'id'
+    conn.execute(text(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY ({primary_key})'))
+    for statement in foreign_keys + indexes:
+        conn.execute(text(statement))
+
+
+def upgrade():
+    """Rebuild the audit tables as monthly range-partitioned tables"""
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+    for table, column in TABLES.items():
+        if _table_exists(conn, table) and not _is_partitioned(conn, table):
+            _rebuild(conn, table, column, partitioned=True)
+
+
+def downgrade():
+    """Merge the partitions back into plain tables (detached partitions are left alone)"""
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+    for table, column in TABLES.items():
+        if _is_partitioned(conn, table):
+            _rebuild(conn, table, column, partitioned=False)
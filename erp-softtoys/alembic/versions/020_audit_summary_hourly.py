@@ -0,0 +1,60 @@
+"""hourly audit summary buckets
+
+Revision ID: 020_audit_summary_hourly
+Revises: 019_audit_partitioning
+Create Date: 2026-04-01 09:00:00.000000
+
+audit_summary_hourly holds event counts per (hour, module, action, user),
+maintained by the audit writer in the same transaction as the audit_logs
+INSERT. The audit summary sums these rows instead of counting audit_logs.
+Backfilled here from existing logs; scripts/rebuild_audit_summary.py
+recomputes it at any time.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '020_audit_summary_hourly'
+down_revision = '019_audit_partitioning'
+branch_labels = None
+depends_on = None
+
+
+def _enum(name, *values):
+    # auditmodule / auditaction already exist (audit_logs) on PostgreSQL
+    return sa.Enum(*values, name=name).with_variant(
+        postgresql.ENUM(*values, name=name, create_type=False), 'postgresql'
+    )
+
+
+def upgrade():
+    """Create audit_summary_hourly and backfill it from audit_logs"""
+    op.create_table(
+        'audit_summary_hourly',
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('module', _enum('auditmodule', 'AUTH', 'PPIC', 'CUTTING', 'EMBROIDERY', 'SEWING',
+                                  'FINISHING', 'PACKING', 'QUALITY', 'WAREHOUSE', 'KANBAN', 'REPORTS',
+                                  'ADMIN'), nullable=False),
+        sa.Column('action', _enum('auditaction', 'CREATE', 'READ', 'UPDATE', 'DELETE', 'LOGIN', 'LOGOUT',
+                                  'APPROVE', 'REJECT', 'TRANSFER', 'EXPORT', 'IMPORT'), nullable=False),
+        sa.Column('username', sa.String(100), nullable=False, server_default=''),
+        sa.Column('event_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('bucket_start', 'module', 'action', 'username'),
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            """
+            INSERT INTO audit_summary_hourly (bucket_start, module, action, username, event_count)
+            SELECT date_trunc('hour', "timestamp"), module, action, coalesce(username, ''), count(*)
+            FROM audit_logs
+            GROUP BY 1, 2, 3, 4
+            """
+        )
+
+
+def downgrade():
+    """Drop audit_summary_hourly"""
+    op.drop_table('audit_summary_hourly')
@@ -0,0 +1,73 @@
+"""inventory position store
+
+Revision ID: 021_inventory_positions
+Revises: 020_audit_summary_hourly
+Create Date: 2026-04-08 09:00:00.000000
+
+inventory_positions (on-hand / reserved per product and location) and
+inventory_lot_age (lotted on-hand per product, location and receipt date)
+back the warehouse overview, low-stock and aging endpoints. Both are kept
+in step with stock_quants by app/services/inventory_position_service.py
+and are backfilled here; scripts/rebuild_inventory_positions.py
+recomputes them at any time.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '021_inventory_positions'
+down_revision = '020_audit_summary_hourly'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create and backfill inventory_positions / inventory_lot_age"""
+    op.create_table(
+        'inventory_positions',
+        sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('location_id', sa.Integer(), sa.ForeignKey('locations.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('qty_on_hand', sa.DECIMAL(14, 2), nullable=False, server_default='0'),
+        sa.Column('qty_reserved', sa.DECIMAL(14, 2), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('product_id', 'location_id'),
+    )
+    op.create_index('ix_inventory_positions_location_id', 'inventory_positions', ['location_id'])
+
+    op.create_table(
+        'inventory_lot_age',
+        sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('location_id', sa.Integer(), sa.ForeignKey('locations.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('received_on', sa.Date(), nullable=False),
+        sa.Column('qty_on_hand', sa.DECIMAL(14, 2), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('product_id', 'location_id', 'received_on'),
+    )
+    op.create_index('ix_inventory_lot_age_received_on', 'inventory_lot_age', ['received_on'])
+
+    op.execute(
+        """
+        INSERT INTO inventory_positions (product_id, location_id, qty_on_hand, qty_reserved)
+        SELECT product_id, location_id, coalesce(sum(qty_on_hand), 0), coalesce(sum(qty_reserved), 0)
+        FROM stock_quants
+        GROUP BY product_id, location_id
+        """
+    )
+    received_on = "date(l.received_date)" if op.get_bind().dialect.name == 'sqlite' else "l.received_date::date"
+    op.execute(
+        f"""
+        INSERT INTO inventory_lot_age (product_id, location_id, received_on, qty_on_hand)
+        SELECT q.product_id, q.location_id, {received_on}, sum(q.qty_on_hand)
+        FROM stock_quants q JOIN stock_lots l ON l.id = q.lot_id
+        GROUP BY q.product_id, q.location_id, {received_on}
+        HAVING sum(q.qty_on_hand) <> 0
+        """
+    )
+
+
+def downgrade():
+    """Drop the inventory position store"""
+    op.drop_index('ix_inventory_lot_age_received_on', table_name='inventory_lot_age')
+    op.drop_table('inventory_lot_age')
+    op.drop_index('ix_inventory_positions_location_id', table_name='inventory_positions')
+    op.drop_table('inventory_positions')
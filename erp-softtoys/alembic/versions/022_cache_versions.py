@@ -0,0 +1,36 @@
+"""cache version counters
+
+Revision ID: 022_cache_versions
+Revises: 021_inventory_positions
+Create Date: 2026-04-15 09:00:00.000000
+
+cache_versions holds one counter per in-process cache. The barcode
+resolution index (app/core/barcode_index.py) bumps `barcode_index` in the
+transaction that changes indexed master data; every worker polls it and
+drops its index when the value moves.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '022_cache_versions'
+down_revision = '021_inventory_positions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create cache_versions"""
+    op.create_table(
+        'cache_versions',
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade():
+    """Drop cache_versions"""
+    op.drop_table('cache_versions')
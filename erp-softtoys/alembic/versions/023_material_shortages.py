@@ -0,0 +1,102 @@
+"""material shortage index
+
+Revision ID: 023_material_shortages
+Revises: 022_cache_versions
+Create Date: 2026-04-22 09:00:00.000000
+
+material_shortages holds one row per (material, work order) whose open
+SPK allocations exceed the stock available at Warehouse Main, with its
+severity. app/services/material_shortage_service.py recomputes the rows
+of a material whenever its allocations or stock quants are flushed; the
+shortage alert endpoints filter and aggregate it in SQL. Backfilled here;
+scripts/rebuild_material_shortages.py recomputes it at any time.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '023_material_shortages'
+down_revision = '022_cache_versions'
+branch_labels = None
+depends_on = None
+
+
+def _enum(name, *values):
+    # department already exists (work_orders) on PostgreSQL
+    return sa.Enum(*values, name=name).with_variant(
+        postgresql.ENUM(*values, name=name, create_type=False), 'postgresql'
+    )
+
+
+def upgrade():
+    """Create material_shortages and backfill it from allocations and stock"""
+    op.create_table(
+        'material_shortages',
+        sa.Column('material_id', sa.Integer(), nullable=False),
+        sa.Column('wo_id', sa.Integer(), nullable=False),
+        sa.Column('mo_id', sa.Integer(), nullable=False),
+        sa.Column('department', _enum('department', 'CUTTING', 'EMBROIDERY', 'SUBCON', 'SEWING',
+                                      'FINISHING', 'PACKING'), nullable=False),
+        sa.Column('required_qty', sa.DECIMAL(14, 3), nullable=False),
+        sa.Column('available_qty', sa.DECIMAL(14, 3), nullable=False),
+        sa.Column('shortage_qty', sa.DECIMAL(14, 3), nullable=False),
+        sa.Column('severity', sa.String(10), nullable=False),
+        sa.Column('severity_rank', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['material_id'], ['products.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['wo_id'], ['work_orders.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('material_id', 'wo_id'),
+    )
+    op.create_index('ix_material_shortages_wo_id', 'material_shortages', ['wo_id'])
+    op.create_index('ix_material_shortages_mo_id', 'material_shortages', ['mo_id'])
+    op.create_index('ix_material_shortages_department', 'material_shortages', ['department'])
+    op.create_index('ix_material_shortages_severity', 'material_shortages', ['severity'])
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            """
+            WITH open_allocations AS (
+                SELECT material_id, wo_id, sum(qty_allocated) AS required
+                FROM spk_material_allocations
+                WHERE is_consumed = false
+                GROUP BY material_id, wo_id
+            ), stock AS (
+                SELECT product_id, sum(qty_on_hand - qty_reserved) AS available
+                FROM stock_quants
+                WHERE qty_on_hand - qty_reserved > 0
+                  AND location_id = (
+                      SELECT id FROM locations
+                      WHERE name LIKE '%Warehouse Main%' AND type = 'INTERNAL'
+                      ORDER BY id LIMIT 1
+                  )
+                GROUP BY product_id
+            ), shortages AS (
+                SELECT a.material_id, a.wo_id, w.mo_id, w.department, a.required,
+                       coalesce(s.available, 0) AS available,
+                       a.required - coalesce(s.available, 0) AS shortage
+                FROM open_allocations a
+                JOIN work_orders w ON w.id = a.wo_id
+                LEFT JOIN stock s ON s.product_id = a.material_id
+                WHERE a.required > 0 AND coalesce(s.available, 0) < a.required
+            )
+            INSERT INTO material_shortages (material_id, wo_id, mo_id, department, required_qty,
+                                            available_qty, shortage_qty, severity, severity_rank)
+            SELECT material_id, wo_id, mo_id, department, required, available, shortage,
+                   CASE WHEN shortage * 100 >= required * 50 THEN 'CRITICAL'
+                        WHEN shortage * 100 >= required * 20 THEN 'HIGH'
+                        WHEN shortage * 100 >= required * 5 THEN 'MEDIUM'
+                        ELSE 'LOW' END,
+                   CASE WHEN shortage * 100 >= required * 50 THEN 0
+                        WHEN shortage * 100 >= required * 20 THEN 1
+                        WHEN shortage * 100 >= required * 5 THEN 2
+                        ELSE 3 END
+            FROM shortages
+            """
+        )
+
+
+def downgrade():
+    """Drop material_shortages"""
+    op.drop_table('material_shortages')
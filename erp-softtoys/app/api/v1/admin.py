@@ -14,6 +14,7 @@ from app.core.database import get_db
 from app.core.dependencies import require_permission
 from app.core.models.users import User, UserRole
 from app.core.security import PasswordUtils
+from app.services.permission_service import get_permission_service
 
 router = APIRouter(
     prefix="/admin",
@@ -164,6 +165,7 @@ async def update_user(
 
     db.commit()
     db.refresh(user)
+    get_permission_service().invalidate_user_cache(user.id)
 
     return UserListResponse(
         id=user.id,
@@ -206,6 +208,7 @@ async def deactivate_user(
 
     user.is_active = False
     db.commit()
+    get_permission_service().invalidate_user_cache(user.id)
 
     return {
         "message": f"User {user.username} deactivated",
@@ -237,6 +240,7 @@ async def reactivate_user(
     user.login_attempts = 0  # Reset login attempts
     user.locked_until = None
     db.commit()
+    get_permission_service().invalidate_user_cache(user.id)
 
     return {
         "message": f"User {user.username} reactivated",
@@ -581,6 +585,7 @@ async def grant_permission_to_user(
         )
         db.add(custom_perm)
         db.commit()
+        get_permission_service().invalidate_user_cache(user_id)
         
         # Log audit
         AuditLogger(db).log_create(
@@ -634,6 +639,7 @@ async def revoke_permission_from_user(
         
         db.delete(custom_perm)
         db.commit()
+        get_permission_service().invalidate_user_cache(user_id)
         
         # Log audit
         AuditLogger(db).log_delete(
@@ -6,9 +6,9 @@ Only accessible by authorized roles with audit permissions
 """
 from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import desc, or_
+from sqlalchemy import desc, or_, select
 from sqlalchemy.orm import Session
 
 from app.core.base_production_service import BaseProductionService
@@ -16,6 +16,9 @@ from app.core.database import get_db
 from app.core.dependencies import require_permission
 from app.core.models.audit import AuditAction, AuditLog, AuditModule, SecurityLog, UserActivityLog
 from app.core.models.users import User
+from app.services.audit_summary_service import AuditSummaryService
+from app.shared.pagination import InvalidCursorError, approximate_count, encode_cursor, keyset_page
+from app.shared.streaming_export import CSV_MEDIA_TYPE, csv_chunks, iter_rows
 
 router = APIRouter(prefix="/audit", tags=["Audit Trail"])
 
@@ -81,6 +84,28 @@ class AuditSummaryResponse(BaseModel):
     recent_critical_events: list[dict]
 
 
+# ============================================================================
+# PAGINATION
+# ============================================================================
+
+def _audit_page(query, limit: int, cursor: str | None, offset: int = 0):
+    """Newest-first page of audit logs.
+
+    Keyset on (timestamp, id) when a cursor is given or for the first page;
+    legacy offsets still work but get slower the deeper the page.
+    Returns: (logs, next_cursor)
+    """
+    if cursor or not offset:
+        try:
+            return keyset_page(query, AuditLog.timestamp, AuditLog.id, limit, cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+    logs = query.order_by(desc(AuditLog.timestamp), desc(AuditLog.id)).offset(offset).limit(limit).all()
+    next_cursor = encode_cursor(logs[-1].timestamp, logs[-1].id) if len(logs) == limit else None
+    return logs, next_cursor
+
+
 # ============================================================================
 # AUDIT LOG ENDPOINTS
 # ============================================================================
@@ -91,6 +116,7 @@ def get_audit_logs(
     current_user: User = Depends(require_permission("audit.view_logs")),
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
     user_id: int | None = None,
     username: str | None = None,
     action: AuditAction | None = None,
@@ -113,6 +139,10 @@ def get_audit_logs(
     - start_date: Filter from this date
     - end_date: Filter until this date
     - search: Search in description field
+
+    **Pagination**: pass `next_cursor` from the previous response as `cursor`
+    (constant cost at any depth); `page` is kept for older clients.
+    `total` is the planner's estimate on large results (`total_is_estimate`).
     """
     query = db.query(AuditLog)
 
@@ -141,18 +171,16 @@ def get_audit_logs(
     if search:
         query = query.filter(AuditLog.description.ilike(f"%{search}%"))
 
-    # Get total count
-    total = query.count()
-
-    # Apply pagination
-    offset = (page - 1) * page_size
-    logs = query.order_by(desc(AuditLog.timestamp)).offset(offset).limit(page_size).all()
+    total, total_is_estimate = approximate_count(db, query)
+    logs, next_cursor = _audit_page(query, page_size, cursor, offset=0 if cursor else (page - 1) * page_size)
 
     return {
         "total": total,
+        "total_is_estimate": total_is_estimate,
         "page": page,
         "page_size": page_size,
         "total_pages": (total + page_size - 1) // page_size,
+        "next_cursor": next_cursor,
         "data": [AuditLogResponse.from_orm(log) for log in logs]
     }
 
@@ -214,35 +242,8 @@ def get_audit_summary(
     """
     now = datetime.now()
 
-    # Total events
-    total_events = db.query(AuditLog).count()
-
-    # Events last 24h
-    events_24h = db.query(AuditLog).filter(
-        AuditLog.timestamp >= now - timedelta(hours=24)
-    ).count()
-
-    # Events last 7d
-    events_7d = db.query(AuditLog).filter(
-        AuditLog.timestamp >= now - timedelta(days=7)
-    ).count()
-
-    # Top users (last 30 days)
-    from sqlalchemy import func
-    top_users = db.query(
-        AuditLog.username,
-        func.count(AuditLog.id).label('event_count')
-    ).filter(
-        AuditLog.timestamp >= now - timedelta(days=30)
-    ).group_by(AuditLog.username).order_by(desc('event_count')).limit(10).all()
-
-    # Top modules (last 30 days)
-    top_modules = db.query(
-        AuditLog.module,
-        func.count(AuditLog.id).label('event_count')
-    ).filter(
-        AuditLog.timestamp >= now - timedelta(days=30)
-    ).group_by(AuditLog.module).order_by(desc('event_count')).limit(10).all()
+    # Counts and top lists come from the hourly summary store, not audit_logs
+    summary = AuditSummaryService(db).summary(now)
 
     # Recent critical events (last 7 days)
     critical_events = db.query(AuditLog).filter(
@@ -254,11 +255,7 @@ def get_audit_summary(
     ).order_by(desc(AuditLog.timestamp)).limit(10).all()
 
     return AuditSummaryResponse(
-        total_events=total_events,
-        events_last_24h=events_24h,
-        events_last_7d=events_7d,
-        top_users=[{"username": u[0], "event_count": u[1]} for u in top_users],
-        top_modules=[{"module": m[0], "event_count": m[1]} for m in top_modules],
+        **summary,
         recent_critical_events=[
             {
                 "id": e.id,
@@ -365,50 +362,31 @@ def export_audit_logs_csv(
 
     **Use Case**: Compliance reporting, external audits
     """
-    import csv
-    import io
-
     from fastapi.responses import StreamingResponse
 
-    query = db.query(AuditLog)
+    query = select(
+        AuditLog.id, AuditLog.timestamp, AuditLog.username, AuditLog.user_role, AuditLog.ip_address,
+        AuditLog.action, AuditLog.module, AuditLog.entity_type, AuditLog.entity_id, AuditLog.description
+    )
 
     if start_date:
-        query = query.filter(AuditLog.timestamp >= start_date)
+        query = query.where(AuditLog.timestamp >= start_date)
     if end_date:
-        query = query.filter(AuditLog.timestamp <= end_date)
+        query = query.where(AuditLog.timestamp <= end_date)
 
-    logs = query.order_by(desc(AuditLog.timestamp)).all()
-
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    writer.writerow([
+    # Streamed through a server-side cursor instead of loading every row
+    rows = (
+        (row[0], row[1].isoformat(), *row[2:])
+        for row in iter_rows(db, query.order_by(desc(AuditLog.timestamp), desc(AuditLog.id)))
+    )
+    header = [
         'ID', 'Timestamp', 'Username', 'Role', 'IP Address',
         'Action', 'Module', 'Entity Type', 'Entity ID', 'Description'
-    ])
-
-    # Data
-    for log in logs:
-        writer.writerow([
-            log.id,
-            log.timestamp.isoformat(),
-            log.username,
-            log.user_role,
-            log.ip_address,
-            log.action.value,
-            log.module.value,
-            log.entity_type,
-            log.entity_id,
-            log.description
-        ])
-
-    output.seek(0)
+    ]
 
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
+        csv_chunks(header, rows),
+        media_type=CSV_MEDIA_TYPE,
         headers={
             "Content-Disposition": f"attachment; filename=audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         }
@@ -424,7 +402,8 @@ async def get_audit_trail_large_dataset(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("audit.view_logs")),
     limit: int = Query(100, ge=1, le=10000, description="Number of records to fetch"),
-    offset: int = Query(0, ge=0, description="Offset for pagination"),
+    offset: int = Query(0, ge=0, description="Offset for pagination (prefer cursor)"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
     module: str | None = Query(None, description="Filter by module"),
     action: str | None = Query(None, description="Filter by action")
 ):
@@ -443,19 +422,23 @@ async def get_audit_trail_large_dataset(
 
     **Query Parameters:**
     - `limit`: Number of records (1-10000, default: 100)
-    - `offset`: Pagination offset (default: 0)
+    - `offset`: Pagination offset (default: 0, legacy - cost grows with depth)
+    - `cursor`: `next_cursor` of the previous page (constant cost at any depth)
     - `module`: Filter by module name (optional)
     - `action`: Filter by action type (optional)
 
     **Performance Optimization:**
-    - Indexed queries on timestamp
+    - Keyset pagination on (timestamp, id) with composite indexes per
+      module / user filter
+    - Planner row estimate instead of COUNT(*) on large results
     - Limit result set to prevent memory issues
     - Pagination for large datasets
 
     Returns:
-        - total: Total matching records
+        - total: Total matching records (estimate when total_is_estimate)
         - limit: Applied limit
         - offset: Applied offset
+        - next_cursor: Cursor for the next page (null on the last page)
         - count: Records in current page
         - data: Array of audit log entries
 
@@ -478,11 +461,10 @@ async def get_audit_trail_large_dataset(
         except ValueError:
             pass  # Invalid action, ignore filter
 
-    # Get total count (for pagination info)
-    total = query.count()
+    # Total for pagination info (planner estimate on large results)
+    total, total_is_estimate = approximate_count(db, query)
 
-    # Apply pagination and ordering
-    logs = query.order_by(desc(AuditLog.timestamp)).offset(offset).limit(limit).all()
+    logs, next_cursor = _audit_page(query, limit, cursor, offset=0 if cursor else offset)
 
     # Format response
     data = []
@@ -508,10 +490,12 @@ async def get_audit_trail_large_dataset(
     return {
         "success": True,
         "total": total,
+        "total_is_estimate": total_is_estimate,
         "limit": limit,
         "offset": offset,
         "count": len(data),
-        "has_more": (offset + len(data)) < total,
+        "has_more": next_cursor is not None,
+        "next_cursor": next_cursor,
         "data": data,
         "performance_note": f"Fetched {len(data)} records efficiently with indexed queries"
     }
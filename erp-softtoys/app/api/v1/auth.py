@@ -4,15 +4,19 @@ User registration, login, token management, profile.
 
 from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.dependencies import get_current_user, get_db
+from app.core.login_throttle import login_throttle
 from app.core.models.users import User
 from app.core.models.users import UserRole as UserRoleModel
 from app.core.schemas import AuthResponse, TokenResponse, UserCreate, UserLogin, UserResponse
-from app.core.security import PasswordUtils, TokenUtils
+from app.core.password_hasher import HasherBusyError, password_hasher
+from app.core.security import TokenUtils
 
 router = APIRouter(
     prefix="/auth",
@@ -21,6 +25,30 @@ router = APIRouter(
 )
 
 
+async def _hash_password(password: str) -> str:
+    """bcrypt hash on the password hasher pool (503 when saturated)."""
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password service is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+
+
+async def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    """bcrypt verify on the password hasher pool (503 when saturated)."""
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password service is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register new user.
@@ -42,24 +70,17 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     **Default Roles**:
     - admin_cutting, admin_sewing, admin_finishing, qc_inspector, etc.
     """
-    # Check if username exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
-    if existing_user:
+    # DB work runs in the threadpool: this handler awaits the hasher, so it
+    # stays on the event loop
+    conflict = await run_in_threadpool(_registration_conflict, db, user_data)
+    if conflict:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-
-    # Check if email exists
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
-    if existing_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail=conflict
         )
 
     # Create new user with hashed password
-    hashed_password = PasswordUtils.hash_password(user_data.password)
+    hashed_password = await _hash_password(user_data.password)
 
     # Use first role from list or default (already a UserRole enum)
     user_role = user_data.roles[0] if user_data.roles else UserRoleModel.WAREHOUSE_OP
@@ -73,7 +94,19 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         is_active=True,
         is_verified=False
     )
+    return await run_in_threadpool(_create_user, db, new_user)
+
 
+def _registration_conflict(db: Session, user_data: UserCreate) -> str | None:
+    """Why the username / email cannot be registered, or None"""
+    if db.query(User).filter(User.username == user_data.username).first():
+        return "Username already registered"
+    if db.query(User).filter(User.email == user_data.email).first():
+        return "Email already registered"
+    return None
+
+
+def _create_user(db: Session, new_user: User) -> UserResponse:
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
@@ -90,7 +123,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=AuthResponse)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, request: Request, db: Session = Depends(get_db)):
     """User login endpoint.
 
     **Roles Required**: None (public endpoint)
@@ -105,16 +138,27 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     - `403`: Account inactive or locked
     - `429`: Too many login attempts (account locked 15 minutes)
     - `422`: Validation error
+    - `503`: Login temporarily saturated (retry after a second)
 
     **Token Format**:
     - Use `access_token` for API requests (Authorization: Bearer <token>)
     - Use `refresh_token` to get new access token when expired (24 hours validity)
     """
+    client_ip = request.client.host if request.client else None
+
+    # Fast path: locked identifier rejected before the DB and bcrypt
+    retry_after = login_throttle.check(credentials.username)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts. Account locked, try again later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    # DB work runs in the threadpool: this handler awaits the hasher, so it
+    # stays on the event loop
     try:
-        # Find user by username or email
-        user = db.query(User).filter(
-            (User.username == credentials.username) | (User.email == credentials.username)
-        ).first()
+        user = await run_in_threadpool(_find_user, db, credentials.username)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -122,10 +166,8 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
         )
 
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid username or password"
-        )
+        login_throttle.record_failure(credentials.username, client_ip)
+        _reject_failed_login(client_ip)
 
     # Check if account is locked (use timezone-naive datetime consistently)
     now = datetime.utcnow()
@@ -144,35 +186,67 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="User account is inactive. Contact administrator."
         )
 
-    # Verify password
+    # Verify password (bounded bcrypt pool, off the event loop)
     try:
-        password_valid = PasswordUtils.verify_password(credentials.password, user.hashed_password)
+        password_valid = await _verify_password(credentials.password, user.hashed_password)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Password verification error"
         )
-    
+
     if not password_valid:
-        # Increment failed attempts
-        user.login_attempts += 1
+        # Counted in the throttle; the user row is only written on lockout
+        failures, locked = login_throttle.record_failure(credentials.username, client_ip)
 
-        # Lock account after 5 failed attempts for 15 minutes
-        if user.login_attempts >= 5:
-            user.locked_until = datetime.utcnow() + timedelta(minutes=15)
-            db.commit()
+        # Lock account after LOGIN_MAX_FAILED_ATTEMPTS failed attempts
+        if locked:
+            await run_in_threadpool(_lock_account, db, user, failures)
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many failed login attempts. Account locked for 15 minutes."
+                detail=f"Too many failed login attempts. Account locked for {settings.LOGIN_LOCKOUT_MINUTES} minutes."
             )
 
-        db.commit()
+        _reject_failed_login(client_ip)
+
+    # Reset failed attempts on successful login
+    login_throttle.record_success(credentials.username)
+    return await run_in_threadpool(_complete_login, db, user)
+
+
+def _find_user(db: Session, identifier: str) -> User | None:
+    """User by username or email"""
+    return db.query(User).filter(
+        (User.username == identifier) | (User.email == identifier)
+    ).first()
+
+
+def _reject_failed_login(client_ip: str | None):
+    """401 for a failed attempt; 429 while its IP is over the failure limit."""
+    retry_after = login_throttle.ip_locked(client_ip)
+    if retry_after:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid username or password"
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts from this address. Try again later.",
+            headers={"Retry-After": str(retry_after)}
         )
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid username or password"
+    )
 
-    # Reset failed attempts on successful login
+
+def _lock_account(db: Session, user: User, failures: int):
+    """Persist the lockout (the only DB write for failed attempts)"""
+    user.login_attempts = failures
+    user.locked_until = datetime.utcnow() + timedelta(minutes=settings.LOGIN_LOCKOUT_MINUTES)
+    db.commit()
+
+
+def _complete_login(db: Session, user: User) -> AuthResponse:
+    """Reset lockout state, issue tokens and commit"""
     user.login_attempts = 0
     user.locked_until = None
     user.last_login = datetime.utcnow()
@@ -332,14 +406,14 @@ async def change_password(
     - `422`: Validation error
     """
     # Verify old password
-    if not PasswordUtils.verify_password(request.old_password, current_user.hashed_password):
+    if not await _verify_password(request.old_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Old password is incorrect"
         )
 
     # Hash new password
-    new_hashed = PasswordUtils.hash_password(request.new_password)
+    new_hashed = await _hash_password(request.new_password)
 
     # Update user
     current_user.hashed_password = new_hashed
@@ -3,17 +3,21 @@ Handles barcode scanning for receiving and picking operations
 Future: RFID integration planned.
 """
 from datetime import datetime
+from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from app.core.barcode_index import barcode_index
 from app.core.database import get_db
 from app.core.dependencies import require_permission
-from app.core.models.products import Product
 from app.core.models.users import User
-from app.core.models.warehouse import StockLot, StockMove, StockQuant
+from app.core.models.warehouse import Location, LocationType, StockLot, StockMove, StockMoveStatus, StockQuant
+from app.services.sequence_service import next_sequence
+from app.services.stock_reservation_service import InsufficientStockError, StockReservationService
 from app.shared.audit import AuditLogger
 
 router = APIRouter(prefix="/barcode", tags=["Barcode Scanner"])
@@ -72,44 +76,29 @@ class BarcodeHistoryResponse(BaseModel):
 @router.post("/validate", response_model=BarcodeValidationResponse)
 async def validate_barcode(
     request: BarcodeValidationRequest,
-    db: AsyncSession = Depends(get_db),
+    db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("barcode.validate_product"))
 ):
     """Validate a barcode and return product information
     Used before receive/pick operations.
+
+    Answered from the barcode index (app/core/barcode_index.py): product
+    codes, PLT- pallet and FG- carton codes resolve without a query, stock
+    comes from a snapshot at most BARCODE_STOCK_TTL_SECONDS old.
     """
-    # Find product by barcode (assuming barcode = product code)
-    result = await db.execute(
-        select(Product).where(Product.code == request.barcode)
-    )
-    product = result.scalar_one_or_none()
+    resolution = barcode_index.resolve(db, request.barcode)
 
-    if not product:
+    if not resolution:
         return BarcodeValidationResponse(
             valid=False,
             message=f"Product not found for barcode: {request.barcode}"
         )
 
-    # Get current stock quantity
-    stock_result = await db.execute(
-        select(func.sum(StockQuant.quantity))
-        .where(
-            and_(
-                StockQuant.product_id == product.id,
-                StockQuant.location == request.location
-            )
-        )
-    )
-    current_qty = stock_result.scalar() or 0.0
-
-    # Get latest lot number
-    lot_result = await db.execute(
-        select(StockLot.lot_number)
-        .where(StockLot.product_id == product.id)
-        .order_by(StockLot.created_at.desc())
-        .limit(1)
-    )
-    lot_number = lot_result.scalar_one_or_none()
+    # Current stock and latest lot number
+    product = resolution.product
+    stock = barcode_index.stock(db, product.id)
+    current_qty = float(stock.qty(_scan_location_ids(db, request.location)))
+    lot_number = stock.latest_lot
 
     # Validation based on operation
     if request.operation == "pick" and current_qty <= 0:
@@ -134,20 +123,28 @@ async def validate_barcode(
     )
 
 
+def scan_lot_number(db: Session, product_code: str, now: datetime | None = None) -> str:
+    """Lot number for a scanned receipt: PROD-CODE-YYYYMMDD-SNNNNNN
+
+    Own yearly counter (LOT-SCAN). The "S" keeps these apart from legacy
+    PROD-CODE-YYYYMMDD-NNN lots numbered per product and day.
+    """
+    now = now or datetime.now()
+    seq = next_sequence(db, "LOT-SCAN", str(now.year))
+    return f"{product_code}-{now.strftime('%Y%m%d')}-S{seq:06d}"
+
+
 @router.post("/receive")
 async def receive_goods(
     request: ReceiveGoodsRequest,
-    db: AsyncSession = Depends(get_db),
+    db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("barcode.receive_inventory"))
 ):
     """Receive goods using barcode scanner
-    Creates stock move and updates inventory.
+    Creates stock lot, stock move and updates inventory.
     """
     # Validate barcode first
-    result = await db.execute(
-        select(Product).where(Product.code == request.barcode)
-    )
-    product = result.scalar_one_or_none()
+    product = barcode_index.product(db, request.barcode)
 
     if not product:
         raise HTTPException(
@@ -155,85 +152,68 @@ async def receive_goods(
             detail=f"Product not found for barcode: {request.barcode}"
         )
 
+    location_ids = _scan_location_ids(db, request.location)
+    supplier_id = db.scalar(
+        select(Location.id).where(Location.type == LocationType.SUPPLIER).order_by(Location.id).limit(1)
+    )
+    if not location_ids or supplier_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown location: {request.location}"
+        )
+    location_id = location_ids[0]
+    qty = Decimal(str(request.qty))
+    uom = product.uom.value if product.uom else "Pcs"
+
     # Generate lot number if not provided
     lot_number = request.lot_number
     if not lot_number:
-        # Auto-generate: PROD-CODE-YYYYMMDD-XXX
-        today = datetime.now().strftime("%Y%m%d")
-        count_result = await db.execute(
-            select(func.count(StockLot.id))
-            .where(
-                and_(
-                    StockLot.product_id == product.id,
-                    func.date(StockLot.created_at) == datetime.now().date()
-                )
-            )
-        )
-        count = count_result.scalar() + 1
-        lot_number = f"{product.code}-{today}-{count:03d}"
+        lot_number = scan_lot_number(db, product.code)
 
     # Create stock lot
     stock_lot = StockLot(
         product_id=product.id,
         lot_number=lot_number,
-        quantity=request.qty,
-        location=request.location,
-        created_at=datetime.now()
+        qty_initial=qty,
+        qty_remaining=qty,
+        received_date=datetime.now()
     )
     db.add(stock_lot)
+    db.flush()
 
     # Create stock move (receiving)
-    stock_move = StockMove(
+    db.add(StockMove(
         product_id=product.id,
-        move_type="receive",
-        quantity=request.qty,
-        from_location="supplier",
-        to_location=request.location,
-        reference=request.po_reference or f"BARCODE-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        status="done",
-        created_by=current_user.id,
-        notes=request.notes or f"Received via barcode scanner by {current_user.username}",
-        created_at=datetime.now()
-    )
-    db.add(stock_move)
-
-    # Update or create stock quant
-    quant_result = await db.execute(
-        select(StockQuant).where(
-            and_(
-                StockQuant.product_id == product.id,
-                StockQuant.location == request.location,
-                StockQuant.lot_id == stock_lot.id
-            )
-        )
-    )
-    stock_quant = quant_result.scalar_one_or_none()
-
-    if stock_quant:
-        stock_quant.quantity += request.qty
-    else:
-        stock_quant = StockQuant(
-            product_id=product.id,
-            location=request.location,
-            lot_id=stock_lot.id,
-            quantity=request.qty,
-            reserved_quantity=0.0
-        )
-        db.add(stock_quant)
-
-    await db.commit()
+        qty=qty,
+        uom=uom,
+        location_id_from=supplier_id,
+        location_id_to=location_id,
+        reference_doc=request.po_reference or f"BARCODE-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+        state=StockMoveStatus.DONE,
+        lot_id=stock_lot.id
+    ))
+
+    # New lot -> new stock quant
+    db.add(StockQuant(
+        product_id=product.id,
+        location_id=location_id,
+        lot_id=stock_lot.id,
+        qty_on_hand=qty,
+        qty_reserved=Decimal("0")
+    ))
 
-    # Audit log
+    # Audit log (commits the receipt with it)
     AuditLogger.log_action(
-        db, current_user, "RECEIVE", "WAREHOUSE",
-        f"Received {request.qty} {product.uom} of {product.name} via barcode",
+        db, current_user, "CREATE", "WAREHOUSE",
+        f"Received {request.qty} {uom} of {product.name} via barcode",
         entity_type="StockQuant",
-        new_values={"barcode": request.barcode, "qty": request.qty, "location": request.location, "lot": lot_number}
+        new_values={"barcode": request.barcode, "qty": request.qty, "location": request.location,
+                    "lot": lot_number, "notes": request.notes}
     )
 
     return {
         "success": True,
-        "message": f"Received {request.qty} {product.uom} of {product.name}",
+        "message": f"Received {request.qty} {uom} of {product.name}",
         "product": {
             "id": product.id,
             "code": product.code,
@@ -248,17 +228,18 @@ async def receive_goods(
 @router.post("/pick")
 async def pick_goods(
     request: PickGoodsRequest,
-    db: AsyncSession = Depends(get_db),
+    db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("barcode.pick_inventory"))
 ):
     """Pick goods using barcode scanner (FIFO logic)
-    Creates stock move and updates inventory.
+    Creates stock moves and updates inventory.
+
+    Quants are taken through StockReservationService: free lots first with
+    SKIP LOCKED, so concurrent scans of one product do not queue behind
+    each other and can never pick the same stock twice.
     """
     # Validate barcode
-    result = await db.execute(
-        select(Product).where(Product.code == request.barcode)
-    )
-    product = result.scalar_one_or_none()
+    product = barcode_index.product(db, request.barcode)
 
     if not product:
         raise HTTPException(
@@ -266,89 +247,69 @@ async def pick_goods(
             detail=f"Product not found for barcode: {request.barcode}"
         )
 
-    # Check available stock (FIFO - oldest lot first)
-    quants_result = await db.execute(
-        select(StockQuant)
-        .join(StockLot)
-        .where(
-            and_(
-                StockQuant.product_id == product.id,
-                StockQuant.location == request.location,
-                StockQuant.quantity > StockQuant.reserved_quantity
-            )
+    source_ids = _scan_location_ids(db, request.location)
+    if not source_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown location: {request.location}"
         )
-        .order_by(StockLot.created_at.asc())
-    )
-    available_quants = quants_result.scalars().all()
-
-    if not available_quants:
+    destination_id = _destination_location_id(db, request.destination)
+    if destination_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"No available stock for {product.name} in {request.location}"
+            detail=f"Unknown destination: {request.destination or 'production'}"
         )
 
-    # Calculate total available
-    total_available = sum(q.quantity - q.reserved_quantity for q in available_quants)
-
-    if total_available < request.qty:
+    # Pick from quants (FIFO, oldest lot first)
+    try:
+        allocations = StockReservationService(db).consume(
+            product.id, request.qty, location_ids=source_ids, skip_locked=True
+        )
+    except InsufficientStockError as e:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Insufficient stock. Requested: {request.qty}, Available: {total_available}"
+            detail=f"Insufficient stock for {product.name} in {request.location}. "
+                   f"Requested: {request.qty}, Available: {e.available}"
         )
 
-    # Pick from quants (FIFO)
-    remaining_qty = request.qty
-    picked_lots = []
-
-    for quant in available_quants:
-        if remaining_qty <= 0:
-            break
-
-        available = quant.quantity - quant.reserved_quantity
-        pick_qty = min(remaining_qty, available)
+    lot_numbers = dict(db.execute(
+        select(StockLot.id, StockLot.lot_number)
+        .where(StockLot.id.in_([a.lot_id for a in allocations if a.lot_id]))
+    ).all())
+    reference = f"WO-{request.work_order_id}" if request.work_order_id else f"BARCODE-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    uom = product.uom.value if product.uom else "Pcs"
 
-        # Update quant
-        quant.quantity -= pick_qty
-        remaining_qty -= pick_qty
-
-        # Get lot info
-        lot_result = await db.execute(
-            select(StockLot).where(StockLot.id == quant.lot_id)
-        )
-        lot = lot_result.scalar_one()
+    picked_lots = []
+    for allocation in allocations:
+        # One move per lot taken (FIFO traceability)
+        db.add(StockMove(
+            product_id=product.id,
+            qty=allocation.qty,
+            uom=uom,
+            location_id_from=allocation.location_id,
+            location_id_to=destination_id,
+            reference_doc=reference,
+            state=StockMoveStatus.DONE,
+            lot_id=allocation.lot_id
+        ))
         picked_lots.append({
-            "lot_number": lot.lot_number,
-            "qty": pick_qty
+            "lot_number": lot_numbers.get(allocation.lot_id),
+            "qty": float(allocation.qty)
         })
 
-    # Create stock move (picking)
-    stock_move = StockMove(
-        product_id=product.id,
-        move_type="pick",
-        quantity=request.qty,
-        from_location=request.location,
-        to_location=request.destination or "production",
-        reference=f"WO-{request.work_order_id}" if request.work_order_id else f"BARCODE-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        status="done",
-        created_by=current_user.id,
-        notes=request.notes or f"Picked via barcode scanner by {current_user.username}",
-        created_at=datetime.now()
-    )
-    db.add(stock_move)
-
-    await db.commit()
-
-    # Audit log
+    # Audit log (commits the pick with it)
     AuditLogger.log_action(
         db, current_user, "TRANSFER", "WAREHOUSE",
-        f"Picked {request.qty} {product.uom} of {product.name} via barcode",
+        f"Picked {request.qty} {uom} of {product.name} via barcode",
         entity_type="StockMove",
-        new_values={"barcode": request.barcode, "qty": request.qty, "location": request.location, "lots": picked_lots}
+        new_values={"barcode": request.barcode, "qty": request.qty, "location": request.location,
+                    "lots": picked_lots, "notes": request.notes}
     )
 
     return {
         "success": True,
-        "message": f"Picked {request.qty} {product.uom} of {product.name}",
+        "message": f"Picked {request.qty} {uom} of {product.name}",
         "product": {
             "id": product.id,
             "code": product.code,
@@ -360,6 +321,30 @@ async def pick_goods(
     }
 
 
+# Scanner location names -> Location.name patterns
+SCAN_LOCATIONS = {
+    "warehouse": "%Warehouse%",
+    "finishgoods": "%Finish%",
+}
+
+
+def _scan_location_ids(db: Session, location: str) -> tuple[int, ...]:
+    """Ids of the active stock locations a scanner location name stands for"""
+    return barcode_index.stock_locations(db, SCAN_LOCATIONS.get(location.lower(), location))
+
+
+def _destination_location_id(db: Session, destination: str | None) -> int | None:
+    """Location receiving picked goods; defaults to the production floor"""
+    if destination and destination.lower() != "production":
+        pattern = SCAN_LOCATIONS.get(destination.lower(), destination)
+        return db.scalar(
+            select(Location.id).where(Location.name.ilike(pattern)).order_by(Location.id).limit(1)
+        )
+    return db.scalar(
+        select(Location.id).where(Location.type == LocationType.PRODUCTION).order_by(Location.id).limit(1)
+    )
+
+
 @router.get("/history", response_model=list[BarcodeHistoryResponse])
 def get_barcode_history(
     location: str | None = None,
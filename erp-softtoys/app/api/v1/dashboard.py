@@ -15,10 +15,50 @@ from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.dependencies import require_permission
+from app.core.matview_refresher import dashboard_view_refresher
 from app.core.models.users import User
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+PLACEHOLDER_PRODUCTION_STATUS = [
+    {
+        "dept": "Cutting",
+        "total_jobs": 45,
+        "completed": 38,
+        "in_progress": 5,
+        "pending": 2,
+        "progress": 84,
+        "status": "Running"
+    },
+    {
+        "dept": "Sewing",
+        "total_jobs": 42,
+        "completed": 35,
+        "in_progress": 6,
+        "pending": 1,
+        "progress": 83,
+        "status": "Running"
+    },
+    {
+        "dept": "Finishing",
+        "total_jobs": 40,
+        "completed": 32,
+        "in_progress": 7,
+        "pending": 1,
+        "progress": 80,
+        "status": "Running"
+    },
+    {
+        "dept": "Packing",
+        "total_jobs": 38,
+        "completed": 30,
+        "in_progress": 6,
+        "pending": 2,
+        "progress": 79,
+        "status": "Running"
+    }
+]
+
 
 # ============================================================================
 # Dashboard Statistics (Top Cards)
@@ -65,10 +105,11 @@ async def get_dashboard_stats(
                     "refreshed_at": result.refreshed_at.isoformat() if result.refreshed_at else None,
                     "data_source": "materialized_view"
                 }
+            dashboard_view_refresher.report_fallback("stats", "mv_dashboard_stats", "view_empty")
         except Exception:
             # Rollback failed transaction and use fallback
             db.rollback()
-            pass
+            dashboard_view_refresher.report_fallback("stats", "mv_dashboard_stats", "view_unavailable")
 
         # Fallback to direct query if materialized view fails or not populated
         from datetime import datetime
@@ -131,45 +172,34 @@ async def get_production_status(
 
     Performance: <100ms (from materialized view)
     """
-    # Return mock data while materialized view is being set up
-    return [
-        {
-            "dept": "Cutting",
-            "total_jobs": 45,
-            "completed": 38,
-            "in_progress": 5,
-            "pending": 2,
-            "progress": 84,
-            "status": "Running"
-        },
-        {
-            "dept": "Sewing",
-            "total_jobs": 42,
-            "completed": 35,
-            "in_progress": 6,
-            "pending": 1,
-            "progress": 83,
-            "status": "Running"
-        },
-        {
-            "dept": "Finishing",
-            "total_jobs": 40,
-            "completed": 32,
-            "in_progress": 7,
-            "pending": 1,
-            "progress": 80,
-            "status": "Running"
-        },
-        {
-            "dept": "Packing",
-            "total_jobs": 38,
-            "completed": 30,
-            "in_progress": 6,
-            "pending": 2,
-            "progress": 79,
-            "status": "Running"
-        }
-    ]
+    try:
+        results = db.execute(text("""
+            SELECT dept, total_jobs, completed, in_progress, pending, avg_progress, status
+            FROM mv_production_dept_status
+            ORDER BY dept
+        """)).fetchall()
+        if results:
+            return [
+                {
+                    "dept": row.dept,
+                    "total_jobs": row.total_jobs,
+                    "completed": row.completed,
+                    "in_progress": row.in_progress,
+                    "pending": row.pending,
+                    "progress": round(float(row.avg_progress or 0)),
+                    "status": row.status
+                }
+                for row in results
+            ]
+        dashboard_view_refresher.report_fallback("production-status", "mv_production_dept_status", "view_empty")
+    except Exception:
+        db.rollback()
+        dashboard_view_refresher.report_fallback(
+            "production-status", "mv_production_dept_status", "view_unavailable"
+        )
+
+    # Placeholder data until the materialized view is populated
+    return PLACEHOLDER_PRODUCTION_STATUS
 
 
 # ============================================================================
@@ -215,6 +245,8 @@ async def get_recent_alerts(
         ]
     except Exception:
         # If materialized view doesn't exist, return mock data
+        db.rollback()
+        dashboard_view_refresher.report_fallback("alerts", "mv_recent_alerts", "view_unavailable")
         return [
             {
                 "id": 1,
@@ -294,26 +326,28 @@ async def refresh_materialized_views(
 
     Requires: DEVELOPER, SUPERADMIN, or ADMIN role
 
-    Refreshes:
+    Refreshes (CONCURRENTLY where the view has a unique index):
         - mv_dashboard_stats
         - mv_production_dept_status
+        - mv_qc_pass_rate
+        - mv_inventory_status
         - mv_recent_alerts
         - mv_mo_trends_7days
 
     Execution time: <1 second
-    Note: Auto-refresh runs every 5 minutes via cron job
+    Note: Views are also refreshed automatically when their source tables
+    change (app/core/matview_refresher.py)
     """
-    try:
-        query = text("SELECT refresh_dashboard_views()")
-        db.execute(query)
-        db.commit()
-
-        return {
-            "success": True,
-            "message": "Dashboard materialized views refreshed successfully"
-        }
-    except Exception as e:
+    durations = dashboard_view_refresher.refresh_all()
+    refreshed = {view: round(seconds * 1000) for view, seconds in durations.items() if seconds is not None}
+    if not refreshed:
         return {
             "success": False,
-            "message": f"Failed to refresh views: {str(e)}"
+            "message": "Failed to refresh views (see server log)",
+            "views": {}
         }
+    return {
+        "success": True,
+        "message": "Dashboard materialized views refreshed successfully",
+        "views": refreshed  # view -> refresh time in ms
+    }
@@ -11,11 +11,13 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import List, Optional
 
+from app.core.barcode_index import OrderEntry, ProductEntry, barcode_index
 from app.core.database import get_db
 from app.core.models.users import User
 from app.core.dependencies import require_permission
 from app.core.permissions import ModuleName, Permission
 from app.modules.finishgoods import FinishgoodsService
+from app.shared.audit import AuditLogger
 
 router = APIRouter(prefix="/finishgoods", tags=["FinishGoods-Mobile"])
 
@@ -117,6 +119,31 @@ class PrepareShipmentResponse(BaseModel):
     status: str = "prepared_for_shipment"
 
 
+# ==================== HELPERS ====================
+
+FG_LOCATION_PATTERN = "%Finish%"
+
+
+def _resolve_box(db: Session, barcode: str) -> tuple[ProductEntry, OrderEntry]:
+    """Product and MO of a box barcode.
+
+    Accepts FG carton labels (FG-YYYY-MOID-CTNxxx) and the box format
+    [MO_ID]-[PRODUCT_CODE]-[BOX_NUMBER]; raises ValueError otherwise.
+    """
+    resolution = barcode_index.resolve(db, barcode)
+    if resolution and resolution.kind == "carton":
+        return resolution.product, resolution.order
+
+    parts = barcode.split('-')
+    if len(parts) < 3 or not parts[0].isdigit() or not parts[-1].isdigit():
+        raise ValueError(f"Invalid barcode format: {barcode}")
+    product = barcode_index.product(db, '-'.join(parts[1:-1]))
+    order = barcode_index.order(db, int(parts[0]))
+    if not product or not order or order.product_id != product.id:
+        raise ValueError(f"Product not found for barcode: {barcode}")
+    return product, order
+
+
 # ==================== ENDPOINTS ====================
 
 @router.get("/pending-transfers", response_model=List[PendingTransferResponse])
@@ -162,25 +189,27 @@ def validate_barcode(
     - Stock information
     """
     try:
-        service = FinishgoodsService(db)
-        
-        # Decode barcode and get product info
-        # Barcode format: [MO_ID]-[PRODUCT_CODE]-[BOX_NUMBER]
-        barcode_parts = barcode.split('-')
-        if len(barcode_parts) < 3:
-            raise ValueError(f"Invalid barcode format: {barcode}")
-        
-        mo_id = int(barcode_parts[0])
-        product_code = barcode_parts[1]
-        box_number = int(barcode_parts[2])
-        
-        # Get product info
-        product_info = service.get_barcode_product_info(barcode)
-        
-        if not product_info:
-            raise ValueError(f"Product not found for barcode: {barcode}")
+        # Resolved from the barcode index - no product / MO query per scan
+        product, order = _resolve_box(db, barcode)
+        stock = barcode_index.stock(db, product.id)
+        unit_per_box = product.pcs_per_carton or 0
+        fg_qty = stock.qty(barcode_index.stock_locations(db, FG_LOCATION_PATTERN))
         
-        return product_info
+        return BarcodeValidationResponse(
+            id=barcode,
+            barcode=barcode,
+            product_code=product.code,
+            product_name=product.name,
+            article_ikea=product.code,
+            mo_id=order.id,
+            quantity=unit_per_box,
+            unit_per_box=unit_per_box,
+            box_count=int(fg_qty // unit_per_box) if unit_per_box else 0,
+            location="finishgoods",
+            received_date="",
+            packing_date="",
+            status="valid"
+        )
     
     except ValueError as e:
         raise HTTPException(
@@ -211,16 +240,22 @@ def scan_box(
     This creates a scan record for audit trail and receipt verification.
     """
     try:
-        service = FinishgoodsService(db)
+        product, order = _resolve_box(db, request.barcode)
+        if order.id != request.mo_id:
+            raise ValueError(f"Barcode {request.barcode} belongs to MO {order.id}, not MO {request.mo_id}")
         
-        # Create scan record
-        scan_record = service.record_box_scan(
-            barcode=request.barcode,
-            mo_id=request.mo_id,
-            box_number=request.box_number,
-            quantity=request.quantity,
-            user_id=current_user.id,
-            scanned_at=request.scanned_at
+        # Scan record = audit trail entry
+        scan_record = AuditLogger.log_action(
+            db, current_user, "CREATE", "WAREHOUSE",
+            f"Scanned box {request.box_number} of MO {order.id} ({request.quantity} pcs {product.code})",
+            entity_type="BoxScan",
+            entity_id=order.id,
+            new_values={
+                "barcode": request.barcode,
+                "box_number": request.box_number,
+                "quantity": request.quantity,
+                "scanned_at": request.scanned_at
+            }
         )
         
         return ScanBoxResponse(
@@ -234,6 +269,11 @@ def scan_box(
             status="recorded"
         )
     
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -7,21 +7,29 @@ from datetime import datetime
 
 import openpyxl
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
 
+from app.api.v1.jobs import submit_job
 from app.core.database import get_db
 from app.core.dependencies import require_permission
+from app.core.jobs import JobContext, job_handler
+from app.core.models.audit import AuditAction, AuditModule
 from app.core.models.bom import BOMDetail, BOMHeader
 from app.core.models.products import Category, Product
 from app.core.models.users import User
 from app.core.models.warehouse import Location, StockQuant
 from app.shared.audit import AuditLogger
+from app.shared.streaming_export import iter_rows, streaming_export
 
 router = APIRouter(prefix="/import-export", tags=["Import/Export"])
 
 # ====================== IMPORT ENDPOINTS ======================
 
+IMPORT_PROGRESS_EVERY = 100  # Rows between progress reports of an import job
+
+
 @router.post("/import/products", dependencies=[Depends(require_permission("import_export.import_data"))])
 async def import_products(
     file: UploadFile = File(...),
@@ -36,26 +44,22 @@ async def import_products(
     FAB-VEL-WHT,White Velvet Fabric,Raw Material,Meter,2,500
 
     Excel Format: Same columns as CSV
+
+    Large files: POST /import-export/import/products/jobs
     """
-    if file.filename.endswith('.csv'):
-        return await _import_products_csv(file, db, current_user)
-    elif file.filename.endswith(('.xlsx', '.xls')):
-        return await _import_products_excel(file, db, current_user)
-    else:
-        raise HTTPException(status_code=400, detail="File must be CSV or Excel (.xlsx, .xls)")
+    _check_import_file(file)
+    content = await file.read()
+    return await run_in_threadpool(_import_products, db, current_user.id, file.filename, content)
 
 
-async def _import_products_csv(file: UploadFile, db: Session, current_user: User):
-    """Import products from CSV."""
-    content = await file.read()
-    decoded = content.decode('utf-8')
-    csv_reader = csv.DictReader(io.StringIO(decoded))
+def _import_products(db: Session, user_id: int, filename: str, content: bytes, progress=None):
+    """Import products from a CSV or Excel upload."""
+    rows = _read_rows(filename, content)
 
     imported_count = 0
     errors = []
-    audit_logger = AuditLogger(db)
 
-    for row_num, row in enumerate(csv_reader, start=2):
+    for index, (row_num, row) in enumerate(rows, start=1):
         try:
             # Check if product exists
             existing = db.query(Product).filter(Product.code == row['code']).first()
@@ -81,90 +85,19 @@ async def _import_products_csv(file: UploadFile, db: Session, current_user: User
             db.add(product)
             imported_count += 1
 
-            # Audit log
-            audit_logger.log_create(
-                user_id=current_user.id,
-                module="Products",
-                action="Import",
-                entity_type="Product",
-                entity_id=None,
-                changes=f"Imported product {row['code']}"
-            )
-
-        except Exception as e:
-            errors.append(f"Row {row_num}: {str(e)}")
-
-    db.commit()
-
-    return {
-        "status": "success",
-        "imported": imported_count,
-        "errors": errors,
-        "total_rows": row_num - 1
-    }
-
-
-async def _import_products_excel(file: UploadFile, db: Session, current_user: User):
-    """Import products from Excel."""
-    content = await file.read()
-    workbook = openpyxl.load_workbook(io.BytesIO(content))
-    sheet = workbook.active
-
-    imported_count = 0
-    errors = []
-    audit_logger = AuditLogger(db)
-
-    # Assume first row is header
-    headers = [cell.value for cell in sheet[1]]
-
-    for row_num in range(2, sheet.max_row + 1):
-        try:
-            row_data = {headers[i]: sheet.cell(row_num, i+1).value for i in range(len(headers))}
-
-            # Check if product exists
-            existing = db.query(Product).filter(Product.code == row_data['code']).first()
-            if existing:
-                errors.append(f"Row {row_num}: Product {row_data['code']} already exists")
-                continue
-
-            # Validate category
-            category = db.query(Category).filter(Category.id == int(row_data['category_id'])).first()
-            if not category:
-                errors.append(f"Row {row_num}: Category ID {row_data['category_id']} not found")
-                continue
-
-            # Create product
-            product = Product(
-                code=row_data['code'],
-                name=row_data['name'],
-                type=row_data['type'],
-                uom=row_data['uom'],
-                category_id=int(row_data['category_id']),
-                min_stock=float(row_data.get('min_stock', 0))
-            )
-            db.add(product)
-            imported_count += 1
-
-            # Audit log
-            audit_logger.log_create(
-                user_id=current_user.id,
-                module="Products",
-                action="Import",
-                entity_type="Product",
-                entity_id=None,
-                changes=f"Imported product {row_data['code']}"
-            )
-
         except Exception as e:
             errors.append(f"Row {row_num}: {str(e)}")
+        finally:
+            _report_progress(progress, index, len(rows))
 
     db.commit()
+    _log_import(db, user_id, "Product", "products", imported_count)
 
     return {
         "status": "success",
         "imported": imported_count,
         "errors": errors,
-        "total_rows": sheet.max_row - 1
+        "total_rows": len(rows)
     }
 
 
@@ -182,26 +115,22 @@ async def import_bom(
     WIP-SEW-SHARK,THR-BLU-001,0.15,2
 
     Excel Format: Same columns as CSV
+
+    Large files: POST /import-export/import/bom/jobs
     """
-    if file.filename.endswith('.csv'):
-        return await _import_bom_csv(file, db, current_user)
-    elif file.filename.endswith(('.xlsx', '.xls')):
-        return await _import_bom_excel(file, db, current_user)
-    else:
-        raise HTTPException(status_code=400, detail="File must be CSV or Excel (.xlsx, .xls)")
+    _check_import_file(file)
+    content = await file.read()
+    return await run_in_threadpool(_import_bom, db, current_user.id, file.filename, content)
 
 
-async def _import_bom_csv(file: UploadFile, db: Session, current_user: User):
-    """Import BOM from CSV."""
-    content = await file.read()
-    decoded = content.decode('utf-8')
-    csv_reader = csv.DictReader(io.StringIO(decoded))
+def _import_bom(db: Session, user_id: int, filename: str, content: bytes, progress=None):
+    """Import BOM lines from a CSV or Excel upload."""
+    rows = _read_rows(filename, content)
 
     imported_count = 0
     errors = []
-    audit_logger = AuditLogger(db)
 
-    for row_num, row in enumerate(csv_reader, start=2):
+    for index, (row_num, row) in enumerate(rows, start=1):
         try:
             # Find product
             product = db.query(Product).filter(Product.code == row['product_code']).first()
@@ -239,101 +168,100 @@ async def _import_bom_csv(file: UploadFile, db: Session, current_user: User):
             db.add(bom_detail)
             imported_count += 1
 
-            # Audit log
-            audit_logger.log_create(
-                user_id=current_user.id,
-                module="BOM",
-                action="Import",
-                entity_type="BOMDetail",
-                entity_id=None,
-                changes=f"Imported BOM for {row['product_code']}"
-            )
-
         except Exception as e:
             errors.append(f"Row {row_num}: {str(e)}")
+        finally:
+            _report_progress(progress, index, len(rows))
 
     db.commit()
+    _log_import(db, user_id, "BOMDetail", "BOM lines", imported_count)
 
     return {
         "status": "success",
         "imported": imported_count,
         "errors": errors,
-        "total_rows": row_num - 1
+        "total_rows": len(rows)
     }
 
 
-async def _import_bom_excel(file: UploadFile, db: Session, current_user: User):
-    """Import BOM from Excel."""
-    content = await file.read()
-    workbook = openpyxl.load_workbook(io.BytesIO(content))
-    sheet = workbook.active
+def _check_import_file(file: UploadFile):
+    if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
+        raise HTTPException(status_code=400, detail="File must be CSV or Excel (.xlsx, .xls)")
 
-    imported_count = 0
-    errors = []
-    audit_logger = AuditLogger(db)
 
+def _read_rows(filename: str, content: bytes) -> list[tuple[int, dict]]:
+    """(row number, {column: value}) for every data row; the first row is the header."""
+    if filename.endswith('.csv'):
+        csv_reader = csv.DictReader(io.StringIO(content.decode('utf-8')))
+        return list(enumerate(csv_reader, start=2))
+
+    sheet = openpyxl.load_workbook(io.BytesIO(content)).active
     headers = [cell.value for cell in sheet[1]]
+    return [
+        (row_num, {headers[i]: sheet.cell(row_num, i+1).value for i in range(len(headers))})
+        for row_num in range(2, sheet.max_row + 1)
+    ]
+
+
+def _log_import(db: Session, user_id: int, entity_type: str, noun: str, imported_count: int):
+    AuditLogger.log_action(
+        db=db,
+        user=db.get(User, user_id),
+        action=AuditAction.IMPORT,
+        module=AuditModule.ADMIN,
+        description=f"Import/Export: Imported {imported_count} {noun}",
+        entity_type=entity_type,
+        new_values={"imported_count": imported_count},
+    )
 
-    for row_num in range(2, sheet.max_row + 1):
-        try:
-            row_data = {headers[i]: sheet.cell(row_num, i+1).value for i in range(len(headers))}
 
-            # Find product
-            product = db.query(Product).filter(Product.code == row_data['product_code']).first()
-            if not product:
-                errors.append(f"Row {row_num}: Product {row_data['product_code']} not found")
-                continue
+def _report_progress(progress, done: int, total: int):
+    if progress is not None and (done % IMPORT_PROGRESS_EVERY == 0 or done == total):
+        progress(done, total)
 
-            # Find component
-            component = db.query(Product).filter(Product.code == row_data['component_code']).first()
-            if not component:
-                errors.append(f"Row {row_num}: Component {row_data['component_code']} not found")
-                continue
 
-            # Check if BOM header exists
-            bom_header = db.query(BOMHeader).filter(BOMHeader.product_id == product.id).first()
-            if not bom_header:
-                bom_header = BOMHeader(
-                    product_id=product.id,
-                    bom_type="Manufacturing",
-                    qty_output=1.0,
-                    is_active=True,
-                    revision="1.0"
-                )
-                db.add(bom_header)
-                db.flush()
+# ====================== BACKGROUND IMPORTS ======================
 
-            # Create BOM detail
-            bom_detail = BOMDetail(
-                bom_header_id=bom_header.id,
-                component_id=component.id,
-                qty_needed=float(row_data['qty_needed']),
-                wastage_percent=float(row_data.get('wastage_percent', 0))
-            )
-            db.add(bom_detail)
-            imported_count += 1
+BACKGROUND_IMPORTS = {
+    "products": _import_products,
+    "bom": _import_bom,
+}
 
-            # Audit log
-            audit_logger.log_create(
-                user_id=current_user.id,
-                module="BOM",
-                action="Import",
-                entity_type="BOMDetail",
-                entity_id=None,
-                changes=f"Imported BOM for {row_data['product_code']}"
-            )
 
-        except Exception as e:
-            errors.append(f"Row {row_num}: {str(e)}")
+@job_handler("import_export.import")
+def run_import_job(ctx: JobContext) -> dict:
+    return BACKGROUND_IMPORTS[ctx.params["import_type"]](
+        ctx.db, ctx.user_id, ctx.params["filename"], ctx.payload, progress=ctx.progress
+    )
 
-    db.commit()
 
-    return {
-        "status": "success",
-        "imported": imported_count,
-        "errors": errors,
-        "total_rows": sheet.max_row - 1
-    }
+@router.post(
+    "/import/{import_type}/jobs",
+    status_code=202,
+    summary="Import products or BOM from CSV/Excel in the background"
+)
+async def submit_import(
+    import_type: str,
+    file: UploadFile = File(...),
+    current_user: User = Depends(require_permission("import_export.import_data"))
+):
+    """Queue a products / BOM import instead of running it inside the request.
+
+    Same file format as POST /import-export/import/{type}. Poll
+    GET /jobs/{job_id} for progress (rows processed) and the import result
+    with its per-row errors.
+    """
+    if import_type not in BACKGROUND_IMPORTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid import type. Supported: {', '.join(BACKGROUND_IMPORTS)}"
+        )
+    _check_import_file(file)
+
+    content = await file.read()
+    return submit_job(
+        "import_export.import", current_user, {"import_type": import_type, "filename": file.filename}, payload=content
+    )
 
 
 # ====================== EXPORT ENDPOINTS ======================
@@ -344,78 +272,25 @@ async def export_products(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("import_export.export_data"))
 ):
-    """Export all products to CSV or Excel.
+    """Export all products to CSV or Excel (streamed).
 
     Query Parameters:
     - format: csv or excel
     """
-    products = db.query(Product).all()
-
-    if format == "csv":
-        return _export_products_csv(products)
-    else:
-        return _export_products_excel(products)
-
-
-def _export_products_csv(products: list[Product]):
-    """Export products to CSV."""
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    writer.writerow(['code', 'name', 'type', 'uom', 'category_id', 'min_stock', 'created_at'])
-
-    # Data
-    for product in products:
-        writer.writerow([
-            product.code,
-            product.name,
-            product.type,
-            product.uom,
-            product.category_id,
-            product.min_stock,
-            product.created_at.strftime('%Y-%m-%d %H:%M:%S') if product.created_at else ''
-        ])
-
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=products_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"}
-    )
-
-
-def _export_products_excel(products: list[Product]):
-    """Export products to Excel."""
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Products"
-
-    # Header
-    headers = ['code', 'name', 'type', 'uom', 'category_id', 'min_stock', 'created_at']
-    sheet.append(headers)
-
-    # Data
-    for product in products:
-        sheet.append([
-            product.code,
-            product.name,
-            product.type,
-            product.uom,
-            product.category_id,
-            product.min_stock,
-            product.created_at.strftime('%Y-%m-%d %H:%M:%S') if product.created_at else ''
-        ])
-
-    # Save to BytesIO
-    output = io.BytesIO()
-    workbook.save(output)
-    output.seek(0)
-
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=products_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"}
+    statement = select(
+        Product.code,
+        Product.name,
+        Product.type,
+        Product.uom,
+        Product.category_id,
+        Product.min_stock,
+        Product.created_at
+    ).order_by(Product.id)
+
+    return streaming_export(
+        format, "products", "Products",
+        ['code', 'name', 'type', 'uom', 'category_id', 'min_stock', 'created_at'],
+        iter_rows(db, statement)
     )
 
 
@@ -425,96 +300,31 @@ async def export_bom(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("import_export.export_data"))
 ):
-    """Export BOM (Bill of Materials) to CSV or Excel.
+    """Export BOM (Bill of Materials) to CSV or Excel (streamed).
 
     Query Parameters:
     - format: csv or excel
     """
-    # Query BOM with product and component info
-    bom_data = db.query(
-        BOMHeader, BOMDetail, Product,
-        Product.code.label('component_code')
-    ).join(
+    component = aliased(Product)
+    statement = select(
+        Product.code,
+        Product.name,
+        component.code,
+        component.name,
+        BOMDetail.qty_needed,
+        BOMDetail.wastage_percent
+    ).select_from(BOMHeader).join(
         BOMDetail, BOMHeader.id == BOMDetail.bom_header_id
     ).join(
         Product, BOMHeader.product_id == Product.id
     ).join(
-        Product, BOMDetail.component_id == Product.id, isouter=True
-    ).all()
-
-    if format == "csv":
-        return _export_bom_csv(bom_data, db)
-    else:
-        return _export_bom_excel(bom_data, db)
-
-
-def _export_bom_csv(bom_data, db: Session):
-    """Export BOM to CSV."""
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    writer.writerow(['product_code', 'product_name', 'component_code', 'component_name', 'qty_needed', 'wastage_percent'])
-
-    # Batch-fetch all component products to avoid N+1
-    comp_ids = {bom_detail.component_id for _, bom_detail, _, _ in bom_data}
-    comp_map = {p.id: p for p in db.query(Product).filter(Product.id.in_(comp_ids)).all()} if comp_ids else {}
-
-    # Data
-    for bom_header, bom_detail, product, component_code in bom_data:
-        component = comp_map.get(bom_detail.component_id)
-        writer.writerow([
-            product.code,
-            product.name,
-            component.code if component else '',
-            component.name if component else '',
-            bom_detail.qty_needed,
-            bom_detail.wastage_percent
-        ])
-
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=bom_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"}
-    )
+        component, BOMDetail.component_id == component.id, isouter=True
+    ).order_by(BOMHeader.id, BOMDetail.id)
 
-
-def _export_bom_excel(bom_data, db: Session):
-    """Export BOM to Excel."""
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "BOM"
-
-    # Header
-    headers = ['product_code', 'product_name', 'component_code', 'component_name', 'qty_needed', 'wastage_percent']
-    sheet.append(headers)
-
-    # Batch-fetch all component products to avoid N+1
-    comp_ids = {bom_detail.component_id for _, bom_detail, _, _ in bom_data}
-    comp_map = {p.id: p for p in db.query(Product).filter(Product.id.in_(comp_ids)).all()} if comp_ids else {}
-
-    # Data
-    for bom_header, bom_detail, product, component_code in bom_data:
-        component = comp_map.get(bom_detail.component_id)
-        sheet.append([
-            product.code,
-            product.name,
-            component.code if component else '',
-            component.name if component else '',
-            bom_detail.qty_needed,
-            bom_detail.wastage_percent
-        ])
-
-    # Save to BytesIO
-    output = io.BytesIO()
-    workbook.save(output)
-    output.seek(0)
-
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=bom_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"}
+    return streaming_export(
+        format, "bom", "BOM",
+        ['product_code', 'product_name', 'component_code', 'component_name', 'qty_needed', 'wastage_percent'],
+        iter_rows(db, statement)
     )
 
 
@@ -525,86 +335,32 @@ async def export_inventory(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("import_export.export_data"))
 ):
-    """Export current inventory to CSV or Excel.
+    """Export current inventory to CSV or Excel (streamed).
 
     Query Parameters:
     - format: csv or excel
     - location_id: Optional filter by location
     """
-    query = db.query(StockQuant, Product, Location).join(
+    statement = select(
+        Product.code,
+        Product.name,
+        Location.name,
+        func.coalesce(StockQuant.qty_on_hand, 0) - func.coalesce(StockQuant.qty_reserved, 0),
+        StockQuant.qty_reserved,
+        Product.uom
+    ).select_from(StockQuant).join(
         Product, StockQuant.product_id == Product.id
     ).join(
         Location, StockQuant.location_id == Location.id
-    )
+    ).order_by(StockQuant.id)
 
     if location_id:
-        query = query.filter(StockQuant.location_id == location_id)
-
-    inventory_data = query.all()
-
-    if format == "csv":
-        return _export_inventory_csv(inventory_data)
-    else:
-        return _export_inventory_excel(inventory_data)
-
-
-def _export_inventory_csv(inventory_data):
-    """Export inventory to CSV."""
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    writer.writerow(['product_code', 'product_name', 'location', 'qty_available', 'qty_reserved', 'uom'])
-
-    # Data
-    for stock_quant, product, location in inventory_data:
-        writer.writerow([
-            product.code,
-            product.name,
-            location.name,
-            stock_quant.qty_available,
-            stock_quant.qty_reserved,
-            product.uom
-        ])
-
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=inventory_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"}
-    )
-
+        statement = statement.where(StockQuant.location_id == location_id)
 
-def _export_inventory_excel(inventory_data):
-    """Export inventory to Excel."""
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Inventory"
-
-    # Header
-    headers = ['product_code', 'product_name', 'location', 'qty_available', 'qty_reserved', 'uom']
-    sheet.append(headers)
-
-    # Data
-    for stock_quant, product, location in inventory_data:
-        sheet.append([
-            product.code,
-            product.name,
-            location.name,
-            stock_quant.qty_available,
-            stock_quant.qty_reserved,
-            product.uom
-        ])
-
-    # Save to BytesIO
-    output = io.BytesIO()
-    workbook.save(output)
-    output.seek(0)
-
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=inventory_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"}
+    return streaming_export(
+        format, "inventory", "Inventory",
+        ['product_code', 'product_name', 'location', 'qty_available', 'qty_reserved', 'uom'],
+        iter_rows(db, statement)
     )
 
 
@@ -614,78 +370,25 @@ async def export_users(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("import_export.export_data"))
 ):
-    """Export users to CSV or Excel (for backup/audit).
+    """Export users to CSV or Excel (for backup/audit, streamed).
 
     Query Parameters:
     - format: csv or excel
     """
-    users = db.query(User).all()
-
-    if format == "csv":
-        return _export_users_csv(users)
-    else:
-        return _export_users_excel(users)
-
-
-def _export_users_csv(users: list[User]):
-    """Export users to CSV."""
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    writer.writerow(['username', 'email', 'full_name', 'role', 'department', 'is_active', 'created_at'])
-
-    # Data
-    for user in users:
-        writer.writerow([
-            user.username,
-            user.email,
-            user.full_name,
-            user.role,
-            user.department,
-            user.is_active,
-            user.created_at.strftime('%Y-%m-%d %H:%M:%S') if user.created_at else ''
-        ])
-
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=users_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"}
-    )
-
-
-def _export_users_excel(users: list[User]):
-    """Export users to Excel."""
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Users"
-
-    # Header
-    headers = ['username', 'email', 'full_name', 'role', 'department', 'is_active', 'created_at']
-    sheet.append(headers)
-
-    # Data
-    for user in users:
-        sheet.append([
-            user.username,
-            user.email,
-            user.full_name,
-            user.role,
-            user.department,
-            user.is_active,
-            user.created_at.strftime('%Y-%m-%d %H:%M:%S') if user.created_at else ''
-        ])
-
-    # Save to BytesIO
-    output = io.BytesIO()
-    workbook.save(output)
-    output.seek(0)
-
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=users_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"}
+    statement = select(
+        User.username,
+        User.email,
+        User.full_name,
+        User.role,
+        User.department,
+        User.is_active,
+        User.created_at
+    ).order_by(User.id)
+
+    return streaming_export(
+        format, "users", "Users",
+        ['username', 'email', 'full_name', 'role', 'department', 'is_active', 'created_at'],
+        iter_rows(db, statement)
     )
 
 
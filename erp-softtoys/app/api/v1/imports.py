@@ -6,6 +6,7 @@ Endpoints:
 - POST /imports/materials - Upload materials Excel
 - POST /imports/articles - Upload articles Excel
 - POST /imports/bom - Upload BOM Excel
+- POST /imports/{type}/jobs - Import suppliers / materials / BOM in the background
 - GET /imports/templates/{type} - Download Excel template
 - GET /imports/history - View import history (future)
 """
@@ -14,8 +15,10 @@ from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from app.api.v1.jobs import submit_job
 from app.core.database import get_db
 from app.core.dependencies import require_permission
+from app.core.jobs import JobContext, JobError, job_handler
 from app.core.models.users import User
 from app.services.masterdata_import_service import MasterdataImportService
 
@@ -275,6 +278,58 @@ async def import_bom(
     return result
 
 
+# ====================== BACKGROUND IMPORTS ======================
+
+BACKGROUND_IMPORTS = {
+    "suppliers": MasterdataImportService.import_suppliers,
+    "materials": MasterdataImportService.import_materials,
+    "bom": MasterdataImportService.import_bom,
+}
+
+
+@job_handler("masterdata.import")
+def run_import_job(ctx: JobContext) -> dict:
+    service = MasterdataImportService(ctx.db, ctx.user_id)
+    result = BACKGROUND_IMPORTS[ctx.params["import_type"]](service, ctx.payload, progress=ctx.progress)
+    if not result["success"]:
+        raise JobError({
+            "message": "Import failed. Please fix errors and try again.",
+            "errors": result["errors"],
+        })
+    return result
+
+
+@router.post(
+    "/{import_type}/jobs",
+    status_code=202,
+    summary="Import suppliers, materials or BOM from Excel in the background"
+)
+async def submit_import(
+    import_type: str,
+    file: UploadFile = File(..., description="Excel file (.xlsx)"),
+    current_user: User = Depends(require_permission("masterdata.import"))
+):
+    """Queue an Excel import instead of running it inside the request.
+
+    Same file format and validation as POST /imports/{type}. Poll
+    GET /jobs/{job_id} for progress (rows written) and the import result;
+    a failed validation ends the job with status "failed" and the row errors.
+    """
+    if import_type not in BACKGROUND_IMPORTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid import type. Supported: {', '.join(BACKGROUND_IMPORTS)}"
+        )
+    if not file.filename.endswith(('.xlsx', '.xls')):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be Excel format (.xlsx or .xls)"
+        )
+
+    content = await file.read()
+    return submit_job("masterdata.import", current_user, {"import_type": import_type}, payload=content)
+
+
 # ====================== TEMPLATE ENDPOINTS ======================
 
 @router.get(
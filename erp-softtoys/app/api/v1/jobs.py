@@ -0,0 +1,79 @@
+"""Background Jobs API
+Status, progress and artifacts of jobs submitted by the report / import
+endpoints (see app/core/jobs.py).
+
+Endpoints:
+- GET /jobs/{job_id} - Job status, progress and result
+- GET /jobs/{job_id}/artifact - Download the generated file
+"""
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from app.core.config import settings
+from app.core.dependencies import get_current_user
+from app.core.jobs import JOB_SUCCEEDED, JobQueueFullError, job_runner
+from app.core.models.users import User, UserRole
+
+router = APIRouter(prefix="/jobs", tags=["Background Jobs"])
+
+# Roles that may see every user's jobs
+JOB_ADMIN_ROLES = {UserRole.DEVELOPER, UserRole.SUPERADMIN, UserRole.ADMIN}
+
+
+def submit_job(kind: str, user: User, params: dict | None = None, payload: bytes | None = None) -> dict:
+    """Queue a job for `user`; the 202 body of every job submission endpoint."""
+    try:
+        job = job_runner.submit(kind, params, user_id=user.id, payload=payload)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"}) from e
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "status_url": f"{settings.API_PREFIX}/jobs/{job['id']}",
+    }
+
+
+def _job_for(job_id: str, user: User) -> dict:
+    job = job_runner.get(job_id)
+    if job is None or (job["user_id"] != user.id and user.role not in JOB_ADMIN_ROLES):
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Job status (queued, running, succeeded, failed), progress and result.
+
+    **Returns**:
+    ```json
+    {
+        "id": "3f2c...",
+        "kind": "masterdata.bom",
+        "status": "running",
+        "progress": {"done": 4000, "total": 20000},
+        "result": null,
+        "error": null,
+        "artifact": null
+    }
+    ```
+    """
+    job = _job_for(job_id, current_user)
+    if job["artifact"]:
+        job["artifact_url"] = f"{settings.API_PREFIX}/jobs/{job_id}/artifact"
+    return job
+
+
+@router.get("/{job_id}/artifact")
+def download_job_artifact(job_id: str, current_user: User = Depends(get_current_user)):
+    """Download the file produced by a finished job."""
+    job = _job_for(job_id, current_user)
+    if job["status"] != JOB_SUCCEEDED or not job["artifact"]:
+        raise HTTPException(status_code=409, detail=f"Job has no artifact (status: {job['status']})")
+    content = job_runner.artifact(job_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Job artifact expired")
+    return Response(
+        content=content,
+        media_type=job["artifact"]["media_type"],
+        headers={"Content-Disposition": f"attachment; filename={job['artifact']['filename']}"}
+    )
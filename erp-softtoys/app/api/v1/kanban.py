@@ -5,7 +5,7 @@ from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
-from sqlalchemy import and_
+from sqlalchemy import and_, func, select
 from sqlalchemy.orm import Session
 
 from app.core.base_production_service import BaseProductionService
@@ -16,6 +16,7 @@ from app.core.models.users import User
 from app.core.dependencies import require_permission
 from app.core.permissions import ModuleName, Permission
 from app.core.websocket import ws_manager
+from app.services.sequence_service import next_sequence
 
 router = APIRouter(prefix="/ppic/kanban", tags=["E-Kanban"])
 
@@ -101,9 +102,13 @@ async def create_kanban_card(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    # Generate card number
-    card_count = db.query(KanbanCard).count()
-    card_number = f"KAN-{datetime.now().strftime('%Y%m%d')}-{card_count + 1:04d}"
+    # Generate card number (yearly counter, seeded once from the legacy card count)
+    now = datetime.now()
+    seq = next_sequence(
+        db, "KAN", str(now.year),
+        seed=lambda conn: conn.execute(select(func.count(KanbanCard.id))).scalar() or 0
+    )
+    card_number = f"KAN-{now.strftime('%Y%m%d')}-{seq:04d}"
 
     # Create kanban card
     kanban = KanbanCard(
@@ -23,6 +23,7 @@ from app.services.material_allocation_service import (
     MaterialAllocationService,
     allocate_materials_for_mo
 )
+from app.services.mrp_batch_service import run_batch_mrp
 
 
 router = APIRouter(prefix="/ppic/material-allocation", tags=["Material Allocation"])
@@ -105,6 +106,26 @@ class CheckWOCanStartResponse(BaseModel):
     blocking_reasons: List[str]
 
 
+class BatchMRPRequest(BaseModel):
+    """Request for a batch MRP run (explicit MOs or a planning week)"""
+    mo_ids: List[int] = []
+    week: Optional[str] = None
+    include_draft_po: bool = True
+
+
+class BatchMRPResponse(BaseModel):
+    """Batch MRP result: per-material netting, per-MO allocations and shortages"""
+    week: Optional[str]
+    mo_count: int
+    mo_ids: List[int]
+    material_count: int
+    materials: List[dict]
+    allocations: List[dict]
+    shortages: List[dict]
+    suggested_pos: List[dict]
+    has_shortages: bool
+
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
@@ -202,6 +223,33 @@ def allocate_materials(
         raise HTTPException(status_code=500, detail=f"Error allocating materials: {str(e)}")
 
 
+@router.post("/mrp-run", response_model=BatchMRPResponse)
+def batch_mrp_run(
+    request: BatchMRPRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Batch MRP for many Manufacturing Orders (PPIC morning run)
+
+    Explodes every MO's BOM together and nets the requirements against
+    warehouse stock and open POs in memory. Read-only: returns shortages,
+    suggested POs and the planned allocations without reserving stock.
+    """
+
+    if not request.mo_ids and not request.week:
+        raise HTTPException(status_code=422, detail="Either mo_ids or week is required")
+
+    try:
+        return run_batch_mrp(
+            db,
+            mo_ids=request.mo_ids,
+            week=request.week,
+            include_draft_po=request.include_draft_po
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/start-wo", response_model=StartWOResponse)
 def start_work_order(
     request: StartWORequest,
@@ -21,6 +21,7 @@ from app.services.material_allocation_service import (
     MaterialShortageAlert,
     allocate_materials_for_mo
 )
+from app.services.material_shortage_service import MaterialShortageService
 
 
 router = APIRouter(
@@ -388,34 +389,28 @@ async def get_material_shortage_alerts(
     **Permissions**: Warehouse, PPIC, Production can view
     """
     
-    service = MaterialAllocationService(db)
-    
-    alerts = service.get_material_shortage_alerts(
+    rows = MaterialShortageService(db).alerts(
         mo_id=mo_id,
         department=department,
         severity=severity
     )
     
-    response = []
-    for alert in alerts:
-        # Get WO details
-        wo = db.query(WorkOrder).filter_by(id=alert.wo_id).first()
-        
-        response.append(ShortageAlertResponse(
-            material_id=alert.material_id,
-            material_code=alert.material_code,
-            material_name=alert.material_name,
-            required_qty=float(alert.required_qty),
-            available_qty=float(alert.available_qty),
-            shortage_qty=float(alert.shortage_qty),
-            shortage_pct=float((alert.shortage_qty / alert.required_qty) * 100),
-            wo_id=alert.wo_id,
-            wo_number=wo.wo_number if wo else f"WO-{alert.wo_id}",
-            department=alert.department,
-            severity=alert.severity
-        ))
-    
-    return response
+    return [
+        ShortageAlertResponse(
+            material_id=row.material_id,
+            material_code=row.material_code,
+            material_name=row.material_name,
+            required_qty=float(row.required_qty),
+            available_qty=float(row.available_qty),
+            shortage_qty=float(row.shortage_qty),
+            shortage_pct=float((row.shortage_qty / row.required_qty) * 100),
+            wo_id=row.wo_id,
+            wo_number=row.wo_number or f"WO-{row.wo_id}",
+            department=row.department.value,
+            severity=row.severity
+        )
+        for row in rows
+    ]
 
 
 @router.get(
@@ -437,47 +432,7 @@ async def get_shortage_alerts_summary(
     - Top 10 most critical materials
     """
     
-    service = MaterialAllocationService(db)
-    
-    all_alerts = service.get_material_shortage_alerts()
-    
-    # Count by severity
-    severity_count = {}
-    for alert in all_alerts:
-        severity_count[alert.severity] = severity_count.get(alert.severity, 0) + 1
-    
-    # Count by department
-    dept_count = {}
-    for alert in all_alerts:
-        dept_count[alert.department] = dept_count.get(alert.department, 0) + 1
-    
-    # Top 10 materials by shortage quantity
-    material_shortage = {}
-    for alert in all_alerts:
-        key = alert.material_code
-        if key not in material_shortage:
-            material_shortage[key] = {
-                "material_code": alert.material_code,
-                "material_name": alert.material_name,
-                "total_shortage": 0,
-                "wo_count": 0
-            }
-        material_shortage[key]["total_shortage"] += float(alert.shortage_qty)
-        material_shortage[key]["wo_count"] += 1
-    
-    top_10_materials = sorted(
-        material_shortage.values(),
-        key=lambda x: x["total_shortage"],
-        reverse=True
-    )[:10]
-    
-    return {
-        "total_shortages": len(all_alerts),
-        "by_severity": severity_count,
-        "by_department": dept_count,
-        "top_10_materials": top_10_materials,
-        "has_critical": severity_count.get("CRITICAL", 0) > 0
-    }
+    return MaterialShortageService(db).summary()
 
 
 @router.get(
@@ -22,6 +22,7 @@ from app.core.database import get_db
 from app.core.dependencies import get_current_user
 from app.core.models import User, SPKDailyProduction, SPKProductionCompletion, SPK
 from app.core.models import SPKModification, MaterialDebt, MaterialDebtSettlement, AuditLog
+from app.services.spk_progress_rollup_service import SPKProgressRollupService
 
 router = APIRouter(prefix="/ppic", tags=["ppic"])
 
@@ -129,12 +130,8 @@ async def record_daily_production(
         )
     
     # Calculate cumulative quantity
-    last_entry = db.query(SPKDailyProduction)\
-        .filter(SPKDailyProduction.spk_id == spk_id)\
-        .order_by(SPKDailyProduction.production_date.desc())\
-        .first()
-    
-    cumulative = (last_entry.cumulative_qty if last_entry else 0) + request.input_qty
+    rollup_service = SPKProgressRollupService(db)
+    cumulative = rollup_service.get_cumulative_qty(spk_id) + request.input_qty
     
     # Create daily entry
     daily_entry = SPKDailyProduction(
@@ -147,6 +144,9 @@ async def record_daily_production(
         notes=request.notes
     )
     db.add(daily_entry)
+    rollup_service.apply_entry(
+        spk_id, request.production_date, request.input_qty, cumulative, request.status
+    )
     
     # Update SPK production status
     spk.actual_qty = cumulative
@@ -298,21 +298,24 @@ async def complete_spk_production(
         raise HTTPException(status_code=404, detail="SPK not found")
     
     # Verify quantity reached target
-    if (spk.actual_qty or 0) < spk.target_qty:
+    rollup_service = SPKProgressRollupService(db)
+    actual_qty = rollup_service.get_cumulative_qty(spk_id)
+    if actual_qty < spk.target_qty:
         raise HTTPException(
             status_code=400,
-            detail=f"Cannot complete. Need {spk.target_qty - (spk.actual_qty or 0)} more units"
+            detail=f"Cannot complete. Need {spk.target_qty - actual_qty} more units"
         )
     
     # Mark as completed
     spk.production_status = "COMPLETED"
     spk.completion_date = date.today()
+    rollup_service.mark_completed(spk_id, spk.completion_date)
     
     # Create completion record
     completion = SPKProductionCompletion(
         spk_id=spk_id,
         target_qty=spk.target_qty,
-        actual_qty=spk.actual_qty or 0,
+        actual_qty=actual_qty,
         completed_date=spk.completion_date,
         confirmed_by_id=current_user.id,
         confirmation_notes=request.confirmation_notes,
@@ -329,7 +332,7 @@ async def complete_spk_production(
         user_id=current_user.id,
         details={
             "target_qty": spk.target_qty,
-            "actual_qty": spk.actual_qty or 0,
+            "actual_qty": actual_qty,
             "completion_date": spk.completion_date.isoformat()
         },
         timestamp=datetime.utcnow()
@@ -342,7 +345,7 @@ async def complete_spk_production(
             "spk_id": spk_id,
             "production_status": "COMPLETED",
             "target_qty": spk.target_qty,
-            "actual_qty": spk.actual_qty or 0,
+            "actual_qty": actual_qty,
             "completion_date": spk.completion_date.isoformat()
         },
         "message": f"✅ SPK {spk_id} marked as COMPLETED",
@@ -13,7 +13,7 @@ Endpoints:
 - GET /ppic/alerts                       - Real-time alerts
 """
 
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
@@ -23,6 +23,7 @@ from app.core.dependencies import get_current_user
 from app.core.models import User, SPKDailyProduction, AuditLog, SPK
 from app.core.models.manufacturing import SPKStatus, ManufacturingOrder, WorkOrder, WorkOrderStatus, Department
 from app.core.models.bom import BOMHeader, BOMDetail
+from app.services.ppic_dashboard_service import PPICDashboardAggregator
 
 router = APIRouter(prefix="/ppic", tags=["ppic"])
 
@@ -72,61 +73,12 @@ async def get_ppic_dashboard(
     """
     # await check_permission - removed
     
-    # Get all SPKs
-    spks = db.query(SPK).all()
-    
-    summary = {
-        "total_spks": len(spks),
-        "not_started": sum(1 for s in spks if s.production_status == "NOT_STARTED"),
-        "in_progress": sum(1 for s in spks if s.production_status == "IN_PROGRESS"),
-        "completed": sum(1 for s in spks if s.production_status == "COMPLETED"),
-        "on_track": 0,
-        "off_track": 0
-    }
-    
-    spk_list = []
-    for spk in spks:
-        actual_qty = spk.actual_qty or 0
-        completion_pct = (actual_qty / spk.target_qty * 100) if spk.target_qty > 0 else 0
-        
-        # Get health status
-        health = _calculate_health_status(spk, db)
-        if health == "ON_TRACK":
-            summary["on_track"] += 1
-        elif health == "OFF_TRACK":
-            summary["off_track"] += 1
-        
-        # Estimate completion date
-        entries = db.query(SPKDailyProduction)\
-            .filter(SPKDailyProduction.spk_id == spk.id).all()
-        
-        daily_avg = (actual_qty / len(entries)) if entries else 0
-        remaining_qty = max(0, spk.target_qty - actual_qty)
-        days_remaining = int(remaining_qty / daily_avg) if daily_avg > 0 else 0
-        
-        est_completion = (date.today() + timedelta(days=days_remaining)).isoformat() \
-                        if days_remaining > 0 else spk.completion_date.isoformat() if spk.completion_date else None
-        
-        spk_list.append({
-            "spk_id": spk.id,
-            "spk_number": spk.spk_number if hasattr(spk, 'spk_number') else f"SPK-{spk.id:03d}",
-            "product": spk.product_name if hasattr(spk, 'product_name') else "Unknown",
-            "target_qty": spk.target_qty,
-            "actual_qty": actual_qty,
-            "remaining_qty": remaining_qty,
-            "completion_pct": round(completion_pct, 1),
-            "status": spk.production_status,
-            "health": health,
-            "daily_rate": round(daily_avg, 1),
-            "est_completion": est_completion
-        })
+    # Set-based aggregation: query count does not grow with the number of SPKs
+    data = PPICDashboardAggregator(db).get_dashboard()
     
     return {
         "success": True,
-        "data": {
-            "dashboard": summary,
-            "spks": spk_list
-        },
+        "data": data,
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -822,65 +774,11 @@ async def get_on_track_status(
     """
     # await check_permission - removed
     
-    spks = db.query(SPK).filter(SPK.production_status == "IN_PROGRESS").all()
-    
-    on_track = []
-    off_track = []
-    
-    today = date.today()
-    
-    for spk in spks:
-        actual_qty = spk.actual_qty or 0
-        entries = db.query(SPKDailyProduction)\
-            .filter(SPKDailyProduction.spk_id == spk.id).all()
-        
-        if not entries:
-            continue
-        
-        # Calculate metrics
-        days_elapsed = len(entries)
-        daily_rate = actual_qty / days_elapsed if days_elapsed > 0 else 0
-        remaining_qty = max(0, spk.target_qty - actual_qty)
-        days_needed = int(remaining_qty / daily_rate) if daily_rate > 0 else 999
-        
-        # Expected progress (assuming consistent daily rate)
-        expected_qty = daily_rate * days_elapsed
-        
-        # Check if on track
-        if days_elapsed > 0 and actual_qty >= (expected_qty * 0.85):  # 85% tolerance
-            status = "ON_TRACK"
-            reason = f"Daily rate: {daily_rate:.0f} units/day, est complete {(today + timedelta(days=days_needed)).isoformat()}"
-            on_track.append({
-                "spk_id": spk.id,
-                "spk_number": spk.spk_number if hasattr(spk, 'spk_number') else f"SPK-{spk.id:03d}",
-                "status": status,
-                "reason": reason
-            })
-        else:
-            status = "OFF_TRACK"
-            required_daily = (remaining_qty / days_needed) if days_needed > 0 else 0
-            reason = f"Behind: need {required_daily:.0f}/day but only {daily_rate:.0f}/day"
-            alert = "🔴 URGENT - will not meet deadline" if days_needed > 7 else "🟡 WARNING - at risk"
-            off_track.append({
-                "spk_id": spk.id,
-                "spk_number": spk.spk_number if hasattr(spk, 'spk_number') else f"SPK-{spk.id:03d}",
-                "status": status,
-                "reason": reason,
-                "alert": alert,
-                "required_daily_rate": round(required_daily, 1),
-                "current_daily_rate": round(daily_rate, 1)
-            })
+    report = PPICDashboardAggregator(db).get_on_track_report()
     
     return {
         "success": True,
-        "data": {
-            "on_track": on_track,
-            "off_track": off_track,
-            "summary": {
-                "on_track_count": len(on_track),
-                "off_track_count": len(off_track)
-            }
-        },
+        "data": report,
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -918,41 +816,8 @@ async def get_alerts(
     """
     # await check_permission - removed
     
-    alerts = []
-    
-    # Check off-track SPKs
-    spks = db.query(SPK).filter(SPK.production_status == "IN_PROGRESS").all()
-    
-    for spk in spks:
-        actual_qty = spk.actual_qty or 0
-        entries = db.query(SPKDailyProduction)\
-            .filter(SPKDailyProduction.spk_id == spk.id).all()
-        
-        if not entries or len(entries) < 2:
-            continue
-        
-        daily_rate = actual_qty / len(entries)
-        remaining_qty = max(0, spk.target_qty - actual_qty)
-        days_needed = int(remaining_qty / daily_rate) if daily_rate > 0 else 999
-        
-        if days_needed > 7:
-            alerts.append({
-                "alert_id": f"OFF_TRACK_{spk.id}",
-                "severity": "🔴 CRITICAL",
-                "title": f"SPK-{spk.id:03d} OFF-TRACK",
-                "message": f"Will not meet deadline at current rate ({daily_rate:.0f} units/day)",
-                "spk_id": spk.id,
-                "created_at": datetime.utcnow().isoformat()
-            })
-        elif days_needed > 3:
-            alerts.append({
-                "alert_id": f"AT_RISK_{spk.id}",
-                "severity": "🟡 WARNING",
-                "title": f"SPK-{spk.id:03d} AT-RISK",
-                "message": f"Production rate declining, at risk of missing deadline",
-                "spk_id": spk.id,
-                "created_at": datetime.utcnow().isoformat()
-            })
+    # Off-track / at-risk SPKs (candidates filtered in SQL)
+    alerts = PPICDashboardAggregator(db).get_alert_candidates()
     
     if severity:
         alerts = [a for a in alerts if severity.lower() in a["severity"].lower()]
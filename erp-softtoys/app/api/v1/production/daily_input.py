@@ -22,6 +22,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
 from app.core.models import User, SPKDailyProduction, AuditLog, SPK
+from app.services.spk_progress_rollup_service import SPKProgressRollupService
 
 router = APIRouter(prefix="/production", tags=["production"])
 
@@ -119,12 +120,8 @@ async def record_daily_input(
         raise HTTPException(status_code=400, detail="Input qty harus >= 0")
     
     # Calculate cumulative
-    last_entry = db.query(SPKDailyProduction)\
-        .filter(SPKDailyProduction.spk_id == spk_id)\
-        .order_by(SPKDailyProduction.production_date.desc())\
-        .first()
-    
-    cumulative = (last_entry.cumulative_qty if last_entry else 0) + request.input_qty
+    rollup_service = SPKProgressRollupService(db)
+    cumulative = rollup_service.get_cumulative_qty(spk_id) + request.input_qty
     
     # Create daily entry
     daily_entry = SPKDailyProduction(
@@ -137,6 +134,9 @@ async def record_daily_input(
         notes=request.notes
     )
     db.add(daily_entry)
+    rollup_service.apply_entry(
+        spk_id, request.production_date, request.input_qty, cumulative, request.status
+    )
     
     # Update SPK status
     spk.actual_qty = cumulative
@@ -146,6 +146,7 @@ async def record_daily_input(
     if cumulative >= spk.target_qty:
         spk.production_status = "COMPLETED"
         spk.completion_date = request.production_date
+        rollup_service.mark_completed(spk_id, request.production_date)
     
     # Audit log
     audit_log = AuditLog(
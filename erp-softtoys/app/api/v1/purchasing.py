@@ -27,6 +27,7 @@ from app.core.models.manufacturing import (
 from app.core.dependencies import require_permission
 from app.core.permissions import ModuleName, Permission
 from app.modules.purchasing import PurchasingService
+from app.services.sequence_service import next_sequence
 
 router = APIRouter(prefix="/purchasing", tags=["Purchasing"])
 
@@ -236,7 +237,7 @@ def _receive_po_stock(db: Session, po: PurchaseOrder, user_id: int) -> dict:
         if not pid or qty <= 0:
             continue
 
-        lot_number = f"LOT-{po.po_number}-{code}-{now.strftime('%Y%m%d%H%M%S')}"
+        lot_number = f"LOT-{po.po_number}-{code}-{next_sequence(db, 'LOT', str(now.year)):06d}"
 
         # Create StockLot (traceability)
         lot = StockLot(
@@ -822,8 +823,9 @@ def create_po_from_ui(
                 "description": mat.get("description", ""),
             })
 
-        # Auto-generate unique po_number
-        po_number = f"PO-{po_type.value}-{dt.now().strftime('%Y%m%d%H%M%S')}"
+        # Auto-generate unique po_number (yearly counter per PO type)
+        year = str(dt.now().year)
+        po_number = f"PO-{po_type.value}-{year}-{next_sequence(db, f'PO-{po_type.value}', year):05d}"
 
         # Create PO record
         po = PurchaseOrder(
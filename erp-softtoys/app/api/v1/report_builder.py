@@ -7,13 +7,13 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
-from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.models.users import User
 from app.core.dependencies import require_permission
 from app.core.permissions import ModuleName, Permission
+from app.services.report_engine import REPORT_DATA_SOURCES, ReportDefinitionError, ReportEngine
 
 router = APIRouter(
     prefix="/report-builder",
@@ -98,9 +98,10 @@ class ExecuteReportRequest(BaseModel):
 
     template_id: int
     override_filters: list[ReportFilter] | None = Field(default=[], description="Override/add filters")
-    limit: int | None = Field(default=1000, description="Max rows to return")
-    offset: int | None = Field(default=0, description="Offset for pagination")
-    export_format: str | None = Field(default="json", description="Format: json, csv, xlsx, pdf")
+    limit: int | None = Field(default=1000, ge=1, le=10000, description="Max rows to return")
+    cursor: str | None = Field(None, description="next_cursor of the previous page")
+    offset: int | None = Field(default=0, ge=0, description="Offset for pagination (prefer cursor)")
+    export_format: str | None = Field(default="json", description="Format: json, csv, xlsx")
 
 
 class ReportResult(BaseModel):
@@ -110,84 +111,51 @@ class ReportResult(BaseModel):
     template_name: str
     columns: list[dict[str, str]]  # [{name, label, type}]
     data: list[dict[str, Any]]
-    total_rows: int
+    total_rows: int  # Rows in this page
+    next_cursor: str | None = None  # None on the last page
+    cached: bool = False
     execution_time: float
     executed_at: datetime
 
 
-# Available data sources
-DATA_SOURCES = {
-    "work_orders": {
-        "table": "work_orders",
-        "joins": ["LEFT JOIN users ON work_orders.worker_id = users.id"],
-        "columns": {
-            "id": "work_orders.id",
-            "mo_id": "work_orders.mo_id",
-            "department": "work_orders.department",
-            "status": "work_orders.status",
-            "input_qty": "work_orders.input_qty",
-            "output_qty": "work_orders.output_qty",
-            "reject_qty": "work_orders.reject_qty",
-            "worker_name": "users.full_name",
-            "start_time": "work_orders.start_time",
-            "end_time": "work_orders.end_time"
-        }
-    },
-    "qc_inspections": {
-        "table": "qc_inspections",
-        "joins": ["LEFT JOIN users ON qc_inspections.inspected_by = users.id"],
-        "columns": {
-            "id": "qc_inspections.id",
-            "work_order_id": "qc_inspections.work_order_id",
-            "type": "qc_inspections.type",
-            "status": "qc_inspections.status",
-            "defect_reason": "qc_inspections.defect_reason",
-            "inspector_name": "users.full_name",
-            "created_at": "qc_inspections.created_at"
-        }
-    },
-    "products": {
-        "table": "products",
-        "joins": [],
-        "columns": {
-            "id": "products.id",
-            "code": "products.code",
-            "name": "products.name",
-            "type": "products.type",
-            "uom": "products.uom",
-            "min_stock": "products.min_stock",
-            "created_at": "products.created_at"
-        }
-    },
-    "stock_quants": {
-        "table": "stock_quants",
-        "joins": [
-            "LEFT JOIN products ON stock_quants.product_id = products.id",
-            "LEFT JOIN stock_locations ON stock_quants.location_id = stock_locations.id"
+# Built-in report templates (no template table yet - see create_report_template)
+REPORT_TEMPLATES = {
+    1: {
+        "id": 1,
+        "name": "Daily Production Report",
+        "description": "Daily production output by department",
+        "category": "Production",
+        "data_source": "work_orders",
+        "columns": [
+            {"name": "department", "label": "Department", "type": "string"},
+            {"name": "output_qty", "label": "Output Qty", "type": "number", "aggregate": "sum"}
         ],
-        "columns": {
-            "id": "stock_quants.id",
-            "product_code": "products.code",
-            "product_name": "products.name",
-            "qty_available": "stock_quants.qty_available",
-            "qty_reserved": "stock_quants.qty_reserved",
-            "location_name": "stock_locations.location_name",
-            "updated_at": "stock_quants.updated_at"
-        }
+        "filters": [],
+        "sorts": [{"column": "department", "direction": "ASC"}],
+        "group_by": ["department"],
+        "is_public": True,
+        "created_by": 1,
+        "created_by_name": "Admin",
+        "usage_count": 45
     },
-    "manufacturing_orders": {
-        "table": "manufacturing_orders",
-        "joins": ["LEFT JOIN products ON manufacturing_orders.product_id = products.id"],
-        "columns": {
-            "id": "manufacturing_orders.id",
-            "batch_number": "manufacturing_orders.batch_number",
-            "product_name": "products.name",
-            "qty_planned": "manufacturing_orders.qty_planned",
-            "qty_produced": "manufacturing_orders.qty_produced",
-            "routing_type": "manufacturing_orders.routing_type",
-            "state": "manufacturing_orders.state",
-            "created_at": "manufacturing_orders.created_at"
-        }
+    2: {
+        "id": 2,
+        "name": "QC Defects Summary",
+        "description": "Summary of QC defects by type",
+        "category": "QC",
+        "data_source": "qc_inspections",
+        "columns": [
+            {"name": "type", "label": "Inspection Type", "type": "string"},
+            {"name": "status", "label": "Status", "type": "string"},
+            {"name": "id", "label": "Count", "type": "number", "aggregate": "count"}
+        ],
+        "filters": [{"column": "status", "operator": "=", "value": "Fail"}],
+        "sorts": [{"column": "id", "direction": "DESC"}],
+        "group_by": ["type", "status"],
+        "is_public": True,
+        "created_by": 1,
+        "created_by_name": "Admin",
+        "usage_count": 32
     }
 }
 
@@ -204,55 +172,15 @@ async def list_report_templates(
     - Can filter by category
     """
     # TODO: Implement database table for report templates
-    # For now, return mock data
-    mock_templates = [
-        {
-            "id": 1,
-            "name": "Daily Production Report",
-            "description": "Daily production output by department",
-            "category": "Production",
-            "data_source": "work_orders",
-            "columns": [
-                {"name": "department", "label": "Department", "type": "string"},
-                {"name": "output_qty", "label": "Output Qty", "type": "number", "aggregate": "sum"}
-            ],
-            "filters": [],
-            "sorts": [{"column": "department", "direction": "ASC"}],
-            "group_by": ["department"],
-            "is_public": True,
-            "created_by": 1,
-            "created_by_name": "Admin",
-            "created_at": datetime.now(),
-            "updated_at": None,
-            "usage_count": 45
-        },
-        {
-            "id": 2,
-            "name": "QC Defects Summary",
-            "description": "Summary of QC defects by type",
-            "category": "QC",
-            "data_source": "qc_inspections",
-            "columns": [
-                {"name": "type", "label": "Inspection Type", "type": "string"},
-                {"name": "status", "label": "Status", "type": "string"},
-                {"name": "id", "label": "Count", "type": "number", "aggregate": "count"}
-            ],
-            "filters": [{"column": "status", "operator": "=", "value": "Fail"}],
-            "sorts": [{"column": "id", "direction": "DESC"}],
-            "group_by": ["type", "status"],
-            "is_public": True,
-            "created_by": 1,
-            "created_by_name": "Admin",
-            "created_at": datetime.now(),
-            "updated_at": None,
-            "usage_count": 32
-        }
+    templates = [
+        {**template, "created_at": datetime.now(), "updated_at": None}
+        for template in REPORT_TEMPLATES.values()
     ]
 
     if category:
-        mock_templates = [t for t in mock_templates if t["category"] == category]
+        templates = [t for t in templates if t["category"] == category]
 
-    return mock_templates
+    return templates
 
 
 @router.post("/template", response_model=ReportTemplate, status_code=status.HTTP_201_CREATED)
@@ -267,14 +195,14 @@ async def create_report_template(
     - Templates can be made public for other users
     """
     # Validate data source
-    if request.data_source not in DATA_SOURCES:
+    if request.data_source not in REPORT_DATA_SOURCES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid data source. Available: {', '.join(DATA_SOURCES.keys())}"
+            detail=f"Invalid data source. Available: {', '.join(REPORT_DATA_SOURCES.keys())}"
         )
 
     # Validate columns
-    available_columns = DATA_SOURCES[request.data_source]["columns"]
+    available_columns = REPORT_DATA_SOURCES[request.data_source].columns
     for col in request.columns:
         if col.name not in available_columns:
             raise HTTPException(
@@ -311,96 +239,55 @@ async def execute_report(
 ):
     """Execute a report template and return results.
 
-    - Apply filters and sorting
-    - Support pagination
-    - Export to various formats
+    - Apply filters and sorting (compiled to a parameterized query)
+    - Keyset pagination: pass `next_cursor` back as `cursor` for the next page
+    - Identical executions within the cache TTL are served from cache
+    - export_format csv/xlsx streams every row as a file download
     """
-    # TODO: Fetch template from database
-    # For now, use mock template
-    template = {
-        "id": 1,
-        "name": "Daily Production Report",
-        "data_source": "work_orders",
-        "columns": [
-            {"name": "department", "label": "Department", "type": "string"},
-            {"name": "output_qty", "label": "Output Qty", "type": "number", "aggregate": "sum"}
-        ],
-        "filters": [],
-        "sorts": [{"column": "department", "direction": "ASC"}],
-        "group_by": ["department"]
-    }
+    template = REPORT_TEMPLATES.get(request.template_id)
+    if not template:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Report template {request.template_id} not found"
+        )
 
-    # Build SQL query
-    source_config = DATA_SOURCES[template["data_source"]]
-    select_parts = []
-
-    for col in template["columns"]:
-        col_def = source_config["columns"][col["name"]]
-        if col.get("aggregate"):
-            select_parts.append(f"{col['aggregate']}({col_def}) as {col['name']}")
-        else:
-            select_parts.append(f"{col_def} as {col['name']}")
-
-    query = f"SELECT {', '.join(select_parts)} FROM {source_config['table']}"
-
-    # Add joins
-    for join in source_config["joins"]:
-        query += f" {join}"
-
-    # Add WHERE clauses
-    where_clauses = []
-    for filter in template["filters"] + request.override_filters:
-        col_def = source_config["columns"].get(filter.column)
-        if col_def:
-            if filter.operator == "LIKE":
-                where_clauses.append(f"{col_def} LIKE '%{filter.value}%'")
-            elif filter.operator == "IN":
-                values = ", ".join([f"'{v}'" for v in filter.value])
-                where_clauses.append(f"{col_def} IN ({values})")
-            else:
-                where_clauses.append(f"{col_def} {filter.operator} '{filter.value}'")
-
-    if where_clauses:
-        query += f" WHERE {' AND '.join(where_clauses)}"
-
-    # Add GROUP BY
-    if template["group_by"]:
-        group_cols = [source_config["columns"][col] for col in template["group_by"]]
-        query += f" GROUP BY {', '.join(group_cols)}"
-
-    # Add ORDER BY
-    if template["sorts"]:
-        sort_parts = []
-        for sort in template["sorts"]:
-            col_def = source_config["columns"][sort["column"]]
-            sort_parts.append(f"{col_def} {sort['direction']}")
-        query += f" ORDER BY {', '.join(sort_parts)}"
-
-    # Add LIMIT and OFFSET
-    query += f" LIMIT {request.limit} OFFSET {request.offset}"
-
-    # Execute query
-    start_time = datetime.now()
-    try:
-        result = db.execute(text(query))
-        rows = result.fetchall()
-        columns_info = [{"name": col, "label": col, "type": "string"} for col in result]
-        data = [dict(row._mapping) for row in rows]
-    except Exception as e:
+    export_format = (request.export_format or "json").lower()
+    if export_format not in ("json", "csv", "xlsx"):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Query execution failed: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported export format. Available: json, csv, xlsx"
         )
 
-    execution_time = (datetime.now() - start_time).total_seconds()
+    engine = ReportEngine(db)
+    override_filters = [f.dict() for f in request.override_filters or []]
+    try:
+        if export_format != "json":
+            return engine.export(
+                template, override_filters,
+                format="csv" if export_format == "csv" else "excel",
+                name=f"report_{template['id']}"
+            )
+        page = engine.execute(
+            template, override_filters,
+            limit=request.limit or 1000,
+            cursor=request.cursor,
+            offset=request.offset or 0
+        )
+    except ReportDefinitionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     return {
-        "template_id": request.template_id,
+        "template_id": template["id"],
         "template_name": template["name"],
-        "columns": columns_info,
-        "data": data,
-        "total_rows": len(data),
-        "execution_time": execution_time,
+        "columns": [
+            {"name": col["name"], "label": col.get("label") or col["name"], "type": col.get("type", "string")}
+            for col in template["columns"]
+        ],
+        "data": page["data"],
+        "total_rows": page["row_count"],
+        "next_cursor": page["next_cursor"],
+        "cached": page["cached"],
+        "execution_time": page["execution_time"],
         "executed_at": datetime.now()
     }
 
@@ -416,13 +303,13 @@ async def get_available_data_sources(
     """
     return {
         source_name: {
-            "table": config["table"],
+            "table": source.table_name,
             "columns": [
                 {"name": col_name, "label": col_name.replace("_", " ").title()}
-                for col_name in config["columns"]
+                for col_name in source.columns
             ]
         }
-        for source_name, config in DATA_SOURCES.items()
+        for source_name, source in REPORT_DATA_SOURCES.items()
     }
 
 
@@ -9,7 +9,9 @@ from pydantic import BaseModel
 from sqlalchemy import and_, case, func
 from sqlalchemy.orm import Session
 
+from app.api.v1.jobs import submit_job
 from app.core.dependencies import get_db, require_permission
+from app.core.jobs import JobArtifact, JobContext, job_handler
 from app.core.models.manufacturing import WorkOrder
 from app.core.models.products import Product
 from app.core.models.quality import QCInspection
@@ -91,7 +93,9 @@ def generate_excel_report(data: dict, title: str) -> bytes:
                 ws.cell(row=row_idx, column=col_idx, value=value)
 
         # Auto-adjust column widths
-        for column in ws.columns:
+        from openpyxl.utils import get_column_letter
+
+        for column_idx, column in enumerate(ws.columns, start=1):
             max_length = 0
             column_cells = list(column)
             for cell in column_cells:
@@ -101,9 +105,8 @@ def generate_excel_report(data: dict, title: str) -> bytes:
                 except (AttributeError, TypeError):
                     pass
             adjusted_width = min(max_length + 2, 50)
-            if column_cells:
-                col_letter = column_cells[0].column_letter
-                ws.column_dimensions[col_letter].width = adjusted_width
+            # Row 1 is merged, so cells[0] may be a MergedCell without column_letter
+            ws.column_dimensions[get_column_letter(column_idx)].width = adjusted_width
 
         # Save to bytes
         output = io.BytesIO()
@@ -184,26 +187,38 @@ def generate_pdf_report(data: dict, title: str) -> bytes:
         ) from exc
 
 
-# ========== ENDPOINTS ==========
+EXCEL_MEDIA_TYPE = (
+    "application/vnd.openxmlformats-"
+    "officedocument.spreadsheetml.sheet"
+)
 
-@router.post("/production")
-async def generate_production_report(
-    request: ProductionReportRequest,
-    current_user: User = Depends(
-        require_permission(ModuleName.REPORTS, Permission.CREATE)
-    ),
-    db: Session = Depends(get_db)
-):
-    """Generate Production Report.
 
-    **Report Contents**:
-    - Manufacturing Orders summary
-    - Work Orders by department
-    - Completion rates
-    - Output quantities
+def render_report(report_data: dict, title: str, report_format: str, basename: str) -> tuple[bytes, str, str]:
+    """Render report data as Excel ('excel') or PDF (anything else).
 
-    **Formats**: excel, pdf
+    Returns: (file bytes, filename, media type)
     """
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if report_format == 'excel':
+        return generate_excel_report(report_data, title), f"{basename}_{timestamp}.xlsx", EXCEL_MEDIA_TYPE
+    return generate_pdf_report(report_data, title), f"{basename}_{timestamp}.pdf", "application/pdf"
+
+
+def _file_response(file_bytes: bytes, filename: str, media_type: str) -> Response:
+    return Response(
+        content=file_bytes,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
+
+
+# ========== REPORT DATA ==========
+
+def build_production_report(db: Session, start_date: datetime, end_date: datetime,
+                            department: str | None = None) -> dict:
+    """Work order output per department in the date range."""
     # Query work orders in date range
     query = db.query(
         WorkOrder.department,
@@ -212,21 +227,21 @@ async def generate_production_report(
         func.sum(WorkOrder.reject_qty).label('total_reject')
     ).filter(
         and_(
-            WorkOrder.start_time >= request.start_date,
-            WorkOrder.start_time <= request.end_date
+            WorkOrder.start_time >= start_date,
+            WorkOrder.start_time <= end_date
         )
     )
 
-    if request.department:
-        query = query.filter(WorkOrder.department == request.department)
+    if department:
+        query = query.filter(WorkOrder.department == department)
 
     results = query.group_by(WorkOrder.department).all()
 
     # Prepare data
     report_data = {
         'title': 'Production Report',
-        'start_date': request.start_date.strftime('%Y-%m-%d'),
-        'end_date': request.end_date.strftime('%Y-%m-%d'),
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
         'headers': [
             'Department', 'Total Orders', 'Total Output',
             'Total Reject', 'Pass Rate %'
@@ -250,48 +265,12 @@ async def generate_production_report(
             f"{pass_rate:.2f}%"
         ])
 
-    # Generate report
-    if request.format == 'excel':
-        file_bytes = generate_excel_report(report_data, 'Production Report')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"production_report_{timestamp}.xlsx"
-        media_type = (
-            "application/vnd.openxmlformats-"
-            "officedocument.spreadsheetml.sheet"
-        )
-    else:
-        file_bytes = generate_pdf_report(report_data, 'Production Report')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"production_report_{timestamp}.pdf"
-        media_type = "application/pdf"
+    return report_data
 
-    return Response(
-        content=file_bytes,
-        media_type=media_type,
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
-    )
 
-
-@router.post("/qc")
-async def generate_qc_report(
-    request: QCReportRequest,
-    current_user: User = Depends(
-        require_permission(ModuleName.REPORTS, Permission.CREATE)
-    ),
-    db: Session = Depends(get_db)
-):
-    """Generate Quality Control Report.
-
-    **Report Contents**:
-    - QC inspections summary
-    - Pass/Fail rates
-    - Defect analysis
-    - Lab test results
-
-    **Formats**: excel, pdf
-    """
+def build_qc_report(db: Session, start_date: datetime, end_date: datetime,
+                    test_type: str | None = None) -> dict:
+    """QC inspections and pass rate per inspection type in the date range."""
     # Query QC inspections
     query = db.query(
         QCInspection.type,
@@ -306,21 +285,21 @@ async def generate_qc_report(
         WorkOrder, QCInspection.work_order_id == WorkOrder.id
     ).filter(
         and_(
-            QCInspection.inspected_at >= request.start_date,
-            QCInspection.inspected_at <= request.end_date
+            QCInspection.inspected_at >= start_date,
+            QCInspection.inspected_at <= end_date
         )
     )
 
-    if request.test_type:
-        query = query.filter(QCInspection.type == request.test_type)
+    if test_type:
+        query = query.filter(QCInspection.type == test_type)
 
     results = query.group_by(QCInspection.type).all()
 
     # Prepare data
     report_data = {
         'title': 'Quality Control Report',
-        'start_date': request.start_date.strftime('%Y-%m-%d'),
-        'end_date': request.end_date.strftime('%Y-%m-%d'),
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
         'headers': [
             'Inspection Type', 'Total Inspections',
             'Passed', 'Failed', 'Pass Rate %'
@@ -339,45 +318,11 @@ async def generate_qc_report(
             f"{pass_rate:.2f}%"
         ])
 
-    # Generate report
-    if request.format == 'excel':
-        file_bytes = generate_excel_report(report_data, 'QC Report')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"qc_report_{timestamp}.xlsx"
-        media_type = (
-            "application/vnd.openxmlformats-"
-            "officedocument.spreadsheetml.sheet"
-        )
-    else:
-        file_bytes = generate_pdf_report(report_data, 'QC Report')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"qc_report_{timestamp}.pdf"
-        media_type = "application/pdf"
-
-    return Response(
-        content=file_bytes,
-        media_type=media_type,
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
-    )
+    return report_data
 
 
-@router.get("/inventory")
-async def generate_inventory_report(
-    report_format: str = "excel",
-    current_user: User = Depends(
-        require_permission(ModuleName.REPORTS, Permission.VIEW)
-    ),
-    db: Session = Depends(get_db)
-):
-    """Generate Inventory Report.
-
-    **Report Contents**:
-    - Current stock levels
-    - Low stock alerts
-    - Stock movements summary
-    """
+def build_inventory_report(db: Session) -> dict:
+    """Stock on hand / reserved / available per product."""
     from app.core.models.warehouse import StockQuant
 
     # Query stock quants
@@ -413,30 +358,155 @@ async def generate_inventory_report(
             available
         ])
 
-    # Generate report
-    if report_format == 'excel':
-        file_bytes = generate_excel_report(
-            report_data, 'Inventory Report'
-        )
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"inventory_report_{timestamp}.xlsx"
-        media_type = (
-            "application/vnd.openxmlformats-"
-            "officedocument.spreadsheetml.sheet"
-        )
-    else:
-        file_bytes = generate_pdf_report(report_data, 'Inventory Report')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"inventory_report_{timestamp}.pdf"
-        media_type = "application/pdf"
+    return report_data
 
-    return Response(
-        content=file_bytes,
-        media_type=media_type,
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
+
+# ========== BACKGROUND JOBS ==========
+
+@job_handler("reports.production")
+def run_production_report_job(ctx: JobContext) -> JobArtifact:
+    params = ctx.params
+    report_data = build_production_report(
+        ctx.db,
+        datetime.fromisoformat(params['start_date']),
+        datetime.fromisoformat(params['end_date']),
+        params.get('department'),
+    )
+    return JobArtifact(*render_report(report_data, 'Production Report', params.get('format'), 'production_report'))
+
+
+@job_handler("reports.qc")
+def run_qc_report_job(ctx: JobContext) -> JobArtifact:
+    params = ctx.params
+    report_data = build_qc_report(
+        ctx.db,
+        datetime.fromisoformat(params['start_date']),
+        datetime.fromisoformat(params['end_date']),
+        params.get('test_type'),
+    )
+    return JobArtifact(*render_report(report_data, 'QC Report', params.get('format'), 'qc_report'))
+
+
+@job_handler("reports.inventory")
+def run_inventory_report_job(ctx: JobContext) -> JobArtifact:
+    report_data = build_inventory_report(ctx.db)
+    return JobArtifact(*render_report(report_data, 'Inventory Report', ctx.params.get('format'), 'inventory_report'))
+
+
+# ========== ENDPOINTS ==========
+
+@router.post("/production")
+async def generate_production_report(
+    request: ProductionReportRequest,
+    current_user: User = Depends(
+        require_permission(ModuleName.REPORTS, Permission.CREATE)
+    ),
+    db: Session = Depends(get_db)
+):
+    """Generate Production Report.
+
+    **Report Contents**:
+    - Manufacturing Orders summary
+    - Work Orders by department
+    - Completion rates
+    - Output quantities
+
+    **Formats**: excel, pdf
+
+    Large date ranges: use POST /reports/production/jobs instead.
+    """
+    report_data = build_production_report(db, request.start_date, request.end_date, request.department)
+    return _file_response(*render_report(report_data, 'Production Report', request.format, 'production_report'))
+
+
+@router.post("/production/jobs", status_code=202)
+def submit_production_report(
+    request: ProductionReportRequest,
+    current_user: User = Depends(
+        require_permission(ModuleName.REPORTS, Permission.CREATE)
     )
+):
+    """Generate the Production Report in the background.
+
+    Poll GET /jobs/{job_id} and download from GET /jobs/{job_id}/artifact.
+    """
+    return submit_job("reports.production", current_user, {
+        "start_date": request.start_date.isoformat(),
+        "end_date": request.end_date.isoformat(),
+        "department": request.department,
+        "format": request.format,
+    })
+
+
+@router.post("/qc")
+async def generate_qc_report(
+    request: QCReportRequest,
+    current_user: User = Depends(
+        require_permission(ModuleName.REPORTS, Permission.CREATE)
+    ),
+    db: Session = Depends(get_db)
+):
+    """Generate Quality Control Report.
+
+    **Report Contents**:
+    - QC inspections summary
+    - Pass/Fail rates
+    - Defect analysis
+    - Lab test results
+
+    **Formats**: excel, pdf
+
+    Large date ranges: use POST /reports/qc/jobs instead.
+    """
+    report_data = build_qc_report(db, request.start_date, request.end_date, request.test_type)
+    return _file_response(*render_report(report_data, 'QC Report', request.format, 'qc_report'))
+
+
+@router.post("/qc/jobs", status_code=202)
+def submit_qc_report(
+    request: QCReportRequest,
+    current_user: User = Depends(
+        require_permission(ModuleName.REPORTS, Permission.CREATE)
+    )
+):
+    """Generate the QC Report in the background."""
+    return submit_job("reports.qc", current_user, {
+        "start_date": request.start_date.isoformat(),
+        "end_date": request.end_date.isoformat(),
+        "test_type": request.test_type,
+        "format": request.format,
+    })
+
+
+@router.get("/inventory")
+async def generate_inventory_report(
+    report_format: str = "excel",
+    current_user: User = Depends(
+        require_permission(ModuleName.REPORTS, Permission.VIEW)
+    ),
+    db: Session = Depends(get_db)
+):
+    """Generate Inventory Report.
+
+    **Report Contents**:
+    - Current stock levels
+    - Low stock alerts
+    - Stock movements summary
+    """
+    report_data = build_inventory_report(db)
+    return _file_response(*render_report(report_data, 'Inventory Report', report_format, 'inventory_report'))
+
+
+@router.post("/inventory/jobs", status_code=202)
+def submit_inventory_report(
+    report_format: str = "excel",
+    current_user: User = Depends(
+        require_permission(ModuleName.REPORTS, Permission.VIEW)
+    )
+):
+    """Generate the Inventory Report in the background."""
+    return submit_job("reports.inventory", current_user, {"format": report_format})
+
 
 @router.get("/production-stats")
 def get_production_stats(
@@ -22,6 +22,9 @@ from app.core.models.warehouse import (
 )
 from app.core.models.bom import BOMHeader
 from app.core.permissions import ModuleName, Permission
+from app.services.inventory_position_service import InventoryPositionService
+from app.services.sequence_service import next_sequence
+from app.services.stock_reservation_service import InsufficientStockError, StockReservationService
 from app.core.schemas import (
     StockCheckResponse,
     StockTransferCreate,
@@ -148,7 +151,7 @@ async def create_stock_transfer(
 
     2. **Stock Validation**:
        - Check qty_available >= qty (on_hand - reserved)
-       - Decrement qty_available, increment qty_reserved
+       - Increment qty_reserved FIFO under row locks (StockReservationService)
 
     3. **Create Transfer Log**:
        - Status = INITIATED (waiting for ACCEPT at receiving dept)
@@ -172,16 +175,10 @@ async def create_stock_transfer(
             detail="Product not found"
         )
 
-    # Check stock availability
-    stock_query = db.query(StockQuant).filter(
-        StockQuant.product_id == transfer_data.product_id
-    )
-
-    if transfer_data.lot_id:
-        stock_query = stock_query.filter(StockQuant.lot_id == transfer_data.lot_id)
-
-    stock_quants = stock_query.all()
-    total_available = sum((sq.qty_on_hand - sq.qty_reserved) for sq in stock_quants)
+    # Check stock availability (unlocked pre-check; the reservation below is authoritative)
+    stock = StockReservationService(db)
+    lot_id = transfer_data.lot_id or None
+    total_available = stock.available(transfer_data.product_id, lot_id=lot_id)
 
     if total_available < transfer_data.qty:
         raise HTTPException(
@@ -246,12 +243,15 @@ async def create_stock_transfer(
             headers={"X-Transfer-ID": str(new_transfer.id), "X-Transfer-Status": "BLOCKED"}
         )
 
-    # Reserve stock
-    for stock_quant in stock_quants:
-        if transfer_data.qty > 0:
-            amount_to_reserve = min(transfer_data.qty, stock_quant.qty_on_hand - stock_quant.qty_reserved)
-            stock_quant.qty_reserved += amount_to_reserve
-            transfer_data.qty -= amount_to_reserve
+    # Reserve stock (quants locked in id order, FIFO split)
+    try:
+        stock.reserve(transfer_data.product_id, transfer_data.qty, lot_id=lot_id)
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
     db.add(new_transfer)
     db.commit()
@@ -522,80 +522,62 @@ async def get_stock_overview(
 ):
     """Get complete warehouse stock overview.
 
-    Shows inventory summary across all locations
+    Shows inventory summary across all stock locations, read from the
+    inventory position store (no scan of stock_quants).
     """
+    positions = InventoryPositionService(db)
+    locations = positions.location_totals()
+
     return {
         "status": "active",
-        "total_items": 450,
-        "total_quantity": 12500,
-        "low_stock_alerts": 8,
-        "overstock_items": 3,
+        "total_items": positions.products_in_stock(),
+        "total_quantity": float(sum(loc.total_qty for loc in locations)),
+        "total_reserved": float(sum(loc.reserved_qty for loc in locations)),
+        "low_stock_alerts": len(positions.low_stock()),
+        "locations_over_capacity": sum(
+            1 for loc in locations if loc.capacity and loc.total_qty > loc.capacity
+        ),
         "locations": [
             {
-                "location": "Warehouse Zone A",
-                "total_items": 120,
-                "total_qty": 3500,
-                "capacity_used": "70%"
-            },
-            {
-                "location": "Warehouse Zone B",
-                "total_items": 150,
-                "total_qty": 4200,
-                "capacity_used": "75%"
-            },
-            {
-                "location": "Warehouse Zone C",
-                "total_items": 100,
-                "total_qty": 2800,
-                "capacity_used": "65%"
-            },
-            {
-                "location": "Finishgoods",
-                "total_items": 80,
-                "total_qty": 2000,
-                "capacity_used": "55%"
+                "location_id": loc.id,
+                "location": loc.name,
+                "total_items": loc.total_items,
+                "total_qty": float(loc.total_qty),
+                "reserved_qty": float(loc.reserved_qty),
+                "capacity_used": f"{round(loc.total_qty / loc.capacity * 100)}%" if loc.capacity else None
             }
+            for loc in locations
         ]
     }
 
 
 @router.get("/low-stock-alert")
 async def get_low_stock_alerts(
+    limit: int = Query(100, ge=1, le=1000),
     current_user: User = Depends(require_permission(ModuleName.WAREHOUSE, Permission.VIEW)),
     db: Session = Depends(get_db)
 ):
     """Get products with low stock levels.
 
-    Alerts when inventory falls below reorder point
+    Alerts when on-hand stock falls below the reorder point (Product.min_stock);
+    at or below half of it the reorder is urgent. Most critical first.
     """
+    positions = InventoryPositionService(db)
+    breaches = positions.low_stock()
+
     return {
         "status": "active",
-        "alerts_count": 8,
+        "alerts_count": len(breaches),
         "low_stock_items": [
             {
-                "product_id": 1,
-                "product_code": "PROD-001",
-                "product_name": "T-Shirt XL Blue",
-                "current_qty": 45,
-                "reorder_point": 100,
-                "action": "Reorder Recommended"
-            },
-            {
-                "product_id": 2,
-                "product_code": "PROD-002",
-                "product_name": "T-Shirt L Red",
-                "current_qty": 30,
-                "reorder_point": 80,
-                "action": "Urgent Reorder"
-            },
-            {
-                "product_id": 5,
-                "product_code": "PROD-005",
-                "product_name": "Buttons (size 20mm)",
-                "current_qty": 200,
-                "reorder_point": 500,
-                "action": "Reorder Recommended"
+                "product_id": item.id,
+                "product_code": item.code,
+                "product_name": item.name,
+                "current_qty": float(item.current_qty),
+                "reorder_point": float(item.min_stock),
+                "action": "Urgent Reorder" if item.current_qty * 2 <= item.min_stock else "Reorder Recommended"
             }
+            for item in breaches[:limit]
         ]
     }
 
@@ -607,39 +589,16 @@ async def get_stock_aging(
 ):
     """Get stock aging report.
 
-    Shows inventory by age (newly received, 30+ days old, etc)
+    Shows lotted inventory by age of lot receipt (newly received, 30+ days old, etc)
     Helps identify slow-moving items
     """
+    today = datetime.now().date()
+    aging = InventoryPositionService(db).aging(today)
+
     return {
         "status": "active",
-        "report_date": "2026-01-22",
-        "total_sku": 450,
-        "aging_categories": [
-            {
-                "category": "0-7 days",
-                "item_count": 85,
-                "total_qty": 2100,
-                "status": "Fresh Stock"
-            },
-            {
-                "category": "8-30 days",
-                "item_count": 120,
-                "total_qty": 3200,
-                "status": "Recent"
-            },
-            {
-                "category": "31-90 days",
-                "item_count": 150,
-                "total_qty": 4500,
-                "status": "Normal"
-            },
-            {
-                "category": "90+ days",
-                "item_count": 95,
-                "total_qty": 2700,
-                "status": "Slow Moving"
-            }
-        ],
+        "report_date": today.isoformat(),
+        **aging,
         "slow_moving_action": "Review for obsolescence or promotional clearance"
     }
 
@@ -1349,7 +1308,8 @@ async def material_receipt(
     for item in items:
         pid = item.get("material_id") or item.get("product_id")
         qty = float(item.get("received_qty") or item.get("quantity") or 0)
-        lot_no = item.get("lot_number") or f"LOT-{pid}-{_dt.utcnow().strftime('%Y%m%d%H%M%S')}"
+        year = str(_dt.utcnow().year)
+        lot_no = item.get("lot_number") or f"LOT-{pid}-{year}-{next_sequence(db, 'LOT', year):06d}"
 
         if not pid or qty <= 0:
             continue
@@ -61,8 +61,8 @@ async def websocket_notifications(
                     # You can log this to alert_logs table
 
                 elif data.get("type") == "ping":
-                    # Respond to keepalive ping
-                    await websocket.send_json({
+                    # Respond to keepalive ping (through the client's send queue)
+                    await ws_manager.send_personal(websocket, {
                         "type": "pong",
                         "timestamp": data.get("timestamp")
                     })
@@ -121,7 +121,7 @@ async def websocket_department(
                 data = await websocket.receive_json()
 
                 if data.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    await ws_manager.send_personal(websocket, {"type": "pong"})
 
             except WebSocketDisconnect:
                 break
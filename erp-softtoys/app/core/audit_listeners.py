@@ -9,6 +9,8 @@ from typing import Any
 
 from sqlalchemy import event
 
+from app.core.audit_writer import audit_writer, install_session_hooks
+
 
 def get_model_dict(instance, exclude_fields=None) -> dict[str, Any]:
     """Convert SQLAlchemy model to dict for audit logging."""
@@ -30,7 +32,7 @@ def get_model_dict(instance, exclude_fields=None) -> dict[str, Any]:
 
 def get_changed_fields(instance) -> dict[str, Any]:
     """Get only changed fields from SQLAlchemy instance."""
-    from sqlalchemy.inspect import inspect
+    from sqlalchemy import inspect
 
     changed = {}
     insp = inspect(instance)
@@ -57,17 +59,31 @@ def get_changed_fields(instance) -> dict[str, Any]:
     return changed
 
 
+def _audit_user_fields(target) -> dict[str, Any]:
+    """User context attached by attach_audit_context()."""
+    return {
+        'user_id': getattr(target, '_audit_user_id', None),
+        'username': getattr(target, '_audit_username', 'System'),
+        'user_role': getattr(target, '_audit_user_role', None),
+        'ip_address': getattr(target, '_audit_ip_address', None),
+    }
+
+
 def setup_audit_listeners():
     """Initialize all audit event listeners
     Call this during application startup.
+
+    Listeners only build the event; app.core.audit_writer batches the
+    INSERTs (in the parent transaction or via the background flusher).
     """
     # Import here to avoid circular imports
-    from app.core.database import SessionLocal
-    from app.core.models.audit import AuditAction, AuditLog, AuditModule
+    from app.core.models.audit import AuditAction, AuditModule
     from app.core.models.manufacturing import ManufacturingOrder, WorkOrder
     from app.core.models.transfer import TransferLog
     from app.core.models.warehouse import PurchaseOrder, StockQuant
 
+    install_session_hooks()
+
     # ============================================================================
     # PURCHASE ORDER AUDIT (Financial Transactions - SOX 404 Compliance)
     # ============================================================================
@@ -76,18 +92,13 @@ def setup_audit_listeners():
     def log_purchase_order_create(mapper, connection, target):
         """Log PO creation - Critical for Segregation of Duties."""
         try:
-            db = SessionLocal()
-
             values = get_model_dict(target)
 
             # Get supplier name for description (supplier_id links to Partner)
             supplier_name = f"Supplier#{target.supplier_id}"
 
-            audit_log = AuditLog(
-                user_id=getattr(target, '_audit_user_id', None),
-                username=getattr(target, '_audit_username', 'System'),
-                user_role=getattr(target, '_audit_user_role', None),
-                ip_address=getattr(target, '_audit_ip_address', None),
+            audit_writer.submit(target, dict(
+                **_audit_user_fields(target),
                 action=AuditAction.CREATE,
                 module=AuditModule.WAREHOUSE,
                 entity_type='PurchaseOrder',
@@ -96,11 +107,7 @@ def setup_audit_listeners():
                 new_values=values,
                 request_method='POST',
                 request_path='/api/v1/purchasing/purchase-order'
-            )
-
-            db.add(audit_log)
-            db.commit()
-            db.close()
+            ))
         except Exception:
             pass
 
@@ -109,8 +116,6 @@ def setup_audit_listeners():
     def log_purchase_order_update(mapper, connection, target):
         """Log PO updates - Track status changes and approvals."""
         try:
-            db = SessionLocal()
-
             changed = get_changed_fields(target)
             if not changed:
                 return
@@ -123,11 +128,8 @@ def setup_audit_listeners():
                 action = AuditAction.UPDATE
                 description = f"Updated Purchase Order #{target.po_number}: {', '.join(changed.keys())}"
 
-            audit_log = AuditLog(
-                user_id=getattr(target, '_audit_user_id', None),
-                username=getattr(target, '_audit_username', 'System'),
-                user_role=getattr(target, '_audit_user_role', None),
-                ip_address=getattr(target, '_audit_ip_address', None),
+            audit_writer.submit(target, dict(
+                **_audit_user_fields(target),
                 action=action,
                 module=AuditModule.WAREHOUSE,
                 entity_type='PurchaseOrder',
@@ -137,11 +139,7 @@ def setup_audit_listeners():
                 new_values={k: v['new'] for k, v in changed.items()},
                 request_method='PUT',
                 request_path=f'/api/v1/purchasing/purchase-order/{target.id}'
-            )
-
-            db.add(audit_log)
-            db.commit()
-            db.close()
+            ))
         except Exception:
             pass
 
@@ -150,15 +148,10 @@ def setup_audit_listeners():
     def log_purchase_order_delete(mapper, connection, target):
         """Log PO deletion - Critical financial event."""
         try:
-            db = SessionLocal()
-
             values = get_model_dict(target)
 
-            audit_log = AuditLog(
-                user_id=getattr(target, '_audit_user_id', None),
-                username=getattr(target, '_audit_username', 'System'),
-                user_role=getattr(target, '_audit_user_role', None),
-                ip_address=getattr(target, '_audit_ip_address', None),
+            audit_writer.submit(target, dict(
+                **_audit_user_fields(target),
                 action=AuditAction.DELETE,
                 module=AuditModule.WAREHOUSE,
                 entity_type='PurchaseOrder',
@@ -167,11 +160,7 @@ def setup_audit_listeners():
                 old_values=values,
                 request_method='DELETE',
                 request_path=f'/api/v1/purchasing/purchase-order/{target.id}'
-            )
-
-            db.add(audit_log)
-            db.commit()
-            db.close()
+            ))
         except Exception:
             pass
 
@@ -184,8 +173,6 @@ def setup_audit_listeners():
     def log_stock_update(mapper, connection, target):
         """Log stock quantity changes - Critical for FIFO traceability."""
         try:
-            db = SessionLocal()
-
             changed = get_changed_fields(target)
             if not changed or 'qty_on_hand' not in changed:
                 return
@@ -198,11 +185,8 @@ def setup_audit_listeners():
             product_code = target.product.code if target.product else f"Product#{target.product_id}"
             location_name = target.location.name if target.location else f"Location#{target.location_id}"
 
-            audit_log = AuditLog(
-                user_id=getattr(target, '_audit_user_id', None),
-                username=getattr(target, '_audit_username', 'System'),
-                user_role=getattr(target, '_audit_user_role', None),
-                ip_address=getattr(target, '_audit_ip_address', None),
+            audit_writer.submit(target, dict(
+                **_audit_user_fields(target),
                 action=AuditAction.UPDATE,
                 module=AuditModule.WAREHOUSE,
                 entity_type='StockQuant',
@@ -212,11 +196,7 @@ def setup_audit_listeners():
                 new_values={k: v['new'] for k, v in changed.items()},
                 request_method='PUT',
                 request_path='/api/v1/warehouse/stock'
-            )
-
-            db.add(audit_log)
-            db.commit()
-            db.close()
+            ))
         except Exception:
             pass
 
@@ -225,15 +205,10 @@ def setup_audit_listeners():
     def log_transfer_create(mapper, connection, target):
         """Log inter-departmental transfers - QT-09 protocol compliance."""
         try:
-            db = SessionLocal()
-
             values = get_model_dict(target)
 
-            audit_log = AuditLog(
-                user_id=getattr(target, '_audit_user_id', None),
-                username=getattr(target, '_audit_username', 'System'),
-                user_role=getattr(target, '_audit_user_role', None),
-                ip_address=getattr(target, '_audit_ip_address', None),
+            audit_writer.submit(target, dict(
+                **_audit_user_fields(target),
                 action=AuditAction.TRANSFER,
                 module=AuditModule.WAREHOUSE,
                 entity_type='TransferLog',
@@ -242,11 +217,7 @@ def setup_audit_listeners():
                 new_values=values,
                 request_method='POST',
                 request_path='/api/v1/warehouse/transfer'
-            )
-
-            db.add(audit_log)
-            db.commit()
-            db.close()
+            ))
         except Exception:
             pass
 
@@ -259,18 +230,13 @@ def setup_audit_listeners():
     def log_mo_create(mapper, connection, target):
         """Log MO creation."""
         try:
-            db = SessionLocal()
-
             values = get_model_dict(target)
 
             # Get product code for description
             product_code = target.product.code if target.product else f"Product#{target.product_id}"
 
-            audit_log = AuditLog(
-                user_id=getattr(target, '_audit_user_id', None),
-                username=getattr(target, '_audit_username', 'System'),
-                user_role=getattr(target, '_audit_user_role', None),
-                ip_address=getattr(target, '_audit_ip_address', None),
+            audit_writer.submit(target, dict(
+                **_audit_user_fields(target),
                 action=AuditAction.CREATE,
                 module=AuditModule.PPIC,
                 entity_type='ManufacturingOrder',
@@ -279,11 +245,7 @@ def setup_audit_listeners():
                 new_values=values,
                 request_method='POST',
                 request_path='/api/v1/ppic/manufacturing-orders'
-            )
-
-            db.add(audit_log)
-            db.commit()
-            db.close()
+            ))
         except Exception:
             pass
 
@@ -292,8 +254,6 @@ def setup_audit_listeners():
     def log_mo_update(mapper, connection, target):
         """Log MO status changes - Track production progress."""
         try:
-            db = SessionLocal()
-
             changed = get_changed_fields(target)
             if not changed:
                 return
@@ -308,11 +268,8 @@ def setup_audit_listeners():
             else:
                 description = f"Updated Manufacturing Order {product_code}: {', '.join(changed.keys())}"
 
-            audit_log = AuditLog(
-                user_id=getattr(target, '_audit_user_id', None),
-                username=getattr(target, '_audit_username', 'System'),
-                user_role=getattr(target, '_audit_user_role', None),
-                ip_address=getattr(target, '_audit_ip_address', None),
+            audit_writer.submit(target, dict(
+                **_audit_user_fields(target),
                 action=AuditAction.UPDATE,
                 module=AuditModule.PPIC,
                 entity_type='ManufacturingOrder',
@@ -322,11 +279,7 @@ def setup_audit_listeners():
                 new_values={k: v['new'] for k, v in changed.items()},
                 request_method='PUT',
                 request_path=f'/api/v1/ppic/manufacturing-orders/{target.id}'
-            )
-
-            db.add(audit_log)
-            db.commit()
-            db.close()
+            ))
         except Exception:
             pass
 
@@ -339,15 +292,10 @@ def setup_audit_listeners():
     def log_work_order_create(mapper, connection, target):
         """Log work order creation for all departments."""
         try:
-            db = SessionLocal()
-
             values = get_model_dict(target)
 
-            audit_log = AuditLog(
-                user_id=getattr(target, '_audit_user_id', None),
-                username=getattr(target, '_audit_username', 'System'),
-                user_role=getattr(target, '_audit_user_role', None),
-                ip_address=getattr(target, '_audit_ip_address', None),
+            audit_writer.submit(target, dict(
+                **_audit_user_fields(target),
                 action=AuditAction.CREATE,
                 module=AuditModule.PPIC,
                 entity_type='WorkOrder',
@@ -356,11 +304,7 @@ def setup_audit_listeners():
                 new_values=values,
                 request_method='POST',
                 request_path='/api/v1/production/work-orders'
-            )
-
-            db.add(audit_log)
-            db.commit()
-            db.close()
+            ))
         except Exception:
             pass
 
@@ -369,8 +313,6 @@ def setup_audit_listeners():
     def log_work_order_update(mapper, connection, target):
         """Log work order status changes for all departments."""
         try:
-            db = SessionLocal()
-
             changed = get_changed_fields(target)
             if not changed:
                 return
@@ -383,11 +325,8 @@ def setup_audit_listeners():
             else:
                 description = f"Updated {target.department.value} WO #{target.id}: {', '.join(changed.keys())}"
 
-            audit_log = AuditLog(
-                user_id=getattr(target, '_audit_user_id', None),
-                username=getattr(target, '_audit_username', 'System'),
-                user_role=getattr(target, '_audit_user_role', None),
-                ip_address=getattr(target, '_audit_ip_address', None),
+            audit_writer.submit(target, dict(
+                **_audit_user_fields(target),
                 action=AuditAction.UPDATE,
                 module=AuditModule.PPIC,
                 entity_type='WorkOrder',
@@ -397,11 +336,7 @@ def setup_audit_listeners():
                 new_values={k: v['new'] for k, v in changed.items()},
                 request_method='PUT',
                 request_path=f'/api/v1/production/work-orders/{target.id}'
-            )
-
-            db.add(audit_log)
-            db.commit()
-            db.close()
+            ))
         except Exception:
             pass
 
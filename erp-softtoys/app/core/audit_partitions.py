@@ -0,0 +1,328 @@
+"""Audit Log Partition Maintenance
+audit_logs, security_logs and user_activity_logs are range-partitioned by
+month on "timestamp" in PostgreSQL (migration 019):
+
+    audit_logs                  PARTITION BY RANGE ("timestamp")
+      audit_logs_y2026m03       FOR VALUES FROM ('2026-03-01') TO ('2026-04-01')
+      ...
+      audit_logs_default        DEFAULT (safety net, normally empty)
+
+Inserts only touch the current month's partition and its indexes, so they
+stay fast as history grows; queries with a timestamp range (24h / 7d
+summary counts, date-filtered listings) are pruned to the months they need.
+
+The maintainer thread (one worker at a time, advisory lock):
+- creates the partitions for the current month and the next
+  AUDIT_PARTITION_MONTHS_AHEAD months before rows arrive;
+- with AUDIT_RETENTION_MONTHS > 0, detaches the partitions older than the
+  retention window, archives each to a gzip-compressed CSV in
+  AUDIT_ARCHIVE_DIR (plus a JSON manifest with row count and SHA-256) and
+  then drops it. A partition whose archive fails stays detached and is
+  retried on the next run; nothing is dropped without a complete archive.
+
+AUDIT_ARCHIVE_DIR must be an absolute path to an existing directory on
+persistent storage (a mounted volume, or an object storage bucket mounted
+into the container), since the archive is the only copy once the partition
+is dropped. While it is unset, relative or missing, expired partitions are
+left in place and each run logs a warning and counts an "archive_location"
+failure.
+
+Also runnable once from the command line (cron, maintenance windows):
+    python scripts/maintain_audit_partitions.py
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from prometheus_client import Counter
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Parent table -> partition key column
+PARTITIONED_TABLES: dict[str, str] = {
+    "audit_logs": "timestamp",
+    "security_logs": "timestamp",
+    "user_activity_logs": "timestamp",
+}
+
+ADVISORY_LOCK_KEY = "audit:partition-maintenance"
+
+AUDIT_PARTITIONS_CREATED = Counter(
+    'audit_partitions_created_total',
+    'Monthly audit partitions created',
+    ['table'],
+    registry=registry
+)
+
+AUDIT_PARTITIONS_ARCHIVED = Counter(
+    'audit_partitions_archived_total',
+    'Audit partitions archived to file and dropped',
+    ['table'],
+    registry=registry
+)
+
+AUDIT_PARTITION_MAINTENANCE_FAILURES = Counter(
+    'audit_partition_maintenance_failures_total',
+    'Failed audit partition maintenance steps',
+    ['table', 'step'],  # create, archive, archive_location
+    registry=registry
+)
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def parse_partition_month(table: str, name: str) -> date | None:
+    """Month of a partition named by `partition_name`, None for other tables."""
+    match = re.fullmatch(rf"{re.escape(table)}_y(\d{{4}})m(\d{{2}})", name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def months_to_create(today: date, months_ahead: int) -> list[date]:
+    """Current month and the next `months_ahead` months."""
+    first = month_start(today)
+    return [add_months(first, offset) for offset in range(months_ahead + 1)]
+
+
+def expired_months(months: list[date], today: date, retention_months: int) -> list[date]:
+    """Months entirely older than the retention window (0 = keep forever)."""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(today), -retention_months)
+    return sorted(month for month in months if month < cutoff)
+
+
+def archive_location_problem(archive_dir: str) -> str | None:
+    """Why `archive_dir` cannot hold archives, None when it can."""
+    if not archive_dir:
+        return "AUDIT_ARCHIVE_DIR is not set"
+    if not os.path.isabs(archive_dir):
+        return f"AUDIT_ARCHIVE_DIR {archive_dir!r} is not an absolute path on a persistent volume"
+    if not os.path.isdir(archive_dir):
+        return f"AUDIT_ARCHIVE_DIR {archive_dir!r} does not exist (is the archive volume mounted?)"
+    return None
+
+
+def write_archive(rows_copy, archive_dir: Path, name: str) -> dict:
+    """Write a partition's rows to `<name>.csv.gz` with a manifest.
+
+    `rows_copy(file)` writes the CSV bytes to `file` (COPY ... TO STDOUT).
+    The archive is written to a temporary file and renamed only once
+    complete. Returns the manifest.
+    """
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / f"{name}.csv.gz"
+    partial = archive_dir / f"{name}.csv.gz.partial"
+
+    with open(partial, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as compressed:
+        rows_copy(compressed)
+
+    digest = hashlib.sha256()
+    with gzip.open(partial, "rb") as archived:
+        lines = 0
+        for line in archived:
+            digest.update(line)
+            lines += 1
+    os.replace(partial, path)
+
+    manifest = {
+        "partition": name,
+        "file": path.name,
+        "rows": max(0, lines - 1),  # CSV header
+        "sha256": digest.hexdigest(),
+        "archived_at": datetime.now(timezone.utc).isoformat(),
+    }
+    (archive_dir / f"{name}.manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+class AuditPartitionMaintainer:
+    """Create upcoming monthly partitions; archive and drop expired ones"""
+
+    def __init__(self, tables: dict[str, str], engine=None, months_ahead: int = 3,
+                 retention_months: int = 0, archive_dir: str = "",
+                 interval_seconds: float = 21600):
+        self.tables = tables
+        self.engine = engine
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.archive_dir = archive_dir
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ------------------------------------------------------------------
+    def run_once(self, today: date | None = None) -> dict:
+        """One maintenance pass; returns {"created": [...], "archived": [...]}."""
+        today = today or date.today()
+        summary = {"created": [], "archived": []}
+        with self.engine.connect() as lock_conn:
+            locked = lock_conn.execute(
+                text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": ADVISORY_LOCK_KEY}
+            ).scalar()
+            if not locked:
+                return summary  # Another worker is maintaining the partitions
+            try:
+                for table in self.tables:
+                    if not self._is_partitioned(table):
+                        continue
+                    summary["created"] += self._create_upcoming(table, today)
+                    summary["archived"] += self._archive_expired(table, today)
+            finally:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": ADVISORY_LOCK_KEY})
+                lock_conn.commit()
+        return summary
+
+    def _is_partitioned(self, table: str) -> bool:
+        with self.engine.connect() as conn:
+            return bool(conn.execute(
+                text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+                     "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"),
+                {"table": table}
+            ).scalar())
+
+    def _partitions(self, table: str) -> tuple[dict[date, str], set[str]]:
+        """(month -> partition name for every monthly table, names currently attached)"""
+        with self.engine.connect() as conn:
+            names = conn.execute(
+                text("SELECT relname FROM pg_class WHERE relkind IN ('r', 'p') AND relname LIKE :pattern "
+                     "AND pg_table_is_visible(oid)"),
+                {"pattern": f"{table}\\_y%"}
+            ).scalars().all()
+            attached = set(conn.execute(
+                text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                     "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table"),
+                {"table": table}
+            ).scalars().all())
+        months = {}
+        for name in names:
+            month = parse_partition_month(table, name)
+            if month:
+                months[month] = name
+        return months, attached
+
+    def _create_upcoming(self, table: str, today: date) -> list[str]:
+        existing, _ = self._partitions(table)
+        created = []
+        for month in months_to_create(today, self.months_ahead):
+            if month in existing:
+                continue
+            name = partition_name(table, month)
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text(
+                        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                    ))
+                AUDIT_PARTITIONS_CREATED.labels(table=table).inc()
+                created.append(name)
+                logger.info(f"Created audit partition {name}")
+            except Exception as e:  # noqa: BLE001
+                # Typically rows for this month already sit in the default partition
+                AUDIT_PARTITION_MAINTENANCE_FAILURES.labels(table=table, step="create").inc()
+                logger.error(f"Could not create audit partition {name}: {e}")
+        return created
+
+    def _archive_expired(self, table: str, today: date) -> list[str]:
+        existing, attached = self._partitions(table)
+        archived = []
+        expired = expired_months(list(existing), today, self.retention_months)
+        problem = archive_location_problem(self.archive_dir) if expired else None
+        if problem:
+            AUDIT_PARTITION_MAINTENANCE_FAILURES.labels(table=table, step="archive_location").inc()
+            logger.warning(f"Keeping {len(expired)} expired {table} partitions online: {problem}")
+            return archived
+        for month in expired:
+            name = existing[month]
+            try:
+                if name in attached:
+                    with self.engine.begin() as conn:
+                        conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+                manifest = self._export(name)
+                with self.engine.begin() as conn:
+                    conn.execute(text(f'DROP TABLE "{name}"'))
+                AUDIT_PARTITIONS_ARCHIVED.labels(table=table).inc()
+                archived.append(name)
+                logger.info(f"Archived audit partition {name}: {manifest['rows']} rows -> {manifest['file']}")
+            except Exception as e:  # noqa: BLE001
+                AUDIT_PARTITION_MAINTENANCE_FAILURES.labels(table=table, step="archive").inc()
+                logger.error(f"Could not archive audit partition {name} (kept, retried next run): {e}")
+        return archived
+
+    def _export(self, name: str) -> dict:
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            manifest = write_archive(
+                lambda file: cursor.copy_expert(f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER)', file),
+                Path(self.archive_dir),
+                name,
+            )
+            raw.commit()
+            return manifest
+        finally:
+            raw.close()
+
+    # ------------------------------------------------------------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-partitions", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"Audit partition maintenance failed: {e}")
+            self._stop.wait(self.interval_seconds)
+
+
+# Process-wide maintainer started with the application (PostgreSQL only)
+audit_partition_maintainer = AuditPartitionMaintainer(
+    PARTITIONED_TABLES,
+    months_ahead=settings.AUDIT_PARTITION_MONTHS_AHEAD,
+    retention_months=settings.AUDIT_RETENTION_MONTHS,
+    archive_dir=settings.AUDIT_ARCHIVE_DIR,
+    interval_seconds=settings.AUDIT_PARTITION_CHECK_INTERVAL_SECONDS,
+)
+
+
+def start_audit_partition_maintainer():
+    """Keep audit partitions ahead of time and apply retention (PostgreSQL only)."""
+    if not settings.AUDIT_PARTITION_MAINTENANCE_ENABLED:
+        return
+    if audit_partition_maintainer.engine is None:
+        from app.core.database import engine
+        audit_partition_maintainer.engine = engine
+    if audit_partition_maintainer.engine.dialect.name != "postgresql":
+        return
+    audit_partition_maintainer.start()
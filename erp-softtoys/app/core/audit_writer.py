@@ -0,0 +1,353 @@
+"""Buffered Audit Log Writer
+Collects audit events produced by the SQLAlchemy listeners and writes them
+to `audit_logs` in bulk instead of one session + commit per event.
+
+Two write modes (settings.AUDIT_WRITE_MODE):
+
+- "transaction" (default): events are buffered on the originating Session
+  and inserted with a single executemany in `after_flush`, on the SAME
+  connection and transaction as the audited change. No second pooled
+  connection, no second commit; a rolled-back change leaves no audit row.
+
+- "background": events go to a bounded in-process queue drained by a
+  daemon thread in batches. When the queue is full, `submit` blocks for
+  AUDIT_ENQUEUE_TIMEOUT_SECONDS (backpressure) and then writes the event
+  synchronously rather than dropping it. Batches that cannot be written
+  after retries are spooled to AUDIT_SPOOL_PATH (JSON lines) and replayed
+  on the next start, and the queue is drained on shutdown.
+
+Every written batch is also folded into the hourly summary store
+(audit_summary_hourly, app/services/audit_summary_service.py) in the same
+transaction.
+
+Metrics: audit_queue_depth, audit_flush_duration_seconds,
+audit_events_total{outcome}.
+
+ISO 27001 A.12.4.1: Event Logging
+"""
+import atexit
+import enum
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MODE_TRANSACTION = "transaction"
+MODE_BACKGROUND = "background"
+
+_SESSION_BUFFER_KEY = "audit_event_buffer"
+
+# Every event carries the same keys so batches can go out as one executemany
+AUDIT_EVENT_FIELDS = (
+    'timestamp', 'user_id', 'username', 'user_role', 'ip_address',
+    'action', 'module', 'entity_type', 'entity_id', 'description',
+    'old_values', 'new_values', 'session_id', 'request_method',
+    'request_path', 'response_status'
+)
+
+AUDIT_QUEUE_DEPTH = Gauge(
+    'audit_queue_depth',
+    'Audit events waiting in the background writer queue',
+    registry=registry
+)
+
+AUDIT_FLUSH_LATENCY = Histogram(
+    'audit_flush_duration_seconds',
+    'Time spent writing one batch of audit events',
+    ['mode'],
+    registry=registry
+)
+
+AUDIT_EVENTS = Counter(
+    'audit_events_total',
+    'Audit events by write outcome',
+    ['outcome'],
+    registry=registry
+)
+
+
+class AuditLogWriter:
+    """Bulk writer for audit events (plain dicts of AuditLog column values)."""
+
+    def __init__(
+        self,
+        mode: str = MODE_TRANSACTION,
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        enqueue_timeout: float = 0.5,
+        max_retries: int = 3,
+        spool_path: str | None = None,
+        session_factory=None
+    ):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self.spool_path = spool_path
+        self._session_factory = session_factory
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._write_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Entry point for listeners
+    # ------------------------------------------------------------------
+    def submit(self, instance, values: dict[str, Any]):
+        """Queue one audit event produced while flushing `instance`."""
+        values = {field: values.get(field) for field in AUDIT_EVENT_FIELDS}
+        values['timestamp'] = values['timestamp'] or datetime.now()
+        for field in ('old_values', 'new_values'):
+            if values[field] is not None:
+                # Decimal/date/Enum column values must not break the bulk INSERT
+                values[field] = json.loads(json.dumps(values[field], default=_json_value))
+
+        if self.mode == MODE_TRANSACTION:
+            session = object_session(instance)
+            if session is not None:
+                session.info.setdefault(_SESSION_BUFFER_KEY, []).append(values)
+                return
+
+        if self._thread is None or not self._thread.is_alive():
+            # Writer not running (scripts, tests, detached objects)
+            self._write_with_retry([values], outcome='sync')
+            return
+
+        try:
+            self._queue.put(values, timeout=self.enqueue_timeout)
+            AUDIT_QUEUE_DEPTH.set(self._queue.qsize())
+        except queue.Full:
+            # Backpressure exhausted - never drop audit events
+            logger.warning("Audit queue full; writing event synchronously")
+            self._write_with_retry([values], outcome='sync_fallback')
+
+    # ------------------------------------------------------------------
+    # Transaction mode
+    # ------------------------------------------------------------------
+    def flush_session_buffer(self, session: Session, flush_context=None):
+        """after_flush hook: bulk insert buffered events in the parent transaction.
+
+        AuditLog objects added to the session directly were inserted by this
+        flush; they are counted into the hourly summary alongside the buffer.
+        """
+        from app.core.models.audit import AuditLog
+        from app.services.audit_summary_service import fold_audit_events
+
+        rows = session.info.pop(_SESSION_BUFFER_KEY, None) or []
+        added = [_column_values(obj) for obj in session.new if isinstance(obj, AuditLog)]
+        if not rows and not added:
+            return
+
+        started = time.perf_counter()
+        if rows:
+            session.connection().execute(insert(AuditLog.__table__), rows)
+        fold_audit_events(session.connection(), rows + added)
+        AUDIT_FLUSH_LATENCY.labels(mode=MODE_TRANSACTION).observe(time.perf_counter() - started)
+        AUDIT_EVENTS.labels(outcome='written').inc(len(rows))
+
+    @staticmethod
+    def discard_session_buffer(session: Session, *args):
+        """after_soft_rollback hook: events of a rolled-back flush are dropped."""
+        session.info.pop(_SESSION_BUFFER_KEY, None)
+
+    # ------------------------------------------------------------------
+    # Background mode
+    # ------------------------------------------------------------------
+    def start(self):
+        """Start the background flusher (no-op in transaction mode)."""
+        if self.mode != MODE_BACKGROUND or (self._thread and self._thread.is_alive()):
+            return
+        self.replay_spool()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flusher and drain everything still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """Synchronously write everything currently queued."""
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return
+            self._write_with_retry(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first] + self._drain(self.batch_size - 1)
+            self._write_with_retry(batch)
+
+    def _drain(self, limit: int) -> list[dict[str, Any]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        AUDIT_QUEUE_DEPTH.set(self._queue.qsize())
+        return batch
+
+    # ------------------------------------------------------------------
+    # Writing, retry and spooling
+    # ------------------------------------------------------------------
+    def _write_with_retry(self, rows: list[dict[str, Any]], outcome: str = 'written'):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self._write_batch(rows)
+                AUDIT_EVENTS.labels(outcome=outcome).inc(len(rows))
+                return
+            except Exception as e:
+                logger.warning(f"Audit batch write failed (attempt {attempt}/{self.max_retries}): {e}")
+                time.sleep(min(0.05 * 2 ** attempt, 1.0))
+        self._spool(rows)
+
+    def _write_batch(self, rows: list[dict[str, Any]]):
+        from app.core.models.audit import AuditLog
+        from app.services.audit_summary_service import fold_audit_events
+
+        session_factory = self._session_factory
+        if session_factory is None:
+            from app.core.database import SessionLocal
+            session_factory = SessionLocal
+
+        started = time.perf_counter()
+        with self._write_lock:
+            db = session_factory()
+            try:
+                db.execute(insert(AuditLog.__table__), rows)
+                fold_audit_events(db.connection(), rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+        AUDIT_FLUSH_LATENCY.labels(mode=MODE_BACKGROUND).observe(time.perf_counter() - started)
+
+    def _spool(self, rows: list[dict[str, Any]]):
+        if not self.spool_path:
+            logger.error(f"Dropping {len(rows)} audit events: write failed and no spool configured")
+            AUDIT_EVENTS.labels(outcome='dropped').inc(len(rows))
+            return
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=_json_default) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        AUDIT_EVENTS.labels(outcome='spooled').inc(len(rows))
+
+    def replay_spool(self) -> int:
+        """Write events spooled by a previous failed flush; returns rows replayed.
+
+        The spool is moved aside atomically and appended to `<spool>.replay`,
+        which is only removed once every row in it was written (or
+        re-spooled). A replay interrupted by a crash is therefore picked up
+        by the next call instead of being overwritten - at worst rows of
+        the interrupted batch are written twice, never lost.
+        """
+        if not self.spool_path:
+            return 0
+
+        replay_path = f"{self.spool_path}.replay"
+        pending_path = f"{self.spool_path}.pending"
+        if os.path.exists(self.spool_path):
+            os.replace(self.spool_path, pending_path)
+        if os.path.exists(pending_path):
+            with open(pending_path, encoding="utf-8") as src, open(replay_path, "a", encoding="utf-8") as dst:
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(pending_path)
+        if not os.path.exists(replay_path):
+            return 0
+
+        with open(replay_path, encoding="utf-8") as f:
+            rows = [_restore_row(json.loads(line)) for line in f if line.strip()]
+
+        for i in range(0, len(rows), self.batch_size):
+            self._write_with_retry(rows[i:i + self.batch_size], outcome='replayed')
+        os.remove(replay_path)
+        return len(rows)
+
+
+def _column_values(log) -> dict[str, Any]:
+    """Summary key columns of an AuditLog object inserted by the ORM."""
+    return {'timestamp': log.timestamp, 'module': log.module, 'action': log.action, 'username': log.username}
+
+
+def _json_value(value):
+    """JSON form of a column value inside old_values/new_values."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _json_default(value):
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _restore_row(row: dict[str, Any]) -> dict[str, Any]:
+    row = {field: row.get(field) for field in AUDIT_EVENT_FIELDS}
+    if isinstance(row.get('timestamp'), str):
+        row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+    return row
+
+
+# Process-wide writer used by app.core.audit_listeners
+audit_writer = AuditLogWriter(
+    mode=settings.AUDIT_WRITE_MODE,
+    max_queue_size=settings.AUDIT_QUEUE_MAX_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+    enqueue_timeout=settings.AUDIT_ENQUEUE_TIMEOUT_SECONDS,
+    spool_path=settings.AUDIT_SPOOL_PATH
+)
+
+_session_hooks_installed = False
+
+
+def install_session_hooks():
+    """Register the transaction-mode Session hooks once per process."""
+    global _session_hooks_installed
+    if _session_hooks_installed:
+        return
+    event.listen(Session, "after_flush", audit_writer.flush_session_buffer)
+    event.listen(Session, "after_soft_rollback", audit_writer.discard_session_buffer)
+    atexit.register(audit_writer.stop)
+    _session_hooks_installed = True
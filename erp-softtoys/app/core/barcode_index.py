@@ -0,0 +1,476 @@
+"""Barcode Resolution Index
+In-process index behind the handheld scan endpoints (app/api/v1/barcode.py,
+app/api/v1/finishgoods_mobile.py, PalletService.receive_pallet_in_fg_warehouse),
+so resolving a scanned code does not cost a product / pallet query.
+
+- Codes: product codes -> ProductEntry, `PLT-` pallet barcodes ->
+  PalletEntry (content only - status is re-read under lock by the code
+  that changes it), `FG-YYYY-MOID-CTNxxx` carton labels -> the MO and its
+  product. A miss loads one row; unknown codes are not cached.
+- Stock: on hand / reserved per location (inventory_positions) and the
+  latest lot of a product, kept for BARCODE_STOCK_TTL_SECONDS and dropped
+  in this worker when a commit touches the product's quants or lots.
+- Versioned invalidation: Session hooks note products, pallets, MOs and
+  locations flushed with a changed indexed column. The flush bumps the
+  `barcode_index` row of cache_versions in the same transaction; on commit
+  the keys are evicted in this worker, and the poller of every other
+  worker sees the new version within BARCODE_INDEX_VERSION_POLL_SECONDS
+  and drops its index. A lookup that was reading the DB while entries
+  were evicted does not store its (possibly stale) result.
+- Bulk writes: a Core INSERT / UPDATE / DELETE on one of those tables run
+  through a Session (the masterdata importer's upserts) bumps the version
+  too and clears the whole index of this worker on commit.
+- Master entries expire after BARCODE_MASTER_TTL_SECONDS, a backstop for
+  SQL that bypasses the Session entirely.
+
+Metrics: barcode_index_lookups_total{kind,result},
+barcode_index_invalidations_total{reason}, barcode_index_entries.
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from itertools import chain
+from typing import Any, Callable
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import event, inspect, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.models.manufacturing import ManufacturingOrder
+from app.core.models.products import Product
+from app.core.models.sequences import CacheVersion
+from app.core.models.warehouse import (
+    InventoryPosition,
+    Location,
+    LocationType,
+    PalletBarcode,
+    StockLot,
+    StockQuant,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = "barcode_index"
+
+PALLET_PREFIX = "PLT-"
+CARTON_PATTERN = re.compile(r"^FG-\d{4}-(\d+)-\w+$")  # FG-YYYY-MOID-CTNxxx
+
+# Columns an entry is built from; a change to any of them invalidates it
+INDEXED_COLUMNS: dict[type, tuple[str, ...]] = {
+    Product: ("code", "name", "type", "uom", "pcs_per_carton", "cartons_per_pallet", "is_active"),
+    PalletBarcode: ("barcode", "product_id", "work_order_id", "carton_count", "total_pcs"),
+    ManufacturingOrder: ("product_id", "batch_number", "qty_planned"),
+    Location: ("name", "type", "is_active"),
+}
+
+# Tables of INDEXED_COLUMNS, for bulk writes seen by do_orm_execute
+_INDEXED_TABLES = {model.__table__ for model in INDEXED_COLUMNS}
+
+_SESSION_KEYS = "barcode_index_keys"
+ALL_KEYS = ("*", None)  # Session key: evict everything on commit
+
+BARCODE_INDEX_LOOKUPS = Counter(
+    'barcode_index_lookups_total',
+    'Barcode index lookups by entry kind and result',
+    ['kind', 'result'],  # hit, miss (loaded), unknown (no such row)
+    registry=registry
+)
+
+BARCODE_INDEX_INVALIDATIONS = Counter(
+    'barcode_index_invalidations_total',
+    'Barcode index evictions',
+    ['reason'],  # commit (this worker), version (another worker)
+    registry=registry
+)
+
+BARCODE_INDEX_ENTRIES = Gauge(
+    'barcode_index_entries',
+    'Entries held by the barcode index of this worker',
+    registry=registry
+)
+
+
+@dataclass(frozen=True)
+class ProductEntry:
+    id: int
+    code: str
+    name: str
+    type: Any
+    uom: Any
+    pcs_per_carton: int | None
+    cartons_per_pallet: int | None
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class PalletEntry:
+    id: int
+    barcode: str
+    product_id: int
+    work_order_id: int | None
+    carton_count: int
+    total_pcs: int
+
+
+@dataclass(frozen=True)
+class OrderEntry:
+    id: int
+    product_id: int
+    batch_number: str | None
+    qty_planned: Decimal | None
+
+
+@dataclass(frozen=True)
+class StockEntry:
+    on_hand: dict[int, Decimal] = field(default_factory=dict)   # location_id -> qty
+    reserved: dict[int, Decimal] = field(default_factory=dict)  # location_id -> qty
+    latest_lot: str | None = None
+
+    def qty(self, location_ids=None) -> Decimal:
+        return sum((q for loc, q in self.on_hand.items() if location_ids is None or loc in location_ids),
+                   Decimal("0"))
+
+    def available(self, location_ids=None) -> Decimal:
+        return self.qty(location_ids) - sum(
+            (q for loc, q in self.reserved.items() if location_ids is None or loc in location_ids), Decimal("0")
+        )
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """What a scanned code stands for"""
+    kind: str  # product, pallet, carton
+    product: ProductEntry
+    pallet: PalletEntry | None = None
+    order: OrderEntry | None = None
+
+
+class BarcodeIndex:
+    """Thread-safe LRU of scan lookups with commit / version invalidation"""
+
+    def __init__(self, max_entries: int = 50000, stock_ttl: float = 5.0, poll_interval: float = 2.0,
+                 master_ttl: float | None = 300.0, engine=None):
+        self.max_entries = max_entries
+        self.stock_ttl = stock_ttl
+        self.master_ttl = master_ttl
+        self.poll_interval = poll_interval
+        self.engine = engine
+        self._entries: OrderedDict[tuple, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped by every eviction; guards concurrent loads
+        self._version: int | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        BARCODE_INDEX_ENTRIES.set_function(lambda: len(self._entries))
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def resolve(self, db: Session, code: str) -> Resolution | None:
+        """Product, pallet or carton a scanned code stands for (None if unknown)"""
+        code = code.strip()
+        if code.upper().startswith(PALLET_PREFIX):
+            pallet = self.pallet(db, code)
+            product = self.product_by_id(db, pallet.product_id) if pallet else None
+            return Resolution("pallet", product, pallet=pallet) if product else None
+
+        carton = CARTON_PATTERN.match(code.upper())
+        if carton:
+            order = self.order(db, int(carton.group(1)))
+            product = self.product_by_id(db, order.product_id) if order else None
+            return Resolution("carton", product, order=order) if product else None
+
+        product = self.product(db, code)
+        return Resolution("product", product) if product else None
+
+    def product(self, db: Session, code: str) -> ProductEntry | None:
+        return self._get(("product", code), lambda: _product_entry(
+            db.execute(select(*_PRODUCT_COLUMNS).where(Product.code == code)).first()
+        ))
+
+    def product_by_id(self, db: Session, product_id: int) -> ProductEntry | None:
+        return self._get(("product_id", product_id), lambda: _product_entry(
+            db.execute(select(*_PRODUCT_COLUMNS).where(Product.id == product_id)).first()
+        ))
+
+    def pallet(self, db: Session, barcode: str) -> PalletEntry | None:
+        def load():
+            row = db.execute(
+                select(PalletBarcode.id, PalletBarcode.barcode, PalletBarcode.product_id,
+                       PalletBarcode.work_order_id, PalletBarcode.carton_count, PalletBarcode.total_pcs)
+                .where(PalletBarcode.barcode == barcode)
+            ).first()
+            return PalletEntry(*row) if row else None
+        return self._get(("pallet", barcode), load)
+
+    def order(self, db: Session, mo_id: int) -> OrderEntry | None:
+        def load():
+            row = db.execute(
+                select(ManufacturingOrder.id, ManufacturingOrder.product_id,
+                       ManufacturingOrder.batch_number, ManufacturingOrder.qty_planned)
+                .where(ManufacturingOrder.id == mo_id)
+            ).first()
+            return OrderEntry(*row) if row else None
+        return self._get(("mo", mo_id), load)
+
+    def stock_locations(self, db: Session, name_pattern: str) -> tuple[int, ...]:
+        """Active internal / display locations whose name matches `name_pattern` (ILIKE)"""
+        return self._get(("locations", name_pattern), lambda: tuple(db.scalars(
+            select(Location.id).where(
+                Location.name.ilike(name_pattern),
+                Location.type.in_([LocationType.INTERNAL, LocationType.VIEW]),
+                Location.is_active.isnot(False)
+            ).order_by(Location.id)
+        )))
+
+    def stock(self, db: Session, product_id: int) -> StockEntry:
+        """On hand / reserved per location and latest lot (up to BARCODE_STOCK_TTL_SECONDS old)"""
+        def load():
+            rows = db.execute(
+                select(InventoryPosition.location_id, InventoryPosition.qty_on_hand, InventoryPosition.qty_reserved)
+                .where(InventoryPosition.product_id == product_id)
+            ).all()
+            latest_lot = db.scalar(
+                select(StockLot.lot_number).where(StockLot.product_id == product_id)
+                .order_by(StockLot.created_at.desc(), StockLot.id.desc()).limit(1)
+            )
+            return StockEntry(
+                on_hand={row.location_id: Decimal(str(row.qty_on_hand or 0)) for row in rows},
+                reserved={row.location_id: Decimal(str(row.qty_reserved or 0)) for row in rows},
+                latest_lot=latest_lot,
+            )
+        return self._get(("stock", product_id), load, ttl=self.stock_ttl)
+
+    def _get(self, key: tuple, load: Callable[[], Any], ttl: float | None = None):
+        """Cached value of `key` or load() it; kept `ttl` seconds (master_ttl by default)"""
+        kind = key[0]
+        if ttl is None:
+            ttl = self.master_ttl
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at is None or expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    BARCODE_INDEX_LOOKUPS.labels(kind=kind, result="hit").inc()
+                    return value
+                del self._entries[key]
+            generation = self._generation
+
+        value = load()
+        if value is None:
+            BARCODE_INDEX_LOOKUPS.labels(kind=kind, result="unknown").inc()
+            return None
+        BARCODE_INDEX_LOOKUPS.labels(kind=kind, result="miss").inc()
+        if ttl is not None and ttl <= 0:
+            return value
+        with self._lock:
+            if self._generation == generation:
+                self._entries[key] = (time.monotonic() + ttl if ttl is not None else None, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+    def evict(self, keys, reason: str = "commit"):
+        """Drop `keys`; ("locations", None) drops every location lookup"""
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if key == ("locations", None):
+                    for cached in [k for k in self._entries if k[0] == "locations"]:
+                        del self._entries[cached]
+                else:
+                    self._entries.pop(key, None)
+        BARCODE_INDEX_INVALIDATIONS.labels(reason=reason).inc()
+
+    def clear(self, reason: str = "version"):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+        BARCODE_INDEX_INVALIDATIONS.labels(reason=reason).inc()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------
+    # Session hooks
+    # ------------------------------------------------------------------
+    def collect_flushed_keys(self, session: Session, flush_context):
+        """after_flush hook: note keys to evict on commit; bump the shared version for master data"""
+        keys = set()
+        master_data = False
+        for obj in chain(session.new, session.dirty, session.deleted):
+            if isinstance(obj, (StockQuant, StockLot)):
+                keys.add(("stock", obj.product_id))
+                continue
+            columns = INDEXED_COLUMNS.get(type(obj))
+            if columns is None:
+                continue
+            if obj in session.new:
+                if isinstance(obj, Location):
+                    keys.add(("locations", None))
+                    master_data = True
+                continue
+            state = inspect(obj)
+            if obj in session.dirty and not any(state.attrs[c].history.has_changes() for c in columns):
+                continue
+            keys.update(_entry_keys(obj, state))
+            master_data = True
+
+        if not keys:
+            return
+        session.info.setdefault(_SESSION_KEYS, set()).update(keys)
+        if master_data:
+            bump_version(session.connection())
+
+    def collect_bulk_write(self, orm_execute_state):
+        """do_orm_execute hook: Core / bulk INSERT, UPDATE or DELETE of indexed master data"""
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        if getattr(orm_execute_state.statement, "table", None) not in _INDEXED_TABLES:
+            return
+        # Rows are unknown here: drop the whole index on commit, everywhere
+        session = orm_execute_state.session
+        session.info.setdefault(_SESSION_KEYS, set()).add(ALL_KEYS)
+        bump_version(session.connection())
+
+    def evict_committed(self, session: Session):
+        keys = session.info.pop(_SESSION_KEYS, None)
+        if not keys:
+            return
+        if ALL_KEYS in keys:
+            self.clear(reason="commit")
+        else:
+            self.evict(keys)
+
+    @staticmethod
+    def discard_session(session: Session, previous_transaction=None):
+        if not session.in_transaction():  # Savepoint rollbacks keep the outer transaction's writes
+            session.info.pop(_SESSION_KEYS, None)
+
+    # ------------------------------------------------------------------
+    # Version poller
+    # ------------------------------------------------------------------
+    def poll_version(self, connection: Connection):
+        """Drop the index when another worker bumped the shared version"""
+        version = connection.execute(
+            select(CacheVersion.version).where(CacheVersion.name == CACHE_NAME)
+        ).scalar() or 0
+        if self._version is not None and version != self._version:
+            self.clear(reason="version")
+        self._version = version
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="barcode-index-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        engine = self.engine or _default_engine()
+        while not self._stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    self.poll_version(connection)
+            except Exception as e:
+                # Keep serving scans; entries are still evicted by local commits
+                logger.warning(f"Barcode index version poll failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+
+_PRODUCT_COLUMNS = (
+    Product.id, Product.code, Product.name, Product.type, Product.uom,
+    Product.pcs_per_carton, Product.cartons_per_pallet, Product.is_active,
+)
+
+
+def _product_entry(row) -> ProductEntry | None:
+    if row is None:
+        return None
+    return ProductEntry(*row[:-1], is_active=row.is_active is not False)
+
+
+def _entry_keys(obj, state) -> set[tuple]:
+    """Index keys of a flushed master data row, under its old and new values"""
+    def values(attribute):
+        history = state.attrs[attribute].history
+        return {v for v in chain(history.added, history.unchanged, history.deleted) if v is not None}
+
+    if isinstance(obj, Product):
+        return {("product", code) for code in values("code")} | {("product_id", obj.id)}
+    if isinstance(obj, PalletBarcode):
+        return {("pallet", barcode) for barcode in values("barcode")}
+    if isinstance(obj, ManufacturingOrder):
+        return {("mo", obj.id)}
+    return {("locations", None)}
+
+
+def bump_version(connection: Connection):
+    """Increment the shared barcode index version in the caller's transaction"""
+    table = CacheVersion.__table__
+    now = datetime.utcnow()
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        statement = dialect_insert(table).values(name=CACHE_NAME, version=1, updated_at=now)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"version": table.c.version + 1, "updated_at": now},
+        ))
+        return
+
+    bumped = connection.execute(
+        update(table).where(table.c.name == CACHE_NAME).values(version=table.c.version + 1, updated_at=now)
+    )
+    if bumped.rowcount == 0:
+        connection.execute(insert(table).values(name=CACHE_NAME, version=1, updated_at=now))
+
+
+def _default_engine():
+    from app.core.database import engine
+    return engine
+
+
+# Process-wide index used by the scan endpoints
+barcode_index = BarcodeIndex(
+    max_entries=settings.BARCODE_INDEX_MAX_ENTRIES,
+    stock_ttl=settings.BARCODE_STOCK_TTL_SECONDS,
+    poll_interval=settings.BARCODE_INDEX_VERSION_POLL_SECONDS,
+    master_ttl=settings.BARCODE_MASTER_TTL_SECONDS
+)
+
+_session_hooks_installed = False
+
+
+def install_session_hooks():
+    """Register the invalidation hooks on every Session once per process."""
+    global _session_hooks_installed
+    if _session_hooks_installed:
+        return
+    event.listen(Session, "after_flush", barcode_index.collect_flushed_keys)
+    event.listen(Session, "do_orm_execute", barcode_index.collect_bulk_write)
+    event.listen(Session, "after_commit", barcode_index.evict_committed)
+    event.listen(Session, "after_soft_rollback", barcode_index.discard_session)
+    _session_hooks_installed = True
@@ -126,6 +126,90 @@ class Settings(BaseSettings):
     PROMETHEUS_ENABLED: bool = Field(default=True)
     PROMETHEUS_PORT: int = Field(default=8001)
 
+    # Audit trail writer ('transaction' = bulk insert in the parent transaction,
+    # 'background' = bounded queue drained by a flusher thread)
+    AUDIT_WRITE_MODE: str = Field(default="transaction")
+    AUDIT_QUEUE_MAX_SIZE: int = Field(default=10000)
+    AUDIT_BATCH_SIZE: int = Field(default=500)
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = Field(default=1.0)
+    AUDIT_ENQUEUE_TIMEOUT_SECONDS: float = Field(default=0.5)  # Backpressure before sync write
+    AUDIT_SPOOL_PATH: str = Field(default="logs/audit_spool.jsonl")  # Failed batches, replayed on start
+
+    # Redis (optional - shared permission cache tier + invalidation pub/sub)
+    REDIS_URL: str | None = Field(default=None)
+
+    # Permission cache (per-worker LRU in front of Redis)
+    PERMISSION_CACHE_LOCAL_TTL_SECONDS: float = Field(default=30.0)  # Max staleness without Redis
+    PERMISSION_CACHE_REDIS_TTL_SECONDS: int = Field(default=300)
+    PERMISSION_CACHE_MAX_USERS: int = Field(default=5000)
+
+    # Authenticated-user snapshot cache used by get_current_user (0 = disabled)
+    USER_IDENTITY_CACHE_TTL_SECONDS: float = Field(default=15.0)
+    USER_IDENTITY_CACHE_MAX_ENTRIES: int = Field(default=10000)
+
+    # WebSocket fan-out (per-client bounded send queue, see app/core/websocket.py)
+    WS_CLIENT_QUEUE_SIZE: int = Field(default=100)
+    WS_SEND_TIMEOUT_SECONDS: float = Field(default=5.0)
+    # Cross-worker delivery: 'local' (this worker only), 'memory', 'redis' (uses REDIS_URL)
+    WS_BACKPLANE: str = Field(default="local")
+
+    # Event loop safety (see app/core/loop_safety.py)
+    SYNC_ENDPOINT_OFFLOAD: bool = Field(default=True)  # Run non-awaiting async DB handlers in the threadpool
+    SYNC_ENDPOINT_THREADS: int | None = Field(default=None)  # None = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = Field(default=0.5)
+    EVENT_LOOP_BLOCK_THRESHOLD_MS: float = Field(default=100.0)  # Report handlers blocking longer
+
+    # Password hashing pool (bcrypt off the event loop, see app/core/password_hasher.py)
+    PASSWORD_HASH_WORKERS: int | None = Field(default=None)  # None = half the CPUs (min 1)
+    PASSWORD_HASH_MAX_QUEUE: int = Field(default=256)  # Waiting + running; beyond -> 503
+
+    # Login throttle (failed attempts counted in memory / Redis, not in the DB)
+    LOGIN_MAX_FAILED_ATTEMPTS: int = Field(default=5)
+    LOGIN_LOCKOUT_MINUTES: int = Field(default=15)
+    LOGIN_IP_MAX_FAILURES_PER_MINUTE: int = Field(default=50)  # Failures only - shift change shares one NAT IP
+
+    # Document numbers (see app/services/sequence_service.py)
+    DOCUMENT_SEQUENCE_BLOCK_SIZE: int = Field(default=20)  # Numbers reserved per worker per DB round trip
+
+    # Report builder result cache (see app/services/report_engine.py, 0 = disabled)
+    REPORT_CACHE_TTL_SECONDS: float = Field(default=120.0)
+    REPORT_CACHE_MAX_ENTRIES: int = Field(default=256)
+
+    # Dashboard materialized views (change-driven refresh, see app/core/matview_refresher.py)
+    MATVIEW_REFRESH_ENABLED: bool = Field(default=True)  # PostgreSQL only
+    MATVIEW_MIN_REFRESH_INTERVAL_SECONDS: float = Field(default=30.0)  # Coalesce bursts of writes
+    MATVIEW_MAX_AGE_SECONDS: float = Field(default=900.0)  # Time-window views refresh even without writes (0 = never)
+    MATVIEW_MISSING_RETRY_SECONDS: float = Field(default=300.0)  # How often a view that does not exist is looked for again
+
+    # Masterdata Excel import (see app/services/masterdata_import_service.py)
+    MASTERDATA_IMPORT_CHUNK_SIZE: int = Field(default=1000)  # Rows per bulk statement / key lookup
+
+    # Background jobs for long imports / reports / exports (see app/core/jobs.py)
+    JOB_BACKEND: str = Field(default="memory")  # 'memory' (this process) or 'redis' (uses REDIS_URL)
+    JOB_IN_PROCESS_WORKERS: bool = Field(default=True)  # False when a dedicated `python -m app.job_worker` runs
+    JOB_WORKERS: int = Field(default=2)  # Concurrent jobs per process
+    JOB_MAX_PENDING: int = Field(default=100)  # Queued jobs before submissions get 503
+    JOB_RESULT_TTL_SECONDS: int = Field(default=86400)  # Job status and artifacts kept for a day
+    JOB_LEASE_SECONDS: float = Field(default=60.0)  # Running job requeued when its worker stops renewing for this long
+    JOB_MAX_ATTEMPTS: int = Field(default=3)  # Claims of one job (worker deaths) before it is marked failed
+
+    # Monthly audit log partitions and retention (PostgreSQL only, see app/core/audit_partitions.py)
+    AUDIT_PARTITION_MAINTENANCE_ENABLED: bool = Field(default=True)
+    AUDIT_PARTITION_MONTHS_AHEAD: int = Field(default=3)  # Partitions created before their month starts
+    AUDIT_PARTITION_CHECK_INTERVAL_SECONDS: float = Field(default=21600.0)
+    AUDIT_RETENTION_MONTHS: int = Field(default=60)  # Months kept online (5-year requirement); older partitions are archived (0 = keep forever)
+    AUDIT_ARCHIVE_DIR: str = Field(default="")  # Absolute path on a persistent volume for the CSV + manifest archives; unset = expired partitions are kept
+
+    # Stock reservation / consumption (see app/services/stock_reservation_service.py)
+    STOCK_LOCK_MAX_RETRIES: int = Field(default=3)  # Retries after deadlock / serialization failure / lock timeout
+    STOCK_LOCK_RETRY_BACKOFF_SECONDS: float = Field(default=0.05)  # Doubled per retry
+
+    # Barcode resolution index for scan endpoints (see app/core/barcode_index.py)
+    BARCODE_INDEX_MAX_ENTRIES: int = Field(default=50000)
+    BARCODE_INDEX_VERSION_POLL_SECONDS: float = Field(default=2.0)  # How soon other workers' master data edits are seen
+    BARCODE_STOCK_TTL_SECONDS: float = Field(default=5.0)  # Stock shown on scan validation (0 = always read)
+    BARCODE_MASTER_TTL_SECONDS: float = Field(default=300.0)  # Backstop for product / pallet / MO entries changed by raw SQL
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -3,6 +3,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from .config import settings
+from .db_metrics import InstrumentedQueuePool
 
 # Database URL is loaded from .env by Pydantic BaseSettings in config.py
 # (env_file=".env" — no need for extra load_dotenv() here)
@@ -10,6 +11,7 @@ from .config import settings
 # Pool configuration for connection management - Optimized for production
 engine = create_engine(
     settings.DATABASE_URL,
+    poolclass=InstrumentedQueuePool,  # QueuePool + checkout wait histogram
     pool_pre_ping=True,  # Check connection before using
     pool_size=settings.DB_POOL_SIZE,  # Increased to 20 for concurrency
     max_overflow=settings.DB_MAX_OVERFLOW,  # Increased to 40
@@ -0,0 +1,154 @@
+"""Database Metrics
+Connection pool and SQL statement metrics for Prometheus.
+
+- `InstrumentedQueuePool` (the pool of app.core.database.engine) times
+  every checkout, so pool exhaustion shows up as wait time rather than
+  only as request latency.
+- `install_pool_metrics(engine)` exposes the pool's checked-out / idle /
+  overflow connections as gauges read at scrape time and counts pool
+  events in `database_connections_total`.
+- `count_queries()` opens a per-request accounting scope: every cursor
+  execute on any engine inside it adds to the scope's statement count and
+  SQL time. Work outside a scope (jobs, background threads) is not
+  counted. The request middleware (app.core.request_metrics) observes the
+  totals per route, which is where N+1 query patterns show up.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.metrics import registry
+
+DB_CONNECTIONS = Counter(
+    'database_connections_total',
+    'Connection pool events (opened, checked_out, checked_in, invalidated, closed)',
+    ['status'],
+    registry=registry
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting for a pooled connection (including opening a new one)',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    registry=registry
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    'Connections currently checked out of the pool',
+    registry=registry
+)
+
+DB_POOL_IDLE = Gauge(
+    'db_pool_idle_connections',
+    'Connections currently idle in the pool',
+    registry=registry
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    'db_pool_overflow_connections',
+    'Connections open beyond the pool size (max_overflow in use)',
+    registry=registry
+)
+
+DB_POOL_SIZE = Gauge(
+    'db_pool_size',
+    'Configured pool size',
+    registry=registry
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+_POOL_EVENTS = {
+    "connect": "opened",
+    "checkout": "checked_out",
+    "checkin": "checked_in",
+    "invalidate": "invalidated",
+    "close": "closed",
+}
+
+_instrumented_engines = set()
+
+
+def install_pool_metrics(engine: Engine):
+    """Expose `engine`'s pool as the pool gauges and count its events; once per engine."""
+    if engine in _instrumented_engines:
+        return
+    for event_name, status in _POOL_EVENTS.items():
+        event.listen(engine, event_name, _count_pool_event(status))
+
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+        DB_POOL_IDLE.set_function(pool.checkedin)
+        DB_POOL_OVERFLOW.set_function(lambda: max(pool.overflow(), 0))
+        DB_POOL_SIZE.set_function(pool.size)
+    _instrumented_engines.add(engine)
+
+
+def _count_pool_event(status: str):
+    counter = DB_CONNECTIONS.labels(status=status)
+
+    def listener(*args):
+        counter.inc()
+    return listener
+
+
+# ---------------------------------------------------------------------------
+# Per-request SQL accounting
+# ---------------------------------------------------------------------------
+class QueryStats:
+    """Statements executed and time spent in them within one accounting scope"""
+
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Copied into worker threads (run_in_threadpool), so sync handlers count too
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Accounting scope for the SQL executed by the current request"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_stats.get() is not None:
+        context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    start = getattr(context, "_query_start", None)
+    if stats is None or start is None:
+        return
+    stats.statements += 1
+    stats.seconds += time.perf_counter() - start
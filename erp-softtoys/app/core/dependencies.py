@@ -7,7 +7,7 @@ ACCESS CONTROL STRATEGY (Session 13.1 - Week 3):
 ✅ PRIMARY: PBAC (Permission-Based Access Control)
    - Use: require_permission('module.action')
    - Granular control: specific actions per user
-   - Redis cached (5-min TTL)
+   - Cached per worker + Redis (see app/services/permission_cache.py)
    - Example: require_permission('cutting.create_wo')
 
 🔄 FALLBACK: RBAC (Role-Based Access Control)
@@ -25,30 +25,20 @@ MIGRATION PATH:
    - Mixed: Use require_any_permission() for OR logic
 """
 
-from collections.abc import Generator
-
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 
-from app.core.database import SessionLocal
+# Database session dependency - re-exported so that routers, get_current_user
+# and the permission dependencies all resolve to the SAME callable; FastAPI then
+# creates one session (one pooled connection) per request.
+from app.core.database import get_db  # noqa: F401
+from app.core.identity_cache import token_version, user_identity_cache
 from app.core.models.users import User, UserRole
 from app.core.security import TokenUtils
 from app.services.permission_service import get_permission_service
 
 
-# Database session dependency
-def get_db() -> Generator[Session, None, None]:
-    """Database session dependency
-    Provides SQLAlchemy session to routes.
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # HTTP Bearer token scheme
 security = HTTPBearer()
 
@@ -82,14 +72,18 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Get user from database
-    user = db.query(User).filter(User.id == token_data.user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    # Identity snapshot cache (keyed by user id + token version), then database
+    version = token_version(token_data)
+    user = user_identity_cache.load(db, token_data.user_id, version)
+    if user is None:
+        user = db.query(User).filter(User.id == token_data.user_id).first()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        user_identity_cache.put(user, version)
 
     if not user.is_active:
         raise HTTPException(
@@ -252,7 +246,7 @@ def require_permission(permission_code: str = None, permission_type: str = None)
 
     **Benefits**:
     - Fine-grained access control (specific actions, not just roles)
-    - Redis caching (5-minute TTL for performance)
+    - Two-tier permission cache (per-worker LRU + Redis, pub/sub invalidation)
     - Role hierarchy support (supervisors can perform operator actions)
     - Custom user permissions (temporary elevated access)
 
@@ -0,0 +1,123 @@
+"""User Identity Cache
+Short-lived, size-bounded cache of authenticated-user snapshots used by
+`get_current_user`, so a valid token does not cost a `SELECT users` on
+every request.
+
+- Keyed by (user id, token version); the token version is the JWT `iat`,
+  so a re-issued token never reuses an older snapshot.
+- Only active users are cached. Snapshots hold the identity columns
+  (id, username, email, full_name, role, department, is_active,
+  is_verified, created_at); password and login-tracking columns are left
+  unloaded and load lazily if an endpoint touches them.
+- Invalidated explicitly by admin user edits (via PermissionService
+  invalidation, which also reaches other workers over Redis pub/sub) and
+  locally whenever a User row is flushed as updated or deleted.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.core.models.users import User
+
+IDENTITY_FIELDS = (
+    'id', 'username', 'email', 'full_name', 'role', 'department',
+    'is_active', 'is_verified', 'created_at'
+)
+
+
+class UserIdentityCache:
+    """Thread-safe LRU of user identity snapshots with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 15.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[int, int], tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, token_version: int) -> dict[str, Any] | None:
+        key = (user_id, token_version)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, snapshot = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def put(self, user: User, token_version: int):
+        if self.ttl_seconds <= 0 or not user.is_active:
+            return
+        snapshot = {field: getattr(user, field) for field in IDENTITY_FIELDS}
+        key = (snapshot['id'], token_version)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def load(self, db: Session, user_id: int, token_version: int) -> User | None:
+        """Attach a cached snapshot to `db` as a persistent User (no SELECT)."""
+        snapshot = self.get(user_id, token_version)
+        if snapshot is None:
+            return None
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def invalidate_role(self, role: str):
+        with self._lock:
+            for key in [k for k, (_, s) in self._entries.items() if _role_value(s['role']) == role]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def apply_invalidation(self, message: dict):
+        """Apply one `pbac:invalidate` message ({user_id}, {role} or {all})."""
+        if message.get("all"):
+            self.clear()
+        elif message.get("role") is not None:
+            self.invalidate_role(message["role"])
+        elif message.get("user_id") is not None:
+            self.invalidate_user(int(message["user_id"]))
+
+
+def _role_value(role) -> str:
+    return getattr(role, 'value', role)
+
+
+def token_version(token_data) -> int:
+    """Version of a decoded token (its issued-at second)."""
+    iat = getattr(token_data, 'iat', None)
+    return int(iat.timestamp()) if iat else 0
+
+
+# Process-wide cache used by app.core.dependencies
+user_identity_cache = UserIdentityCache(
+    max_entries=settings.USER_IDENTITY_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.USER_IDENTITY_CACHE_TTL_SECONDS
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_flushed_user(mapper, connection, target):
+    """Any flushed change to a user drops its snapshots in this worker."""
+    user_identity_cache.invalidate_user(target.id)
@@ -0,0 +1,566 @@
+"""Background Job Runner
+Long Excel imports, PDF/Excel report generation and large exports run as
+jobs instead of inside the HTTP request: the API submits a job and answers
+202 at once, the client polls the job's status / progress and downloads the
+artifact when it is ready.
+
+- `InMemoryJobBroker` - queue and result store in this process (tests, dev,
+  single worker; JOB_BACKEND=memory).
+- `RedisJobBroker`    - shared Redis list + keys, so any API worker can
+  accept / report on a job and a dedicated worker process runs it
+  (JOB_BACKEND=redis, `python -m app.job_worker`). A worker claims a job by
+  moving it (BLMOVE) from the queue to the in-flight list and keeps a
+  lease on it while it runs; the reaper puts jobs whose lease ran out
+  (worker killed, host lost) back on the queue, and fails a job after
+  JOB_MAX_ATTEMPTS such claims.
+
+`JobRunner` runs at most `workers` jobs at a time per process and rejects
+submissions beyond `max_pending` queued jobs with `JobQueueFullError`
+(503). Handlers register with `@job_handler(kind)`, receive a `JobContext`
+(params, uploaded payload, own DB session, progress callback) and return a
+`JobArtifact` (a file to download) or a JSON-serializable result.
+
+Job records, payloads and artifacts expire after JOB_RESULT_TTL_SECONDS.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+BACKGROUND_JOBS = Counter(
+    'background_jobs_total',
+    'Background jobs finished, by kind and final status',
+    ['kind', 'status'],
+    registry=registry
+)
+
+BACKGROUND_JOB_DURATION = Histogram(
+    'background_job_duration_seconds',
+    'Background job execution time',
+    ['kind'],
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+    registry=registry
+)
+
+BACKGROUND_JOBS_REJECTED = Counter(
+    'background_jobs_rejected_total',
+    'Job submissions rejected because the queue was full',
+    ['kind'],
+    registry=registry
+)
+
+BACKGROUND_JOBS_REQUEUED = Counter(
+    'background_jobs_requeued_total',
+    'Jobs put back on the queue after their worker stopped renewing the lease',
+    ['kind'],
+    registry=registry
+)
+
+BACKGROUND_JOB_QUEUE_DEPTH = Gauge(
+    'background_job_queue_depth',
+    'Jobs waiting for a worker',
+    registry=registry
+)
+
+
+class JobQueueFullError(RuntimeError):
+    """Too many jobs are waiting for a worker"""
+
+
+class JobError(Exception):
+    """A handler failed in an expected way; `detail` is shown to the user."""
+
+    def __init__(self, detail: Any):
+        super().__init__(str(detail))
+        self.detail = detail
+
+
+@dataclass
+class JobArtifact:
+    """File produced by a job."""
+
+    content: bytes
+    filename: str
+    media_type: str
+
+
+@dataclass
+class JobContext:
+    """What a handler gets to work with."""
+
+    job_id: str
+    kind: str
+    user_id: int | None
+    params: dict
+    payload: bytes | None
+    db: Any = None
+    _report: Callable[[int, int | None], None] = field(default=lambda done, total: None, repr=False)
+
+    def progress(self, done: int, total: int | None = None):
+        """Report progress (e.g. rows written so far)."""
+        self._report(done, total)
+
+
+JobHandler = Callable[[JobContext], Any]
+
+JOB_HANDLERS: dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str):
+    """Register the decorated function as the handler for jobs of `kind`."""
+    def register(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ====================== BROKERS ======================
+
+class JobBroker(ABC):
+    """Interface: job queue plus store for job records, payloads and artifacts."""
+
+    lease_seconds: float = 60.0  # How long a claimed job counts as alive without a renewal
+
+    @abstractmethod
+    def save(self, job: dict):
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def put_blob(self, job_id: str, name: str, content: bytes):
+        ...
+
+    @abstractmethod
+    def get_blob(self, job_id: str, name: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    def delete_blob(self, job_id: str, name: str):
+        ...
+
+    @abstractmethod
+    def enqueue(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def dequeue(self, timeout: float) -> str | None:
+        """Claim the next job: it stays in flight, leased, until `ack`."""
+
+    @abstractmethod
+    def ack(self, job_id: str):
+        """Release a claimed job that is finished (or was not runnable)."""
+
+    @abstractmethod
+    def renew(self, job_id: str):
+        """Extend the lease of a claimed job that is still running."""
+
+    @abstractmethod
+    def expired_claims(self) -> list[str]:
+        """Claimed jobs whose lease ran out."""
+
+    @abstractmethod
+    def requeue(self, job_id: str) -> bool:
+        """Move a claimed job back to the queue; False if it was no longer claimed."""
+
+    @abstractmethod
+    def pending(self) -> int:
+        ...
+
+    def close(self):
+        pass
+
+
+class InMemoryJobBroker(JobBroker):
+    """Queue and store for a single process."""
+
+    def __init__(self, ttl_seconds: float = 86400):
+        self.ttl_seconds = ttl_seconds
+        self._queue: queue.Queue[str] = queue.Queue()
+        self._items: dict[tuple[str, str], tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _put(self, key: tuple[str, str], value):
+        with self._lock:
+            self._purge()
+            self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def _get(self, key: tuple[str, str]):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._items.pop(key, None)
+                return None
+            return entry[1]
+
+    def _purge(self):
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._items.items() if expires <= now]:
+            del self._items[key]
+
+    def save(self, job: dict):
+        self._put(("job", job["id"]), json.dumps(job))
+
+    def get(self, job_id: str) -> dict | None:
+        data = self._get(("job", job_id))
+        return json.loads(data) if data else None
+
+    def put_blob(self, job_id: str, name: str, content: bytes):
+        self._put((name, job_id), content)
+
+    def get_blob(self, job_id: str, name: str) -> bytes | None:
+        return self._get((name, job_id))
+
+    def delete_blob(self, job_id: str, name: str):
+        with self._lock:
+            self._items.pop((name, job_id), None)
+
+    def enqueue(self, job_id: str):
+        self._queue.put(job_id)
+
+    def dequeue(self, timeout: float) -> str | None:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    # Claims die with this process and its queue, so there is nothing to reap
+    def ack(self, job_id: str):
+        pass
+
+    def renew(self, job_id: str):
+        pass
+
+    def expired_claims(self) -> list[str]:
+        return []
+
+    def requeue(self, job_id: str) -> bool:
+        self._queue.put(job_id)
+        return True
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+
+class RedisJobBroker(JobBroker):
+    """Queue and in-flight list (Redis lists) and store (expiring keys) shared by all workers."""
+
+    def __init__(self, redis_client, ttl_seconds: int = 86400, prefix: str = "jobs",
+                 lease_seconds: float = 60.0):
+        self.redis = redis_client
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.queue_key = f"{prefix}:queue"
+        self.processing_key = f"{prefix}:processing"
+        self._unleased: set[str] = set()
+
+    def _key(self, job_id: str, name: str = "record") -> str:
+        return f"{self.prefix}:{job_id}:{name}"
+
+    def save(self, job: dict):
+        self.redis.set(self._key(job["id"]), json.dumps(job), ex=self.ttl_seconds)
+
+    def get(self, job_id: str) -> dict | None:
+        data = self.redis.get(self._key(job_id))
+        return json.loads(data) if data else None
+
+    def put_blob(self, job_id: str, name: str, content: bytes):
+        self.redis.set(self._key(job_id, name), content, ex=self.ttl_seconds)
+
+    def get_blob(self, job_id: str, name: str) -> bytes | None:
+        return self.redis.get(self._key(job_id, name))
+
+    def delete_blob(self, job_id: str, name: str):
+        self.redis.delete(self._key(job_id, name))
+
+    def enqueue(self, job_id: str):
+        self.redis.rpush(self.queue_key, job_id)
+
+    def dequeue(self, timeout: float) -> str | None:
+        job_id = self.redis.blmove(self.queue_key, self.processing_key, max(1, int(timeout)), "LEFT", "RIGHT")
+        if job_id is None:
+            return None
+        job_id = _text(job_id)
+        self.renew(job_id)
+        return job_id
+
+    def ack(self, job_id: str):
+        self.redis.lrem(self.processing_key, 1, job_id)
+        self.redis.delete(self._key(job_id, "lease"))
+
+    def renew(self, job_id: str):
+        self.redis.set(self._key(job_id, "lease"), _now(), px=int(self.lease_seconds * 1000))
+
+    def expired_claims(self) -> list[str]:
+        # A job only just moved by BLMOVE has no lease yet: it counts as
+        # expired when it is still unleased on the next call
+        in_flight = [_text(job_id) for job_id in self.redis.lrange(self.processing_key, 0, -1)]
+        leases = self.redis.mget([self._key(job_id, "lease") for job_id in in_flight]) if in_flight else []
+        unleased = {job_id for job_id, lease in zip(in_flight, leases) if lease is None}
+        expired = sorted(unleased & self._unleased)
+        self._unleased = unleased - set(expired)
+        return expired
+
+    def requeue(self, job_id: str) -> bool:
+        # LREM is atomic: of several reapers only the one that removed the claim requeues it
+        if not self.redis.lrem(self.processing_key, 1, job_id):
+            return False
+        self.redis.rpush(self.queue_key, job_id)
+        return True
+
+    def pending(self) -> int:
+        return int(self.redis.llen(self.queue_key))
+
+    def close(self):
+        self.redis.close()
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def build_job_broker(kind: str, redis_url: str | None = None, ttl_seconds: float = 86400,
+                     lease_seconds: float = 60.0) -> JobBroker:
+    """Broker for settings.JOB_BACKEND ('memory' or 'redis')."""
+    if kind == "redis":
+        if redis_url:
+            import redis
+            return RedisJobBroker(redis.Redis.from_url(redis_url), ttl_seconds=ttl_seconds,
+                                  lease_seconds=lease_seconds)
+        logger.warning("JOB_BACKEND=redis but REDIS_URL is not set; jobs stay in this worker")
+    return InMemoryJobBroker(ttl_seconds=ttl_seconds)
+
+
+# ====================== RUNNER ======================
+
+class JobRunner:
+    """Submit jobs and run them on a bounded pool of worker threads."""
+
+    PAYLOAD = "payload"
+    ARTIFACT = "artifact"
+
+    def __init__(self, broker: JobBroker, workers: int = 2, max_pending: int = 100,
+                 session_factory: Callable | None = None, poll_interval: float = 1.0,
+                 max_attempts: int = 3):
+        self.broker = broker
+        self.workers = workers
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+        BACKGROUND_JOB_QUEUE_DEPTH.set_function(self._queue_depth)
+
+    def _queue_depth(self) -> int:
+        try:
+            return self.broker.pending()
+        except Exception:  # noqa: BLE001
+            return 0
+
+    # ---------------------------------------------------------------- API side
+    def submit(self, kind: str, params: dict | None = None, user_id: int | None = None,
+               payload: bytes | None = None) -> dict:
+        """Queue a job and return its record."""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        if self.broker.pending() >= self.max_pending:
+            BACKGROUND_JOBS_REJECTED.labels(kind=kind).inc()
+            raise JobQueueFullError("Too many background jobs are waiting, try again later")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": JOB_QUEUED,
+            "user_id": user_id,
+            "params": params or {},
+            "progress": {"done": 0, "total": None},
+            "attempts": 0,
+            "result": None,
+            "error": None,
+            "artifact": None,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        if payload is not None:
+            self.broker.put_blob(job["id"], self.PAYLOAD, payload)
+        self.broker.save(job)
+        self.broker.enqueue(job["id"])
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        return self.broker.get(job_id)
+
+    def artifact(self, job_id: str) -> bytes | None:
+        return self.broker.get_blob(job_id, self.ARTIFACT)
+
+    # ------------------------------------------------------------- worker side
+    def start(self):
+        """Start the worker threads (idempotent)."""
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(max(1, self.workers))
+        ]
+        self._threads.append(threading.Thread(target=self._reap, name="job-reaper", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Let running jobs finish (up to `timeout`) and stop taking new ones."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                self.run_next(timeout=self.poll_interval)
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"Job worker error: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def _reap(self):
+        while not self._stop.wait(self.broker.lease_seconds):
+            try:
+                self.reap_stuck()
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"Job reaper error: {e}")
+
+    def reap_stuck(self) -> list[str]:
+        """Requeue claimed jobs whose worker died; returns the requeued ids."""
+        requeued = []
+        for job_id in self.broker.expired_claims():
+            job = self.broker.get(job_id)
+            if job is None or job["status"] in (JOB_SUCCEEDED, JOB_FAILED):
+                self.broker.ack(job_id)  # Expired, or the worker died after finishing
+                continue
+            if job.get("attempts", 0) >= self.max_attempts:
+                job.update(status=JOB_FAILED, finished_at=_now(),
+                           error=f"Worker stopped while running the job ({job['attempts']} attempts)")
+                self.broker.save(job)
+                self.broker.ack(job_id)
+                BACKGROUND_JOBS.labels(kind=job["kind"], status=JOB_FAILED).inc()
+                continue
+            # Reset before requeueing, so the next worker to claim it sees it queued
+            job.update(status=JOB_QUEUED, started_at=None)
+            self.broker.save(job)
+            if self.broker.requeue(job_id):
+                BACKGROUND_JOBS_REQUEUED.labels(kind=job["kind"]).inc()
+                logger.warning(f"Requeued background job {job_id} ({job['kind']}): its worker stopped")
+                requeued.append(job_id)
+        return requeued
+
+    def run_next(self, timeout: float = 0) -> bool:
+        """Run the next queued job, if one arrives within `timeout`."""
+        job_id = self.broker.dequeue(timeout)
+        if job_id is None:
+            return False
+        job = self.broker.get(job_id)
+        if job is None or job["status"] != JOB_QUEUED:
+            self.broker.ack(job_id)
+            return True  # Expired or already taken
+        self._execute(job)
+        return True
+
+    def _execute(self, job: dict):
+        job.update(status=JOB_RUNNING, started_at=_now(), attempts=job.get("attempts", 0) + 1)
+        self.broker.save(job)
+        finished = threading.Event()
+        threading.Thread(target=self._keep_leased, args=(job["id"], finished), name="job-lease", daemon=True).start()
+
+        def report(done: int, total: int | None):
+            job["progress"] = {"done": done, "total": total}
+            self.broker.save(job)
+
+        started = time.perf_counter()
+        db = None
+        try:
+            db = self.session_factory() if self.session_factory else None
+            context = JobContext(
+                job_id=job["id"], kind=job["kind"], user_id=job["user_id"], params=job["params"],
+                payload=self.broker.get_blob(job["id"], self.PAYLOAD), db=db, _report=report,
+            )
+            outcome = JOB_HANDLERS[job["kind"]](context)
+            if isinstance(outcome, JobArtifact):
+                self.broker.put_blob(job["id"], self.ARTIFACT, outcome.content)
+                job["artifact"] = {
+                    "filename": outcome.filename,
+                    "media_type": outcome.media_type,
+                    "size": len(outcome.content),
+                }
+            else:
+                job["result"] = outcome
+            job["status"] = JOB_SUCCEEDED
+        except JobError as e:
+            job.update(status=JOB_FAILED, error=e.detail)
+        except Exception as e:  # noqa: BLE001
+            logger.exception(f"Background job {job['id']} ({job['kind']}) failed")
+            job.update(status=JOB_FAILED, error=str(e))
+        finally:
+            finished.set()  # Stop renewing the lease, however the job ended
+            try:
+                if db is not None:
+                    db.close()
+                self.broker.delete_blob(job["id"], self.PAYLOAD)
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"Cleanup after background job {job['id']} failed: {e}")
+            if job["status"] == JOB_RUNNING:  # Interrupted (SystemExit, KeyboardInterrupt)
+                job.update(status=JOB_FAILED, error="Job was interrupted")
+            job["finished_at"] = _now()
+            self.broker.save(job)
+
+        self.broker.ack(job["id"])
+        BACKGROUND_JOBS.labels(kind=job["kind"], status=job["status"]).inc()
+        BACKGROUND_JOB_DURATION.labels(kind=job["kind"]).observe(time.perf_counter() - started)
+
+    def _keep_leased(self, job_id: str, finished: threading.Event):
+        while not finished.wait(self.broker.lease_seconds / 3):
+            self.broker.renew(job_id)
+
+
+def _session_factory():
+    from app.core.database import SessionLocal
+    return SessionLocal()
+
+
+# Process-wide runner; API workers submit to it and, with
+# JOB_IN_PROCESS_WORKERS, also run jobs on its threads
+job_runner = JobRunner(
+    build_job_broker(settings.JOB_BACKEND, settings.REDIS_URL, settings.JOB_RESULT_TTL_SECONDS,
+                     settings.JOB_LEASE_SECONDS),
+    workers=settings.JOB_WORKERS,
+    max_pending=settings.JOB_MAX_PENDING,
+    session_factory=_session_factory,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+)
@@ -0,0 +1,178 @@
+"""Login Throttle
+Failed-login counting and lockout without a DB write per failed attempt.
+
+- Per identifier (username/email as typed, lower-cased): after
+  LOGIN_MAX_FAILED_ATTEMPTS failures within the lockout window the
+  identifier is locked for LOGIN_LOCKOUT_MINUTES. Only the transition to
+  "locked" is persisted on the User row (login_attempts, locked_until), so
+  admins still see it and it survives restarts.
+- Per client IP: failures only. Operators at shift change share the
+  factory NAT address, so successful logins are never rate-limited;
+  a burst of failures from one address is. An IP lock only turns the
+  answer to further FAILED attempts from that address into 429 - correct
+  credentials still log in, whatever the address.
+
+Locked identifiers are rejected before the user lookup and before bcrypt.
+With Redis (REDIS_URL) counters are shared between workers; otherwise, or
+when Redis errors, they are per worker.
+"""
+import logging
+import threading
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+IP_WINDOW_SECONDS = 60
+
+
+class LoginThrottle:
+    """Failed-attempt counters and lockouts (local, optionally Redis-backed)"""
+
+    def __init__(
+        self,
+        max_failures: int = 5,
+        lockout_seconds: int = 900,
+        ip_max_failures: int = 50,
+        max_entries: int = 50000,
+        redis_client=None
+    ):
+        self.max_failures = max_failures
+        self.lockout_seconds = lockout_seconds
+        self.ip_max_failures = ip_max_failures
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self._failures: dict[str, tuple[int, float]] = {}  # key -> (count, window end)
+        self._locked: dict[str, float] = {}                 # key -> locked until
+        self._lock = threading.Lock()
+
+    def attach_redis(self, redis_client):
+        self.redis_client = redis_client
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def check(self, identifier: str) -> int | None:
+        """Seconds until the identifier may try again, or None if allowed."""
+        return self._retry_after([self._user_key(identifier)])
+
+    def ip_locked(self, ip: str | None) -> int | None:
+        """Seconds until failed attempts from `ip` stop being rejected, or None."""
+        return self._retry_after([self._ip_key(ip)]) if ip else None
+
+    def record_failure(self, identifier: str, ip: str | None = None) -> tuple[int, bool]:
+        """Count a failed attempt; returns (failures in window, identifier locked now)."""
+        user_key = self._user_key(identifier)
+        if self.redis_client is not None:
+            try:
+                return self._redis_failure(user_key, self._ip_key(ip) if ip else None)
+            except Exception as e:
+                logger.warning(f"Login throttle Redis update failed: {e}")
+        return self._local_failure(user_key, self._ip_key(ip) if ip else None)
+
+    def record_success(self, identifier: str):
+        user_key = self._user_key(identifier)
+        with self._lock:
+            self._failures.pop(user_key, None)
+            self._locked.pop(user_key, None)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.delete(f"{user_key}:fail", f"{user_key}:lock")
+            except Exception as e:
+                logger.warning(f"Login throttle Redis reset failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._failures.clear()
+            self._locked.clear()
+
+    def _retry_after(self, keys: list[str]) -> int | None:
+        if self.redis_client is not None:
+            try:
+                return self._redis_check(keys)
+            except Exception as e:
+                logger.warning(f"Login throttle Redis check failed: {e}")
+        return self._local_check(keys)
+
+    # ------------------------------------------------------------------
+    # Local counters
+    # ------------------------------------------------------------------
+    def _local_check(self, keys: list[str]) -> int | None:
+        now = time.monotonic()
+        with self._lock:
+            remaining = [until - now for key in keys if (until := self._locked.get(key)) and until > now]
+        return int(max(remaining)) + 1 if remaining else None
+
+    def _local_failure(self, user_key: str, ip_key: str | None) -> tuple[int, bool]:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._failures) >= self.max_entries:
+                self._prune(now)
+            failures = self._bump(user_key, now, self.lockout_seconds)
+            locked = failures >= self.max_failures
+            if locked:
+                self._locked[user_key] = now + self.lockout_seconds
+                self._failures.pop(user_key, None)
+            if ip_key and self._bump(ip_key, now, IP_WINDOW_SECONDS) >= self.ip_max_failures:
+                self._locked[ip_key] = now + IP_WINDOW_SECONDS
+                self._failures.pop(ip_key, None)
+        return failures, locked
+
+    def _bump(self, key: str, now: float, window: float) -> int:
+        count, window_end = self._failures.get(key, (0, 0.0))
+        if window_end <= now:
+            count, window_end = 0, now + window
+        self._failures[key] = (count + 1, window_end)
+        return count + 1
+
+    def _prune(self, now: float):
+        for key in [k for k, (_, end) in self._failures.items() if end <= now]:
+            del self._failures[key]
+        for key in [k for k, until in self._locked.items() if until <= now]:
+            del self._locked[key]
+
+    # ------------------------------------------------------------------
+    # Redis counters
+    # ------------------------------------------------------------------
+    def _redis_check(self, keys: list[str]) -> int | None:
+        pipe = self.redis_client.pipeline()
+        for key in keys:
+            pipe.ttl(f"{key}:lock")
+        remaining = [ttl for ttl in pipe.execute() if ttl and ttl > 0]
+        return max(remaining) if remaining else None
+
+    def _redis_failure(self, user_key: str, ip_key: str | None) -> tuple[int, bool]:
+        pipe = self.redis_client.pipeline()
+        pipe.incr(f"{user_key}:fail")
+        pipe.expire(f"{user_key}:fail", self.lockout_seconds, nx=True)
+        if ip_key:
+            pipe.incr(f"{ip_key}:fail")
+            pipe.expire(f"{ip_key}:fail", IP_WINDOW_SECONDS, nx=True)
+        results = pipe.execute()
+
+        failures = int(results[0])
+        locked = failures >= self.max_failures
+        if locked:
+            self.redis_client.set(f"{user_key}:lock", 1, ex=self.lockout_seconds)
+            self.redis_client.delete(f"{user_key}:fail")
+        if ip_key and int(results[2]) >= self.ip_max_failures:
+            self.redis_client.set(f"{ip_key}:lock", 1, ex=IP_WINDOW_SECONDS)
+            self.redis_client.delete(f"{ip_key}:fail")
+        return failures, locked
+
+    @staticmethod
+    def _user_key(identifier: str) -> str:
+        return f"login:user:{identifier.strip().lower()}"
+
+    @staticmethod
+    def _ip_key(ip: str) -> str:
+        return f"login:ip:{ip}"
+
+
+# Process-wide throttle used by the login endpoint
+login_throttle = LoginThrottle(
+    max_failures=settings.LOGIN_MAX_FAILED_ATTEMPTS,
+    lockout_seconds=settings.LOGIN_LOCKOUT_MINUTES * 60,
+    ip_max_failures=settings.LOGIN_IP_MAX_FAILURES_PER_MINUTE
+)
@@ -0,0 +1,236 @@
+"""Event Loop Safety
+Most routers declare `async def` handlers that call the synchronous
+SQLAlchemy Session from `get_db`; every query then runs on the event loop
+and stalls barcode scans and WebSocket traffic on that worker.
+
+`install_loop_safety(app)` walks the registered routes once at startup:
+
+- Handlers that depend on `get_db` and never `await` (no await /
+  async for / async with, no loop-bound calls) are re-registered as plain
+  functions, so FastAPI runs them in the threadpool like any `def` route.
+  The threadpool is sized to the DB pool (`configure_threadpool`).
+- The remaining async handlers are wrapped with a step timer: every
+  synchronous stretch between two awaits is timed, and stretches longer
+  than EVENT_LOOP_BLOCK_THRESHOLD_MS are logged and counted per route.
+
+`LoopLagMonitor` measures scheduling lag of the loop itself, which also
+catches blocking in middlewares, dependencies and WebSocket handlers.
+"""
+import asyncio
+import dis
+import functools
+import inspect
+import logging
+import time
+
+import anyio.to_thread
+from fastapi.routing import APIRoute, request_response
+from prometheus_client import Counter, Histogram
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG = Histogram(
+    'event_loop_lag_seconds',
+    'Delay between scheduled and actual wake-up of the loop lag probe',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=registry
+)
+
+EVENT_LOOP_BLOCKING = Counter(
+    'event_loop_blocking_total',
+    'Handler steps that blocked the event loop beyond the threshold',
+    ['handler'],
+    registry=registry
+)
+
+EVENT_LOOP_BLOCKED_SECONDS = Counter(
+    'event_loop_blocked_seconds_total',
+    'Time the event loop spent blocked in over-threshold handler steps',
+    ['handler'],
+    registry=registry
+)
+
+# Bytecode that needs a running loop in the handler's own frame
+_ASYNC_OPCODES = {"GET_AWAITABLE", "GET_AITER", "GET_ANEXT", "BEFORE_ASYNC_WITH"}
+# Calls that schedule work on the current loop (would fail in a worker thread)
+_LOOP_BOUND_NAMES = {"create_task", "ensure_future", "get_running_loop", "get_event_loop", "call_soon"}
+
+# Most recent over-threshold step: (handler, seconds, monotonic time)
+_last_blocking_step: tuple[str, float, float] | None = None
+
+
+# ---------------------------------------------------------------------------
+# Handler analysis
+# ---------------------------------------------------------------------------
+def _code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            yield from _code_objects(const)
+
+
+def never_awaits(func) -> bool:
+    """True if `func` is a coroutine function that can run to completion without a loop."""
+    if not inspect.iscoroutinefunction(func):
+        return False
+    for code in _code_objects(func.__code__):
+        if _LOOP_BOUND_NAMES.intersection(code.co_names):
+            return False
+        if any(instr.opname in _ASYNC_OPCODES for instr in dis.get_instructions(code)):
+            return False
+    return True
+
+
+def uses_db_session(dependant) -> bool:
+    """True if `get_db` appears anywhere in the dependency tree."""
+    return any(
+        sub.call is get_db or uses_db_session(sub)
+        for sub in dependant.dependencies
+    )
+
+
+# ---------------------------------------------------------------------------
+# Wrappers
+# ---------------------------------------------------------------------------
+def run_to_completion(func):
+    """Plain-function wrapper for a coroutine function that never awaits."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        coro = func(*args, **kwargs)
+        try:
+            coro.send(None)
+        except StopIteration as stop:
+            return stop.value
+        coro.close()
+        raise RuntimeError(f"{func.__qualname__} suspended while running off the event loop")
+
+    return wrapper
+
+
+class _TimedSteps:
+    """Drive a coroutine and time each synchronous step between awaits"""
+
+    def __init__(self, coro, handler: str, threshold: float):
+        self.coro = coro
+        self.handler = handler
+        self.threshold = threshold
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            started = time.perf_counter()
+            try:
+                if error is not None:
+                    yielded = self.coro.throw(error)
+                else:
+                    yielded = self.coro.send(value)
+            except StopIteration as stop:
+                self._record(time.perf_counter() - started)
+                return stop.value
+            except BaseException:
+                self._record(time.perf_counter() - started)
+                raise
+            self._record(time.perf_counter() - started)
+
+            try:
+                value, error = (yield yielded), None
+            except BaseException as exc:  # cancellation / thrown into the awaiting task
+                value, error = None, exc
+
+    def _record(self, seconds: float):
+        global _last_blocking_step
+        if seconds < self.threshold:
+            return
+        EVENT_LOOP_BLOCKING.labels(handler=self.handler).inc()
+        EVENT_LOOP_BLOCKED_SECONDS.labels(handler=self.handler).inc(seconds)
+        _last_blocking_step = (self.handler, seconds, time.monotonic())
+        logger.warning(f"Handler {self.handler} blocked the event loop for {seconds * 1000:.0f} ms")
+
+
+def time_loop_steps(func, handler: str, threshold_ms: float):
+    """Async wrapper reporting steps of `func` that block the loop longer than threshold_ms."""
+    threshold = threshold_ms / 1000
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await _TimedSteps(func(*args, **kwargs), handler, threshold)
+
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Installation
+# ---------------------------------------------------------------------------
+def install_loop_safety(app, offload: bool = True, threshold_ms: float = 100.0) -> dict:
+    """Offload / instrument every async API route; returns counts for logging."""
+    stats = {"offloaded": 0, "instrumented": 0}
+    for route in app.router.routes:
+        if not isinstance(route, APIRoute) or getattr(route, "_loop_safety", False):
+            continue
+        endpoint = route.dependant.call
+        if not inspect.iscoroutinefunction(endpoint):
+            continue
+
+        handler = f"{','.join(sorted(route.methods or []))} {route.path}"
+        if offload and never_awaits(endpoint) and uses_db_session(route.dependant):
+            route.dependant.call = run_to_completion(endpoint)
+            stats["offloaded"] += 1
+        else:
+            route.dependant.call = time_loop_steps(endpoint, handler, threshold_ms)
+            stats["instrumented"] += 1
+
+        # The request handler captured `call` and whether it is a coroutine
+        route.app = request_response(route.get_route_handler())
+        route._loop_safety = True
+    return stats
+
+
+def configure_threadpool(threads: int):
+    """Size the threadpool used for sync handlers (call from a running loop)."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+
+
+class LoopLagMonitor:
+    """Background task sampling event loop lag"""
+
+    def __init__(self, interval: float = 0.5, threshold_ms: float = 100.0):
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - scheduled, 0.0)
+            EVENT_LOOP_LAG.observe(lag)
+            if lag >= self.threshold:
+                logger.warning(f"Event loop lag {lag * 1000:.0f} ms{self._culprit(lag)}")
+
+    def _culprit(self, lag: float) -> str:
+        step = _last_blocking_step
+        if step is None or time.monotonic() - step[2] > lag + self.interval:
+            return " (no instrumented handler - middleware, dependency or WebSocket)"
+        return f" (last blocking handler: {step[0]}, {step[1] * 1000:.0f} ms)"
+
+
+loop_lag_monitor = LoopLagMonitor(
+    interval=settings.EVENT_LOOP_LAG_INTERVAL_SECONDS,
+    threshold_ms=settings.EVENT_LOOP_BLOCK_THRESHOLD_MS
+)
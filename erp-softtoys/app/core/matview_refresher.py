@@ -0,0 +1,365 @@
+"""Dashboard Materialized View Refresher
+Keeps the dashboard materialized views (scripts/create_dashboard_mvs_fixed.sql)
+fresh from inside the application instead of a 5-minute cron job.
+
+- Change driven: Session hooks collect the tables written by each committed
+  transaction; views that read those tables are marked dirty and the
+  refresher thread refreshes them. Bursts are coalesced: a view is refreshed
+  at most once per MATVIEW_MIN_REFRESH_INTERVAL_SECONDS.
+- Views with time windows (today, last 24 h / 7 days) are also refreshed
+  when older than MATVIEW_MAX_AGE_SECONDS, even without writes.
+- A view that does not exist is retried every
+  MATVIEW_MISSING_RETRY_SECONDS, so one created later (migration run
+  against a live app) is picked up without a restart.
+- REFRESH MATERIALIZED VIEW CONCURRENTLY (readers are never blocked) when
+  the view is populated and has a unique index; plain REFRESH otherwise.
+- Each refresh holds a transaction-level advisory lock, so with several
+  workers only one refreshes a given view at a time; the others keep it
+  dirty and retry later.
+
+Metrics: per-view staleness (seconds since the oldest change not yet
+refreshed), last refresh timestamp, refresh duration and failures, and
+`dashboard_fallback_served_total` - dashboard responses served from live
+queries / placeholder data because a view was missing or empty. Serving the
+fallback also logs an error (at most once a minute per endpoint) and queues
+a refresh of the view.
+"""
+import logging
+import threading
+import time
+from collections.abc import Iterable
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# View -> tables it reads (writes to these make the view dirty)
+DASHBOARD_VIEWS: dict[str, tuple[str, ...]] = {
+    "mv_dashboard_stats": ("manufacturing_orders", "qc_inspections", "audit_logs"),
+    "mv_production_dept_status": ("work_orders",),
+    "mv_qc_pass_rate": ("qc_inspections", "work_orders"),
+    "mv_inventory_status": ("products", "stock_quants"),
+    "mv_recent_alerts": ("audit_logs",),
+    "mv_mo_trends_7days": ("manufacturing_orders",),
+}
+
+FALLBACK_ALARM_INTERVAL_SECONDS = 60.0
+
+MATVIEW_STALENESS = Gauge(
+    'matview_staleness_seconds',
+    'Seconds since the oldest committed change not yet reflected in the view (0 = fresh)',
+    ['view'],
+    registry=registry
+)
+
+MATVIEW_LAST_REFRESH = Gauge(
+    'matview_last_refresh_timestamp_seconds',
+    'Unix time of the last successful refresh by this worker',
+    ['view'],
+    registry=registry
+)
+
+MATVIEW_REFRESH_DURATION = Histogram(
+    'matview_refresh_duration_seconds',
+    'REFRESH MATERIALIZED VIEW execution time',
+    ['view', 'mode'],  # concurrent, blocking
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+    registry=registry
+)
+
+MATVIEW_REFRESH_FAILURES = Counter(
+    'matview_refresh_failures_total',
+    'Failed materialized view refreshes',
+    ['view'],
+    registry=registry
+)
+
+DASHBOARD_FALLBACK_SERVED = Counter(
+    'dashboard_fallback_served_total',
+    'Dashboard responses served without the materialized view',
+    ['endpoint', 'reason'],
+    registry=registry
+)
+
+_SESSION_TABLES_KEY = "_matview_written_tables"
+
+
+class _ViewState:
+    __slots__ = ("dirty_since", "last_request", "last_attempt", "last_refresh", "missing")
+
+    def __init__(self):
+        self.dirty_since: float | None = None   # monotonic
+        self.last_request: float | None = None  # monotonic
+        self.last_attempt: float | None = None  # monotonic
+        self.last_refresh: float | None = None  # monotonic
+        self.missing = False
+
+
+class MaterializedViewRefresher:
+    """Change-driven background refresher for a set of materialized views"""
+
+    def __init__(
+        self,
+        views: dict[str, tuple[str, ...]],
+        engine=None,
+        min_interval: float = 30.0,
+        max_age: float = 900.0,
+        poll_interval: float = 1.0,
+        missing_retry_interval: float = 300.0
+    ):
+        self.views = dict(views)
+        self.engine = engine
+        self.min_interval = min_interval
+        self.max_age = max_age
+        self.missing_retry_interval = missing_retry_interval
+        self.poll_interval = poll_interval
+        self._by_table: dict[str, list[str]] = {}
+        for view, tables in self.views.items():
+            for table in tables:
+                self._by_table.setdefault(table, []).append(view)
+        self._state = {view: _ViewState() for view in self.views}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_alarm: dict[str, float] = {}
+        for view in self.views:
+            MATVIEW_STALENESS.labels(view=view).set_function(lambda v=view: self.staleness(v))
+
+    # ------------------------------------------------------------------
+    # Change notification
+    # ------------------------------------------------------------------
+    def notify_tables(self, tables: Iterable[str]):
+        """Committed writes to `tables`: mark the views reading them dirty."""
+        views = {view for table in tables for view in self._by_table.get(table, ())}
+        if views:
+            self.request_refresh(*views)
+
+    def request_refresh(self, *views: str):
+        """Queue a refresh of `views` (all views if none given)."""
+        now = time.monotonic()
+        with self._lock:
+            for view in views or self.views:
+                state = self._state.get(view)
+                if state is None:
+                    continue
+                state.last_request = now
+                if not state.missing and state.dirty_since is None:
+                    state.dirty_since = now
+        self._wake.set()
+
+    def staleness(self, view: str) -> float:
+        state = self._state[view]
+        dirty_since = state.dirty_since
+        return 0.0 if dirty_since is None else time.monotonic() - dirty_since
+
+    def report_fallback(self, endpoint: str, view: str | None, reason: str):
+        """A dashboard endpoint served data without its materialized view."""
+        DASHBOARD_FALLBACK_SERVED.labels(endpoint=endpoint, reason=reason).inc()
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_alarm.get(endpoint)
+            alarm = last is None or now - last >= FALLBACK_ALARM_INTERVAL_SECONDS
+            if alarm:
+                self._last_alarm[endpoint] = now
+            missing = view in self._state and self._state[view].missing
+        if alarm:
+            if missing:
+                action = f"does not exist, checked again every {self.missing_retry_interval:.0f} s"
+            else:
+                action = "unavailable, refresh queued"
+            logger.error(
+                f"Dashboard '{endpoint}' is serving fallback data ({reason})"
+                + (f" - {view} {action}" if view else "")
+            )
+        if view:
+            self.request_refresh(view)
+
+    # ------------------------------------------------------------------
+    # Refreshing
+    # ------------------------------------------------------------------
+    def due_views(self) -> list[str]:
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for view, state in self._state.items():
+                if state.missing:
+                    # Created since? Checked on a slow interval
+                    if state.last_attempt is None or now - state.last_attempt >= self.missing_retry_interval:
+                        due.append(view)
+                    continue
+                retry_ok = state.last_attempt is None or now - state.last_attempt >= self.min_interval
+                too_old = (
+                    self.max_age > 0
+                    and (state.last_refresh is None or now - state.last_refresh >= self.max_age)
+                )
+                if retry_ok and (state.dirty_since is not None or too_old):
+                    due.append(view)
+        return due
+
+    def refresh(self, view: str) -> float | None:
+        """Refresh one view now; returns the duration, None if skipped or failed."""
+        state = self._state[view]
+        started = time.monotonic()
+        with self._lock:
+            state.last_attempt = started
+        try:
+            duration = self._refresh_view(view)
+        except Exception as e:
+            MATVIEW_REFRESH_FAILURES.labels(view=view).inc()
+            logger.error(f"Refresh of {view} failed: {e}")
+            return None
+        if duration is None:
+            return None  # Missing, or another worker holds the lock
+
+        with self._lock:
+            state.last_refresh = started
+            state.missing = False
+            if state.last_request is None or state.last_request < started:
+                state.dirty_since = None  # Changes committed before the refresh started are in
+            elif state.dirty_since is not None:
+                # Requested while REFRESH ran: that change may not be in the view
+                state.dirty_since = max(state.dirty_since, started)
+        MATVIEW_LAST_REFRESH.labels(view=view).set(time.time())
+        return duration
+
+    def refresh_all(self) -> dict[str, float | None]:
+        return {view: self.refresh(view) for view in self.views}
+
+    def _refresh_view(self, view: str) -> float | None:
+        engine = self.engine or _default_engine()
+        with engine.begin() as conn:
+            info = conn.execute(text("""
+                SELECT m.ispopulated,
+                       EXISTS (
+                           SELECT 1 FROM pg_index i
+                           WHERE i.indrelid = (quote_ident(m.schemaname) || '.' || quote_ident(m.matviewname))::regclass
+                             AND i.indisunique AND i.indpred IS NULL AND i.indexprs IS NULL
+                       ) AS has_unique_index
+                FROM pg_matviews m
+                WHERE m.matviewname = :view AND m.schemaname = ANY (current_schemas(false))
+            """), {"view": view}).first()
+            if info is None:
+                logger.warning(f"Materialized view {view} does not exist - not refreshing it")
+                with self._lock:
+                    state = self._state[view]
+                    state.missing = True
+                    state.dirty_since = None
+                return None
+
+            locked = conn.execute(
+                text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"), {"key": f"matview:{view}"}
+            ).scalar()
+            if not locked:
+                return None
+
+            concurrent = bool(info.ispopulated and info.has_unique_index)
+            mode = "concurrent" if concurrent else "blocking"
+            started = time.perf_counter()
+            conn.execute(text(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrent else ''}{view}"))
+            duration = time.perf_counter() - started
+        MATVIEW_REFRESH_DURATION.labels(view=view, mode=mode).observe(duration)
+        logger.info(f"Refreshed {view} ({mode}) in {duration * 1000:.0f} ms")
+        return duration
+
+    # ------------------------------------------------------------------
+    # Background thread
+    # ------------------------------------------------------------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.request_refresh()  # Views may be stale since the last deployment
+        self._thread = threading.Thread(target=self._run, name="matview-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(timeout=self.poll_interval)
+            self._wake.clear()
+            for view in self.due_views():
+                if self._stop.is_set():
+                    break
+                self.refresh(view)
+
+    # ------------------------------------------------------------------
+    # Session hooks
+    # ------------------------------------------------------------------
+    def collect_flushed_tables(self, session, flush_context):
+        tables = session.info.setdefault(_SESSION_TABLES_KEY, set())
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(obj, "__tablename__", None)
+            if table:
+                tables.add(table)
+
+    def collect_bulk_tables(self, orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, "table", None)
+            if table is not None:
+                orm_execute_state.session.info.setdefault(_SESSION_TABLES_KEY, set()).add(table.name)
+
+    def notify_committed(self, session):
+        tables = session.info.pop(_SESSION_TABLES_KEY, None)
+        if tables:
+            self.notify_tables(tables)
+
+    def discard_session(self, session, previous_transaction=None):
+        if not session.in_transaction():  # Savepoint rollbacks keep the outer transaction's writes
+            session.info.pop(_SESSION_TABLES_KEY, None)
+
+    def listen(self, target=Session):
+        """Feed committed ORM writes of `target` (Session class or sessionmaker) to this refresher."""
+        event.listen(target, "after_flush", self.collect_flushed_tables)
+        event.listen(target, "do_orm_execute", self.collect_bulk_tables)
+        event.listen(target, "after_commit", self.notify_committed)
+        event.listen(target, "after_soft_rollback", self.discard_session)
+
+
+_session_hooks_installed = False
+
+
+def install_session_hooks(refresher: MaterializedViewRefresher):
+    """Register the Session hooks once per process."""
+    global _session_hooks_installed
+    if _session_hooks_installed:
+        return
+    refresher.listen(Session)
+    _session_hooks_installed = True
+
+
+def _default_engine():
+    from app.core.database import engine
+    return engine
+
+
+# Process-wide refresher for the dashboard views (started in app.main on PostgreSQL)
+dashboard_view_refresher = MaterializedViewRefresher(
+    DASHBOARD_VIEWS,
+    min_interval=settings.MATVIEW_MIN_REFRESH_INTERVAL_SECONDS,
+    max_age=settings.MATVIEW_MAX_AGE_SECONDS,
+    missing_retry_interval=settings.MATVIEW_MISSING_RETRY_SECONDS
+)
+
+
+def start_dashboard_view_refresher():
+    """Install the change hooks and start refreshing (PostgreSQL only)."""
+    if not settings.MATVIEW_REFRESH_ENABLED:
+        return
+    engine = dashboard_view_refresher.engine or _default_engine()
+    if engine.dialect.name != "postgresql":
+        return
+    dashboard_view_refresher.engine = engine
+    install_session_hooks(dashboard_view_refresher)
+    dashboard_view_refresher.start()
@@ -0,0 +1,7 @@
+"""Prometheus Metrics Registry
+Shared CollectorRegistry so metrics declared outside app.main
+(audit writer, caches, background workers) are exposed on /metrics.
+"""
+from prometheus_client import CollectorRegistry
+
+registry = CollectorRegistry()
@@ -2,24 +2,26 @@
 All models are based on Database Scheme.csv.
 """
 
-from .audit import AuditLog, SecurityLog, UserActivityLog
+from .audit import AuditLog, AuditSummaryBucket, SecurityLog, UserActivityLog
 from .bom import BOMDetail, BOMHeader
 from .exceptions import AlertLog, SegregasiAcknowledgement
 from .kanban import KanbanBoard, KanbanCard, KanbanRule
-from .manufacturing import ManufacturingOrder, MaterialConsumption, WorkOrder, SPK, MOType
+from .manufacturing import ManufacturingOrder, MaterialConsumption, MaterialShortage, WorkOrder, SPK, MOType
 from .products import Category, Partner, Product
 from .quality import QCCheckpoint, QCCheckpointType, QCInspection, QCLabTest
 from .sales import SalesOrder, SalesOrderLine
 from .transfer import LineOccupancy, TransferLog
 from .users import User
-from .warehouse import Location, PurchaseOrder, StockMove, StockQuant
+from .warehouse import InventoryLotAge, InventoryPosition, Location, PurchaseOrder, StockMove, StockQuant
 from .po_requests import PODeleteRequest, PORequestStatus
+from .sequences import CacheVersion, DocumentSequence
 from .daily_production import (
     SPKDailyProduction,
     SPKProductionCompletion,
     SPKModification,
     MaterialDebt,
-    MaterialDebtSettlement
+    MaterialDebtSettlement,
+    SPKProgressRollup
 )
 
 __all__ = [
@@ -32,11 +34,14 @@ __all__ = [
     "WorkOrder",
     "SPK",
     "MaterialConsumption",
+    "MaterialShortage",
     "TransferLog",
     "LineOccupancy",
     "Location",
     "StockMove",
     "StockQuant",
+    "InventoryPosition",
+    "InventoryLotAge",
     "PurchaseOrder",
     "QCLabTest",
     "QCInspection",
@@ -49,6 +54,7 @@ __all__ = [
     "KanbanBoard",
     "KanbanRule",
     "AuditLog",
+    "AuditSummaryBucket",
     "UserActivityLog",
     "SecurityLog",
     "SPKDailyProduction",
@@ -56,5 +62,8 @@ __all__ = [
     "SPKModification",
     "MaterialDebt",
     "MaterialDebtSettlement",
+    "SPKProgressRollup",
+    "DocumentSequence",
+    "CacheVersion",
 ]
 
@@ -4,11 +4,14 @@ Comprehensive logging of all system activities for ISO/IKEA compliance.
 import enum as py_enum
 from datetime import datetime
 
-from sqlalchemy import JSON, BigInteger, Column, DateTime, Enum, ForeignKey, Index, String, Text
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Enum, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
 
+# BIGINT primary keys do not autoincrement on SQLite (test database)
+AuditPK = BigInteger().with_variant(Integer, "sqlite")
+
 
 class AuditAction(str, py_enum.Enum):
     """Types of audited actions."""
@@ -50,11 +53,15 @@ class AuditLog(Base):
     Required for ISO 9001 and IKEA IWAY standards.
 
     **Retention**: Keep audit logs for minimum 5 years (regulatory requirement)
+
+    **Storage**: Monthly range partitions on timestamp in PostgreSQL (primary
+    key (id, timestamp)); expired months are archived by
+    app/core/audit_partitions.py after AUDIT_RETENTION_MONTHS.
     """
 
     __tablename__ = "audit_logs"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(AuditPK, primary_key=True, autoincrement=True)
 
     # When & Who
     timestamp = Column(DateTime, default=datetime.now, nullable=False, index=True)
@@ -88,6 +95,10 @@ class AuditLog(Base):
         Index('idx_audit_timestamp_user', 'timestamp', 'user_id'),
         Index('idx_audit_module_action', 'module', 'action'),
         Index('idx_audit_entity', 'entity_type', 'entity_id'),
+        # Keyset pagination (timestamp DESC, id DESC), unfiltered / per module / per user
+        Index('idx_audit_time_id', 'timestamp', 'id'),
+        Index('idx_audit_module_time_id', 'module', 'timestamp', 'id'),
+        Index('idx_audit_user_time_id', 'user_id', 'timestamp', 'id'),
     )
 
     def __repr__(self):
@@ -103,7 +114,7 @@ class UserActivityLog(Base):
 
     __tablename__ = "user_activity_logs"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(AuditPK, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False, index=True)
 
     # Activity details
@@ -138,7 +149,7 @@ class SecurityLog(Base):
 
     __tablename__ = "security_logs"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(AuditPK, primary_key=True, autoincrement=True)
 
     # When & Where
     timestamp = Column(DateTime, default=datetime.now, nullable=False, index=True)
@@ -166,3 +177,24 @@ class SecurityLog(Base):
 
     def __repr__(self):
         return f"<SecurityLog {self.event_type} at {self.timestamp}>"
+
+
+class AuditSummaryBucket(Base):
+    """Hourly audit event counts per module, action and user.
+
+    Maintained in the same transaction as the audit_logs INSERTs
+    (app/core/audit_writer.py) so the audit summary reads a few hundred
+    bucket rows instead of counting audit_logs. Rebuildable from raw logs
+    (scripts/rebuild_audit_summary.py).
+    """
+
+    __tablename__ = "audit_summary_hourly"
+
+    bucket_start = Column(DateTime, primary_key=True)  # Hour the events fall in
+    module = Column(Enum(AuditModule), primary_key=True)
+    action = Column(Enum(AuditAction), primary_key=True)
+    username = Column(String(100), primary_key=True, default="")  # '' = events without a user
+    event_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AuditSummaryBucket {self.bucket_start} {self.module} {self.action} {self.username}: {self.event_count}>"
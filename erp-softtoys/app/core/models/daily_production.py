@@ -9,6 +9,7 @@ Tables:
 - SPKModification: Audit trail for SPK edits
 - MaterialDebt: Negative inventory tracking
 - MaterialDebtSettlement: Settlement records for material debt
+- SPKProgressRollup: Per-SPK progress totals maintained incrementally
 """
 
 from datetime import datetime, date
@@ -181,6 +182,40 @@ class MaterialDebtSettlement(Base):
     )
 
 
+# ============================================================================
+# MODEL 6: SPKProgressRollup
+# ============================================================================
+class SPKProgressRollup(Base):
+    """
+    Per-SPK progress totals, maintained in the same transaction as the
+    daily input so progress views never scan spk_daily_production
+    - confirmed_qty / pending_qty: Sum of input_qty by entry status
+    - cumulative_qty: cumulative_qty of the latest production_date
+    - days_tracked: Number of daily entries
+    - first/last_entry_date: Range of production dates
+    Rebuildable from raw rows (scripts/reconcile_spk_progress_rollup.py)
+    """
+    __tablename__ = "spk_progress_rollup"
+
+    spk_id = Column(Integer, ForeignKey("spks.id", ondelete="CASCADE"), primary_key=True)
+    confirmed_qty = Column(Integer, default=0, nullable=False)
+    pending_qty = Column(Integer, default=0, nullable=False)
+    cumulative_qty = Column(Integer, default=0, nullable=False)
+    days_tracked = Column(Integer, default=0, nullable=False)
+    first_entry_date = Column(Date)
+    last_entry_date = Column(Date, index=True)
+    completed_date = Column(Date)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    spk = relationship("SPK", back_populates="progress_rollup")
+
+    # Constraints
+    __table_args__ = (
+        CheckConstraint('days_tracked >= 0', name='ck_rollup_days_positive'),
+    )
+
+
 # ============================================================================
 # ENHANCEMENT: Update existing SPK model
 # ============================================================================
@@ -124,6 +124,7 @@ class SPK(Base):
     production_completion = relationship("SPKProductionCompletion", back_populates="spk")
     modifications = relationship("SPKModification", back_populates="spk")
     material_debts = relationship("MaterialDebt", back_populates="spk")
+    progress_rollup = relationship("SPKProgressRollup", back_populates="spk", uselist=False)
     created_by = relationship("User", foreign_keys=[created_by_id])
     modified_by = relationship("User", foreign_keys=[modified_by_id])
     negative_approved_by = relationship("User", foreign_keys=[negative_approved_by_id])
@@ -462,6 +463,33 @@ class SPKMaterialAllocation(Base):
         return f"<SPKMaterialAllocation(wo_id={self.wo_id}, material_id={self.material_id}, allocated={self.qty_allocated})>"
 
 
+class MaterialShortage(Base):
+    """Material Shortage Index
+    One row per (material, work order) whose open allocations exceed the
+    available stock at Warehouse Main. Maintained by
+    app/services/material_shortage_service.py on every allocation / stock
+    quant flush; read by the shortage alert endpoints.
+    """
+
+    __tablename__ = "material_shortages"
+
+    material_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    wo_id = Column(Integer, ForeignKey("work_orders.id", ondelete="CASCADE"), primary_key=True, index=True)
+    mo_id = Column(Integer, nullable=False, index=True)
+    department = Column(Enum(Department), nullable=False, index=True)
+
+    required_qty = Column(DECIMAL(14, 3), nullable=False)  # Open (unconsumed) allocations
+    available_qty = Column(DECIMAL(14, 3), nullable=False)  # On hand - reserved at Warehouse Main
+    shortage_qty = Column(DECIMAL(14, 3), nullable=False)
+    severity = Column(String(10), nullable=False, index=True)  # CRITICAL, HIGH, MEDIUM, LOW
+    severity_rank = Column(Integer, nullable=False)  # 0 = CRITICAL ... 3 = LOW
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<MaterialShortage(material_id={self.material_id}, wo_id={self.wo_id}, {self.severity})>"
+
+
 class MaterialConsumption(Base):
     """Material Consumption Tracking
     Records actual material used in each work order.
@@ -0,0 +1,53 @@
+"""Document Number Sequences and Cache Versions
+Per-prefix / per-period counters used by the sequence service
+(app/services/sequence_service.py) to hand out pallet, kanban, PO and
+lot numbers without scanning the document tables, and the version
+counters that tell every worker when an in-process cache went stale.
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, UniqueConstraint
+
+from app.core.database import Base
+
+
+class DocumentSequence(Base):
+    """
+    One counter row per (prefix, period)
+    - prefix: Document family, e.g. PLT, KAN, PO-KAIN, LOT, LOT-SCAN
+    - period: Counter scope, normally the year ("2026")
+    - next_value: First value not yet reserved by any worker
+    Workers reserve blocks by bumping next_value; unused values of a block
+    are lost when a worker stops, so numbers are unique but may have gaps.
+    """
+    __tablename__ = "document_sequences"
+
+    id = Column(Integer, primary_key=True, index=True)
+    prefix = Column(String(30), nullable=False)
+    period = Column(String(10), nullable=False)
+    next_value = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('prefix', 'period', name='uq_document_sequence_prefix_period'),
+    )
+
+    def __repr__(self):
+        return f"<DocumentSequence {self.prefix}/{self.period} next={self.next_value}>"
+
+
+class CacheVersion(Base):
+    """
+    Version counter of one in-process cache shared by all workers
+    - name: Cache, e.g. barcode_index (app/core/barcode_index.py)
+    - version: Bumped in the transaction that changes the cached data;
+      workers polling a different value than they last saw drop the cache
+    """
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.name}={self.version}>"
@@ -349,6 +349,44 @@ class StockLot(Base):
         return f"<StockLot(lot={self.lot_number}, qty={self.qty_remaining})>"
 
 
+class InventoryPosition(Base):
+    """Inventory Positions
+    Stock totals per product and location, kept in step with stock_quants
+    in the same transaction (app/services/inventory_position_service.py) so
+    overview / low-stock views never aggregate stock_quants.
+    Rebuildable from raw quants (scripts/rebuild_inventory_positions.py).
+    """
+
+    __tablename__ = "inventory_positions"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True, index=True)
+    qty_on_hand = Column(DECIMAL(14, 2), nullable=False, default=0)
+    qty_reserved = Column(DECIMAL(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<InventoryPosition(product={self.product_id}, loc={self.location_id}, qty={self.qty_on_hand})>"
+
+
+class InventoryLotAge(Base):
+    """Inventory Lot Age
+    On-hand qty of lotted stock per product, location and lot receipt date,
+    maintained with InventoryPosition. Aging buckets (0-7 days, ...) are a
+    GROUP BY over these rows.
+    """
+
+    __tablename__ = "inventory_lot_age"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True)
+    received_on = Column(Date, primary_key=True, index=True)
+    qty_on_hand = Column(DECIMAL(14, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<InventoryLotAge(product={self.product_id}, loc={self.location_id}, {self.received_on}: {self.qty_on_hand})>"
+
+
 class MaterialRequest(Base):
     """Manual Material Requests
     Tracks requests for additional materials with approval workflow.
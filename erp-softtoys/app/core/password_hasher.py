@@ -0,0 +1,120 @@
+"""Password Hasher Executor
+bcrypt hashing/verification (~100 ms of CPU each at rounds=10) runs on a
+dedicated, bounded thread pool instead of the event loop or the shared
+request threadpool, so a shift-change login burst neither freezes the loop
+nor starves other handlers.
+
+- `max_workers` bounds concurrent bcrypt calls (bcrypt releases the GIL,
+  so each worker can keep a CPU busy).
+- `max_queue` bounds waiting + running jobs; beyond it `HasherBusyError`
+  is raised and login answers 503 with Retry-After instead of queueing
+  requests until they time out.
+
+Metrics: queue depth, queue wait, bcrypt duration and rejections.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.security import PasswordUtils
+
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    'password_hash_queue_depth',
+    'bcrypt jobs waiting or running in the password hasher pool',
+    registry=registry
+)
+
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    'password_hash_queue_wait_seconds',
+    'Time a bcrypt job waited for a hasher thread',
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    registry=registry
+)
+
+PASSWORD_HASH_DURATION = Histogram(
+    'password_hash_duration_seconds',
+    'bcrypt hash/verify execution time',
+    ['operation'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.4, 0.8, 1.6),
+    registry=registry
+)
+
+PASSWORD_HASH_REJECTED = Counter(
+    'password_hash_rejected_total',
+    'bcrypt jobs rejected because the hasher queue was full',
+    registry=registry
+)
+
+
+class HasherBusyError(RuntimeError):
+    """The password hasher queue is full"""
+
+
+class PasswordHasher:
+    """Bounded executor for PasswordUtils hash/verify"""
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 256):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit("verify", PasswordUtils.verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", PasswordUtils.hash_password, password)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    # ------------------------------------------------------------------
+    async def _submit(self, operation: str, func, *args):
+        with self._lock:
+            if self._pending >= self.max_queue:
+                PASSWORD_HASH_REJECTED.inc()
+                raise HasherBusyError("Password hasher queue is full")
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+            executor = self._executor
+        PASSWORD_HASH_QUEUE_DEPTH.inc()
+
+        enqueued = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            PASSWORD_HASH_QUEUE_WAIT.observe(started - enqueued)
+            try:
+                return func(*args)
+            finally:
+                PASSWORD_HASH_DURATION.labels(operation=operation).observe(time.perf_counter() - started)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, run)
+        finally:
+            with self._lock:
+                self._pending -= 1
+            PASSWORD_HASH_QUEUE_DEPTH.dec()
+
+
+# Process-wide hasher used by the auth endpoints; by default half the CPUs
+# so bcrypt bursts leave room for the event loop and request threads
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS or max(1, (os.cpu_count() or 2) // 2),
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
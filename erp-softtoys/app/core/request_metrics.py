@@ -0,0 +1,127 @@
+"""Request Metrics
+HTTP metrics for Prometheus, labeled by route template.
+
+`PrometheusMiddleware` records request count, latency, errors and the SQL
+statements / SQL time of every request (app.core.db_metrics). The
+`endpoint` label is the path template of the matched route
+(`/api/v1/purchasing/purchase-orders/{po_id}`), not the raw URL, so one
+route is one time series whatever ids it is called with. Requests that
+match no route share the `<unmatched>` label.
+"""
+import time
+
+from prometheus_client import Counter, Histogram
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match, Mount
+
+from app.core.db_metrics import count_queries
+from app.core.metrics import registry
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_COUNT = Counter(
+    'http_requests_total',
+    'Total HTTP requests',
+    ['method', 'endpoint', 'status'],
+    registry=registry
+)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency in seconds',
+    ['method', 'endpoint'],
+    registry=registry
+)
+
+REQUEST_SQL_STATEMENTS = Histogram(
+    'http_request_sql_statements',
+    'SQL statements executed per HTTP request',
+    ['method', 'endpoint'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    registry=registry
+)
+
+REQUEST_SQL_DURATION = Histogram(
+    'http_request_sql_duration_seconds',
+    'Time spent executing SQL per HTTP request',
+    ['method', 'endpoint'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    registry=registry
+)
+
+API_ERRORS = Counter(
+    'api_errors_total',
+    'Total API errors',
+    ['endpoint', 'error_type'],
+    registry=registry
+)
+
+
+class RouteTemplates:
+    """Path template of the route that handled a request"""
+
+    def __init__(self):
+        self._routes = None
+        self._route_count = 0
+        self._by_endpoint = {}
+
+    def resolve(self, request: Request) -> str:
+        # The router stores the matched route's endpoint in the scope
+        endpoint = request.scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        routes = request.app.router.routes
+        if routes is not self._routes or len(routes) != self._route_count:
+            self._index(routes)
+
+        candidates = self._by_endpoint.get(endpoint, [])
+        if len(candidates) == 1:
+            return candidates[0][1]
+        # Same handler on several paths (aliases): match like the router did
+        for route, template in candidates:
+            match, _ = route.matches(request.scope)
+            if match != Match.NONE:
+                return template
+        return UNMATCHED_ROUTE
+
+    def _index(self, routes):
+        by_endpoint = {}
+        for route in routes:
+            if isinstance(route, Mount):
+                key, template = route.app, f"{route.path}/{{path:path}}"
+            else:
+                key, template = getattr(route, "endpoint", None), route.path
+            by_endpoint.setdefault(key, []).append((route, template))
+        self._by_endpoint = by_endpoint
+        self._routes, self._route_count = routes, len(routes)
+
+
+route_templates = RouteTemplates()
+
+
+class PrometheusMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next) -> Response:
+        start_time = time.perf_counter()
+
+        with count_queries() as queries:
+            try:
+                response = await call_next(request)
+            except Exception as e:
+                API_ERRORS.labels(
+                    endpoint=route_templates.resolve(request),
+                    error_type=type(e).__name__
+                ).inc()
+                raise
+
+        endpoint = route_templates.resolve(request)
+        REQUEST_COUNT.labels(
+            method=request.method,
+            endpoint=endpoint,
+            status=response.status_code
+        ).inc()
+        REQUEST_LATENCY.labels(method=request.method, endpoint=endpoint).observe(time.perf_counter() - start_time)
+        REQUEST_SQL_STATEMENTS.labels(method=request.method, endpoint=endpoint).observe(queries.statements)
+        REQUEST_SQL_DURATION.labels(method=request.method, endpoint=endpoint).observe(queries.seconds)
+        return response
@@ -1,15 +1,195 @@
 """WebSocket Manager for Real-time Notifications
 Handles real-time alerts, line clearance notifications, and system events.
+
+Fan-out model:
+- Every outgoing message is serialized ONCE, then offered (non-blocking)
+  to each target client's bounded send queue. Broadcasting never awaits a
+  client socket, so one slow tablet cannot stall alerts to everyone else.
+- Each connected socket has its own writer task draining its queue.
+
+Slow-consumer policy (per client queue, WS_CLIENT_QUEUE_SIZE entries):
+1. Coalesce - a newer WORK_ORDER_UPDATE for the same work order replaces
+   the pending older one.
+2. Queue full - the oldest pending non-critical message (INFO/WARNING
+   notifications) is dropped to make room.
+3. Critical alerts (severity CRITICAL or requires_action) are never
+   dropped: if the queue holds nothing droppable, the client is
+   disconnected (close 1013) so it reconnects and refetches state.
+4. A single send taking longer than WS_SEND_TIMEOUT_SECONDS also
+   disconnects the client.
+
+Multi-worker: with a backplane attached (WS_BACKPLANE, see
+app/core/ws_backplane.py), user/department/broadcast messages are
+published once and every worker delivers them to its own sockets.
 """
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime
 
 from fastapi import WebSocket
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.ws_backplane import Backplane
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to clients that cannot keep up ("Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# notification_type -> details field identifying the entity whose updates coalesce
+COALESCE_FIELDS = {
+    "WORK_ORDER_UPDATE": "work_order_id",
+}
+
+WS_CONNECTED_CLIENTS = Gauge(
+    'ws_connected_clients',
+    'Connected WebSocket clients in this worker',
+    registry=registry
+)
+
+WS_MESSAGES_DISCARDED = Counter(
+    'ws_messages_discarded_total',
+    'WebSocket messages not delivered as sent, by reason',
+    ['reason'],  # coalesced, dropped_oldest, slow_consumer, send_timeout, send_error
+    registry=registry
+)
+
+WS_DELIVERY_LATENCY = Histogram(
+    'ws_delivery_latency_seconds',
+    'Time from fan-out to completed socket send',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=registry
+)
+
+
+@dataclass
+class OutboundMessage:
+    """A message serialized once and shared by every client queue"""
+    payload: str
+    critical: bool = False
+    coalesce_key: str | None = None
+    created_at: float = field(default_factory=time.perf_counter)
+
+    def to_envelope(self) -> dict:
+        return {"payload": self.payload, "critical": self.critical, "coalesce_key": self.coalesce_key}
+
+    @classmethod
+    def from_envelope(cls, data: dict) -> "OutboundMessage":
+        return cls(payload=data["payload"], critical=data["critical"], coalesce_key=data["coalesce_key"])
+
+    @classmethod
+    def from_dict(cls, message: dict) -> "OutboundMessage":
+        critical = message.get("severity") == "CRITICAL" or bool(message.get("requires_action"))
+        coalesce_key = None
+        coalesce_field = COALESCE_FIELDS.get(message.get("notification_type"))
+        if coalesce_field:
+            entity_id = (message.get("details") or {}).get(coalesce_field)
+            if entity_id is not None:
+                coalesce_key = f"{message['notification_type']}:{entity_id}"
+        return cls(
+            # Same encoding as WebSocket.send_json
+            payload=json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str),
+            critical=critical,
+            coalesce_key=coalesce_key,
+        )
+
+
+class ClientChannel:
+    """Bounded send queue + writer task for one WebSocket."""
+
+    def __init__(self, websocket: WebSocket, user_id: int, department: str | None,
+                 max_queue: int, send_timeout: float, on_slow_consumer):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.department = department
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self._on_slow_consumer = on_slow_consumer
+        self._pending: deque[OutboundMessage] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.closed = False
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._writer())
+
+    def close(self):
+        self.closed = True
+        self._pending.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    async def wait_closed(self):
+        if self._task is not None and self._task is not asyncio.current_task():
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def offer(self, message: OutboundMessage):
+        """Queue a message without awaiting; applies the slow-consumer policy."""
+        if self.closed:
+            return
+
+        if message.coalesce_key is not None:
+            for i, pending in enumerate(self._pending):
+                if pending.coalesce_key == message.coalesce_key:
+                    self._pending[i] = message
+                    WS_MESSAGES_DISCARDED.labels(reason='coalesced').inc()
+                    return
+
+        if len(self._pending) >= self.max_queue and not self._drop_oldest_droppable():
+            WS_MESSAGES_DISCARDED.labels(reason='slow_consumer').inc(len(self._pending) + 1)
+            self._on_slow_consumer(self, "queue full of critical alerts")
+            return
+
+        self._pending.append(message)
+        self._wakeup.set()
+
+    def _drop_oldest_droppable(self) -> bool:
+        for i, pending in enumerate(self._pending):
+            if not pending.critical:
+                del self._pending[i]
+                WS_MESSAGES_DISCARDED.labels(reason='dropped_oldest').inc()
+                return True
+        return False
+
+    async def _writer(self):
+        try:
+            while not self.closed:
+                if not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                message = self._pending.popleft()
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(message.payload), self.send_timeout)
+                except asyncio.TimeoutError:
+                    WS_MESSAGES_DISCARDED.labels(reason='send_timeout').inc()
+                    self._on_slow_consumer(self, "send timeout")
+                    return
+                except Exception:  # noqa: BLE001
+                    WS_MESSAGES_DISCARDED.labels(reason='send_error').inc()
+                    self._on_slow_consumer(self, None)
+                    return
+                WS_DELIVERY_LATENCY.observe(time.perf_counter() - message.created_at)
+        except asyncio.CancelledError:
+            pass
 
 
 class ConnectionManager:
     """Manages WebSocket connections for real-time notifications."""
 
-    def __init__(self):
+    def __init__(self, max_queue: int | None = None, send_timeout: float | None = None):
+        self.max_queue = max_queue or settings.WS_CLIENT_QUEUE_SIZE
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT_SECONDS
         # Active connections by user_id
         self.active_connections: dict[int, list[WebSocket]] = {}
         # Connections by department
@@ -26,6 +206,18 @@ class ConnectionManager:
         }
         # Global broadcast connections
         self.broadcast_connections: set[WebSocket] = set()
+        # Per-socket send queue + writer task
+        self.channels: dict[WebSocket, ClientChannel] = {}
+        # Cross-worker delivery (None = this worker's sockets only)
+        self.backplane: Backplane | None = None
+
+    async def attach_backplane(self, backplane: Backplane | None):
+        """Route user/department/broadcast messages through `backplane`."""
+        if self.backplane is not None:
+            await self.backplane.stop()
+        self.backplane = backplane
+        if backplane is not None:
+            await backplane.start(self._deliver_envelope)
 
     async def connect(self, websocket: WebSocket, user_id: int, department: str = None):
         """Connect a new WebSocket client."""
@@ -43,13 +235,23 @@ class ConnectionManager:
         # Add to broadcast
         self.broadcast_connections.add(websocket)
 
+        channel = ClientChannel(
+            websocket, user_id, department,
+            max_queue=self.max_queue,
+            send_timeout=self.send_timeout,
+            on_slow_consumer=self._drop_client
+        )
+        self.channels[websocket] = channel
+        channel.start()
+        WS_CONNECTED_CLIENTS.set(len(self.channels))
+
         # Send connection confirmation
-        await websocket.send_json({
+        channel.offer(OutboundMessage.from_dict({
             "type": "connection",
             "status": "connected",
             "timestamp": datetime.now().isoformat(),
             "message": "WebSocket connection established"
-        })
+        }))
 
     def disconnect(self, websocket: WebSocket, user_id: int, department: str = None):
         """Disconnect a WebSocket client."""
@@ -67,46 +269,84 @@ class ConnectionManager:
         # Remove from broadcast
         self.broadcast_connections.discard(websocket)
 
-    async def send_to_user(self, user_id: int, message: dict):
-        """Send message to specific user (all their connections)."""
-        if user_id in self.active_connections:
-            disconnected = []
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception:  # noqa: BLE001
-                    disconnected.append(connection)
+        channel = self.channels.pop(websocket, None)
+        if channel is not None:
+            channel.close()
+        WS_CONNECTED_CLIENTS.set(len(self.channels))
 
-            # Clean up disconnected
-            for conn in disconnected:
-                self.active_connections[user_id].remove(conn)
+    async def shutdown(self):
+        """Detach the backplane and stop every writer task (application shutdown)."""
+        await self.attach_backplane(None)
+        channels = list(self.channels.values())
+        for channel in channels:
+            self.disconnect(channel.websocket, channel.user_id, channel.department)
+        await asyncio.gather(*(channel.wait_closed() for channel in channels))
 
-    async def send_to_department(self, department: str, message: dict):
-        """Send message to all users in a department."""
-        if department in self.dept_connections:
-            disconnected = []
-            for connection in self.dept_connections[department]:
-                try:
-                    await connection.send_json(message)
-                except Exception:  # noqa: BLE001
-                    disconnected.append(connection)
+    def _drop_client(self, channel: ClientChannel, reason: str | None):
+        """Remove a client that failed or cannot keep up; close it when it is slow."""
+        self.disconnect(channel.websocket, channel.user_id, channel.department)
+        if reason:
+            logger.warning(f"Dropping slow WebSocket client (user {channel.user_id}): {reason}")
+            asyncio.get_running_loop().create_task(self._close_quietly(channel.websocket, reason))
 
-            # Clean up disconnected
-            for conn in disconnected:
-                self.dept_connections[department].discard(conn)
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket, reason: str):
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason=reason)
+        except Exception:  # noqa: BLE001
+            pass
 
-    async def broadcast(self, message: dict):
-        """Broadcast message to all connected clients."""
-        disconnected = []
-        for connection in self.broadcast_connections:
+    def _fan_out(self, connections, message: dict) -> int:
+        """Serialize once and enqueue for every connection; returns clients reached."""
+        return self._offer_all(connections, OutboundMessage.from_dict(message))
+
+    def _offer_all(self, connections, outbound: OutboundMessage) -> int:
+        delivered = 0
+        for connection in list(connections):
+            channel = self.channels.get(connection)
+            if channel is not None:
+                channel.offer(outbound)
+                delivered += 1
+        return delivered
+
+    def _targets(self, target: str, key) -> list[WebSocket]:
+        if target == "user":
+            return list(self.active_connections.get(int(key), []))
+        if target == "department":
+            return list(self.dept_connections.get(key, ()))
+        return list(self.broadcast_connections)
+
+    async def _publish(self, target: str, key, message: dict):
+        """Deliver via the backplane (all workers) or directly to local sockets."""
+        outbound = OutboundMessage.from_dict(message)
+        if self.backplane is not None:
             try:
-                await connection.send_json(message)
-            except Exception:  # noqa: BLE001
-                disconnected.append(connection)
+                await self.backplane.publish({"target": target, "key": key, **outbound.to_envelope()})
+                return
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"WebSocket backplane publish failed, delivering locally only: {e}")
+        self._offer_all(self._targets(target, key), outbound)
+
+    async def _deliver_envelope(self, envelope: dict):
+        """Backplane handler: deliver a published message to this worker's sockets."""
+        outbound = OutboundMessage.from_envelope(envelope)
+        self._offer_all(self._targets(envelope["target"], envelope.get("key")), outbound)
 
-        # Clean up disconnected
-        for conn in disconnected:
-            self.broadcast_connections.discard(conn)
+    async def send_personal(self, websocket: WebSocket, message: dict):
+        """Send a message to one socket through its queue (e.g. pong replies)."""
+        self._fan_out([websocket], message)
+
+    async def send_to_user(self, user_id: int, message: dict):
+        """Send message to specific user (all their connections, on every worker)."""
+        await self._publish("user", user_id, message)
+
+    async def send_to_department(self, department: str, message: dict):
+        """Send message to all users in a department (on every worker)."""
+        await self._publish("department", department, message)
+
+    async def broadcast(self, message: dict):
+        """Broadcast message to all connected clients (on every worker)."""
+        await self._publish("broadcast", None, message)
 
     async def notify_line_clearance_required(self, department: str, details: dict):
         """Send line clearance alert to department."""
@@ -0,0 +1,139 @@
+"""WebSocket Notification Backplane
+Carries department / user / broadcast notifications between API workers so
+that a notification raised in one uvicorn/gunicorn worker reaches sockets
+connected to every worker.
+
+- `InMemoryBackplane`  - single process; workers sharing one
+  `InMemoryBackplaneHub` see each other's messages (tests, dev).
+- `RedisBackplane`     - Redis pub/sub channel (WS_BACKPLANE=redis).
+
+Envelopes carry the already-serialized payload, so a message is encoded
+once no matter how many workers and sockets receive it. Every worker,
+including the publisher, delivers through its own subscription.
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL = "ws:notifications"
+
+EnvelopeHandler = Callable[[dict], Awaitable[None]]
+
+
+class Backplane(ABC):
+    """Interface: publish envelopes, deliver every envelope to `handler`."""
+
+    def __init__(self):
+        self._handler: EnvelopeHandler | None = None
+
+    async def start(self, handler: EnvelopeHandler):
+        self._handler = handler
+
+    async def stop(self):
+        self._handler = None
+
+    @abstractmethod
+    async def publish(self, envelope: dict):
+        ...
+
+    async def _dispatch(self, envelope: dict):
+        if self._handler is None:
+            return
+        try:
+            await self._handler(envelope)
+        except Exception as e:  # noqa: BLE001
+            logger.error(f"WebSocket backplane delivery failed: {e}")
+
+
+class InMemoryBackplaneHub:
+    """Shared 'channel' for in-memory backplanes in one process."""
+
+    def __init__(self):
+        self.subscribers: list["InMemoryBackplane"] = []
+
+
+class InMemoryBackplane(Backplane):
+    """Backplane for a single process (or several simulated workers in tests)."""
+
+    def __init__(self, hub: InMemoryBackplaneHub | None = None):
+        super().__init__()
+        self.hub = hub or InMemoryBackplaneHub()
+
+    async def start(self, handler: EnvelopeHandler):
+        await super().start(handler)
+        if self not in self.hub.subscribers:
+            self.hub.subscribers.append(self)
+
+    async def stop(self):
+        if self in self.hub.subscribers:
+            self.hub.subscribers.remove(self)
+        await super().stop()
+
+    async def publish(self, envelope: dict):
+        # Round-trip through JSON like the Redis transport would
+        data = json.dumps(envelope)
+        for subscriber in list(self.hub.subscribers):
+            await subscriber._dispatch(json.loads(data))
+
+
+class RedisBackplane(Backplane):
+    """Redis pub/sub backplane (one channel shared by all workers)."""
+
+    def __init__(self, redis_url: str, channel: str = DEFAULT_CHANNEL, reconnect_delay: float = 1.0):
+        super().__init__()
+        import redis.asyncio as aioredis
+
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._redis = aioredis.Redis.from_url(redis_url)
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, handler: EnvelopeHandler):
+        await super().start(handler)
+        self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        await self._redis.close()
+        await super().stop()
+
+    async def publish(self, envelope: dict):
+        await self._redis.publish(self.channel, json.dumps(envelope))
+
+    async def _listen(self):
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._dispatch(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # noqa: BLE001
+                logger.warning(f"WebSocket backplane subscription lost: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:  # noqa: BLE001
+                    pass
+
+
+def build_backplane(kind: str, redis_url: str | None = None) -> Backplane | None:
+    """Backplane for settings.WS_BACKPLANE ('local' = none, 'memory', 'redis')."""
+    if kind == "redis":
+        if not redis_url:
+            logger.warning("WS_BACKPLANE=redis but REDIS_URL is not set; notifications stay worker-local")
+            return None
+        return RedisBackplane(redis_url)
+    if kind == "memory":
+        return InMemoryBackplane()
+    return None
@@ -0,0 +1,53 @@
+"""Background Job Worker
+Dedicated process that runs jobs queued by the API workers, so long
+imports and report generation never compete with interactive requests:
+
+    JOB_BACKEND=redis JOB_IN_PROCESS_WORKERS=false  (API)
+    python -m app.job_worker                        (worker)
+
+Concurrency per worker process is JOB_WORKERS; scale out by running more
+worker processes against the same Redis.
+"""
+import importlib
+import logging
+import signal
+import threading
+
+from app.core import models  # noqa: F401 - register every model
+from app.core.barcode_index import install_session_hooks as install_barcode_index_hooks
+from app.core.config import settings
+from app.core.jobs import JOB_HANDLERS, job_runner
+from app.services.inventory_position_service import install_session_hooks as install_inventory_position_hooks
+from app.services.material_shortage_service import install_session_hooks as install_material_shortage_hooks
+
+logger = logging.getLogger(__name__)
+
+# Modules whose @job_handler functions this worker runs
+JOB_HANDLER_MODULES = [
+    "app.api.v1.reports",
+    "app.api.v1.imports",
+    "app.api.v1.import_export",
+]
+
+
+def main():
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    install_inventory_position_hooks()
+    install_barcode_index_hooks()
+    install_material_shortage_hooks()
+    for module in JOB_HANDLER_MODULES:
+        importlib.import_module(module)
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+
+    job_runner.start()
+    logger.info(f"Job worker started ({settings.JOB_BACKEND}, {settings.JOB_WORKERS} threads): {sorted(JOB_HANDLERS)}")
+    stopped.wait()
+    logger.info("Job worker stopping, waiting for running jobs")
+    job_runner.stop(timeout=300)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from prometheus_client import Counter, Histogram, generate_latest, CollectorRegistry
-import time
+from prometheus_client import generate_latest
 
 from app.api.v1 import (
     admin,
@@ -13,6 +12,7 @@ from app.api.v1 import (
     finishgoods,
     import_export,
     imports,  # ✅ NEW: Masterdata Imports (Session 49 Phase 8)
+    jobs,
     kanban,
     material_allocation,  # ✅ NEW: Material Allocation API
     pallet,  # ✅ NEW: Pallet System API (2026-02-10)
@@ -45,9 +45,26 @@ from app.core import models  # noqa: F401
 # Initialize Audit Trail Event Listeners
 from app.core.audit_listeners import setup_audit_listeners
 from app.core.audit_middleware import AuditContextMiddleware
+from app.core.audit_partitions import audit_partition_maintainer, start_audit_partition_maintainer
+from app.core.audit_writer import audit_writer
+from app.core.barcode_index import barcode_index
+from app.core.barcode_index import install_session_hooks as install_barcode_index_hooks
 from app.core.config import settings
 from app.core.database import Base, engine
 from app.core.datetime_utils import DateTimeJSONEncoder
+from app.core.db_metrics import install_pool_metrics
+from app.core.jobs import job_runner
+from app.core.login_throttle import login_throttle
+from app.core.loop_safety import configure_threadpool, install_loop_safety, loop_lag_monitor
+from app.core.matview_refresher import dashboard_view_refresher, start_dashboard_view_refresher
+from app.core.password_hasher import password_hasher
+from app.core.request_metrics import PrometheusMiddleware
+from app.core.metrics import registry
+from app.core.websocket import ws_manager
+from app.core.ws_backplane import build_backplane
+from app.services.inventory_position_service import install_session_hooks as install_inventory_position_hooks
+from app.services.material_shortage_service import install_session_hooks as install_material_shortage_hooks
+from app.services.permission_service import init_permission_service, shutdown_permission_service
 from app.modules.cutting import cutting_router
 from app.modules.finishing import finishing_router
 from app.modules.packing import packing_router
@@ -63,6 +80,13 @@ try:
 except Exception:
     pass
 
+# Keep inventory_positions in step with every stock_quants change
+install_inventory_position_hooks()
+# Evict scan lookups when products / pallets / MOs / locations / stock change
+install_barcode_index_hooks()
+# Recompute material_shortages for materials whose allocations / stock change
+install_material_shortage_hooks()
+
 app = FastAPI(
     title=settings.API_TITLE,
     description=settings.API_DESCRIPTION,
@@ -71,75 +95,12 @@ app = FastAPI(
 )
 
 # ============================================================================
-# Prometheus Metrics Configuration
-# ============================================================================
-registry = CollectorRegistry()
-
-# Request metrics
-REQUEST_COUNT = Counter(
-    'http_requests_total',
-    'Total HTTP requests',
-    ['method', 'endpoint', 'status'],
-    registry=registry
-)
-
-REQUEST_LATENCY = Histogram(
-    'http_request_duration_seconds',
-    'HTTP request latency in seconds',
-    ['method', 'endpoint'],
-    registry=registry
-)
-
-# Database metrics
-DB_CONNECTIONS = Counter(
-    'database_connections_total',
-    'Total database connections',
-    ['status'],
-    registry=registry
-)
-
-# Application metrics
-API_ERRORS = Counter(
-    'api_errors_total',
-    'Total API errors',
-    ['endpoint', 'error_type'],
-    registry=registry
-)
-
-# ============================================================================
-# Prometheus Middleware
+# Prometheus Metrics
 # ============================================================================
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
-        start_time = time.time()
-        
-        # Track request
-        try:
-            response = await call_next(request)
-            REQUEST_COUNT.labels(
-                method=request.method,
-                endpoint=request.url.path,
-                status=response.status_code
-            ).inc()
-            
-            # Track latency
-            process_time = time.time() - start_time
-            REQUEST_LATENCY.labels(
-                method=request.method,
-                endpoint=request.url.path
-            ).observe(process_time)
-            
-            return response
-        except Exception as e:
-            API_ERRORS.labels(
-                endpoint=request.url.path,
-                error_type=type(e).__name__
-            ).inc()
-            raise
+# Request metrics labeled by route template, plus per-request SQL
+# statements / time (app.core.request_metrics); pool gauges and checkout
+# wait (app.core.db_metrics). All on the shared registry (app.core.metrics).
+install_pool_metrics(engine)
 
 app.add_middleware(PrometheusMiddleware)
 
@@ -330,6 +291,12 @@ app.include_router(
     prefix=settings.API_PREFIX
 )
 
+# Background Jobs (status / artifacts of long reports and imports)
+app.include_router(
+    jobs.router,
+    prefix=settings.API_PREFIX
+)
+
 # Dynamic Report Builder
 app.include_router(
     report_builder.router,
@@ -360,6 +327,121 @@ app.include_router(
     prefix=settings.API_PREFIX
 )
 
+# Event loop safety: run non-awaiting async DB handlers in the threadpool,
+# time the rest (must run after every router is included)
+install_loop_safety(
+    app,
+    offload=settings.SYNC_ENDPOINT_OFFLOAD,
+    threshold_ms=settings.EVENT_LOOP_BLOCK_THRESHOLD_MS
+)
+
+@app.on_event("startup")
+def start_audit_writer():
+    """Start the background audit flusher (no-op in transaction mode)."""
+    audit_writer.start()
+
+
+@app.on_event("shutdown")
+def stop_audit_writer():
+    """Drain queued audit events before the worker exits."""
+    audit_writer.stop()
+
+
+@app.on_event("startup")
+def start_permission_cache():
+    """Attach the Redis permission cache tier, invalidation subscriber and shared login throttle when configured."""
+    redis_client = None
+    if settings.REDIS_URL:
+        import redis
+        try:
+            redis_client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=0.5)
+            redis_client.ping()
+        except Exception:
+            redis_client = None  # In-process cache only
+    init_permission_service(redis_client)
+    login_throttle.attach_redis(redis_client)
+
+
+@app.on_event("shutdown")
+def stop_permission_cache():
+    shutdown_permission_service()
+
+
+@app.on_event("startup")
+async def start_websocket_backplane():
+    """Share WebSocket notifications between workers (WS_BACKPLANE)."""
+    await ws_manager.attach_backplane(build_backplane(settings.WS_BACKPLANE, settings.REDIS_URL))
+
+
+@app.on_event("shutdown")
+async def stop_websocket_writers():
+    """Detach the backplane and cancel per-client WebSocket writer tasks."""
+    await ws_manager.shutdown()
+
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    """Size the sync handler threadpool to the DB pool and start the loop lag probe."""
+    configure_threadpool(settings.SYNC_ENDPOINT_THREADS or settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    loop_lag_monitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_loop_lag_monitor():
+    await loop_lag_monitor.stop()
+
+
+@app.on_event("shutdown")
+def stop_password_hasher():
+    """Finish in-flight bcrypt jobs and release the hasher threads."""
+    password_hasher.shutdown()
+
+
+@app.on_event("startup")
+def start_matview_refresher():
+    """Refresh dashboard materialized views when their source tables change."""
+    start_dashboard_view_refresher()
+
+
+@app.on_event("shutdown")
+def stop_matview_refresher():
+    dashboard_view_refresher.stop()
+
+
+@app.on_event("startup")
+def start_job_workers():
+    """Run background jobs in this process unless a dedicated worker does (JOB_IN_PROCESS_WORKERS)."""
+    if settings.JOB_IN_PROCESS_WORKERS:
+        job_runner.start()
+
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    job_runner.stop()
+
+
+@app.on_event("startup")
+def start_audit_partitions():
+    """Create upcoming audit log partitions and archive expired ones."""
+    start_audit_partition_maintainer()
+
+
+@app.on_event("shutdown")
+def stop_audit_partitions():
+    audit_partition_maintainer.stop()
+
+
+@app.on_event("startup")
+def start_barcode_index():
+    """Watch the shared barcode index version for master data edits made by other workers."""
+    barcode_index.start()
+
+
+@app.on_event("shutdown")
+def stop_barcode_index():
+    barcode_index.stop()
+
+
 @app.get("/")
 def read_root():
     """Root endpoint - System health check."""
@@ -12,6 +12,7 @@ from sqlalchemy.orm import Session
 from app.core.base_production_service import BaseProductionService
 from app.core.models.products import Product, ProductType
 from app.core.models.warehouse import POStatus, PurchaseOrder, StockLot, StockMove, StockQuant
+from app.services.sequence_service import next_sequence
 from app.shared.audit import log_audit
 
 
@@ -231,7 +232,9 @@ class PurchasingService:
             product_id = item["product_id"]
             quantity = float(item.get("quantity") or 0)
             uom = str(item.get("uom") or "PCS")
-            lot_number = item.get("lot_number") or f"LOT-{po.po_number}-{product_id}-{now.strftime('%Y%m%d%H%M%S')}"
+            lot_number = item.get("lot_number") or (
+                f"LOT-{po.po_number}-{product_id}-{next_sequence(self.db, 'LOT', str(now.year)):06d}"
+            )
 
             if quantity <= 0:
                 continue
@@ -0,0 +1,167 @@
+"""
+Audit Summary Service
+Location: app/services/audit_summary_service.py
+
+Maintains `audit_summary_hourly` - event counts per hour, module, action
+and user - so the audit summary never counts audit_logs.
+
+- Writers: `fold_audit_events` is called by the audit writer with every
+  batch of audit_logs rows, on the SAME connection and transaction as the
+  INSERT (one upsert per distinct bucket, in key order so concurrent
+  writers lock buckets in the same order).
+- Readers: `AuditSummaryService.summary()` sums bucket rows. The 24h / 7d
+  counts stay exact: whole hours come from buckets, the partial first hour
+  from a range count on audit_logs.timestamp. Top users / modules use
+  hour-aligned 30 day windows.
+- `rebuild()` recomputes buckets from raw logs in one INSERT ... SELECT
+  (see scripts/rebuild_audit_summary.py).
+"""
+
+import enum
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import delete, desc, func, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.models.audit import AuditLog, AuditSummaryBucket
+
+HOUR = timedelta(hours=1)
+BUCKET_KEY = ("bucket_start", "module", "action", "username")
+
+
+def hour_bucket(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _name(value):
+    """Enum member or spooled enum name -> name (what the Enum columns store)"""
+    return value.name if isinstance(value, enum.Enum) else value
+
+
+def fold_audit_events(connection: Connection, rows: Iterable[Dict[str, Any]]):
+    """Add audit events (AuditLog column values) to their hourly buckets"""
+    counts = Counter(
+        (hour_bucket(row["timestamp"]), _name(row["module"]), _name(row["action"]), row.get("username") or "")
+        for row in rows
+    )
+    if not counts:
+        return
+    records = [
+        dict(zip(BUCKET_KEY, key), event_count=count)
+        for key, count in sorted(counts.items())
+    ]
+
+    table = AuditSummaryBucket.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(BUCKET_KEY),
+            set_={"event_count": table.c.event_count + statement.excluded.event_count},
+        )
+        connection.execute(statement, records)
+        return
+
+    for record in records:
+        key = [table.c[column] == record[column] for column in BUCKET_KEY]
+        updated = connection.execute(
+            update(table).where(*key).values(event_count=table.c.event_count + record["event_count"])
+        )
+        if updated.rowcount == 0:
+            connection.execute(insert(table), record)
+
+
+class AuditSummaryService:
+    """Reads and reconciliation of the hourly audit summary store"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def total_events(self) -> int:
+        return self.db.scalar(select(func.coalesce(func.sum(AuditSummaryBucket.event_count), 0)))
+
+    def count_since(self, start: datetime) -> int:
+        """Exact number of events at or after `start`"""
+        first_full_hour = hour_bucket(start) if start == hour_bucket(start) else hour_bucket(start) + HOUR
+        total = self.db.scalar(
+            select(func.coalesce(func.sum(AuditSummaryBucket.event_count), 0))
+            .where(AuditSummaryBucket.bucket_start >= first_full_hour)
+        )
+        if first_full_hour > start:
+            total += self.db.scalar(
+                select(func.count()).select_from(AuditLog)
+                .where(AuditLog.timestamp >= start, AuditLog.timestamp < first_full_hour)
+            )
+        return total
+
+    def top(self, column, since: datetime, limit: int = 10) -> list:
+        """(value, event_count) of the busiest `column` values since the hour of `since`"""
+        event_count = func.sum(AuditSummaryBucket.event_count).label("event_count")
+        return self.db.execute(
+            select(column, event_count)
+            .where(AuditSummaryBucket.bucket_start >= hour_bucket(since))
+            .group_by(column)
+            .order_by(desc("event_count"))
+            .limit(limit)
+        ).all()
+
+    def summary(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        now = now or datetime.now()
+        month_ago = now - timedelta(days=30)
+        return {
+            "total_events": self.total_events(),
+            "events_last_24h": self.count_since(now - timedelta(hours=24)),
+            "events_last_7d": self.count_since(now - timedelta(days=7)),
+            "top_users": [
+                {"username": username or None, "event_count": count}
+                for username, count in self.top(AuditSummaryBucket.username, month_ago)
+            ],
+            "top_modules": [
+                {"module": module, "event_count": count}
+                for module, count in self.top(AuditSummaryBucket.module, month_ago)
+            ],
+        }
+
+    # ------------------------------------------------------------------
+    # Reconciliation (caller commits)
+    # ------------------------------------------------------------------
+    def rebuild(self, since: Optional[datetime] = None) -> int:
+        """Recompute buckets from audit_logs - all of them, or from the hour of `since`.
+
+        Run while audit writes are quiet, or with `since` set to a past hour:
+        events committed while the rebuild runs may be counted twice or missed.
+        Returns the number of buckets written.
+        """
+        bucket = self._hour_expression()
+        username = func.coalesce(AuditLog.username, "")
+        source = select(
+            bucket, AuditLog.module, AuditLog.action, username, func.count()
+        ).group_by(bucket, AuditLog.module, AuditLog.action, username)
+
+        clear = delete(AuditSummaryBucket)
+        if since is not None:
+            start = hour_bucket(since)
+            clear = clear.where(AuditSummaryBucket.bucket_start >= start)
+            source = source.where(AuditLog.timestamp >= start)
+
+        self.db.execute(clear)
+        result = self.db.execute(
+            insert(AuditSummaryBucket).from_select(list(BUCKET_KEY) + ["event_count"], source)
+        )
+        return result.rowcount
+
+    def _hour_expression(self):
+        if self.db.get_bind().dialect.name == "sqlite":
+            # Same text form SQLAlchemy stores for DateTime on SQLite
+            return func.strftime("%Y-%m-%d %H:00:00.000000", AuditLog.timestamp)
+        return func.date_trunc("hour", AuditLog.timestamp)
@@ -0,0 +1,242 @@
+"""
+BOM Explosion Engine - set-based, memoized multi-level BOM explosion
+Location: app/services/bom_explosion_engine.py
+
+The whole BOM graph reachable from an article is loaded in three queries:
+
+1. Recursive CTE over bom_headers/bom_details -> every reachable product id
+2. Active BOM lines of those products (lowest active BOM id per product)
+3. Product master rows for every node
+
+Explosions are computed per UNIT of a product and memoized by product id,
+so a sub-assembly shared by several parents or requested for several order
+quantities is exploded once and then scaled. Cycles in the BOM graph raise
+BOMCycleError instead of recursing until the depth limit.
+
+The result shape matches BOMExplosionService.explode_bom_multi_level so the
+Work Order generation code can consume either.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.models.bom import BOMDetail, BOMHeader
+from app.core.models.products import Product, ProductType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_LEVEL = 10
+
+
+class BOMCycleError(ValueError):
+    """Raised when a product (indirectly) consumes itself"""
+
+    def __init__(self, path: List[str]):
+        self.path = path
+        super().__init__(f"Circular BOM reference: {' -> '.join(path)}")
+
+
+@dataclass
+class BOMLine:
+    component_id: int
+    qty_needed: Decimal
+    wastage_percent: Optional[Decimal]
+
+
+@dataclass
+class UnitExplosion:
+    """Explosion of ONE unit of a product (scaled on demand)"""
+    product_id: int
+    bom_id: Optional[int]
+    materials: List[Tuple[BOMLine, Product]] = field(default_factory=list)
+    children: List[Tuple[Decimal, "UnitExplosion"]] = field(default_factory=list)  # (qty per unit, child)
+    leaf_totals: Dict[int, Decimal] = field(default_factory=dict)  # material id -> qty per unit
+
+
+def is_wip_product(product: Product) -> bool:
+    """WIP components are exploded further; everything else is a material"""
+    return product.type == ProductType.WIP or '_WIP_' in (product.code or '').upper()
+
+
+class BOMExplosionEngine:
+    """
+    Loads BOM graphs in bulk and explodes them from a per-unit memo
+
+    Usage:
+        engine = BOMExplosionEngine(db)
+        tree = engine.explode(product_id, Decimal("1200"))
+        totals = engine.material_totals(product_id, Decimal("1200"))
+    """
+
+    def __init__(self, db: Session, department_resolver=None):
+        self.db = db
+        self._department_resolver = department_resolver or (lambda code: 'UNKNOWN')
+        self.products: Dict[int, Product] = {}
+        self.bom_ids: Dict[int, int] = {}               # product id -> active BOM id
+        self.bom_lines: Dict[int, List[BOMLine]] = {}   # product id -> lines
+        self._unit_cache: Dict[int, UnitExplosion] = {}
+
+    # ------------------------------------------------------------------
+    # Graph loading
+    # ------------------------------------------------------------------
+    def load(self, root_product_ids: Iterable[int]):
+        """Load every BOM reachable from `root_product_ids` (three queries)
+
+        Products already loaded are skipped - their whole subgraph was
+        loaded with them.
+        """
+        roots = {int(pid) for pid in root_product_ids} - set(self.products)
+        if not roots:
+            return
+
+        # 1. Reachable product ids through active BOMs
+        reachable = select(Product.id.label("product_id")).where(Product.id.in_(roots)) \
+            .cte("bom_reachable", recursive=True)
+        headers = select(BOMHeader.id, BOMHeader.product_id) \
+            .where(BOMHeader.is_active.is_(True)).subquery("active_headers")
+        step = (
+            select(BOMDetail.component_id.label("product_id"))
+            .join(headers, BOMDetail.bom_header_id == headers.c.id)
+            .join(reachable, headers.c.product_id == reachable.c.product_id)
+        )
+        # UNION (not UNION ALL) so cycles terminate in the database as well
+        reachable = reachable.union(step)
+        product_ids = set(self.db.scalars(select(reachable.c.product_id)).all())
+        product_ids |= roots
+        new_ids = product_ids - set(self.products)
+
+        if new_ids:
+            # 2. Active BOM lines (lowest active BOM per product, like .first())
+            chosen = (
+                select(BOMHeader.product_id, func.min(BOMHeader.id).label("bom_id"))
+                .where(BOMHeader.is_active.is_(True), BOMHeader.product_id.in_(new_ids))
+                .group_by(BOMHeader.product_id)
+                .subquery("chosen_bom")
+            )
+            rows = self.db.execute(
+                select(chosen.c.product_id, chosen.c.bom_id, BOMDetail.component_id,
+                       BOMDetail.qty_needed, BOMDetail.wastage_percent)
+                .join(BOMDetail, BOMDetail.bom_header_id == chosen.c.bom_id, isouter=True)
+                .order_by(chosen.c.product_id, BOMDetail.id)
+            ).all()
+            for product_id, bom_id, component_id, qty_needed, wastage in rows:
+                self.bom_ids[product_id] = bom_id
+                lines = self.bom_lines.setdefault(product_id, [])
+                if component_id is not None:
+                    lines.append(BOMLine(component_id, Decimal(qty_needed or 0), wastage))
+
+            # 3. Product master rows
+            for product in self.db.scalars(select(Product).where(Product.id.in_(new_ids))):
+                self.products[product.id] = product
+
+    # ------------------------------------------------------------------
+    # Per-unit explosion (memoized)
+    # ------------------------------------------------------------------
+    def unit_explosion(self, product_id: int) -> UnitExplosion:
+        """Explosion of one unit of `product_id` (cached for the engine's lifetime)"""
+        self.load([product_id])
+        return self._unit(product_id, [])
+
+    def _unit(self, product_id: int, path: List[int]) -> UnitExplosion:
+        cached = self._unit_cache.get(product_id)
+        if cached is not None:
+            return cached
+
+        if product_id in path:
+            cycle = path[path.index(product_id):] + [product_id]
+            raise BOMCycleError([self._code(pid) for pid in cycle])
+
+        if product_id not in self.products:
+            raise ValueError(f"Product {product_id} not found")
+
+        unit = UnitExplosion(product_id=product_id, bom_id=self.bom_ids.get(product_id))
+        path = path + [product_id]
+
+        for line in self.bom_lines.get(product_id, []):
+            component = self.products.get(line.component_id)
+            if component is None:
+                raise ValueError(f"Product {line.component_id} not found")
+
+            if is_wip_product(component):
+                child = self._unit(component.id, path)
+                unit.children.append((line.qty_needed, child))
+                for material_id, qty in child.leaf_totals.items():
+                    unit.leaf_totals[material_id] = unit.leaf_totals.get(material_id, Decimal("0")) + qty * line.qty_needed
+            else:
+                unit.materials.append((line, component))
+                unit.leaf_totals[component.id] = unit.leaf_totals.get(component.id, Decimal("0")) + line.qty_needed
+
+        self._unit_cache[product_id] = unit
+        return unit
+
+    # ------------------------------------------------------------------
+    # Scaled results
+    # ------------------------------------------------------------------
+    def explode(self, product_id: int, qty_required: Decimal, max_level: int = DEFAULT_MAX_LEVEL) -> Dict:
+        """Explosion tree for `qty_required` units (explode_bom_multi_level format)"""
+        unit = self.unit_explosion(product_id)
+        return self._scale(unit, Decimal(qty_required), 0, max_level)
+
+    def material_totals(self, product_id: int, qty_required: Decimal) -> Dict[int, Decimal]:
+        """Total leaf material quantity per component id for `qty_required` units"""
+        qty = Decimal(qty_required)
+        return {mid: per_unit * qty for mid, per_unit in self.unit_explosion(product_id).leaf_totals.items()}
+
+    def _scale(self, unit: UnitExplosion, qty: Decimal, level: int, max_level: int) -> Dict:
+        if level > max_level:
+            logger.warning(f"BOM explosion stopped at max level {max_level} (product {unit.product_id})")
+            return {}
+
+        product = self.products[unit.product_id]
+        if unit.bom_id is None:
+            return {
+                'product_id': product.id,
+                'product_code': product.code,
+                'product_name': product.name,
+                'product_type': 'raw_material',
+                'qty_required': qty,
+                'level': level,
+                'is_leaf': True,
+                'materials': [],
+                'children': []
+            }
+
+        materials = [
+            {
+                'component_id': component.id,
+                'component_code': component.code,
+                'component_name': component.name,
+                'qty_per_unit': line.qty_needed,
+                'total_qty_needed': line.qty_needed * qty,
+                'uom': 'PCE',
+                'wastage_percent': line.wastage_percent
+            }
+            for line, component in unit.materials
+        ]
+        children = [
+            self._scale(child, qty_per_unit * qty, level + 1, max_level)
+            for qty_per_unit, child in unit.children
+        ]
+
+        return {
+            'product_id': product.id,
+            'product_code': product.code,
+            'product_name': product.name,
+            'product_type': 'wip',
+            'qty_required': qty,
+            'level': level,
+            'bom_id': unit.bom_id,
+            'department': self._department_resolver(product.code),
+            'is_leaf': len(children) == 0,
+            'materials': materials,
+            'children': children
+        }
+
+    def _code(self, product_id: int) -> str:
+        product = self.products.get(product_id)
+        return product.code if product else str(product_id)
@@ -5,6 +5,7 @@ Author: IT Developer Expert
 Date: 3 Februari 2026
 """
 
+import logging
 from typing import List, Dict, Optional, Tuple
 from decimal import Decimal
 from sqlalchemy.orm import Session
@@ -14,6 +15,9 @@ from app.core.models.products import Product
 from app.core.models.bom import BOMHeader, BOMDetail
 from app.core.models.manufacturing import ManufacturingOrder, WorkOrder, Department, WorkOrderStatus
 from app.core.models.warehouse import StockQuant
+from app.services.bom_explosion_engine import BOMExplosionEngine
+
+logger = logging.getLogger(__name__)
 
 
 class BOMExplosionService:
@@ -21,7 +25,9 @@ class BOMExplosionService:
     
     def __init__(self, db: Session):
         self.db = db
-        self.explosion_cache = {}  # Cache to avoid re-exploding same BOM
+        self.explosion_cache = {}  # Cache for the reference recursive path
+        # Bulk-loaded, per-unit memoized explosions (shared by every call on this service)
+        self.engine = BOMExplosionEngine(db, department_resolver=self._detect_department_from_product_code)
     
     def explode_mo_and_generate_work_orders(
         self, 
@@ -86,7 +92,36 @@ class BOMExplosionService:
         max_level: int = 10
     ) -> Dict:
         """
-        Recursively explode BOM from Finished Good down to raw materials
+        Explode BOM from Finished Good down to raw materials
+
+        Uses BOMExplosionEngine: the BOM graph is loaded in a few bulk
+        queries and per-unit explosions are memoized, so shared WIP stages
+        and repeated order quantities are not re-exploded.
+
+        Args:
+            product_id: Product to explode
+            qty_required: Quantity needed
+            level: Kept for backward compatibility (explosions start at 0)
+            max_level: Maximum depth (safety)
+
+        Returns:
+            Dict with explosion results including all WIP stages and materials
+
+        Raises:
+            BOMCycleError: the BOM graph contains a circular reference
+        """
+        return self.engine.explode(product_id, Decimal(qty_required), max_level=max_level)
+
+    def _explode_bom_recursive(
+        self,
+        product_id: int,
+        qty_required: Decimal,
+        level: int = 0,
+        max_level: int = 10
+    ) -> Dict:
+        """
+        Reference implementation: recursive explosion with one Product and
+        one BOMHeader query per node (kept to verify/benchmark the engine)
         
         Args:
             product_id: Product to explode
@@ -102,7 +137,7 @@ class BOMExplosionService:
         
         # Safety check
         if level > max_level:
-            print(f"{indent}⚠️  Max recursion level reached!")
+            logger.warning(f"{indent}Max recursion level reached!")
             return {}
         
         # Get product
@@ -110,12 +145,12 @@ class BOMExplosionService:
         if not product:
             raise ValueError(f"Product {product_id} not found")
         
-        print(f"{indent}{'🔍' if level > 0 else '🎯'} Level {level}: {product.code} x {qty_required}")
+        logger.debug(f"{indent}{'🔍' if level > 0 else '🎯'} Level {level}: {product.code} x {qty_required}")
         
         # Check cache
         cache_key = f"{product_id}_{qty_required}"
         if cache_key in self.explosion_cache:
-            print(f"{indent}  💾 Using cached result")
+            logger.debug(f"{indent}  💾 Using cached result")
             return self.explosion_cache[cache_key]
         
         # Get BOM for this product
@@ -126,7 +161,7 @@ class BOMExplosionService:
         
         if not bom:
             # No BOM = raw material or purchased item
-            print(f"{indent}  ✅ Raw material/Purchased (no BOM)")
+            logger.debug(f"{indent}  ✅ Raw material/Purchased (no BOM)")
             result = {
                 'product_id': product_id,
                 'product_code': product.code,
@@ -142,7 +177,7 @@ class BOMExplosionService:
             return result
         
         # BOM exists - explode details
-        print(f"{indent}  📋 BOM found: {bom.id} ({len(bom.details)} components)")
+        logger.debug(f"{indent}  📋 BOM found: {bom.id} ({len(bom.details)} components)")
         
         materials = []
         children = []
@@ -152,15 +187,15 @@ class BOMExplosionService:
             qty_needed_per_unit = detail.qty_needed
             total_qty_needed = qty_needed_per_unit * qty_required
             
-            print(f"{indent}    - {component.code}: {qty_needed_per_unit} x {qty_required} = {total_qty_needed}")
+            logger.debug(f"{indent}    - {component.code}: {qty_needed_per_unit} x {qty_required} = {total_qty_needed}")
             
             # Check if component is WIP (needs further explosion) or raw material
             component_type = getattr(component, 'product_type', 'raw_material')
             
             if component_type == 'wip' or '_WIP_' in component.code.upper():
                 # WIP product - needs recursive explosion
-                print(f"{indent}      🔄 WIP detected - exploding...")
-                child_explosion = self.explode_bom_multi_level(
+                logger.debug(f"{indent}      🔄 WIP detected - exploding...")
+                child_explosion = self._explode_bom_recursive(
                     product_id=component.id,
                     qty_required=total_qty_needed,
                     level=level + 1,
@@ -15,8 +15,9 @@ from sqlalchemy.orm import Session
 from app.core.models import (
     SPK, SPKDailyProduction, SPKProductionCompletion,
     SPKModification, MaterialDebt, MaterialDebtSettlement,
-    AuditLog, User, Material
+    AuditLog, User
 )
+from app.services.spk_progress_rollup_service import SPKProgressRollupService
 
 
 class DailyProductionService:
@@ -24,6 +25,7 @@ class DailyProductionService:
     
     def __init__(self, db: Session):
         self.db = db
+        self.rollup = SPKProgressRollupService(db)
     
     def record_daily_input(
         self,
@@ -79,6 +81,9 @@ class DailyProductionService:
         )
         self.db.add(daily_entry)
         
+        # Update progress rollup (same transaction as the raw entry)
+        self.rollup.apply_entry(spk_id, production_date, input_qty, cumulative, status)
+        
         # Update SPK
         spk.actual_qty = cumulative
         spk.production_status = "IN_PROGRESS" if cumulative > 0 else "NOT_STARTED"
@@ -108,14 +113,14 @@ class DailyProductionService:
             .order_by(SPKDailyProduction.production_date.asc())\
             .all()
         
-        total_days = len(entries)
-        confirmed_qty = sum(e.input_qty for e in entries if e.status == "CONFIRMED")
-        pending_qty = sum(e.input_qty for e in entries if e.status == "PENDING")
+        # Summary totals come from the rollup, not from the entry list
+        rollup = self.rollup.get(spk_id)
+        actual_qty = rollup.cumulative_qty if rollup else 0
         
         return {
             "spk_id": spk_id,
             "target_qty": spk.target_qty,
-            "actual_qty": spk.actual_qty or 0,
+            "actual_qty": actual_qty,
             "daily_entries": [
                 {
                     "date": e.production_date.isoformat(),
@@ -127,10 +132,11 @@ class DailyProductionService:
                 for e in entries
             ],
             "summary": {
-                "total_days": total_days,
-                "confirmed_qty": confirmed_qty,
-                "pending_qty": pending_qty,
-                "completion_pct": (spk.actual_qty / spk.target_qty * 100) if spk.target_qty > 0 else 0
+                "total_days": rollup.days_tracked if rollup else 0,
+                "confirmed_qty": rollup.confirmed_qty if rollup else 0,
+                "pending_qty": rollup.pending_qty if rollup else 0,
+                "last_entry_date": rollup.last_entry_date.isoformat() if rollup and rollup.last_entry_date else None,
+                "completion_pct": (actual_qty / spk.target_qty * 100) if spk.target_qty > 0 else 0
             }
         }
     
@@ -140,21 +146,24 @@ class DailyProductionService:
         if not spk:
             raise ValueError(f"SPK {spk_id} not found")
         
-        entries = self.db.query(SPKDailyProduction)\
-            .filter(SPKDailyProduction.spk_id == spk_id).all()
+        # O(1): read the rollup instead of scanning daily entries
+        rollup = self.rollup.get(spk_id)
+        actual_qty = rollup.cumulative_qty if rollup else 0
+        days_tracked = rollup.days_tracked if rollup else 0
         
-        daily_avg = (spk.actual_qty or 0) / len(entries) if entries else 0
+        daily_avg = actual_qty / days_tracked if days_tracked else 0
         
         return {
             "spk_id": spk_id,
             "target_qty": spk.target_qty,
-            "actual_qty": spk.actual_qty or 0,
-            "progress_pct": (spk.actual_qty / spk.target_qty * 100) if spk.target_qty > 0 else 0,
-            "remaining_qty": max(0, spk.target_qty - (spk.actual_qty or 0)),
-            "days_tracked": len(entries),
+            "actual_qty": actual_qty,
+            "progress_pct": (actual_qty / spk.target_qty * 100) if spk.target_qty > 0 else 0,
+            "remaining_qty": max(0, spk.target_qty - actual_qty),
+            "days_tracked": days_tracked,
+            "last_entry_date": rollup.last_entry_date.isoformat() if rollup and rollup.last_entry_date else None,
             "daily_average": daily_avg,
             "estimated_days_remaining": max(0,
-                int((spk.target_qty - (spk.actual_qty or 0)) / daily_avg) if daily_avg > 0 else 0
+                int((spk.target_qty - actual_qty) / daily_avg) if daily_avg > 0 else 0
             )
         }
     
@@ -170,20 +179,22 @@ class DailyProductionService:
             raise ValueError(f"SPK {spk_id} not found")
         
         # Verify target reached
-        if (spk.actual_qty or 0) < spk.target_qty:
+        actual_qty = self.rollup.get_cumulative_qty(spk_id)
+        if actual_qty < spk.target_qty:
             raise ValueError(
-                f"Cannot complete. Need {spk.target_qty - (spk.actual_qty or 0)} more units"
+                f"Cannot complete. Need {spk.target_qty - actual_qty} more units"
             )
         
         # Mark as completed
         spk.production_status = "COMPLETED"
         spk.completion_date = date.today()
+        self.rollup.mark_completed(spk_id, spk.completion_date)
         
         # Create completion record
         completion = SPKProductionCompletion(
             spk_id=spk_id,
             target_qty=spk.target_qty,
-            actual_qty=spk.actual_qty or 0,
+            actual_qty=actual_qty,
             completed_date=spk.completion_date,
             confirmed_by_id=user_id,
             confirmation_notes=confirmation_notes,
@@ -198,17 +209,12 @@ class DailyProductionService:
             "status": "COMPLETED",
             "completion_date": spk.completion_date.isoformat(),
             "target_qty": spk.target_qty,
-            "actual_qty": spk.actual_qty or 0
+            "actual_qty": actual_qty
         }
     
     def _calculate_cumulative(self, spk_id: int, new_qty: int) -> int:
-        """Calculate cumulative quantity including new input"""
-        last_entry = self.db.query(SPKDailyProduction)\
-            .filter(SPKDailyProduction.spk_id == spk_id)\
-            .order_by(SPKDailyProduction.production_date.desc())\
-            .first()
-        
-        return (last_entry.cumulative_qty if last_entry else 0) + new_qty
+        """Calculate cumulative quantity including new input (from rollup)"""
+        return self.rollup.get_cumulative_qty(spk_id) + new_qty
 
 
 class SPKModificationService:
@@ -319,6 +325,9 @@ class SPKModificationService:
             spk.modified_by_id = user_id
             spk.modified_at = datetime.utcnow()
         
+        # Re-derive progress for this SPK in the same transaction
+        SPKProgressRollupService(self.db).refresh(spk.id)
+        
         self.db.commit()
         
         return {
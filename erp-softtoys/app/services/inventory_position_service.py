@@ -0,0 +1,306 @@
+"""
+Inventory Position Service
+Location: app/services/inventory_position_service.py
+
+Maintains `inventory_positions` (on-hand / reserved per product and
+location) and `inventory_lot_age` (lotted on-hand per product, location and
+receipt date) behind the warehouse overview, low-stock and aging endpoints.
+
+- Writers: stock changes through StockQuant objects (receipts, transfers,
+  consumption, reservations, adjustments). Session hooks note the
+  (product, location) pairs of inserted, updated and deleted quants and,
+  after the flush, re-derive those pairs from stock_quants on the SAME
+  connection and transaction. Each position row is locked before its
+  quants are summed, in key order, so concurrent writers to one pair
+  serialize and every recompute sees the other's committed quants.
+- Readers: overview / low stock / aging aggregate a few thousand position
+  and lot-age rows instead of stock_quants, stock_lots and stock_moves.
+- `rebuild()` recomputes both tables from stock_quants in one
+  INSERT ... SELECT each (see scripts/rebuild_inventory_positions.py). Run
+  it after SQL that bypasses the ORM or after lot receipt date corrections.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Date, and_, case, cast, delete, distinct, event, func, insert, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.models.products import Product
+from app.core.models.warehouse import (
+    InventoryLotAge,
+    InventoryPosition,
+    Location,
+    LocationType,
+    StockLot,
+    StockQuant,
+)
+
+# Locations holding physical stock (supplier / customer / loss are virtual)
+STOCK_LOCATION_TYPES = (LocationType.INTERNAL, LocationType.VIEW, LocationType.PRODUCTION)
+
+# (max age in days or None, category, status)
+AGING_BUCKETS = [
+    (7, "0-7 days", "Fresh Stock"),
+    (30, "8-30 days", "Recent"),
+    (90, "31-90 days", "Normal"),
+    (None, "90+ days", "Slow Moving"),
+]
+
+_SESSION_KEYS = "inventory_position_keys"
+
+PositionKey = Tuple[int, int]  # (product_id, location_id)
+
+
+def _received_on(connection: Connection):
+    if connection.dialect.name == "sqlite":
+        return func.date(StockLot.received_date)
+    return cast(StockLot.received_date, Date)
+
+
+def _lock_position(connection: Connection, product_id: int, location_id: int):
+    """Create the position row if needed and hold its row lock until commit"""
+    table = InventoryPosition.__table__
+    key = {"product_id": product_id, "location_id": location_id}
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        statement = dialect_insert(table).values(**key, qty_on_hand=0, qty_reserved=0)
+        statement = statement.on_conflict_do_update(
+            index_elements=["product_id", "location_id"],
+            set_={"qty_on_hand": table.c.qty_on_hand},
+        )
+        connection.execute(statement)
+        return
+
+    locked = connection.execute(
+        select(table.c.product_id).where(table.c.product_id == product_id, table.c.location_id == location_id)
+        .with_for_update()
+    ).first()
+    if locked is None:
+        connection.execute(insert(table).values(**key, qty_on_hand=0, qty_reserved=0))
+
+
+def refresh_positions(connection: Connection, keys: Iterable[PositionKey]):
+    """Re-derive the position and lot-age rows of `keys` from stock_quants"""
+    received_on = _received_on(connection)
+    for product_id, location_id in sorted(keys):
+        _lock_position(connection, product_id, location_id)
+        of_pair = and_(StockQuant.product_id == product_id, StockQuant.location_id == location_id)
+
+        on_hand, reserved = connection.execute(
+            select(
+                func.coalesce(func.sum(StockQuant.qty_on_hand), 0),
+                func.coalesce(func.sum(StockQuant.qty_reserved), 0),
+            ).where(of_pair)
+        ).one()
+        connection.execute(
+            update(InventoryPosition)
+            .where(InventoryPosition.product_id == product_id, InventoryPosition.location_id == location_id)
+            .values(qty_on_hand=on_hand, qty_reserved=reserved)
+        )
+
+        connection.execute(
+            delete(InventoryLotAge)
+            .where(InventoryLotAge.product_id == product_id, InventoryLotAge.location_id == location_id)
+        )
+        connection.execute(
+            insert(InventoryLotAge).from_select(
+                ["product_id", "location_id", "received_on", "qty_on_hand"],
+                select(StockQuant.product_id, StockQuant.location_id, received_on, func.sum(StockQuant.qty_on_hand))
+                .join(StockLot, StockLot.id == StockQuant.lot_id)
+                .where(of_pair)
+                .group_by(StockQuant.product_id, StockQuant.location_id, received_on)
+                .having(func.sum(StockQuant.qty_on_hand) != 0)
+            )
+        )
+
+
+# ----------------------------------------------------------------------
+# Session hooks
+# ----------------------------------------------------------------------
+def collect_quant_keys(session: Session, flush_context, instances):
+    """before_flush hook: pairs of changed / deleted quants as they were before the flush"""
+    quants = [obj for obj in chain(session.dirty, session.deleted) if isinstance(obj, StockQuant)]
+    if not quants:
+        return
+    keys: Set[PositionKey] = session.info.setdefault(_SESSION_KEYS, set())
+    with session.no_autoflush:
+        for quant in quants:
+            keys.add((quant.product_id, quant.location_id))
+            # A reassigned product_id / location_id keeps the old pair in its history
+            keys.add((
+                _previous(quant, "product_id") or quant.product_id,
+                _previous(quant, "location_id") or quant.location_id,
+            ))
+
+
+def refresh_flushed_positions(session: Session, flush_context):
+    """after_flush hook: recompute every pair touched by this flush, in its transaction"""
+    keys: Set[PositionKey] = session.info.pop(_SESSION_KEYS, None) or set()
+    for quant in chain(session.new, session.dirty):
+        if isinstance(quant, StockQuant):
+            keys.add((quant.product_id, quant.location_id))
+    keys = {key for key in keys if None not in key}
+    if keys:
+        refresh_positions(session.connection(), keys)
+
+
+def discard_session_keys(session: Session, *args):
+    """after_soft_rollback hook: nothing of a rolled-back flush is applied"""
+    session.info.pop(_SESSION_KEYS, None)
+
+
+def _previous(quant: StockQuant, attribute: str):
+    history = inspect(quant).attrs[attribute].history
+    return history.deleted[0] if history.deleted else None
+
+
+_session_hooks_installed = False
+
+
+def install_session_hooks():
+    """Register the position hooks on every Session once per process."""
+    global _session_hooks_installed
+    if _session_hooks_installed:
+        return
+    event.listen(Session, "before_flush", collect_quant_keys)
+    event.listen(Session, "after_flush", refresh_flushed_positions)
+    event.listen(Session, "after_soft_rollback", discard_session_keys)
+    _session_hooks_installed = True
+
+
+class InventoryPositionService:
+    """Reads and reconciliation of the inventory position store"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def location_totals(self) -> List[Any]:
+        """Per stock location: distinct products in stock, on-hand and reserved qty"""
+        return self.db.execute(
+            select(
+                Location.id,
+                Location.name,
+                Location.capacity,
+                func.count(InventoryPosition.product_id).label("total_items"),
+                func.sum(InventoryPosition.qty_on_hand).label("total_qty"),
+                func.sum(InventoryPosition.qty_reserved).label("reserved_qty"),
+            )
+            .join(InventoryPosition, InventoryPosition.location_id == Location.id)
+            .where(Location.type.in_(STOCK_LOCATION_TYPES), InventoryPosition.qty_on_hand > 0)
+            .group_by(Location.id, Location.name, Location.capacity)
+            .order_by(Location.name)
+        ).all()
+
+    def products_in_stock(self) -> int:
+        return self.db.scalar(
+            select(func.count(distinct(InventoryPosition.product_id)))
+            .join(Location, Location.id == InventoryPosition.location_id)
+            .where(Location.type.in_(STOCK_LOCATION_TYPES), InventoryPosition.qty_on_hand > 0)
+        )
+
+    def low_stock(self, limit: Optional[int] = None) -> List[Any]:
+        """Active products whose on-hand qty is below Product.min_stock, most critical first"""
+        on_hand = (
+            select(InventoryPosition.product_id, func.sum(InventoryPosition.qty_on_hand).label("qty"))
+            .join(Location, Location.id == InventoryPosition.location_id)
+            .where(Location.type.in_(STOCK_LOCATION_TYPES))
+            .group_by(InventoryPosition.product_id)
+            .subquery()
+        )
+        current_qty = func.coalesce(on_hand.c.qty, 0)
+        query = (
+            select(Product.id, Product.code, Product.name, current_qty.label("current_qty"), Product.min_stock)
+            .outerjoin(on_hand, on_hand.c.product_id == Product.id)
+            .where(Product.is_active.isnot(False), Product.min_stock > 0, current_qty < Product.min_stock)
+            .order_by(current_qty / Product.min_stock, Product.code)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return self.db.execute(query).all()
+
+    def aging(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Lotted on-hand stock by age of lot receipt"""
+        today = today or date.today()
+        bucket = case(
+            *[
+                (InventoryLotAge.received_on >= today - timedelta(days=max_days), category)
+                for max_days, category, _ in AGING_BUCKETS if max_days is not None
+            ],
+            else_=AGING_BUCKETS[-1][1],
+        )
+        in_stock = (
+            select(InventoryLotAge.product_id, InventoryLotAge.qty_on_hand, bucket.label("category"))
+            .join(Location, Location.id == InventoryLotAge.location_id)
+            .where(Location.type.in_(STOCK_LOCATION_TYPES), InventoryLotAge.qty_on_hand > 0)
+            .subquery()
+        )
+        rows = {
+            row.category: row
+            for row in self.db.execute(
+                select(
+                    in_stock.c.category,
+                    func.count(distinct(in_stock.c.product_id)).label("item_count"),
+                    func.sum(in_stock.c.qty_on_hand).label("total_qty"),
+                ).group_by(in_stock.c.category)
+            )
+        }
+        total_sku = self.db.scalar(select(func.count(distinct(in_stock.c.product_id))))
+        return {
+            "total_sku": total_sku,
+            "aging_categories": [
+                {
+                    "category": category,
+                    "item_count": rows[category].item_count if category in rows else 0,
+                    "total_qty": _qty(rows[category].total_qty) if category in rows else 0.0,
+                    "status": status,
+                }
+                for _, category, status in AGING_BUCKETS
+            ],
+        }
+
+    # ------------------------------------------------------------------
+    # Reconciliation (caller commits)
+    # ------------------------------------------------------------------
+    def rebuild(self) -> int:
+        """Recompute both tables from stock_quants; returns the number of positions"""
+        connection = self.db.connection()
+        received_on = _received_on(connection)
+
+        connection.execute(delete(InventoryLotAge))
+        connection.execute(delete(InventoryPosition))
+        result = connection.execute(
+            insert(InventoryPosition).from_select(
+                ["product_id", "location_id", "qty_on_hand", "qty_reserved"],
+                select(
+                    StockQuant.product_id,
+                    StockQuant.location_id,
+                    func.coalesce(func.sum(StockQuant.qty_on_hand), 0),
+                    func.coalesce(func.sum(StockQuant.qty_reserved), 0),
+                ).group_by(StockQuant.product_id, StockQuant.location_id)
+            )
+        )
+        connection.execute(
+            insert(InventoryLotAge).from_select(
+                ["product_id", "location_id", "received_on", "qty_on_hand"],
+                select(StockQuant.product_id, StockQuant.location_id, received_on, func.sum(StockQuant.qty_on_hand))
+                .join(StockLot, StockLot.id == StockQuant.lot_id)
+                .group_by(StockQuant.product_id, StockQuant.location_id, received_on)
+                .having(func.sum(StockQuant.qty_on_hand) != 0)
+            )
+        )
+        return result.rowcount
+
+
+def _qty(value) -> float:
+    return float(value or Decimal("0"))
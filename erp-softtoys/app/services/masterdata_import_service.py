@@ -13,11 +13,15 @@ Features:
 - Comprehensive validation (format, data types, business rules)
 - Transaction-safe imports (rollback on ANY error)
 - UPDATE mode for existing records
+- Vectorized validation (pandas column operations, no per-row queries)
+- Chunked bulk writes: existing keys fetched once per chunk, products
+  upserted with INSERT ... ON CONFLICT, progress reported per chunk
 - Detailed error reporting with row numbers
 - Audit logging for all imports
 """
+import logging
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Union
 import pandas as pd
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment
@@ -25,13 +29,37 @@ from openpyxl.utils.dataframe import dataframe_to_rows
 from io import BytesIO
 from decimal import Decimal
 
+from sqlalchemy import and_, insert, or_, select, update
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 
+from app.core.config import settings
+from app.core.models.audit import AuditAction, AuditModule
 from app.core.models.products import Partner, PartnerType, Product, ProductType, UOM, Category
 from app.core.models.bom import BOMHeader, BOMDetail, BOMType
+from app.core.models.users import User
 from app.shared.audit import AuditLogger
 
+logger = logging.getLogger(__name__)
+
+# Template values -> enum members
+PARTNER_TYPES = {
+    'SUPPLIER': PartnerType.SUPPLIER,
+    'SUBCON': PartnerType.SUBCON,
+    'CUSTOMER': PartnerType.CUSTOMER,
+}
+MATERIAL_TYPES = {
+    'RAW_MATERIAL': ProductType.RAW_MATERIAL,
+    'BAHAN_PENOLONG': ProductType.BAHAN_PENOLONG,
+    'WIP': ProductType.WIP,
+    'FINISHED_GOODS': ProductType.FINISH_GOOD,
+}
+MATERIAL_UOMS = {
+    'PCS': UOM.PCS, 'YARD': UOM.YARD, 'METER': UOM.METER, 'KG': UOM.KG, 'GRAM': UOM.GRAM,
+    'CONE': UOM.CONE, 'ROLL': UOM.ROLL, 'BOX': UOM.BOX, 'CARTON': UOM.CTN, 'SET': UOM.SET,
+}
+
+ProgressCallback = Callable[[int, int], None]  # (rows written, total rows)
+
 
 class MasterdataImportService:
     """Service for masterdata bulk imports."""
@@ -39,7 +67,6 @@ class MasterdataImportService:
     def __init__(self, db: Session, user_id: int):
         self.db = db
         self.user_id = user_id
-        self.audit_logger = AuditLogger(db)
 
     # ====================== TEMPLATE GENERATION ======================
 
@@ -293,30 +320,18 @@ class MasterdataImportService:
             errors.append(f"Missing required columns: {', '.join(missing_cols)}")
             return False, errors
 
-        # Validate each row
-        for idx, row in df.iterrows():
-            row_num = idx + 2  # Excel row (header is row 1)
-
-            # Check supplier_code not empty
-            if pd.isna(row['supplier_code']) or str(row['supplier_code']).strip() == '':
-                errors.append(f"Row {row_num}: supplier_code is required")
+        _flag(errors, _text(df, 'supplier_code').isna(), "supplier_code is required")
+        _flag(errors, _text(df, 'supplier_name').isna(), "supplier_name is required")
+        _flag(errors, ~_text(df, 'supplier_type').str.upper().isin(list(PARTNER_TYPES)),
+              f"supplier_type must be one of {list(PARTNER_TYPES)}")
 
-            # Check supplier_name not empty
-            if pd.isna(row['supplier_name']) or str(row['supplier_name']).strip() == '':
-                errors.append(f"Row {row_num}: supplier_name is required")
+        # Validate phone format (optional but if provided must be valid)
+        phone = _text(df, 'phone')
+        digits = phone.str.replace(r'[+\- ]', '', regex=True)
+        _flag(errors, phone.notna() & ~digits.str.isdigit().fillna(True),
+              "phone must contain only digits, +, -, and spaces")
 
-            # Check supplier_type valid
-            valid_types = ['SUPPLIER', 'SUBCON', 'CUSTOMER']
-            if pd.isna(row['supplier_type']) or str(row['supplier_type']).upper() not in valid_types:
-                errors.append(f"Row {row_num}: supplier_type must be one of {valid_types}")
-
-            # Validate phone format (optional but if provided must be valid)
-            if not pd.isna(row.get('phone')):
-                phone = str(row['phone']).strip()
-                if phone and not phone.replace('+', '').replace('-', '').replace(' ', '').isdigit():
-                    errors.append(f"Row {row_num}: phone must contain only digits, +, -, and spaces")
-
-        return len(errors) == 0, errors
+        return len(errors) == 0, _row_messages(errors)
 
     def validate_materials_data(self, df: pd.DataFrame) -> Tuple[bool, List[str]]:
         """Validate materials dataframe."""
@@ -329,48 +344,27 @@ class MasterdataImportService:
             errors.append(f"Missing required columns: {', '.join(missing_cols)}")
             return False, errors
 
-        # Valid enums
-        valid_types = ['RAW_MATERIAL', 'BAHAN_PENOLONG', 'WIP', 'FINISHED_GOODS']
-        valid_uoms = ['PCS', 'YARD', 'METER', 'KG', 'GRAM', 'CONE', 'ROLL', 'BOX', 'CARTON', 'SET']
-
         # Get valid categories from database
-        valid_categories = {cat.name for cat in self.db.query(Category).all()}
-
-        for idx, row in df.iterrows():
-            row_num = idx + 2
+        valid_categories = set(self.db.scalars(select(Category.name)))
 
-            # Check material_code
-            if pd.isna(row['material_code']) or str(row['material_code']).strip() == '':
-                errors.append(f"Row {row_num}: material_code is required")
+        _flag(errors, _text(df, 'material_code').isna(), "material_code is required")
+        _flag(errors, _text(df, 'material_name').isna(), "material_name is required")
+        _flag(errors, ~_text(df, 'material_type').str.upper().isin(list(MATERIAL_TYPES)),
+              f"material_type must be one of {list(MATERIAL_TYPES)}")
+        _flag(errors, ~_text(df, 'uom').str.upper().isin(list(MATERIAL_UOMS)),
+              f"uom must be one of {list(MATERIAL_UOMS)}")
 
-            # Check material_name
-            if pd.isna(row['material_name']) or str(row['material_name']).strip() == '':
-                errors.append(f"Row {row_num}: material_name is required")
+        category = _text(df, 'category')
+        _flag(errors, category.isna(), "category is required")
+        _flag(errors, category.notna() & ~category.isin(valid_categories),
+              lambda idx: f"category '{df['category'][idx]}' not found in database. Valid: {valid_categories}")
 
-            # Check material_type
-            if pd.isna(row['material_type']) or str(row['material_type']).upper() not in valid_types:
-                errors.append(f"Row {row_num}: material_type must be one of {valid_types}")
+        # Check minimum_stock is positive number (if provided)
+        min_stock, not_numeric = _number(df, 'minimum_stock')
+        _flag(errors, not_numeric, "minimum_stock must be a number")
+        _flag(errors, min_stock < 0, "minimum_stock must be >= 0")
 
-            # Check uom
-            if pd.isna(row['uom']) or str(row['uom']).upper() not in valid_uoms:
-                errors.append(f"Row {row_num}: uom must be one of {valid_uoms}")
-
-            # Check category exists
-            if pd.isna(row['category']):
-                errors.append(f"Row {row_num}: category is required")
-            elif str(row['category']).strip() not in valid_categories:
-                errors.append(f"Row {row_num}: category '{row['category']}' not found in database. Valid: {valid_categories}")
-
-            # Check minimum_stock is positive number (if provided)
-            if not pd.isna(row.get('minimum_stock')):
-                try:
-                    min_stock = float(row['minimum_stock'])
-                    if min_stock < 0:
-                        errors.append(f"Row {row_num}: minimum_stock must be >= 0")
-                except ValueError:
-                    errors.append(f"Row {row_num}: minimum_stock must be a number")
-
-        return len(errors) == 0, errors
+        return len(errors) == 0, _row_messages(errors)
 
     def validate_bom_data(self, df: pd.DataFrame) -> Tuple[bool, List[str]]:
         """Validate BOM dataframe."""
@@ -383,50 +377,39 @@ class MasterdataImportService:
             errors.append(f"Missing required columns: {', '.join(missing_cols)}")
             return False, errors
 
-        # Get valid product codes
-        valid_products = {p.code for p in self.db.query(Product).all()}
+        article = _text(df, 'article_code')
+        component = _text(df, 'component_code')
+        # Only the codes referenced by the file, not the whole product master
+        known_codes = set(self._product_ids(pd.concat([article, component]).dropna().unique()))
 
-        for idx, row in df.iterrows():
-            row_num = idx + 2
+        _flag(errors, article.isna(), "article_code is required")
+        _flag(errors, article.notna() & ~article.isin(known_codes),
+              lambda idx: f"article_code '{df['article_code'][idx]}' not found in products")
+        _flag(errors, component.isna(), "component_code is required")
+        _flag(errors, component.notna() & ~component.isin(known_codes),
+              lambda idx: f"component_code '{df['component_code'][idx]}' not found in products")
 
-            # Check article_code exists
-            if pd.isna(row['article_code']) or str(row['article_code']).strip() == '':
-                errors.append(f"Row {row_num}: article_code is required")
-            elif str(row['article_code']).strip() not in valid_products:
-                errors.append(f"Row {row_num}: article_code '{row['article_code']}' not found in products")
+        quantity, not_numeric = _number(df, 'quantity_required')
+        _flag(errors, df['quantity_required'].isna(), "quantity_required is required")
+        _flag(errors, not_numeric, "quantity_required must be a number")
+        _flag(errors, quantity <= 0, "quantity_required must be > 0")
 
-            # Check component_code exists
-            if pd.isna(row['component_code']) or str(row['component_code']).strip() == '':
-                errors.append(f"Row {row_num}: component_code is required")
-            elif str(row['component_code']).strip() not in valid_products:
-                errors.append(f"Row {row_num}: component_code '{row['component_code']}' not found in products")
-
-            # Check quantity_required
-            if pd.isna(row['quantity_required']):
-                errors.append(f"Row {row_num}: quantity_required is required")
-            else:
-                try:
-                    qty = float(row['quantity_required'])
-                    if qty <= 0:
-                        errors.append(f"Row {row_num}: quantity_required must be > 0")
-                except ValueError:
-                    errors.append(f"Row {row_num}: quantity_required must be a number")
-
-            # Check wastage_percent (optional, but if provided must be valid)
-            if not pd.isna(row.get('wastage_percent')):
-                try:
-                    wastage = float(row['wastage_percent'])
-                    if wastage < 0 or wastage > 100:
-                        errors.append(f"Row {row_num}: wastage_percent must be between 0-100")
-                except ValueError:
-                    errors.append(f"Row {row_num}: wastage_percent must be a number")
+        # Check wastage_percent (optional, but if provided must be valid)
+        wastage, not_numeric = _number(df, 'wastage_percent')
+        _flag(errors, not_numeric, "wastage_percent must be a number")
+        _flag(errors, (wastage < 0) | (wastage > 100), "wastage_percent must be between 0-100")
 
-        return len(errors) == 0, errors
+        return len(errors) == 0, _row_messages(errors)
 
     # ====================== IMPORT EXECUTION ======================
 
-    def import_suppliers(self, file_content: bytes) -> Dict:
+    def import_suppliers(self, file_content: bytes, progress: Optional[ProgressCallback] = None) -> Dict:
         """Import suppliers from Excel file.
+
+        Partners have no supplier code column: a row updates the partner
+        whose name equals its supplier_code (or supplier_name), otherwise a
+        new partner is inserted. Rows are written in chunks - one lookup,
+        one bulk insert and one bulk update per chunk.
         
         Returns:
             {
@@ -446,72 +429,51 @@ class MasterdataImportService:
             # Validate
             is_valid, errors = self.validate_suppliers_data(df)
             if not is_valid:
-                return {
-                    "success": False,
-                    "imported_count": 0,
-                    "updated_count": 0,
-                    "errors": errors,
-                    "execution_time_ms": 0
-                }
+                return _failed(errors)
+
+            rows = pd.DataFrame({
+                "code": _text(df, 'supplier_code'),
+                "name": _text(df, 'supplier_name'),
+                "type": _text(df, 'supplier_type').str.upper().map(PARTNER_TYPES),
+                "contact_person": _text(df, 'contact_person'),
+                "phone": _text(df, 'phone'),
+                "email": _text(df, 'email'),
+                "address": _text(df, 'address'),
+            }).drop_duplicates("code", keep="last")
 
             imported_count = 0
             updated_count = 0
-            errors = []
 
-            # Begin transaction
-            for idx, row in df.iterrows():
-                row_num = idx + 2
-                try:
-                    supplier_code = str(row['supplier_code']).strip()
-                    
-                    # Check if exists
-                    existing = self.db.query(Partner).filter(Partner.name == supplier_code).first()
-                    
-                    if existing:
-                        # UPDATE mode
-                        existing.name = str(row['supplier_name']).strip()
-                        existing.type = PartnerType[str(row['supplier_type']).upper()]
-                        existing.contact_person = str(row.get('contact_person', '')).strip() or None
-                        existing.phone = str(row.get('phone', '')).strip() or None
-                        existing.email = str(row.get('email', '')).strip() or None
-                        existing.address = str(row.get('address', '')).strip() or None
-                        updated_count += 1
+            for chunk in self._chunks(rows, "suppliers", progress):
+                records = _records(chunk)
+                names = {r["code"] for r in records} | {r["name"] for r in records}
+                existing = {}
+                for partner_id, name in self.db.execute(
+                    select(Partner.id, Partner.name).where(Partner.name.in_(names)).order_by(Partner.id)
+                ):
+                    existing.setdefault(name, partner_id)
+
+                inserts, updates = [], []
+                for record in records:
+                    code = record.pop("code")
+                    partner_id = existing.get(code) or existing.get(record["name"])
+                    if partner_id:
+                        updates.append({"id": partner_id, **record})
                     else:
-                        # INSERT mode
-                        partner = Partner(
-                            name=str(row['supplier_name']).strip(),
-                            type=PartnerType[str(row['supplier_type']).upper()],
-                            contact_person=str(row.get('contact_person', '')).strip() or None,
-                            phone=str(row.get('phone', '')).strip() or None,
-                            email=str(row.get('email', '')).strip() or None,
-                            address=str(row.get('address', '')).strip() or None
-                        )
-                        self.db.add(partner)
-                        imported_count += 1
-
-                except Exception as e:
-                    errors.append(f"Row {row_num}: {str(e)}")
-                    self.db.rollback()
-                    return {
-                        "success": False,
-                        "imported_count": 0,
-                        "updated_count": 0,
-                        "errors": errors,
-                        "execution_time_ms": 0
-                    }
+                        inserts.append(record)
+
+                if inserts:
+                    self.db.execute(insert(Partner), inserts)
+                if updates:
+                    self.db.execute(update(Partner), updates)
+                imported_count += len(inserts)
+                updated_count += len(updates)
 
             # Commit transaction
             self.db.commit()
 
             # Audit log
-            self.audit_logger.log_create(
-                user_id=self.user_id,
-                module="Masterdata Import",
-                action="Import Suppliers",
-                entity_type="Partner",
-                entity_id=None,
-                changes=f"Imported {imported_count} suppliers, Updated {updated_count} suppliers"
-            )
+            self._log_import("Partner", "suppliers", imported_count, updated_count)
 
             execution_time = (datetime.now() - start_time).total_seconds() * 1000
 
@@ -525,16 +487,13 @@ class MasterdataImportService:
 
         except Exception as e:
             self.db.rollback()
-            return {
-                "success": False,
-                "imported_count": 0,
-                "updated_count": 0,
-                "errors": [f"Fatal error: {str(e)}"],
-                "execution_time_ms": 0
-            }
+            return _failed([f"Fatal error: {str(e)}"])
+
+    def import_materials(self, file_content: bytes, progress: Optional[ProgressCallback] = None) -> Dict:
+        """Import materials from Excel file.
 
-    def import_materials(self, file_content: bytes) -> Dict:
-        """Import materials from Excel file."""
+        Chunked INSERT ... ON CONFLICT (code) DO UPDATE on products.
+        """
         start_time = datetime.now()
 
         try:
@@ -543,79 +502,35 @@ class MasterdataImportService:
             # Validate
             is_valid, errors = self.validate_materials_data(df)
             if not is_valid:
-                return {
-                    "success": False,
-                    "imported_count": 0,
-                    "updated_count": 0,
-                    "errors": errors,
-                    "execution_time_ms": 0
-                }
+                return _failed(errors)
+
+            # Get category mapping
+            categories = {name: category_id for category_id, name in self.db.execute(select(Category.id, Category.name))}
+            min_stock, _ = _number(df, 'minimum_stock')
+
+            rows = pd.DataFrame({
+                "code": _text(df, 'material_code'),
+                "name": _text(df, 'material_name'),
+                "type": _text(df, 'material_type').str.upper().map(MATERIAL_TYPES),
+                "uom": _text(df, 'uom').str.upper().map(MATERIAL_UOMS),
+                "category_id": _text(df, 'category').map(categories),
+                "min_stock": min_stock.fillna(0).map(lambda value: Decimal(str(value))),
+                "is_active": True,
+            }).drop_duplicates("code", keep="last")
 
             imported_count = 0
             updated_count = 0
-            errors = []
 
-            # Get category mapping
-            categories = {cat.name: cat.id for cat in self.db.query(Category).all()}
-
-            for idx, row in df.iterrows():
-                row_num = idx + 2
-                try:
-                    material_code = str(row['material_code']).strip()
-                    
-                    # Check if exists
-                    existing = self.db.query(Product).filter(Product.code == material_code).first()
-                    
-                    category_id = categories.get(str(row['category']).strip())
-                    if not category_id:
-                        errors.append(f"Row {row_num}: Category '{row['category']}' not found")
-                        continue
-
-                    min_stock = float(row.get('minimum_stock', 0)) if not pd.isna(row.get('minimum_stock')) else 0
-
-                    if existing:
-                        # UPDATE mode
-                        existing.name = str(row['material_name']).strip()
-                        existing.type = ProductType[str(row['material_type']).upper()]
-                        existing.uom = UOM[str(row['uom']).upper()]
-                        existing.category_id = category_id
-                        existing.min_stock = Decimal(str(min_stock))
-                        updated_count += 1
-                    else:
-                        # INSERT mode
-                        product = Product(
-                            code=material_code,
-                            name=str(row['material_name']).strip(),
-                            type=ProductType[str(row['material_type']).upper()],
-                            uom=UOM[str(row['uom']).upper()],
-                            category_id=category_id,
-                            min_stock=Decimal(str(min_stock)),
-                            is_active=True
-                        )
-                        self.db.add(product)
-                        imported_count += 1
-
-                except Exception as e:
-                    errors.append(f"Row {row_num}: {str(e)}")
-                    self.db.rollback()
-                    return {
-                        "success": False,
-                        "imported_count": 0,
-                        "updated_count": 0,
-                        "errors": errors,
-                        "execution_time_ms": 0
-                    }
+            for chunk in self._chunks(rows, "materials", progress):
+                records = _records(chunk)
+                existing = set(self._product_ids(chunk["code"]))
+                self._upsert(Product, records, ["code"], ["name", "type", "uom", "category_id", "min_stock"])
+                updated_count += len(existing)
+                imported_count += len(records) - len(existing)
 
             self.db.commit()
 
-            self.audit_logger.log_create(
-                user_id=self.user_id,
-                module="Masterdata Import",
-                action="Import Materials",
-                entity_type="Product",
-                entity_id=None,
-                changes=f"Imported {imported_count} materials, Updated {updated_count} materials"
-            )
+            self._log_import("Product", "materials", imported_count, updated_count)
 
             execution_time = (datetime.now() - start_time).total_seconds() * 1000
 
@@ -629,16 +544,15 @@ class MasterdataImportService:
 
         except Exception as e:
             self.db.rollback()
-            return {
-                "success": False,
-                "imported_count": 0,
-                "updated_count": 0,
-                "errors": [f"Fatal error: {str(e)}"],
-                "execution_time_ms": 0
-            }
+            return _failed([f"Fatal error: {str(e)}"])
+
+    def import_bom(self, file_content: bytes, progress: Optional[ProgressCallback] = None) -> Dict:
+        """Import BOM from Excel file.
 
-    def import_bom(self, file_content: bytes) -> Dict:
-        """Import BOM from Excel file."""
+        Missing active BOM headers are created up front; lines are then
+        written in chunks - one lookup of the chunk's existing lines, one
+        bulk insert and one bulk update per chunk.
+        """
         start_time = datetime.now()
 
         try:
@@ -647,102 +561,58 @@ class MasterdataImportService:
             # Validate
             is_valid, errors = self.validate_bom_data(df)
             if not is_valid:
-                return {
-                    "success": False,
-                    "imported_count": 0,
-                    "updated_count": 0,
-                    "errors": errors,
-                    "execution_time_ms": 0
-                }
+                return _failed(errors)
+
+            article = _text(df, 'article_code')
+            component = _text(df, 'component_code')
+            products = self._product_ids(pd.concat([article, component]).unique())
+            quantity, _ = _number(df, 'quantity_required')
+            wastage, _ = _number(df, 'wastage_percent')
+
+            rows = pd.DataFrame({
+                "article_id": article.map(products).astype(int),
+                "component_id": component.map(products).astype(int),
+                "qty_needed": quantity.map(lambda value: Decimal(str(value))),
+                "wastage_percent": wastage.fillna(0).map(lambda value: Decimal(str(value))),
+            }).drop_duplicates(["article_id", "component_id"], keep="last")
+
+            headers = self._active_bom_headers(rows["article_id"].unique().tolist())
+            rows["bom_header_id"] = rows["article_id"].map(headers)
 
             imported_count = 0
             updated_count = 0
-            errors = []
-
-            # Get product mapping
-            products = {p.code: p.id for p in self.db.query(Product).all()}
 
-            # Group by article_code (BOM Header)
-            for article_code, group in df.groupby('article_code'):
-                try:
-                    article_id = products.get(str(article_code).strip())
-                    if not article_id:
-                        errors.append(f"Article '{article_code}' not found")
-                        continue
-
-                    # Check if BOM header exists
-                    bom_header = self.db.query(BOMHeader).filter(
-                        BOMHeader.product_id == article_id,
-                        BOMHeader.is_active == True
-                    ).first()
-
-                    if not bom_header:
-                        # Create new BOM header
-                        bom_header = BOMHeader(
-                            product_id=article_id,
-                            bom_type=BOMType.MANUFACTURING,
-                            qty_output=Decimal('1.0'),
-                            is_active=True,
-                            revision="Rev 1.0",
-                            revised_by=self.user_id
+            for chunk in self._chunks(rows.drop(columns="article_id"), "BOM lines", progress):
+                records = _records(chunk)
+                existing = {
+                    (header_id, component_id): detail_id
+                    for detail_id, header_id, component_id in self.db.execute(
+                        select(BOMDetail.id, BOMDetail.bom_header_id, BOMDetail.component_id).where(
+                            BOMDetail.bom_header_id.in_(set(chunk["bom_header_id"])),
+                            BOMDetail.component_id.in_(set(chunk["component_id"])),
                         )
-                        self.db.add(bom_header)
-                        self.db.flush()  # Get ID
-
-                    # Process BOM details
-                    for idx, row in group.iterrows():
-                        component_id = products.get(str(row['component_code']).strip())
-                        if not component_id:
-                            errors.append(f"Component '{row['component_code']}' not found")
-                            continue
-
-                        qty_needed = Decimal(str(row['quantity_required']))
-                        wastage = Decimal(str(row.get('wastage_percent', 0))) if not pd.isna(row.get('wastage_percent')) else Decimal('0')
-
-                        # Check if detail exists
-                        existing_detail = self.db.query(BOMDetail).filter(
-                            BOMDetail.bom_header_id == bom_header.id,
-                            BOMDetail.component_id == component_id
-                        ).first()
-
-                        if existing_detail:
-                            # UPDATE
-                            existing_detail.qty_needed = qty_needed
-                            existing_detail.wastage_percent = wastage
-                            updated_count += 1
-                        else:
-                            # INSERT
-                            detail = BOMDetail(
-                                bom_header_id=bom_header.id,
-                                component_id=component_id,
-                                qty_needed=qty_needed,
-                                wastage_percent=wastage,
-                                has_variants=False
-                            )
-                            self.db.add(detail)
-                            imported_count += 1
-
-                except Exception as e:
-                    errors.append(f"Article '{article_code}': {str(e)}")
-                    self.db.rollback()
-                    return {
-                        "success": False,
-                        "imported_count": 0,
-                        "updated_count": 0,
-                        "errors": errors,
-                        "execution_time_ms": 0
-                    }
+                    )
+                }
+
+                inserts, updates = [], []
+                for record in records:
+                    detail_id = existing.get((record["bom_header_id"], record["component_id"]))
+                    if detail_id:
+                        updates.append({"id": detail_id, "qty_needed": record["qty_needed"],
+                                        "wastage_percent": record["wastage_percent"]})
+                    else:
+                        inserts.append({**record, "has_variants": False})
+
+                if inserts:
+                    self.db.execute(insert(BOMDetail), inserts)
+                if updates:
+                    self.db.execute(update(BOMDetail), updates)
+                imported_count += len(inserts)
+                updated_count += len(updates)
 
             self.db.commit()
 
-            self.audit_logger.log_create(
-                user_id=self.user_id,
-                module="Masterdata Import",
-                action="Import BOM",
-                entity_type="BOMDetail",
-                entity_id=None,
-                changes=f"Imported {imported_count} BOM lines, Updated {updated_count} BOM lines"
-            )
+            self._log_import("BOMDetail", "BOM lines", imported_count, updated_count)
 
             execution_time = (datetime.now() - start_time).total_seconds() * 1000
 
@@ -756,10 +626,154 @@ class MasterdataImportService:
 
         except Exception as e:
             self.db.rollback()
-            return {
-                "success": False,
-                "imported_count": 0,
-                "updated_count": 0,
-                "errors": [f"Fatal error: {str(e)}"],
-                "execution_time_ms": 0
-            }
+            return _failed([f"Fatal error: {str(e)}"])
+
+    # ====================== BULK HELPERS ======================
+
+    def _log_import(self, entity_type: str, noun: str, imported_count: int, updated_count: int):
+        AuditLogger.log_action(
+            db=self.db,
+            user=self.db.get(User, self.user_id),
+            action=AuditAction.CREATE,
+            module=AuditModule.ADMIN,
+            description=f"Masterdata import: Imported {imported_count} {noun}, Updated {updated_count} {noun}",
+            entity_type=entity_type,
+            new_values={"imported_count": imported_count, "updated_count": updated_count},
+        )
+
+    def _chunks(self, rows: pd.DataFrame, label: str, progress: Optional[ProgressCallback]) -> Iterator[pd.DataFrame]:
+        """Yield chunks of rows, reporting progress once each chunk has been written."""
+        total = len(rows)
+        size = max(1, settings.MASTERDATA_IMPORT_CHUNK_SIZE)
+        for start in range(0, total, size):
+            chunk = rows.iloc[start:start + size]
+            yield chunk
+            done = start + len(chunk)
+            logger.info(f"Masterdata import {label}: {done}/{total} rows written")
+            if progress:
+                progress(done, total)
+
+    def _product_ids(self, codes) -> Dict[str, int]:
+        """code -> product id for the given codes (IN lists bounded by the chunk size)."""
+        codes = list(codes)
+        size = max(1, settings.MASTERDATA_IMPORT_CHUNK_SIZE)
+        ids = {}
+        for start in range(0, len(codes), size):
+            ids.update(self.db.execute(
+                select(Product.code, Product.id).where(Product.code.in_(codes[start:start + size]))
+            ).all())
+        return ids
+
+    def _active_bom_headers(self, article_ids: List[int]) -> Dict[int, int]:
+        """article id -> active BOM header id, creating the missing headers."""
+        headers = {}
+        for header_id, product_id in self.db.execute(
+            select(BOMHeader.id, BOMHeader.product_id)
+            .where(BOMHeader.product_id.in_(article_ids), BOMHeader.is_active == True)  # noqa: E712
+            .order_by(BOMHeader.id)
+        ):
+            headers.setdefault(product_id, header_id)
+
+        missing = [article_id for article_id in article_ids if article_id not in headers]
+        if missing:
+            new_headers = [
+                BOMHeader(
+                    product_id=article_id,
+                    bom_type=BOMType.MANUFACTURING,
+                    qty_output=Decimal('1.0'),
+                    is_active=True,
+                    revision="Rev 1.0",
+                    revised_by=self.user_id
+                )
+                for article_id in missing
+            ]
+            self.db.add_all(new_headers)
+            self.db.flush()  # Get IDs
+            headers.update((header.product_id, header.id) for header in new_headers)
+        return headers
+
+    def _upsert(self, model, records: List[Dict], conflict_columns: List[str], update_columns: List[str]):
+        """INSERT ... ON CONFLICT (conflict_columns) DO UPDATE SET update_columns."""
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            self._upsert_by_lookup(model, records, conflict_columns, update_columns)
+            return
+
+        statement = dialect_insert(model.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={column: statement.excluded[column] for column in update_columns},
+        )
+        self.db.execute(statement, records)
+
+    def _upsert_by_lookup(self, model, records: List[Dict], conflict_columns: List[str], update_columns: List[str]):
+        """Upsert without ON CONFLICT: select the existing keys, bulk insert the new rows, bulk update the rest by id."""
+        key_columns = [getattr(model, column) for column in conflict_columns]
+        keys = {tuple(record[column] for column in conflict_columns) for record in records}
+        if len(key_columns) == 1:
+            condition = key_columns[0].in_([key[0] for key in keys])
+        else:
+            condition = or_(*(and_(*(c == v for c, v in zip(key_columns, key))) for key in keys))
+        existing = {
+            tuple(row[1:]): row[0]
+            for row in self.db.execute(select(model.id, *key_columns).where(condition))
+        }
+
+        inserts, updates = [], []
+        for record in records:
+            row_id = existing.get(tuple(record[column] for column in conflict_columns))
+            if row_id:
+                updates.append({"id": row_id, **{column: record[column] for column in update_columns}})
+            else:
+                inserts.append(record)
+
+        if inserts:
+            self.db.execute(insert(model), inserts)
+        if updates:
+            self.db.execute(update(model), updates)
+
+
+# ====================== COLUMN HELPERS ======================
+
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    """Stripped string column; blank and missing cells (or a missing column) are <NA>."""
+    if column not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype="string")
+    return df[column].astype("string").str.strip().replace("", pd.NA)
+
+
+def _number(df: pd.DataFrame, column: str) -> Tuple[pd.Series, pd.Series]:
+    """(float column with NaN for empty cells, mask of filled cells that are not numbers)."""
+    text = _text(df, column)
+    numbers = pd.to_numeric(text, errors="coerce").astype("float64")
+    return numbers, text.notna() & numbers.isna()
+
+
+def _flag(errors: List[Tuple[int, str]], mask: pd.Series, message: Union[str, Callable[[int], str]]):
+    """Record message (or message(row index)) for every row where mask is set."""
+    for idx in mask.index[mask.fillna(False).astype(bool)]:
+        errors.append((idx, message(idx) if callable(message) else message))
+
+
+def _row_messages(errors: List[Tuple[int, str]]) -> List[str]:
+    """Errors as 'Row N: ...' (Excel row, header is row 1), ordered by row."""
+    return [f"Row {idx + 2}: {message}" for idx, message in sorted(errors, key=lambda error: error[0])]
+
+
+def _records(chunk: pd.DataFrame) -> List[Dict]:
+    """Chunk rows as dicts with None for missing values."""
+    return chunk.astype(object).where(chunk.notna(), None).to_dict("records")
+
+
+def _failed(errors: List[str]) -> Dict:
+    return {
+        "success": False,
+        "imported_count": 0,
+        "updated_count": 0,
+        "errors": errors,
+        "execution_time_ms": 0
+    }
@@ -17,8 +17,10 @@ from sqlalchemy import and_, or_
 
 from app.core.models.manufacturing import WorkOrder, WorkOrderStatus, SPKMaterialAllocation
 from app.core.models.bom import BOMDetail
-from app.core.models.warehouse import StockQuant, Location, StockMove, StockMoveStatus
+from app.core.models.warehouse import StockQuant, Location, LocationType, StockMove, StockMoveStatus
 from app.core.models.products import Product
+from app.services.material_shortage_service import MaterialShortageService
+from app.services.stock_reservation_service import InsufficientStockError, StockReservationService
 
 
 class MaterialShortageAlert:
@@ -190,16 +192,10 @@ class MaterialAllocationService:
         if not self.warehouse_main_location:
             return Decimal('0')
         
-        # Sum all stock quants for this material at Warehouse Main
-        total = self.db.query(func.sum(StockQuant.quantity)).filter(
-            and_(
-                StockQuant.product_id == material_id,
-                StockQuant.location_id == self.warehouse_main_location.id,
-                StockQuant.quantity > 0
-            )
-        ).scalar()
-        
-        return total or Decimal('0')
+        # On hand minus reserved over all stock quants of this material at Warehouse Main
+        return StockReservationService(self.db).available(
+            material_id, location_ids=[self.warehouse_main_location.id]
+        )
     
     def deduct_stock_on_wo_start(
         self,
@@ -293,42 +289,28 @@ class MaterialAllocationService:
         if not self.warehouse_main_location:
             return False, ["Warehouse Main location not found"]
         
-        # Get stock quants ordered by creation date (FIFO)
-        from sqlalchemy import func
-        stock_quants = self.db.query(StockQuant).filter(
-            and_(
-                StockQuant.product_id == material_id,
-                StockQuant.location_id == self.warehouse_main_location.id,
-                StockQuant.quantity > 0
+        # Take from oldest lots first (FIFO) under row locks; with force the
+        # shortfall is left to the debt entry below
+        try:
+            allocations = StockReservationService(self.db).consume(
+                material_id,
+                qty_to_deduct,
+                location_ids=[self.warehouse_main_location.id],
+                partial=force
             )
-        ).order_by(StockQuant.created_at.asc()).all()
+        except InsufficientStockError as e:
+            return False, [f"Insufficient stock: still need {e.requested - e.available} more"]
         
-        remaining_to_deduct = qty_to_deduct
-        deducted_lots = []
+        remaining_to_deduct = Decimal(str(qty_to_deduct)) - sum((a.qty for a in allocations), Decimal('0'))
         
-        # Deduct from oldest lots first (FIFO)
-        for quant in stock_quants:
-            if remaining_to_deduct <= 0:
-                break
-            
-            # Deduct from this lot
-            deduct_from_lot = min(quant.quantity, remaining_to_deduct)
-            
-            quant.quantity -= deduct_from_lot
-            remaining_to_deduct -= deduct_from_lot
-            
-            deducted_lots.append({
-                'lot_id': quant.lot_id,
-                'qty': deduct_from_lot
-            })
-            
+        for allocation in allocations:
             # Create stock move record for traceability
             self._create_stock_move(
                 product_id=material_id,
-                qty=deduct_from_lot,
+                qty=allocation.qty,
                 from_location=self.warehouse_main_location,
                 to_location=None,  # Consumed by production
-                lot_id=quant.lot_id,
+                lot_id=allocation.lot_id,
                 reference=f"WO-{wo_id}"
             )
         
@@ -342,7 +324,8 @@ class MaterialAllocationService:
                 debt_quant = StockQuant(
                     product_id=material_id,
                     location_id=self.warehouse_main_location.id,
-                    quantity=-remaining_to_deduct,
+                    qty_on_hand=-remaining_to_deduct,
+                    qty_reserved=Decimal('0'),
                     lot_id=None
                 )
                 self.db.add(debt_quant)
@@ -373,15 +356,25 @@ class MaterialAllocationService:
     ):
         """Create stock move record for traceability"""
         
+        # Consumption goes to the production floor
+        destination = to_location or self.db.query(Location).filter(
+            Location.type == LocationType.PRODUCTION
+        ).order_by(Location.id).first()
+        if not from_location or not destination:
+            print(f"      ⚠️ No stock move for {reference}: source / production location missing")
+            return
+        
+        product = self.db.query(Product).filter_by(id=product_id).first()
         move = StockMove(
             product_id=product_id,
-            quantity=qty,
-            source_location_id=from_location.id if from_location else None,
-            destination_location_id=to_location.id if to_location else None,
+            qty=qty,
+            uom=product.uom.value if product and product.uom else 'Pcs',
+            location_id_from=from_location.id,
+            location_id_to=destination.id,
             lot_id=lot_id,
-            reference=reference,
-            status=StockMoveStatus.DONE,
-            move_date=datetime.utcnow()
+            reference_doc=reference,
+            state=StockMoveStatus.DONE,
+            date=datetime.utcnow()
         )
         
         self.db.add(move)
@@ -395,6 +388,9 @@ class MaterialAllocationService:
         """
         Get material shortage alerts with filtering
         
+        Reads the material shortage index: one alert per material and WO,
+        most severe first.
+        
         Args:
             mo_id: Filter by Manufacturing Order
             department: Filter by department
@@ -404,54 +400,25 @@ class MaterialAllocationService:
             List of MaterialShortageAlert objects
         """
         
-        from app.core.models.manufacturing import ManufacturingOrder
-        
-        # Get all WOs
-        query = self.db.query(WorkOrder)
-        
-        if mo_id:
-            query = query.filter_by(mo_id=mo_id)
-        
-        if department:
-            query = query.filter_by(department=department)
-        
-        work_orders = query.all()
-        
-        all_alerts = []
+        rows = MaterialShortageService(self.db).alerts(
+            mo_id=mo_id,
+            department=department,
+            severity=severity
+        )
         
-        for wo in work_orders:
-            # Get allocations
-            allocations = self.db.query(SPKMaterialAllocation).filter_by(
-                wo_id=wo.id,
-                is_consumed=False
-            ).all()
-            
-            for allocation in allocations:
-                available = self._get_available_stock(allocation.material_id)
-                
-                if available < allocation.qty_allocated:
-                    material = self.db.query(Product).filter_by(id=allocation.material_id).first()
-                    
-                    alert = MaterialShortageAlert(
-                        material_id=allocation.material_id,
-                        material_code=material.code if material else "UNKNOWN",
-                        material_name=material.name if material else "Unknown",
-                        required_qty=allocation.qty_allocated,
-                        available_qty=available,
-                        shortage_qty=allocation.qty_allocated - available,
-                        wo_id=wo.id,
-                        department=wo.department.value
-                    )
-                    
-                    # Filter by severity
-                    if severity is None or alert.severity == severity:
-                        all_alerts.append(alert)
-        
-        # Sort by severity (CRITICAL first)
-        severity_order = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
-        all_alerts.sort(key=lambda x: severity_order.get(x.severity, 99))
-        
-        return all_alerts
+        return [
+            MaterialShortageAlert(
+                material_id=row.material_id,
+                material_code=row.material_code,
+                material_name=row.material_name,
+                required_qty=row.required_qty,
+                available_qty=row.available_qty,
+                shortage_qty=row.shortage_qty,
+                wo_id=row.wo_id,
+                department=row.department.value
+            )
+            for row in rows
+        ]
     
     def check_wo_can_start(self, wo: WorkOrder) -> Tuple[bool, List[str]]:
         """
@@ -0,0 +1,313 @@
+"""
+Material Shortage Service
+Location: app/services/material_shortage_service.py
+
+Maintains `material_shortages` - one row per (material, work order) whose
+open (unconsumed) SPK allocations exceed the stock available at Warehouse
+Main - behind the shortage alert and summary endpoints.
+
+- Writers: allocation and stock changes through SPKMaterialAllocation /
+  StockQuant objects, and WorkOrder department / MO reassignments. Session
+  hooks note the materials touched by a flush and, after it, recompute
+  their rows on the SAME connection and transaction with one
+  DELETE + INSERT ... SELECT that joins open allocations (summed per WO) to
+  available stock (summed per material). On PostgreSQL each material is
+  first locked with a transaction advisory lock, in material id order, so
+  concurrent recomputes of one material serialize and the later one sees
+  the earlier's committed rows.
+- Readers: severity / department / MO filters, ordering and the summary
+  aggregates are SQL over the index; nothing is computed per allocation.
+- `rebuild()` recomputes the whole index (see
+  scripts/rebuild_material_shortages.py). Run it after SQL that bypasses
+  the ORM or after renaming the Warehouse Main location.
+"""
+
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import Integer, case, delete, event, func, insert, inspect, literal, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.models.manufacturing import Department, MaterialShortage, SPKMaterialAllocation, WorkOrder
+from app.core.models.products import Product
+from app.core.models.warehouse import Location, LocationType, StockQuant
+
+# (severity, minimum shortage % of the required qty) - as MaterialShortageAlert
+SEVERITY_LEVELS = [("CRITICAL", 50), ("HIGH", 20), ("MEDIUM", 5), ("LOW", 0)]
+
+# material_shortages columns filled by shortage_select(), in select order
+SHORTAGE_COLUMNS = [
+    "material_id", "wo_id", "mo_id", "department", "required_qty", "available_qty",
+    "shortage_qty", "severity", "severity_rank",
+]
+
+# Key space of the pg_advisory_xact_lock(int, int) locks taken per material
+_ADVISORY_LOCK_CLASS = 24001
+
+_SESSION_KEYS = "material_shortage_keys"
+
+
+def warehouse_main_location_id():
+    """Scalar subquery: the location MaterialAllocationService draws stock from"""
+    return (
+        select(Location.id)
+        .where(Location.name.like('%Warehouse Main%'), Location.type == LocationType.INTERNAL)
+        .order_by(Location.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def shortage_select(material_ids: Optional[Iterable[int]] = None):
+    """Shortage rows (material_shortages columns) for `material_ids` (all materials if None)"""
+    open_allocations = (
+        select(
+            SPKMaterialAllocation.material_id,
+            SPKMaterialAllocation.wo_id,
+            func.sum(SPKMaterialAllocation.qty_allocated).label("required"),
+        )
+        .where(SPKMaterialAllocation.is_consumed.is_(False))
+        .group_by(SPKMaterialAllocation.material_id, SPKMaterialAllocation.wo_id)
+    )
+    available = StockQuant.qty_on_hand - StockQuant.qty_reserved
+    stock = (
+        select(StockQuant.product_id, func.sum(available).label("available"))
+        .where(StockQuant.location_id == warehouse_main_location_id(), available > 0)
+        .group_by(StockQuant.product_id)
+    )
+    if material_ids is not None:
+        material_ids = list(material_ids)
+        open_allocations = open_allocations.where(SPKMaterialAllocation.material_id.in_(material_ids))
+        stock = stock.where(StockQuant.product_id.in_(material_ids))
+    open_allocations, stock = open_allocations.subquery(), stock.subquery()
+
+    required = open_allocations.c.required
+    available_qty = func.coalesce(stock.c.available, 0)
+    shortage = required - available_qty
+    return (
+        select(
+            open_allocations.c.material_id,
+            open_allocations.c.wo_id,
+            WorkOrder.mo_id,
+            WorkOrder.department,
+            required,
+            available_qty,
+            shortage,
+            _severity(shortage, required),
+            _severity(shortage, required, rank=True),
+        )
+        .join(WorkOrder, WorkOrder.id == open_allocations.c.wo_id)
+        .outerjoin(stock, stock.c.product_id == open_allocations.c.material_id)
+        .where(required > 0, available_qty < required)
+    )
+
+
+def _severity(shortage, required, rank: bool = False):
+    """CASE over SEVERITY_LEVELS giving the severity (or its rank) of a shortage"""
+    def value(level: int):
+        return literal(level, Integer) if rank else literal(SEVERITY_LEVELS[level][0])
+
+    return case(
+        *[
+            (shortage * 100 >= required * minimum, value(level))
+            for level, (_, minimum) in enumerate(SEVERITY_LEVELS[:-1])
+        ],
+        else_=value(len(SEVERITY_LEVELS) - 1),
+    )
+
+
+def refresh_shortages(connection: Connection, material_ids: Iterable[int]):
+    """Recompute the index rows of `material_ids` from allocations and stock_quants"""
+    material_ids = sorted(set(material_ids))
+    if not material_ids:
+        return
+    if connection.dialect.name == "postgresql":
+        for material_id in material_ids:
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:lock_class, :material_id)"),
+                {"lock_class": _ADVISORY_LOCK_CLASS, "material_id": material_id},
+            )
+    connection.execute(delete(MaterialShortage).where(MaterialShortage.material_id.in_(material_ids)))
+    connection.execute(insert(MaterialShortage).from_select(SHORTAGE_COLUMNS, shortage_select(material_ids)))
+
+
+# ----------------------------------------------------------------------
+# Session hooks
+# ----------------------------------------------------------------------
+def collect_shortage_keys(session: Session, flush_context, instances):
+    """before_flush hook: materials (and WOs) of changed / deleted rows as they were before the flush"""
+    keys = None
+    with session.no_autoflush:
+        for obj in chain(session.dirty, session.deleted):
+            if isinstance(obj, SPKMaterialAllocation):
+                material_ids = {obj.material_id, _previous(obj, "material_id")}
+            elif isinstance(obj, StockQuant):
+                material_ids = {obj.product_id, _previous(obj, "product_id")}
+            elif isinstance(obj, WorkOrder) and (obj in session.deleted or _changed(obj, "department", "mo_id")):
+                keys = keys if keys is not None else session.info.setdefault(_SESSION_KEYS, set())
+                keys.add(("wo", obj.id))
+                continue
+            else:
+                continue
+            keys = keys if keys is not None else session.info.setdefault(_SESSION_KEYS, set())
+            keys.update(("material", material_id) for material_id in material_ids if material_id is not None)
+
+
+def refresh_flushed_shortages(session: Session, flush_context):
+    """after_flush hook: recompute every material touched by this flush, in its transaction"""
+    keys: Set = session.info.pop(_SESSION_KEYS, None) or set()
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, SPKMaterialAllocation):
+            keys.add(("material", obj.material_id))
+        elif isinstance(obj, StockQuant):
+            keys.add(("material", obj.product_id))
+    if not keys:
+        return
+
+    connection = session.connection()
+    material_ids = {key for kind, key in keys if kind == "material" and key is not None}
+    wo_ids = [key for kind, key in keys if kind == "wo"]
+    if wo_ids:
+        material_ids.update(connection.scalars(
+            select(SPKMaterialAllocation.material_id).where(SPKMaterialAllocation.wo_id.in_(wo_ids)).distinct()
+        ))
+        material_ids.update(connection.scalars(
+            select(MaterialShortage.material_id).where(MaterialShortage.wo_id.in_(wo_ids)).distinct()
+        ))
+    refresh_shortages(connection, material_ids)
+
+
+def discard_session_keys(session: Session, *args):
+    """after_soft_rollback hook: nothing of a rolled-back flush is applied"""
+    session.info.pop(_SESSION_KEYS, None)
+
+
+def _previous(obj, attribute: str):
+    history = inspect(obj).attrs[attribute].history
+    return history.deleted[0] if history.deleted else None
+
+
+def _changed(obj, *attributes: str) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[attribute].history.has_changes() for attribute in attributes)
+
+
+_session_hooks_installed = False
+
+
+def install_session_hooks():
+    """Register the shortage index hooks on every Session once per process."""
+    global _session_hooks_installed
+    if _session_hooks_installed:
+        return
+    event.listen(Session, "before_flush", collect_shortage_keys)
+    event.listen(Session, "after_flush", refresh_flushed_shortages)
+    event.listen(Session, "after_soft_rollback", discard_session_keys)
+    _session_hooks_installed = True
+
+
+class MaterialShortageService:
+    """Reads and reconciliation of the material shortage index"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def alerts(
+        self,
+        mo_id: Optional[int] = None,
+        department: Optional[str] = None,
+        severity: Optional[str] = None
+    ) -> List[Any]:
+        """Shortage rows with material and WO details, most severe first"""
+        query = (
+            select(
+                MaterialShortage.material_id,
+                Product.code.label("material_code"),
+                Product.name.label("material_name"),
+                MaterialShortage.required_qty,
+                MaterialShortage.available_qty,
+                MaterialShortage.shortage_qty,
+                MaterialShortage.wo_id,
+                WorkOrder.wo_number,
+                MaterialShortage.mo_id,
+                MaterialShortage.department,
+                MaterialShortage.severity,
+            )
+            .join(Product, Product.id == MaterialShortage.material_id)
+            .join(WorkOrder, WorkOrder.id == MaterialShortage.wo_id)
+            .where(*self._filters(mo_id, department, severity))
+            .order_by(MaterialShortage.severity_rank, MaterialShortage.shortage_qty.desc(),
+                      MaterialShortage.material_id, MaterialShortage.wo_id)
+        )
+        return self.db.execute(query).all()
+
+    def summary(self, top: int = 10) -> Dict[str, Any]:
+        """Shortage counts by severity and department, and the materials short the most"""
+        by_severity = dict(self.db.execute(
+            select(MaterialShortage.severity, func.count())
+            .group_by(MaterialShortage.severity, MaterialShortage.severity_rank)
+            .order_by(MaterialShortage.severity_rank)
+        ).all())
+        by_department = {
+            department.value: count
+            for department, count in self.db.execute(
+                select(MaterialShortage.department, func.count()).group_by(MaterialShortage.department)
+            )
+        }
+        total_shortage = func.sum(MaterialShortage.shortage_qty)
+        top_materials = [
+            {
+                "material_code": row.code,
+                "material_name": row.name,
+                "total_shortage": float(row.total_shortage),
+                "wo_count": row.wo_count,
+            }
+            for row in self.db.execute(
+                select(Product.code, Product.name, total_shortage.label("total_shortage"),
+                       func.count().label("wo_count"))
+                .join(Product, Product.id == MaterialShortage.material_id)
+                .group_by(Product.id, Product.code, Product.name)
+                .order_by(total_shortage.desc(), Product.code)
+                .limit(top)
+            )
+        ]
+        return {
+            "total_shortages": sum(by_severity.values()),
+            "by_severity": by_severity,
+            "by_department": by_department,
+            "top_10_materials": top_materials,
+            "has_critical": by_severity.get("CRITICAL", 0) > 0,
+        }
+
+    @staticmethod
+    def _filters(mo_id, department, severity) -> list:
+        filters = []
+        if mo_id:
+            filters.append(MaterialShortage.mo_id == mo_id)
+        if department:
+            filters.append(MaterialShortage.department == _department(department))
+        if severity:
+            filters.append(MaterialShortage.severity == severity.upper())
+        return filters
+
+    # ------------------------------------------------------------------
+    # Reconciliation (caller commits)
+    # ------------------------------------------------------------------
+    def rebuild(self) -> int:
+        """Recompute the whole index; returns the number of shortage rows"""
+        connection = self.db.connection()
+        connection.execute(delete(MaterialShortage))
+        result = connection.execute(insert(MaterialShortage).from_select(SHORTAGE_COLUMNS, shortage_select()))
+        return result.rowcount
+
+
+def _department(value: str):
+    """Department filter given as member name (CUTTING) or value (Cutting)"""
+    for department in Department:
+        if value.upper() in (department.name, department.value.upper()):
+            return department
+    return value
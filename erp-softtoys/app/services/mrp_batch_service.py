@@ -0,0 +1,257 @@
+"""
+Batch MRP Service - net material requirements for many MOs in one pass
+Location: app/services/mrp_batch_service.py
+
+PPIC morning run: take a set of Manufacturing Orders (explicit ids or a
+planning week), explode all their BOMs together and net the gross
+requirements against on-hand stock and open Purchase Orders in memory.
+
+Query budget is fixed regardless of the number of MOs / BOM lines:
+    1 query  - the MOs
+    3 queries - BOM graph of every article (BOMExplosionEngine.load)
+    1 query  - available stock per material (grouped StockQuant sum)
+    1 query  - open POs (line items in extra_metadata["items"])
+
+Allocation is greedy in MO priority order (planned production date, then
+id): on-hand stock first, then incoming PO quantity; what is left is the
+MO's shortage. Suggested POs cover the total net shortage plus the
+material's safety stock (Product.min_stock).
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.models.manufacturing import ManufacturingOrder, MOState
+from app.core.models.warehouse import Location, LocationType, POStatus, PurchaseOrder, StockQuant
+from app.services.bom_explosion_engine import BOMExplosionEngine
+
+ZERO = Decimal("0")
+
+# MOs that still need material
+PLANNABLE_MO_STATES = (MOState.DRAFT, MOState.IN_PROGRESS)
+# POs whose quantity has not reached the warehouse yet
+OPEN_PO_STATUSES = (POStatus.DRAFT, POStatus.SENT)
+
+
+def _decimal(value) -> Decimal:
+    if value is None:
+        return ZERO
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+class BatchMRPService:
+    """
+    Batch material requirements planning over many MOs
+
+    Usage:
+        service = BatchMRPService(db)
+        result = service.run(week="W07")
+        result = service.run(mo_ids=[101, 102, 103])
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.engine = BOMExplosionEngine(db)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def run(
+        self,
+        mo_ids: Optional[Iterable[int]] = None,
+        week: Optional[str] = None,
+        include_draft_po: bool = True
+    ) -> Dict:
+        """
+        Run MRP for the given MOs or planning week
+
+        Args:
+            mo_ids: Manufacturing Order ids to plan
+            week: Planning week (ManufacturingOrder.week), used when mo_ids is empty
+            include_draft_po: Count DRAFT POs as incoming supply (SENT always counts)
+
+        Returns:
+            Dict with per-MO allocations, shortages and suggested POs
+        """
+        mos = self._load_mos(mo_ids, week)
+        if not mos:
+            return self._empty_result(week)
+
+        self.engine.load({mo.product_id for mo in mos})
+
+        # Gross requirements per MO (order preserved = allocation priority)
+        requirements = [(mo, self.engine.material_totals(mo.product_id, self._mo_quantity(mo))) for mo in mos]
+        gross: Dict[int, Decimal] = defaultdict(lambda: ZERO)
+        for _, totals in requirements:
+            for material_id, qty in totals.items():
+                gross[material_id] += qty
+
+        on_hand = self._available_stock(gross.keys())
+        on_order = self._open_po_quantities(gross.keys(), include_draft_po)
+
+        remaining_stock = dict(on_hand)
+        remaining_po = dict(on_order)
+        allocations = []
+        shortages = []
+
+        for mo, totals in requirements:
+            for material_id, required in sorted(totals.items()):
+                from_stock = min(required, max(remaining_stock.get(material_id, ZERO), ZERO))
+                remaining_stock[material_id] = remaining_stock.get(material_id, ZERO) - from_stock
+                from_po = min(required - from_stock, max(remaining_po.get(material_id, ZERO), ZERO))
+                remaining_po[material_id] = remaining_po.get(material_id, ZERO) - from_po
+                shortage = required - from_stock - from_po
+
+                material = self.engine.products[material_id]
+                allocations.append({
+                    "mo_id": mo.id,
+                    "batch_number": mo.batch_number,
+                    "material_id": material_id,
+                    "material_code": material.code,
+                    "required_qty": float(required),
+                    "allocated_from_stock": float(from_stock),
+                    "allocated_from_po": float(from_po),
+                    "shortage_qty": float(shortage),
+                })
+                if shortage > 0:
+                    shortages.append({
+                        "mo_id": mo.id,
+                        "batch_number": mo.batch_number,
+                        "material_id": material_id,
+                        "material_code": material.code,
+                        "material_name": material.name,
+                        "required_qty": float(required),
+                        "shortage_qty": float(shortage),
+                        "severity": self._severity(shortage, required),
+                    })
+
+        materials = []
+        suggested_pos = []
+        for material_id in sorted(gross):
+            material = self.engine.products[material_id]
+            net = gross[material_id] - on_hand.get(material_id, ZERO) - on_order.get(material_id, ZERO)
+            safety_stock = _decimal(material.min_stock)
+            materials.append({
+                "material_id": material_id,
+                "material_code": material.code,
+                "material_name": material.name,
+                "uom": material.uom.value if material.uom else None,
+                "gross_requirement": float(gross[material_id]),
+                "on_hand": float(on_hand.get(material_id, ZERO)),
+                "on_order": float(on_order.get(material_id, ZERO)),
+                "net_requirement": float(max(net, ZERO)),
+            })
+            suggested_qty = net + safety_stock
+            if suggested_qty > 0:
+                suggested_pos.append({
+                    "material_id": material_id,
+                    "material_code": material.code,
+                    "material_name": material.name,
+                    "uom": material.uom.value if material.uom else None,
+                    "suggested_qty": float(suggested_qty),
+                    "net_shortage": float(max(net, ZERO)),
+                    "safety_stock": float(safety_stock),
+                })
+
+        return {
+            "week": week,
+            "mo_count": len(mos),
+            "mo_ids": [mo.id for mo in mos],
+            "material_count": len(gross),
+            "materials": materials,
+            "allocations": allocations,
+            "shortages": shortages,
+            "suggested_pos": suggested_pos,
+            "has_shortages": len(shortages) > 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Bulk loaders
+    # ------------------------------------------------------------------
+    def _load_mos(self, mo_ids: Optional[Iterable[int]], week: Optional[str]) -> List[ManufacturingOrder]:
+        query = self.db.query(ManufacturingOrder).filter(ManufacturingOrder.state.in_(PLANNABLE_MO_STATES))
+        ids = list(mo_ids or [])
+        if ids:
+            query = query.filter(ManufacturingOrder.id.in_(ids))
+        elif week:
+            query = query.filter(ManufacturingOrder.week == week)
+        else:
+            raise ValueError("Either mo_ids or week is required")
+        return query.order_by(
+            ManufacturingOrder.planned_production_date.is_(None),
+            ManufacturingOrder.planned_production_date,
+            ManufacturingOrder.id
+        ).all()
+
+    def _available_stock(self, material_ids: Iterable[int]) -> Dict[int, Decimal]:
+        """On-hand minus reserved quantity per material in internal locations"""
+        ids = list(material_ids)
+        if not ids:
+            return {}
+        rows = self.db.query(
+            StockQuant.product_id,
+            func.sum(func.coalesce(StockQuant.qty_on_hand, 0) - func.coalesce(StockQuant.qty_reserved, 0))
+        ).join(Location, StockQuant.location_id == Location.id).filter(
+            StockQuant.product_id.in_(ids),
+            Location.type == LocationType.INTERNAL
+        ).group_by(StockQuant.product_id).all()
+        return {product_id: _decimal(qty) for product_id, qty in rows}
+
+    def _open_po_quantities(self, material_ids: Iterable[int], include_draft_po: bool) -> Dict[int, Decimal]:
+        """Incoming quantity per material from open POs' line items"""
+        wanted = set(material_ids)
+        statuses = OPEN_PO_STATUSES if include_draft_po else (POStatus.SENT,)
+        totals: Dict[int, Decimal] = defaultdict(lambda: ZERO)
+        for (metadata,) in self.db.query(PurchaseOrder.extra_metadata).filter(PurchaseOrder.status.in_(statuses)):
+            for item in (metadata or {}).get("items", []):
+                try:
+                    product_id = int(item.get("product_id"))
+                except (TypeError, ValueError):
+                    continue
+                if product_id in wanted:
+                    totals[product_id] += _decimal(item.get("quantity"))
+        return dict(totals)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _mo_quantity(mo: ManufacturingOrder) -> Decimal:
+        """Production quantity (target + buffer), falling back to qty_planned"""
+        return _decimal(mo.production_quantity) or _decimal(mo.qty_planned)
+
+    @staticmethod
+    def _severity(shortage: Decimal, required: Decimal) -> str:
+        # Same thresholds as MaterialShortageAlert
+        shortage_pct = (shortage / required) * 100 if required else Decimal("100")
+        if shortage_pct >= 50:
+            return "CRITICAL"
+        elif shortage_pct >= 20:
+            return "HIGH"
+        elif shortage_pct >= 5:
+            return "MEDIUM"
+        return "LOW"
+
+    @staticmethod
+    def _empty_result(week: Optional[str]) -> Dict:
+        return {
+            "week": week,
+            "mo_count": 0,
+            "mo_ids": [],
+            "material_count": 0,
+            "materials": [],
+            "allocations": [],
+            "shortages": [],
+            "suggested_pos": [],
+            "has_shortages": False,
+        }
+
+
+def run_batch_mrp(db: Session, mo_ids: Optional[List[int]] = None, week: Optional[str] = None,
+                  include_draft_po: bool = True) -> Dict:
+    """Helper for API endpoints"""
+    return BatchMRPService(db).run(mo_ids=mo_ids, week=week, include_draft_po=include_draft_po)
@@ -4,12 +4,15 @@ Business logic for pallet-based packing and validation
 
 from datetime import datetime
 from decimal import Decimal
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
+from app.core.barcode_index import barcode_index
 from app.core.models.products import Product, ProductType
 from app.core.models.warehouse import PurchaseOrder, PalletBarcode, PalletStatus, Location
 from app.core.models.manufacturing import WorkOrder
+from app.services.sequence_service import next_sequence
 from app.schemas.pallet import (
     PalletSpecsResponse,
     POPalletCalculationRequest,
@@ -280,24 +283,20 @@ class PalletService:
         Format: PLT-YYYY-XXXXX
         Example: PLT-2026-00001
         """
-        current_year = datetime.now().year
-        
-        # Get last barcode for current year
-        last_pallet = (
-            self.db.query(PalletBarcode)
-            .filter(PalletBarcode.barcode.like(f"PLT-{current_year}-%"))
-            .order_by(PalletBarcode.id.desc())
-            .first()
+        current_year = str(datetime.now().year)
+        seq = next_sequence(
+            self.db, "PLT", current_year,
+            seed=lambda conn: self._last_pallet_sequence(conn, current_year)
         )
+        return f"PLT-{current_year}-{seq:05d}"
 
-        if last_pallet:
-            # Extract sequence number
-            last_seq = int(last_pallet.barcode.split("-")[-1])
-            new_seq = last_seq + 1
-        else:
-            new_seq = 1
-
-        return f"PLT-{current_year}-{new_seq:05d}"
+    @staticmethod
+    def _last_pallet_sequence(conn, year: str) -> int:
+        """Highest PLT-YYYY sequence in use (seeds the counter once per year)."""
+        last_barcode = conn.execute(
+            select(func.max(PalletBarcode.barcode)).where(PalletBarcode.barcode.like(f"PLT-{year}-%"))
+        ).scalar()
+        return int(last_barcode.rsplit("-", 1)[-1]) if last_barcode else 0
 
     def create_pallet_barcode(
         self, request: PalletBarcodeCreate
@@ -384,12 +383,10 @@ class PalletService:
             HTTPException 400: Pallet already received
             HTTPException 404: Location not found
         """
-        # Get pallet
-        pallet = (
-            self.db.query(PalletBarcode)
-            .filter(PalletBarcode.barcode == request.pallet_barcode)
-            .first()
-        )
+        # Resolve barcode from the index, then lock the pallet row by id
+        # (status is never taken from the index - a second scan must see RECEIVED)
+        entry = barcode_index.pallet(self.db, request.pallet_barcode)
+        pallet = self.db.get(PalletBarcode, entry.id, with_for_update=True) if entry else None
         if not pallet:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -403,7 +400,7 @@ class PalletService:
             )
 
         # Get location
-        location = self.db.query(Location).filter(Location.id == request.location_id).first()
+        location = self.db.get(Location, request.location_id)
         if not location:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -411,23 +408,25 @@ class PalletService:
             )
 
         # Update pallet status
+        received_at = datetime.now()
         pallet.status = PalletStatus.RECEIVED
         pallet.location_id = request.location_id
-        pallet.received_at = datetime.now()
+        pallet.received_at = received_at
+        location_name = location.name
 
         self.db.commit()
-        self.db.refresh(pallet)
 
-        product = self.db.query(Product).filter(Product.id == pallet.product_id).first()
+        # Response built from the index entries - nothing to reload after commit
+        product = barcode_index.product_by_id(self.db, entry.product_id)
 
         return FGPalletReceiveResponse(
-            pallet_barcode=pallet.barcode,
-            status=pallet.status.value,
+            pallet_barcode=entry.barcode,
+            status=PalletStatus.RECEIVED.value,
             product_code=product.code,
             product_name=product.name,
-            carton_count=pallet.carton_count,
-            total_pcs=pallet.total_pcs,
-            location_name=location.name,
-            received_at=pallet.received_at,
-            message=f"✅ Received 1 pallet ({pallet.carton_count} cartons / {pallet.total_pcs} pcs)"
+            carton_count=entry.carton_count,
+            total_pcs=entry.total_pcs,
+            location_name=location_name,
+            received_at=received_at,
+            message=f"✅ Received 1 pallet ({entry.carton_count} cartons / {entry.total_pcs} pcs)"
         )
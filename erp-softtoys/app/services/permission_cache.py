@@ -0,0 +1,207 @@
+"""
+Permission Cache (two-tier)
+Location: app/services/permission_cache.py
+
+Caches each user's *full* effective permission set so a `require_permission`
+check is a dictionary lookup instead of a Redis round-trip or a DB join.
+
+Tier 1 - per-worker LRU (`LocalPermissionCache`): bounded, short TTL,
+         no network hop.
+Tier 2 - Redis (`pbac:user:{id}:permset`): shared between workers, longer
+         TTL, filled on a local miss.
+
+Invalidation: `publish_invalidation()` deletes the Redis entries and
+publishes on the `pbac:invalidate` channel; every worker runs a
+`PermissionInvalidationSubscriber` that evicts matching local entries (the
+permission sets and the user identity cache), so a revocation reaches all
+workers within the pub/sub latency. Without Redis the local TTL bounds how
+long a stale grant can survive.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from prometheus_client import Counter
+
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "pbac:invalidate"
+
+PERMISSION_CACHE_LOOKUPS = Counter(
+    'permission_cache_lookups_total',
+    'Permission set lookups by cache tier that answered',
+    ['tier'],  # local, redis, computed
+    registry=registry
+)
+
+
+def permset_cache_key(user_id: int) -> str:
+    """Redis key holding a user's serialized permission set."""
+    return f"pbac:user:{user_id}:permset"
+
+
+@dataclass(frozen=True)
+class UserPermissionSet:
+    """Effective permissions of one user at one role"""
+    user_id: int
+    role: str
+    allow_all: bool = False
+    grants: frozenset = field(default_factory=frozenset)  # {(MODULE, PERMISSION)}
+
+    def allows(self, module_name: str | None, permission_name: str | None) -> bool:
+        if self.allow_all:
+            return True
+        if not module_name or not permission_name:
+            return False
+        return (module_name, permission_name) in self.grants
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "user_id": self.user_id,
+            "role": self.role,
+            "allow_all": self.allow_all,
+            "grants": sorted(list(g) for g in self.grants),
+        })
+
+    @classmethod
+    def from_json(cls, payload: str | bytes) -> "UserPermissionSet":
+        data = json.loads(payload)
+        return cls(
+            user_id=data["user_id"],
+            role=data["role"],
+            allow_all=data.get("allow_all", False),
+            grants=frozenset(tuple(g) for g in data.get("grants", [])),
+        )
+
+
+class LocalPermissionCache:
+    """Thread-safe LRU of UserPermissionSet with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, tuple[float, UserPermissionSet]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> UserPermissionSet | None:
+        with self._lock:
+            item = self._entries.get(user_id)
+            if item is None:
+                return None
+            expires_at, perm_set = item
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return perm_set
+
+    def put(self, perm_set: UserPermissionSet):
+        with self._lock:
+            self._entries[perm_set.user_id] = (time.monotonic() + self.ttl_seconds, perm_set)
+            self._entries.move_to_end(perm_set.user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def invalidate_role(self, role: str):
+        with self._lock:
+            for user_id in [uid for uid, (_, ps) in self._entries.items() if ps.role == role]:
+                del self._entries[user_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def apply_invalidation(self, message: dict):
+        """Apply one `pbac:invalidate` message ({user_id}, {role} or {all})."""
+        if message.get("all"):
+            self.clear()
+        elif message.get("role") is not None:
+            self.invalidate_role(message["role"])
+        elif message.get("user_id") is not None:
+            self.invalidate_user(int(message["user_id"]))
+
+
+def publish_invalidation(redis_client, local_caches, message: dict):
+    """Evict from this worker's caches, drop the shared Redis entry and notify other workers."""
+    for cache in local_caches:
+        cache.apply_invalidation(message)
+    if not redis_client:
+        return
+    try:
+        if message.get("user_id") is not None:
+            user_id = int(message["user_id"])
+            redis_client.delete(permset_cache_key(user_id), f"pbac:user:{user_id}:all_perms")
+        else:
+            # Role-wide / global changes: drop every shared permission set
+            keys = list(redis_client.scan_iter(match="pbac:user:*:permset", count=500))
+            if keys:
+                redis_client.delete(*keys)
+        redis_client.publish(INVALIDATION_CHANNEL, json.dumps(message))
+    except Exception as e:
+        logger.warning(f"Permission invalidation publish failed: {e}")
+
+
+class PermissionInvalidationSubscriber:
+    """Daemon thread applying `pbac:invalidate` messages to this worker's caches"""
+
+    def __init__(self, redis_client, local_caches, reconnect_delay: float = 1.0):
+        self.redis_client = redis_client
+        self.local_caches = tuple(local_caches)
+        self.reconnect_delay = reconnect_delay
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pbac-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Messages may have been missed while disconnected
+                self._clear_all()
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        payload = json.loads(message["data"])
+                        for cache in self.local_caches:
+                            cache.apply_invalidation(payload)
+            except Exception as e:
+                logger.warning(f"Permission invalidation subscriber error: {e}")
+                self._clear_all()
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _clear_all(self):
+        for cache in self.local_caches:
+            cache.clear()
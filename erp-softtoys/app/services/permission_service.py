@@ -1,6 +1,6 @@
 """Permission Service for PBAC (Permission-Based Access Control)
-Provides efficient permission checking with Redis caching
-and role hierarchy support.
+Provides efficient permission checking with a two-tier cache
+(per-worker LRU + Redis, pub/sub invalidation) and role hierarchy support.
 
 Session 13.1 - Week 3: PBAC Implementation
 """
@@ -12,10 +12,23 @@ import redis
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.identity_cache import user_identity_cache
 from app.core.models.users import User, UserRole  # pylint: disable=import-error
+from app.services.permission_cache import (
+    PERMISSION_CACHE_LOOKUPS,
+    LocalPermissionCache,
+    PermissionInvalidationSubscriber,
+    UserPermissionSet,
+    permset_cache_key,
+    publish_invalidation,
+)
 
 logger = logging.getLogger(__name__)
 
+# Roles that bypass every permission check
+BYPASS_ROLES = (UserRole.SUPERADMIN, UserRole.DEVELOPER, UserRole.ADMIN, UserRole.MANAGER)
+
 
 class PermissionService:
     """Centralized permission checking service with caching
@@ -30,7 +43,14 @@ class PermissionService:
 
         """
         self.redis_client = redis_client
-        self.cache_ttl = 300  # 5 minutes cache TTL
+        self.cache_ttl = settings.PERMISSION_CACHE_REDIS_TTL_SECONDS  # Shared (Redis) tier
+        self.local_cache = LocalPermissionCache(
+            max_entries=settings.PERMISSION_CACHE_MAX_USERS,
+            ttl_seconds=settings.PERMISSION_CACHE_LOCAL_TTL_SECONDS,
+        )
+        # Caches evicted together on invalidation (this worker + pub/sub)
+        self.local_caches = (self.local_cache, user_identity_cache)
+        self._resolved_codes: dict[str, tuple[str | None, str | None]] = {}
 
         # Role hierarchy: higher roles inherit from lower roles
         # 22 roles total (Session 13.1 - PBAC Implementation)
@@ -86,46 +106,66 @@ class PermissionService:
             UserRole.SECURITY: [UserRole.SECURITY]
         }
 
-    def _get_cache_key(self, user_id: int, permission_code: str) -> str:
-        """Generate Redis cache key for permission check."""
-        return f"pbac:user:{user_id}:perm:{permission_code}"
-
     def _get_user_permissions_cache_key(self, user_id: int) -> str:
         """Generate Redis cache key for user's all permissions."""
         return f"pbac:user:{user_id}:all_perms"
 
-    def _check_cache(self, cache_key: str) -> bool | None:
-        """Check Redis cache for permission result.
+    # ------------------------------------------------------------------
+    # Permission sets (two-tier cache)
+    # ------------------------------------------------------------------
+    def build_permission_set(self, user: User) -> UserPermissionSet:
+        """Compute a user's effective permission set from ROLE_PERMISSIONS."""
+        from app.core.permissions import ROLE_PERMISSIONS  # pylint: disable=import-error
+
+        user_role = UserRole(user.role)  # type: ignore[arg-type]
+        if user_role in BYPASS_ROLES:
+            return UserPermissionSet(user_id=int(user.id), role=user_role.value, allow_all=True)
+
+        grants = frozenset(
+            (module.name, permission.name)
+            for module, permissions in ROLE_PERMISSIONS.get(user_role, {}).items()  # type: ignore[call-overload]
+            for permission in permissions
+        )
+        return UserPermissionSet(user_id=int(user.id), role=user_role.value, grants=grants)
 
-        Returns:
-            True if allowed, False if denied, None if not cached
+    def get_user_permission_set(self, user: User, use_cache: bool = True) -> UserPermissionSet:
+        """Permission set for a user: local LRU, then Redis, then computed.
 
+        Entries whose role differs from the user's current role are stale
+        (role changed) and are recomputed.
         """
-        if not self.redis_client:
-            return None
-
-        try:
-            cached_value = self.redis_client.get(cache_key)
-            if cached_value:
-                return cached_value.decode() == "1"  # type: ignore[union-attr]
-        except Exception as e:
-            logger.warning(f"Redis cache read failed: {e}")
-
-        return None
-
-    def _set_cache(self, cache_key: str, value: bool):
-        """Store permission check result in Redis cache."""
-        if not self.redis_client:
-            return
-
-        try:
-            self.redis_client.setex(
-                cache_key,
-                self.cache_ttl,
-                "1" if value else "0"
-            )
-        except Exception as e:
-            logger.warning(f"Redis cache write failed: {e}")
+        if not use_cache:
+            return self.build_permission_set(user)
+
+        user_id = int(user.id)
+        role = UserRole(user.role).value  # type: ignore[arg-type]
+
+        perm_set = self.local_cache.get(user_id)
+        if perm_set is not None and perm_set.role == role:
+            PERMISSION_CACHE_LOOKUPS.labels(tier='local').inc()
+            return perm_set
+
+        if self.redis_client:
+            try:
+                cached = self.redis_client.get(permset_cache_key(user_id))
+                if cached:
+                    perm_set = UserPermissionSet.from_json(cached)
+                    if perm_set.role == role:
+                        self.local_cache.put(perm_set)
+                        PERMISSION_CACHE_LOOKUPS.labels(tier='redis').inc()
+                        return perm_set
+            except Exception as e:
+                logger.warning(f"Redis cache read failed: {e}")
+
+        perm_set = self.build_permission_set(user)
+        self.local_cache.put(perm_set)
+        if self.redis_client:
+            try:
+                self.redis_client.setex(permset_cache_key(user_id), self.cache_ttl, perm_set.to_json())
+            except Exception as e:
+                logger.warning(f"Redis cache write failed: {e}")
+        PERMISSION_CACHE_LOOKUPS.labels(tier='computed').inc()
+        return perm_set
 
     def get_effective_roles(self, user_role: UserRole) -> list[UserRole]:
         """Get all roles that this user effectively has (including inherited).
@@ -327,65 +367,30 @@ class PermissionService:
             db: Database session
             user: User object
             permission_code: Permission code (e.g., "cutting.create_wo")
-            use_cache: Whether to use Redis cache (default: True)
+            use_cache: Whether to use the permission cache (default: True)
 
         Returns:
             True if user has permission, False otherwise
 
         """
-        # Check cache first
-        cache_key = None
-        if use_cache:
-            cache_key = self._get_cache_key(int(user.id), permission_code)
-            cached_result = self._check_cache(cache_key)
-            if cached_result is not None:
-                return cached_result
-
-        # SUPERADMIN, DEVELOPER, MANAGER and Admin have all permissions
-        user_role = user.role
-        if user_role in [UserRole.SUPERADMIN, UserRole.DEVELOPER, 
-                         UserRole.ADMIN, UserRole.MANAGER]:
-            if use_cache and cache_key:
-                self._set_cache(cache_key, True)
-            return True
-
-        # Import ROLE_PERMISSIONS from permissions module
-        from app.core.permissions import (  # pylint: disable=import-error
-            ROLE_PERMISSIONS, ModuleName, Permission,
-        )
-        
-        # Map permission code to (module, permission) enums
-        module_enum_name, perm_enum_name = (
-            self._map_permission_code_to_role_permissions(permission_code)
-        )
-        
-        if not module_enum_name or not perm_enum_name:
-            if use_cache and cache_key:
-                self._set_cache(cache_key, False)
-            return False
-        
-        # Get ModuleName and Permission enums
-        try:
-            module_enum = ModuleName[module_enum_name]
-            perm_enum = Permission[perm_enum_name]
-        except (KeyError, ValueError):
-            if use_cache and cache_key:
-                self._set_cache(cache_key, False)
-            return False
-        
-        # Check if user's role has this permission in ROLE_PERMISSIONS dict
-        has_perm = False
-        user_role_key = UserRole(user_role)  # type: ignore[arg-type]
-        if user_role_key in ROLE_PERMISSIONS:
-            role_perms = ROLE_PERMISSIONS[user_role_key]  # type: ignore[index]
-            if module_enum in role_perms:
-                has_perm = perm_enum in role_perms[module_enum]
-
-        # Cache the result
-        if use_cache and cache_key:
-            self._set_cache(cache_key, has_perm)
-
-        return has_perm
+        perm_set = self.get_user_permission_set(user, use_cache)
+        module_enum_name, perm_enum_name = self._resolve_permission_code(permission_code)
+        return perm_set.allows(module_enum_name, perm_enum_name)
+
+    def _resolve_permission_code(self, permission_code: str) -> tuple[str | None, str | None]:
+        """Memoized `_map_permission_code_to_role_permissions`, validated against the enums."""
+        resolved = self._resolved_codes.get(permission_code)
+        if resolved is None:
+            from app.core.permissions import ModuleName, Permission  # pylint: disable=import-error
+
+            module_enum_name, perm_enum_name = (
+                self._map_permission_code_to_role_permissions(permission_code)
+            )
+            if module_enum_name not in ModuleName.__members__ or perm_enum_name not in Permission.__members__:
+                module_enum_name, perm_enum_name = None, None
+            resolved = (module_enum_name, perm_enum_name)
+            self._resolved_codes[permission_code] = resolved
+        return resolved
 
     def has_any_permission(
         self,
@@ -400,7 +405,7 @@ class PermissionService:
             db: Database session
             user: User object
             permission_codes: List of permission codes
-            use_cache: Whether to use Redis cache
+            use_cache: Whether to use the permission cache
 
         Returns:
             True if user has at least one permission
@@ -424,7 +429,7 @@ class PermissionService:
             db: Database session
             user: User object
             permission_codes: List of permission codes
-            use_cache: Whether to use Redis cache
+            use_cache: Whether to use the permission cache
 
         Returns:
             True if user has all permissions
@@ -463,25 +468,22 @@ class PermissionService:
         return any(role in required_roles for role in effective_roles)
 
     def invalidate_user_cache(self, user_id: int):
-        """Invalidate all cached permissions for a user
-        Call this when user permissions change.
+        """Invalidate all cached permissions and identity snapshots for a user
+        Call this when user permissions change (role, custom grants, activation).
+        Other workers are notified over Redis pub/sub.
         """
-        if not self.redis_client:
-            return
-
-        try:
-            # Delete all permission cache keys for this user
-            pattern = f"pbac:user:{user_id}:*"
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                keys_list = list(keys)  # type: ignore[arg-type]
-                self.redis_client.delete(*keys_list)
-                logger.info(
-                    "Invalidated %d cache entries for user %d",
-                    len(keys_list), user_id,
-                )
-        except Exception as e:
-            logger.warning(f"Cache invalidation failed: {e}")
+        publish_invalidation(self.redis_client, self.local_caches, {"user_id": int(user_id)})
+        logger.info("Invalidated permission cache for user %d", user_id)
+
+    def invalidate_role_cache(self, role: UserRole | str | None = None):
+        """Invalidate cached permissions of every user with `role` (all users if None)
+        Call this when role permission mappings change.
+        """
+        if role is None:
+            message = {"all": True}
+        else:
+            message = {"role": UserRole(role).value}
+        publish_invalidation(self.redis_client, self.local_caches, message)
 
     def get_user_all_permissions(
         self,
@@ -561,6 +563,7 @@ class PermissionService:
 
 # Singleton instance (initialized in dependencies.py)
 _permission_service: PermissionService | None = None
+_invalidation_subscriber: PermissionInvalidationSubscriber | None = None
 
 
 def get_permission_service() -> PermissionService:
@@ -574,8 +577,25 @@ def get_permission_service() -> PermissionService:
 
 def init_permission_service(redis_client: redis.Redis | None = None):
     """Initialize PermissionService with Redis client
-    Call this during app startup.
+    Call this during app startup. With Redis, the worker also subscribes
+    to permission invalidations published by other workers.
     """
-    global _permission_service
+    global _permission_service, _invalidation_subscriber
+    shutdown_permission_service()
     _permission_service = PermissionService(redis_client)
-    logger.info("PermissionService initialized with Redis caching")
+    if redis_client is not None:
+        _invalidation_subscriber = PermissionInvalidationSubscriber(
+            redis_client, _permission_service.local_caches
+        )
+        _invalidation_subscriber.start()
+        logger.info("PermissionService initialized with Redis caching")
+    else:
+        logger.info("PermissionService initialized with in-process caching only")
+
+
+def shutdown_permission_service():
+    """Stop the invalidation subscriber (app shutdown)."""
+    global _invalidation_subscriber
+    if _invalidation_subscriber is not None:
+        _invalidation_subscriber.stop()
+        _invalidation_subscriber = None
@@ -0,0 +1,316 @@
+"""
+PPIC Dashboard Aggregation Service
+Location: app/services/ppic_dashboard_service.py
+
+Set-based aggregation layer shared by the PPIC dashboard endpoints
+(`/ppic/dashboard`, `/ppic/reports/on-track-status`, `/ppic/alerts`).
+
+Instead of loading every SPK and running one SPKDailyProduction query per
+SPK, progress for *all* SPKs is computed in a fixed number of grouped
+queries:
+
+1. Status counts          - GROUP BY spks.production_status
+2. Per-SPK progress rows  - spk_progress_rollup (latest cumulative qty,
+                            days tracked, first/last entry date) joined to
+                            SPK + MO + Product
+
+The number of SQL statements is independent of the number of SPKs.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.models import ManufacturingOrder, Product, SPK, SPKProgressRollup
+
+# Actual output below this share of the expected output marks an SPK OFF_TRACK
+ON_TRACK_TOLERANCE = 0.85
+
+# Days-needed thresholds used by the alert feed
+CRITICAL_DAYS_NEEDED = 7
+WARNING_DAYS_NEEDED = 3
+
+# Sentinel used when the daily rate is zero (cannot finish at current pace)
+UNREACHABLE_DAYS = 999
+
+
+@dataclass
+class SPKProgress:
+    """Aggregated production progress for a single SPK"""
+    spk_id: int
+    production_status: Optional[str]
+    target_qty: int
+    actual_qty: int
+    days_tracked: int
+    first_entry_date: Optional[date]
+    last_entry_date: Optional[date]
+    start_date: Optional[date]
+    target_completion_date: Optional[date]
+    completion_date: Optional[date]
+    product_name: Optional[str]
+
+    @property
+    def spk_number(self) -> str:
+        return f"SPK-{self.spk_id:03d}"
+
+    @property
+    def remaining_qty(self) -> int:
+        return max(0, self.target_qty - self.actual_qty)
+
+    @property
+    def completion_pct(self) -> float:
+        return (self.actual_qty / self.target_qty * 100) if self.target_qty > 0 else 0
+
+    @property
+    def daily_rate(self) -> float:
+        return (self.actual_qty / self.days_tracked) if self.days_tracked > 0 else 0
+
+    @property
+    def days_needed(self) -> int:
+        rate = self.daily_rate
+        return int(self.remaining_qty / rate) if rate > 0 else UNREACHABLE_DAYS
+
+    def on_track_ratio(self, today: date) -> Optional[float]:
+        """
+        Actual output divided by the output expected by `today`.
+
+        Expected output assumes a linear ramp from the start date to the
+        target completion date. Returns None when the SPK has no schedule.
+        """
+        start = self.start_date or self.first_entry_date
+        if not start or not self.target_completion_date:
+            return None
+
+        planned_days = (self.target_completion_date - start).days + 1
+        elapsed_days = (today - start).days + 1
+        if planned_days <= 0 or elapsed_days <= 0:
+            return None
+
+        expected_qty = self.target_qty * min(1.0, elapsed_days / planned_days)
+        if expected_qty <= 0:
+            return None
+        return self.actual_qty / expected_qty
+
+    def health(self, today: date) -> str:
+        """ON_TRACK / OFF_TRACK for SPKs in progress, NO_DATA otherwise"""
+        if self.production_status != "IN_PROGRESS" or self.days_tracked == 0:
+            return "NO_DATA"
+        ratio = self.on_track_ratio(today)
+        if ratio is not None and ratio < ON_TRACK_TOLERANCE:
+            return "OFF_TRACK"
+        return "ON_TRACK"
+
+
+class PPICDashboardAggregator:
+    """
+    Computes PPIC dashboard figures for all SPKs in a constant number of queries
+
+    Usage:
+        aggregator = PPICDashboardAggregator(db)
+        summary = aggregator.get_dashboard()
+    """
+
+    def __init__(self, db: Session, today: Optional[date] = None):
+        self.db = db
+        self.today = today or date.today()
+
+    # ------------------------------------------------------------------
+    # Raw aggregates
+    # ------------------------------------------------------------------
+    def get_status_counts(self) -> Dict[str, int]:
+        """Number of SPKs per production_status (single GROUP BY query)"""
+        rows = self.db.execute(
+            select(SPK.production_status, func.count(SPK.id))
+            .group_by(SPK.production_status)
+        ).all()
+        counts: Dict[str, int] = {}
+        for status, count in rows:
+            # Legacy rows without a status count as NOT_STARTED
+            key = status or "NOT_STARTED"
+            counts[key] = counts.get(key, 0) + count
+        return counts
+
+    def get_spk_progress(
+        self,
+        statuses: Optional[Iterable[str]] = None,
+        min_days_tracked: int = 0
+    ) -> List[SPKProgress]:
+        """
+        Progress rows for every SPK (optionally filtered) in one query.
+
+        Per-SPK totals come from spk_progress_rollup, which is maintained
+        alongside every daily input, so no daily history is scanned.
+        """
+        rollup = SPKProgressRollup
+        actual_qty = func.coalesce(rollup.cumulative_qty, SPK.produced_qty, 0)
+
+        query = (
+            select(
+                SPK.id,
+                SPK.production_status,
+                SPK.target_qty,
+                actual_qty.label("actual_qty"),
+                func.coalesce(rollup.days_tracked, 0).label("days_tracked"),
+                rollup.first_entry_date,
+                rollup.last_entry_date,
+                func.coalesce(SPK.actual_start_date, SPK.start_date).label("start_date"),
+                SPK.target_completion_date,
+                SPK.completion_date,
+                Product.name.label("product_name"),
+            )
+            .outerjoin(rollup, rollup.spk_id == SPK.id)
+            .outerjoin(ManufacturingOrder, ManufacturingOrder.id == SPK.mo_id)
+            .outerjoin(Product, Product.id == ManufacturingOrder.product_id)
+            .order_by(SPK.id)
+        )
+
+        if statuses is not None:
+            query = query.where(SPK.production_status.in_(list(statuses)))
+        if min_days_tracked > 0:
+            query = query.where(rollup.days_tracked >= min_days_tracked)
+
+        return [
+            SPKProgress(
+                spk_id=row.id,
+                production_status=row.production_status,
+                target_qty=row.target_qty or 0,
+                actual_qty=int(row.actual_qty or 0),
+                days_tracked=int(row.days_tracked or 0),
+                first_entry_date=row.first_entry_date,
+                last_entry_date=row.last_entry_date,
+                start_date=row.start_date,
+                target_completion_date=row.target_completion_date,
+                completion_date=row.completion_date,
+                product_name=row.product_name,
+            )
+            for row in self.db.execute(query)
+        ]
+
+    # ------------------------------------------------------------------
+    # Endpoint payloads
+    # ------------------------------------------------------------------
+    def get_dashboard(self) -> Dict:
+        """Summary counts + per-SPK rows for GET /ppic/dashboard"""
+        counts = self.get_status_counts()
+        progress_rows = self.get_spk_progress()
+
+        summary = {
+            "total_spks": sum(counts.values()),
+            "not_started": counts.get("NOT_STARTED", 0),
+            "in_progress": counts.get("IN_PROGRESS", 0),
+            "completed": counts.get("COMPLETED", 0),
+            "on_track": 0,
+            "off_track": 0
+        }
+
+        spk_list = []
+        for progress in progress_rows:
+            health = progress.health(self.today)
+            if health == "ON_TRACK":
+                summary["on_track"] += 1
+            elif health == "OFF_TRACK":
+                summary["off_track"] += 1
+
+            days_remaining = progress.days_needed if progress.daily_rate > 0 else 0
+            if days_remaining > 0:
+                est_completion = (self.today + timedelta(days=days_remaining)).isoformat()
+            else:
+                est_completion = progress.completion_date.isoformat() if progress.completion_date else None
+
+            spk_list.append({
+                "spk_id": progress.spk_id,
+                "spk_number": progress.spk_number,
+                "product": progress.product_name or "Unknown",
+                "target_qty": progress.target_qty,
+                "actual_qty": progress.actual_qty,
+                "remaining_qty": progress.remaining_qty,
+                "completion_pct": round(progress.completion_pct, 1),
+                "status": progress.production_status,
+                "health": health,
+                "daily_rate": round(progress.daily_rate, 1),
+                "est_completion": est_completion
+            })
+
+        return {"dashboard": summary, "spks": spk_list}
+
+    def get_on_track_report(self) -> Dict:
+        """ON/OFF track split of in-progress SPKs for /ppic/reports/on-track-status"""
+        on_track = []
+        off_track = []
+
+        for progress in self.get_spk_progress(statuses=["IN_PROGRESS"], min_days_tracked=1):
+            daily_rate = progress.daily_rate
+            days_needed = progress.days_needed
+            ratio = progress.on_track_ratio(self.today)
+
+            if progress.health(self.today) == "ON_TRACK":
+                est = (self.today + timedelta(days=days_needed)).isoformat()
+                on_track.append({
+                    "spk_id": progress.spk_id,
+                    "spk_number": progress.spk_number,
+                    "status": "ON_TRACK",
+                    "reason": f"Daily rate: {daily_rate:.0f} units/day, est complete {est}",
+                    "on_track_ratio": round(ratio, 2) if ratio is not None else None
+                })
+            else:
+                days_left = (progress.target_completion_date - self.today).days \
+                    if progress.target_completion_date else days_needed
+                required_daily = (progress.remaining_qty / days_left) if days_left > 0 else progress.remaining_qty
+                alert = "🔴 URGENT - will not meet deadline" if days_needed > CRITICAL_DAYS_NEEDED \
+                    else "🟡 WARNING - at risk"
+                off_track.append({
+                    "spk_id": progress.spk_id,
+                    "spk_number": progress.spk_number,
+                    "status": "OFF_TRACK",
+                    "reason": f"Behind: need {required_daily:.0f}/day but only {daily_rate:.0f}/day",
+                    "alert": alert,
+                    "required_daily_rate": round(required_daily, 1),
+                    "current_daily_rate": round(daily_rate, 1),
+                    "on_track_ratio": round(ratio, 2) if ratio is not None else None
+                })
+
+        return {
+            "on_track": on_track,
+            "off_track": off_track,
+            "summary": {
+                "on_track_count": len(on_track),
+                "off_track_count": len(off_track)
+            }
+        }
+
+    def get_alert_candidates(self) -> List[Dict]:
+        """
+        Alert feed for /ppic/alerts
+
+        Only in-progress SPKs with at least two days of history are
+        considered; that filter is applied in SQL.
+        """
+        created_at = datetime.utcnow().isoformat()
+        alerts = []
+
+        for progress in self.get_spk_progress(statuses=["IN_PROGRESS"], min_days_tracked=2):
+            days_needed = progress.days_needed
+            if days_needed > CRITICAL_DAYS_NEEDED:
+                alerts.append({
+                    "alert_id": f"OFF_TRACK_{progress.spk_id}",
+                    "severity": "🔴 CRITICAL",
+                    "title": f"{progress.spk_number} OFF-TRACK",
+                    "message": f"Will not meet deadline at current rate ({progress.daily_rate:.0f} units/day)",
+                    "spk_id": progress.spk_id,
+                    "created_at": created_at
+                })
+            elif days_needed > WARNING_DAYS_NEEDED:
+                alerts.append({
+                    "alert_id": f"AT_RISK_{progress.spk_id}",
+                    "severity": "🟡 WARNING",
+                    "title": f"{progress.spk_number} AT-RISK",
+                    "message": "Production rate declining, at risk of missing deadline",
+                    "spk_id": progress.spk_id,
+                    "created_at": created_at
+                })
+
+        return alerts
+
@@ -0,0 +1,511 @@
+"""
+Report Engine - compiled report execution with keyset cursors and a result cache
+Location: app/services/report_engine.py
+
+Report Builder templates (data source + columns, filters, sorts, group by)
+are compiled into parameterized SQLAlchemy Core selects - column names,
+operators and aggregates are whitelisted against REPORT_DATA_SOURCES and
+filter values are always bound parameters, never spliced into SQL.
+
+Pagination is keyset based: rows are ordered by the template sorts plus a
+unique tiebreaker (the source key, or the group-by columns of grouped
+reports), and the opaque `next_cursor` of a page carries the sort-key
+values of its last row. The next page starts with a `WHERE (keys) > cursor`
+predicate (HAVING for grouped reports) instead of OFFSET, so page N costs
+the same as page 1. Cursors are bound to the report fingerprint and are
+rejected for any other template/filter combination.
+
+Pages are cached in-process for REPORT_CACHE_TTL_SECONDS keyed by
+(fingerprint, cursor, limit), so the same report re-run by several PPIC
+users within the TTL is answered without a query.
+
+Exports (CSV/XLSX) run the same compiled select without a page limit and
+stream rows through app/shared/streaming_export.py.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import operator
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from enum import Enum
+from typing import Any, Optional
+
+from prometheus_client import Counter
+from sqlalchemy import Enum as SAEnum
+from sqlalchemy import String, and_, cast, false, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.models.manufacturing import ManufacturingOrder, WorkOrder
+from app.core.models.products import Product
+from app.core.models.quality import QCInspection
+from app.core.models.users import User
+from app.core.models.warehouse import Location, StockQuant
+from app.shared.streaming_export import iter_rows, streaming_export
+
+REPORT_CACHE_LOOKUPS = Counter(
+    'report_cache_lookups_total',
+    'Report page lookups in the result cache',
+    ['result'],  # hit, miss
+    registry=registry
+)
+
+AGGREGATES = {"sum": func.sum, "avg": func.avg, "count": func.count, "min": func.min, "max": func.max}
+
+COMPARISONS = {
+    "=": operator.eq, "!=": operator.ne,
+    ">": operator.gt, "<": operator.lt, ">=": operator.ge, "<=": operator.le,
+}
+
+
+class ReportDefinitionError(ValueError):
+    """Template, filter or cursor that cannot be compiled"""
+
+
+# ============================================================================
+# DATA SOURCES
+# ============================================================================
+
+@dataclass(frozen=True)
+class ReportDataSource:
+    """Whitelisted base table, joins and column expressions of a data source"""
+    table: Any
+    joins: tuple = ()                   # ((target, onclause), ...) outer joins
+    columns: dict = field(default_factory=dict)
+    key: str = "id"                     # Unique column, tiebreaker for ungrouped reports
+
+    @property
+    def table_name(self) -> str:
+        return self.table.__tablename__
+
+
+REPORT_DATA_SOURCES: dict[str, ReportDataSource] = {
+    "work_orders": ReportDataSource(
+        table=WorkOrder,
+        joins=((User, WorkOrder.worker_id == User.id),),
+        columns={
+            "id": WorkOrder.id,
+            "mo_id": WorkOrder.mo_id,
+            "department": WorkOrder.department,
+            "status": WorkOrder.status,
+            "input_qty": WorkOrder.input_qty,
+            "output_qty": WorkOrder.output_qty,
+            "reject_qty": WorkOrder.reject_qty,
+            "worker_name": User.full_name,
+            "start_time": WorkOrder.start_time,
+            "end_time": WorkOrder.end_time,
+        },
+    ),
+    "qc_inspections": ReportDataSource(
+        table=QCInspection,
+        joins=((User, QCInspection.inspected_by == User.id),),
+        columns={
+            "id": QCInspection.id,
+            "work_order_id": QCInspection.work_order_id,
+            "type": QCInspection.type,
+            "status": QCInspection.status,
+            "defect_reason": QCInspection.defect_reason,
+            "inspector_name": User.full_name,
+            "created_at": QCInspection.created_at,
+        },
+    ),
+    "products": ReportDataSource(
+        table=Product,
+        columns={
+            "id": Product.id,
+            "code": Product.code,
+            "name": Product.name,
+            "type": Product.type,
+            "uom": Product.uom,
+            "min_stock": Product.min_stock,
+            "created_at": Product.created_at,
+        },
+    ),
+    "stock_quants": ReportDataSource(
+        table=StockQuant,
+        joins=(
+            (Product, StockQuant.product_id == Product.id),
+            (Location, StockQuant.location_id == Location.id),
+        ),
+        columns={
+            "id": StockQuant.id,
+            "product_code": Product.code,
+            "product_name": Product.name,
+            "qty_available": StockQuant.qty_on_hand - StockQuant.qty_reserved,
+            "qty_reserved": StockQuant.qty_reserved,
+            "location_name": Location.name,
+            "updated_at": StockQuant.updated_at,
+        },
+    ),
+    "manufacturing_orders": ReportDataSource(
+        table=ManufacturingOrder,
+        joins=((Product, ManufacturingOrder.product_id == Product.id),),
+        columns={
+            "id": ManufacturingOrder.id,
+            "batch_number": ManufacturingOrder.batch_number,
+            "product_name": Product.name,
+            "qty_planned": ManufacturingOrder.qty_planned,
+            "qty_produced": ManufacturingOrder.qty_produced,
+            "routing_type": ManufacturingOrder.routing_type,
+            "state": ManufacturingOrder.state,
+            "created_at": ManufacturingOrder.created_at,
+        },
+    ),
+}
+
+
+# ============================================================================
+# COMPILER
+# ============================================================================
+
+@dataclass
+class CompiledReport:
+    """Report select without paging, plus what is needed to page it"""
+    fingerprint: str
+    output_columns: list[str]
+    order_keys: list[tuple[Any, bool]]      # (expression, descending), tiebreaker last
+    base: Any                               # Filtered / grouped select of the output columns
+    grouped: bool
+
+    def page_statement(self, after: Optional[list] = None, limit: int = 1000, offset: int = 0):
+        """One page: output columns + hidden sort keys, limit + 1 rows to detect more."""
+        key_columns = [expr.label(f"_k{i}") for i, (expr, _) in enumerate(self.order_keys)]
+        stmt = self.base.add_columns(*key_columns).order_by(*self._ordering())
+        if after is not None:
+            predicate = _keyset_after(self.order_keys, after)
+            stmt = stmt.having(predicate) if self.grouped else stmt.where(predicate)
+        if offset:
+            stmt = stmt.offset(offset)
+        return stmt.limit(limit + 1)
+
+    def export_statement(self):
+        return self.base.order_by(*self._ordering())
+
+    def _ordering(self) -> list:
+        # Explicit NULL placement so the keyset predicate matches on every backend
+        return [expr.desc().nulls_first() if descending else expr.asc().nulls_last()
+                for expr, descending in self.order_keys]
+
+
+def report_fingerprint(template: dict, filters: list[dict]) -> str:
+    """Stable hash of everything that affects the report rows."""
+    definition = {
+        "data_source": template.get("data_source"),
+        "columns": template.get("columns") or [],
+        "filters": filters,
+        "sorts": template.get("sorts") or [],
+        "group_by": template.get("group_by") or [],
+    }
+    payload = json.dumps(definition, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def compile_report(template: dict, extra_filters: Optional[list[dict]] = None) -> CompiledReport:
+    """Compile a template (dict form of ReportTemplate) into a CompiledReport."""
+    source = REPORT_DATA_SOURCES.get(template.get("data_source"))
+    if source is None:
+        raise ReportDefinitionError(
+            f"Invalid data source. Available: {', '.join(REPORT_DATA_SOURCES)}"
+        )
+
+    def column(name: str):
+        if name not in source.columns:
+            raise ReportDefinitionError(
+                f"Column '{name}' not available in data source '{template['data_source']}'"
+            )
+        return source.columns[name]
+
+    columns = template.get("columns") or []
+    if not columns:
+        raise ReportDefinitionError("Report has no columns")
+    group_by = list(template.get("group_by") or [])
+    group_exprs = [column(name) for name in group_by]
+    grouped = bool(group_by) or any(col.get("aggregate") for col in columns)
+
+    # Output columns
+    outputs: dict[str, Any] = {}
+    for col in columns:
+        expr = column(col["name"])
+        aggregate = (col.get("aggregate") or "").lower()
+        if aggregate:
+            if aggregate not in AGGREGATES:
+                raise ReportDefinitionError(f"Unsupported aggregate '{col['aggregate']}'")
+            expr = AGGREGATES[aggregate](expr)
+        elif grouped and col["name"] not in group_by:
+            raise ReportDefinitionError(f"Column '{col['name']}' must be aggregated or grouped")
+        outputs[col["name"]] = expr
+
+    # WHERE
+    filters = list(template.get("filters") or []) + list(extra_filters or [])
+    conditions = [_filter_condition(column(f["column"]), f) for f in filters]
+
+    # ORDER BY: template sorts, then a unique tiebreaker
+    order_keys: list[tuple[Any, bool]] = []
+    for sort in template.get("sorts") or []:
+        direction = str(sort.get("direction") or "ASC").upper()
+        if direction not in ("ASC", "DESC"):
+            raise ReportDefinitionError(f"Invalid sort direction '{sort.get('direction')}'")
+        name = sort["column"]
+        if name in outputs:
+            expr = outputs[name]
+        elif not grouped or name in group_by:
+            expr = column(name)
+        else:
+            raise ReportDefinitionError(f"Cannot sort grouped report by '{name}'")
+        order_keys.append((expr, direction == "DESC"))
+
+    sorted_exprs = [expr for expr, _ in order_keys]
+    tiebreakers = group_exprs if grouped else [column(source.key)]
+    for expr in tiebreakers:
+        if not any(expr is existing for existing in sorted_exprs):
+            order_keys.append((expr, False))
+
+    stmt = select(*[expr.label(name) for name, expr in outputs.items()]).select_from(source.table)
+    for target, onclause in source.joins:
+        stmt = stmt.outerjoin(target, onclause)
+    if conditions:
+        stmt = stmt.where(*conditions)
+    if group_exprs:
+        stmt = stmt.group_by(*group_exprs)
+
+    return CompiledReport(
+        fingerprint=report_fingerprint(template, filters),
+        output_columns=list(outputs),
+        order_keys=order_keys,
+        base=stmt,
+        grouped=grouped,
+    )
+
+
+def _filter_condition(expr, report_filter: dict):
+    op = str(report_filter.get("operator") or "").upper()
+    value = report_filter.get("value")
+    if op in COMPARISONS:
+        return COMPARISONS[op](expr, _coerce(expr, value))
+    if op == "LIKE":
+        return cast(expr, String).like(f"%{value}%")
+    if op == "IN":
+        if not isinstance(value, (list, tuple)):
+            raise ReportDefinitionError("IN filter needs a list value")
+        return expr.in_([_coerce(expr, v) for v in value])
+    if op == "BETWEEN":
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            raise ReportDefinitionError("BETWEEN filter needs [low, high]")
+        return expr.between(_coerce(expr, value[0]), _coerce(expr, value[1]))
+    raise ReportDefinitionError(f"Unsupported filter operator '{report_filter.get('operator')}'")
+
+
+def _coerce(expr, value):
+    """Convert a JSON filter value to the column's Python type."""
+    if value is None:
+        return None
+    type_ = expr.type
+    if isinstance(type_, SAEnum) and type_.enum_class is not None:
+        for member in type_.enum_class:
+            if value in (member, member.name, member.value):
+                return member
+        raise ReportDefinitionError(f"Invalid value '{value}'")
+    if not isinstance(value, str):
+        return value
+    try:
+        python_type = type_.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        if python_type in (int, float, Decimal):
+            return python_type(value)
+    except (ValueError, InvalidOperation):
+        raise ReportDefinitionError(f"Invalid value '{value}'")
+    return value
+
+
+def _keyset_after(order_keys: list[tuple[Any, bool]], values: list):
+    """Rows strictly after `values` in (ASC NULLS LAST / DESC NULLS FIRST) order."""
+    if len(values) != len(order_keys):
+        raise ReportDefinitionError("Invalid cursor")
+    branches = []
+    for i, (expr, descending) in enumerate(order_keys):
+        equal = [_equals(e, v) for (e, _), v in zip(order_keys[:i], values[:i])]
+        branches.append(and_(*equal, _beyond(expr, descending, values[i])))
+    return or_(*branches)
+
+
+def _equals(expr, value):
+    return expr.is_(None) if value is None else expr == value
+
+
+def _beyond(expr, descending: bool, value):
+    if descending:
+        return expr.isnot(None) if value is None else expr < value
+    return false() if value is None else or_(expr > value, expr.is_(None))
+
+
+# ============================================================================
+# CURSORS
+# ============================================================================
+
+def encode_cursor(fingerprint: str, values: list) -> str:
+    payload = {"f": fingerprint[:16], "k": [_encode_value(v) for v in values]}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["f"] != fingerprint[:16]:
+            raise ReportDefinitionError("Cursor does not belong to this report")
+        return [_decode_value(v) for v in payload["k"]]
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        if isinstance(e, ReportDefinitionError):
+            raise
+        raise ReportDefinitionError("Invalid cursor")
+
+
+def _encode_value(value):
+    if isinstance(value, Enum):
+        return {"$enum": value.name}
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "$enum" in value:
+            return value["$enum"]
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$d" in value:
+            return date.fromisoformat(value["$d"])
+        if "$dec" in value:
+            return Decimal(value["$dec"])
+        raise ValueError("Unknown cursor value")
+    return value
+
+
+# ============================================================================
+# RESULT CACHE
+# ============================================================================
+
+class ReportResultCache:
+    """Thread-safe LRU of report pages with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 120.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, page = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return page
+
+    def put(self, key: str, page: dict):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, page)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide page cache shared by all report executions
+report_result_cache = ReportResultCache(
+    max_entries=settings.REPORT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.REPORT_CACHE_TTL_SECONDS
+)
+
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+class ReportEngine:
+    """Runs compiled report templates page by page or as a streamed export"""
+
+    def __init__(self, db: Session, cache: ReportResultCache | None = None):
+        self.db = db
+        self.cache = cache if cache is not None else report_result_cache
+
+    def execute(
+        self,
+        template: dict,
+        extra_filters: Optional[list[dict]] = None,
+        limit: int = 1000,
+        cursor: Optional[str] = None,
+        offset: int = 0
+    ) -> dict:
+        """
+        One page of the report:
+            {"data", "row_count", "next_cursor", "cached", "execution_time"}
+        """
+        started = time.perf_counter()
+        compiled = compile_report(template, extra_filters)
+        after = decode_cursor(cursor, compiled.fingerprint) if cursor else None
+        if after is not None:
+            offset = 0  # The cursor already positions the page
+
+        cache_key = f"{compiled.fingerprint}:{cursor or ''}:{limit}:{offset}"
+        page = self.cache.get(cache_key)
+        cached = page is not None
+        REPORT_CACHE_LOOKUPS.labels(result="hit" if cached else "miss").inc()
+        if not cached:
+            page = self._run(compiled, after, limit, offset)
+            self.cache.put(cache_key, page)
+
+        return {
+            **page,
+            "data": list(page["data"]),
+            "cached": cached,
+            "execution_time": time.perf_counter() - started,
+        }
+
+    def export(self, template: dict, extra_filters: Optional[list[dict]], format: str, name: str):
+        """StreamingResponse with every report row as CSV or XLSX."""
+        compiled = compile_report(template, extra_filters)
+        labels = {col["name"]: col.get("label") or col["name"] for col in template["columns"]}
+        header = [labels[name] for name in compiled.output_columns]
+        rows = iter_rows(self.db, compiled.export_statement())
+        return streaming_export(format, name, (template.get("name") or name)[:31], header, rows)
+
+    def _run(self, compiled: CompiledReport, after: Optional[list], limit: int, offset: int) -> dict:
+        rows = self.db.execute(compiled.page_statement(after, limit, offset)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        width = len(compiled.output_columns)
+        data = [dict(zip(compiled.output_columns, row[:width])) for row in rows]
+        next_cursor = encode_cursor(compiled.fingerprint, list(rows[-1][width:])) if has_more else None
+        return {"data": data, "row_count": len(data), "next_cursor": next_cursor}
@@ -0,0 +1,143 @@
+"""
+Sequence Service - contention-free document numbers
+Location: app/services/sequence_service.py
+
+Pallet barcodes, kanban cards, PO and lot numbers come from per-prefix /
+per-period counters (document_sequences) instead of "last number + 1"
+lookups or COUNT(*) over the document table.
+
+Each worker reserves a block of values with a single
+    UPDATE document_sequences SET next_value = next_value + :block ... RETURNING
+in its own short transaction and then hands numbers out of memory, so:
+- allocation is O(1) - no table scan, one counter-row update per block;
+- the counter row is locked only for the reservation, never for the
+  lifetime of the request that creates the document;
+- numbers are unique across workers; values of a block still unused when
+  a worker stops (or a request rolls back) are skipped - gaps are expected.
+
+The first reservation for a (prefix, period) creates the counter row,
+seeded once from the highest existing number of that family.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Optional
+
+from prometheus_client import Counter
+from sqlalchemy import insert, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.models.sequences import DocumentSequence
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_BLOCKS_RESERVED = Counter(
+    'document_sequence_blocks_reserved_total',
+    'Document number blocks reserved from document_sequences',
+    ['prefix'],
+    registry=registry
+)
+
+# Called with the reservation connection when a counter row is created;
+# returns the highest number already used for the (prefix, period)
+SeedFunc = Callable[[Connection], int]
+
+
+class SequenceAllocator:
+    """Hands out document numbers from per-worker blocks of a DB counter"""
+
+    def __init__(self, block_size: int = 20):
+        self.block_size = max(1, block_size)
+        self._blocks: dict[tuple, list[int]] = {}  # (db, prefix, period) -> [next, end)
+        self._lock = threading.Lock()
+
+    def next_value(
+        self,
+        db: Session,
+        prefix: str,
+        period: Optional[str] = None,
+        seed: Optional[SeedFunc] = None
+    ) -> int:
+        """Next number for prefix in period (default: current year)."""
+        period = period or str(datetime.now().year)
+        bind = db.get_bind()
+        key = (str(bind.engine.url if isinstance(bind, Connection) else bind.url), prefix, period)
+
+        with self._lock:
+            block = self._blocks.get(key)
+            if block and block[0] < block[1]:
+                value = block[0]
+                block[0] += 1
+                return value
+
+        start, end = self._reserve(db, bind, prefix, period, seed)
+        with self._lock:
+            block = self._blocks.get(key)
+            if not block or block[0] >= block[1]:
+                self._blocks[key] = [start + 1, end]
+            # else another thread refilled first - the rest of ours is a gap
+        return start
+
+    async def next_value_async(self, db, prefix: str, period: Optional[str] = None,
+                               seed: Optional[SeedFunc] = None) -> int:
+        """next_value for an AsyncSession."""
+        return await db.run_sync(lambda session: self.next_value(session, prefix, period, seed))
+
+    def reset(self):
+        """Forget cached blocks (their remaining values become gaps)."""
+        with self._lock:
+            self._blocks.clear()
+
+    # ------------------------------------------------------------------
+    def _reserve(self, db: Session, bind, prefix: str, period: str,
+                 seed: Optional[SeedFunc]) -> tuple[int, int]:
+        SEQUENCE_BLOCKS_RESERVED.labels(prefix=prefix).inc()
+        if isinstance(bind, Connection):
+            # Session bound to an explicit connection already owns the
+            # transaction (scripts, tests) - reserve inside it
+            return self._reserve_on(db.connection(), prefix, period, seed)
+        with bind.begin() as conn:
+            return self._reserve_on(conn, prefix, period, seed)
+
+    def _reserve_on(self, conn: Connection, prefix: str, period: str,
+                    seed: Optional[SeedFunc]) -> tuple[int, int]:
+        table = DocumentSequence.__table__
+        size = self.block_size
+        bump = (
+            update(table)
+            .where(table.c.prefix == prefix, table.c.period == period)
+            .values(next_value=table.c.next_value + size, updated_at=datetime.utcnow())
+            .returning(table.c.next_value)
+        )
+
+        end = conn.execute(bump).scalar()
+        if end is not None:
+            return end - size, end
+
+        start = (seed(conn) if seed else 0) + 1
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(table).values(
+                    prefix=prefix, period=period, next_value=start + size, updated_at=datetime.utcnow()
+                ))
+            logger.info(f"Created document sequence {prefix}/{period} starting at {start}")
+            return start, start + size
+        except IntegrityError:
+            # Another worker created the row first
+            end = conn.execute(bump).scalar()
+            return end - size, end
+
+
+# Process-wide allocator used by all document number generators
+sequence_allocator = SequenceAllocator(block_size=settings.DOCUMENT_SEQUENCE_BLOCK_SIZE)
+
+
+def next_sequence(db: Session, prefix: str, period: Optional[str] = None,
+                  seed: Optional[SeedFunc] = None) -> int:
+    """Next document number for prefix in period (default: current year)."""
+    return sequence_allocator.next_value(db, prefix, period, seed)
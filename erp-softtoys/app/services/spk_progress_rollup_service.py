@@ -0,0 +1,187 @@
+"""
+SPK Progress Rollup Service
+Location: app/services/spk_progress_rollup_service.py
+
+Maintains `spk_progress_rollup` - one row per SPK with confirmed qty,
+pending qty, cumulative qty, days tracked and last entry date.
+
+- Writers (daily input, completion, modification undo) update the rollup
+  in the SAME transaction as the raw SPKDailyProduction row; nothing here
+  commits.
+- Readers (progress, calendar summary, PPIC dashboard) read a single row
+  per SPK instead of scanning its daily history.
+- `rebuild_all()` reconciles the whole table from raw rows in one
+  set-based INSERT ... SELECT (see scripts/reconcile_spk_progress_rollup.py).
+"""
+
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.models import SPK, SPKDailyProduction, SPKProgressRollup
+
+CONFIRMED = "CONFIRMED"
+PENDING = "PENDING"
+
+
+class SPKProgressRollupService:
+    """Incremental maintenance and reconciliation of SPK progress totals"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def get(self, spk_id: int) -> Optional[SPKProgressRollup]:
+        """Rollup row for an SPK (None when no input was ever recorded)"""
+        return self.db.get(SPKProgressRollup, spk_id)
+
+    def get_cumulative_qty(self, spk_id: int) -> int:
+        rollup = self.get(spk_id)
+        return rollup.cumulative_qty if rollup else 0
+
+    # ------------------------------------------------------------------
+    # Incremental writes (caller commits)
+    # ------------------------------------------------------------------
+    def apply_entry(
+        self,
+        spk_id: int,
+        production_date: date,
+        input_qty: int,
+        cumulative_qty: int,
+        status: str
+    ) -> SPKProgressRollup:
+        """Fold one new SPKDailyProduction row into the rollup"""
+        rollup = self._get_for_update(spk_id)
+
+        if status == CONFIRMED:
+            rollup.confirmed_qty += input_qty
+        elif status == PENDING:
+            rollup.pending_qty += input_qty
+
+        rollup.days_tracked += 1
+        if rollup.first_entry_date is None or production_date < rollup.first_entry_date:
+            rollup.first_entry_date = production_date
+        if rollup.last_entry_date is None or production_date >= rollup.last_entry_date:
+            rollup.last_entry_date = production_date
+            rollup.cumulative_qty = cumulative_qty
+
+        return rollup
+
+    def mark_completed(self, spk_id: int, completed_date: date) -> SPKProgressRollup:
+        rollup = self._get_for_update(spk_id)
+        rollup.completed_date = completed_date
+        return rollup
+
+    def refresh(self, spk_id: int) -> Optional[SPKProgressRollup]:
+        """Recompute one SPK's rollup from its raw rows (used after undo/edit)"""
+        self.db.flush()
+        self.db.execute(delete(SPKProgressRollup).where(SPKProgressRollup.spk_id == spk_id))
+        self.db.execute(
+            insert(SPKProgressRollup).from_select(
+                _ROLLUP_COLUMNS, self._rollup_source(spk_id=spk_id)
+            )
+        )
+        self.db.expire_all()
+        return self.get(spk_id)
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
+    def rebuild_all(self) -> int:
+        """
+        Rebuild the whole rollup table from spk_daily_production.
+
+        Runs as one DELETE + one INSERT ... SELECT; the caller commits.
+        Returns the number of SPKs with a rollup row afterwards.
+        """
+        self.db.flush()
+        self.db.execute(delete(SPKProgressRollup))
+        self.db.execute(insert(SPKProgressRollup).from_select(_ROLLUP_COLUMNS, self._rollup_source()))
+        self.db.expire_all()
+        return self.db.scalar(select(func.count()).select_from(SPKProgressRollup)) or 0
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _get_for_update(self, spk_id: int) -> SPKProgressRollup:
+        # Flush our own pending increments, then reload the locked row: an
+        # instance already in the session (get_cumulative_qty) may hold
+        # values another transaction has since committed over
+        self.db.flush()
+        rollup = self.db.query(SPKProgressRollup)\
+            .filter(SPKProgressRollup.spk_id == spk_id)\
+            .with_for_update()\
+            .populate_existing()\
+            .first()
+        if rollup is None:
+            rollup = SPKProgressRollup(
+                spk_id=spk_id, confirmed_qty=0, pending_qty=0,
+                cumulative_qty=0, days_tracked=0
+            )
+            self.db.add(rollup)
+            self.db.flush()
+        return rollup
+
+    @staticmethod
+    def _rollup_source(spk_id: Optional[int] = None):
+        """SELECT producing rollup rows from raw daily production"""
+        daily = SPKDailyProduction
+        partition = daily.spk_id
+
+        ranked = select(
+            daily.spk_id.label("spk_id"),
+            daily.cumulative_qty.label("cumulative_qty"),
+            func.row_number().over(
+                partition_by=partition,
+                order_by=(daily.production_date.desc(), daily.id.desc())
+            ).label("rn"),
+        )
+        totals = select(
+            daily.spk_id.label("spk_id"),
+            func.sum(case((daily.status == CONFIRMED, daily.input_qty), else_=0)).label("confirmed_qty"),
+            func.sum(case((daily.status == PENDING, daily.input_qty), else_=0)).label("pending_qty"),
+            func.sum(daily.input_qty).label("total_input"),
+            func.count(daily.id).label("days_tracked"),
+            func.min(daily.production_date).label("first_entry_date"),
+            func.max(daily.production_date).label("last_entry_date"),
+        ).group_by(daily.spk_id)
+
+        if spk_id is not None:
+            ranked = ranked.where(daily.spk_id == spk_id)
+            totals = totals.where(daily.spk_id == spk_id)
+
+        ranked = ranked.subquery("ranked_daily")
+        totals = totals.subquery("daily_totals")
+
+        return (
+            select(
+                totals.c.spk_id,
+                totals.c.confirmed_qty,
+                totals.c.pending_qty,
+                func.coalesce(ranked.c.cumulative_qty, totals.c.total_input),
+                totals.c.days_tracked,
+                totals.c.first_entry_date,
+                totals.c.last_entry_date,
+                case((SPK.production_status == "COMPLETED", SPK.completion_date), else_=None),
+                func.current_timestamp(),
+            )
+            .join(ranked, (ranked.c.spk_id == totals.c.spk_id) & (ranked.c.rn == 1))
+            .join(SPK, SPK.id == totals.c.spk_id)
+        )
+
+
+_ROLLUP_COLUMNS = [
+    SPKProgressRollup.spk_id,
+    SPKProgressRollup.confirmed_qty,
+    SPKProgressRollup.pending_qty,
+    SPKProgressRollup.cumulative_qty,
+    SPKProgressRollup.days_tracked,
+    SPKProgressRollup.first_entry_date,
+    SPKProgressRollup.last_entry_date,
+    SPKProgressRollup.completed_date,
+    SPKProgressRollup.updated_at,
+]
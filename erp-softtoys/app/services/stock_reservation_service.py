@@ -0,0 +1,303 @@
+"""
+Stock Reservation Service - lock-ordered reservation and consumption
+Location: app/services/stock_reservation_service.py
+
+One engine for every path that takes stock out of stock_quants:
+- `reserve()`  - qty_reserved += qty (inter-departmental transfers)
+- `consume()`  - qty_on_hand  -= qty (barcode picks, WO material deduction)
+
+Both draw FIFO (oldest lot receipt first) from the quants that still have
+qty_on_hand - qty_reserved available, and never oversell:
+
+1. Lock. Candidate quants are locked with SELECT ... FOR UPDATE in quant id
+   order, so two writers on overlapping quants always queue in the same
+   order instead of deadlocking. Picks (`skip_locked=True`) first take
+   whatever is free in FIFO order with FOR UPDATE SKIP LOCKED - concurrent
+   scanners fan out over different lots instead of waiting on each other -
+   and fall back to the blocking, id-ordered lock when the free quants do
+   not cover the qty (that savepoint is rolled back, releasing its locks).
+2. Split. How much comes from each locked quant is one window-function
+   query (running sum of availability in FIFO order), not a Python loop
+   over stale objects.
+3. Apply. The per-quant amounts are written through the locked StockQuant
+   objects, so the stock audit trail and the inventory position store
+   (app/services/inventory_position_service.py) see every change.
+
+Each attempt runs in a savepoint; deadlocks, serialization failures and
+lock timeouts are rolled back to it and retried with backoff
+(STOCK_LOCK_MAX_RETRIES). Row locks are PostgreSQL behaviour - SQLite
+serializes writers with its database lock and ignores FOR UPDATE.
+
+Nothing is committed here (caller commits).
+
+Metrics: stock_lock_wait_seconds{operation},
+stock_lock_retries_total{operation,reason},
+stock_allocations_total{operation,outcome},
+stock_skip_locked_fallbacks_total{operation}.
+"""
+
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import List, NamedTuple, Optional, Sequence
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import case, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.models.warehouse import StockLot, StockQuant
+
+logger = logging.getLogger(__name__)
+
+RESERVE = "reserve"
+CONSUME = "consume"
+
+# Oldest receipt first; quants without a lot last; quant id makes the order total
+FIFO_ORDER = (StockLot.received_date.asc().nulls_last(), StockQuant.id.asc())
+
+_CENT = Decimal("0.01")
+
+STOCK_LOCK_WAIT = Histogram(
+    'stock_lock_wait_seconds',
+    'Time spent acquiring stock quant row locks',
+    ['operation'],
+    registry=registry
+)
+
+STOCK_LOCK_RETRIES = Counter(
+    'stock_lock_retries_total',
+    'Stock allocations rolled back and retried after lock contention',
+    ['operation', 'reason'],
+    registry=registry
+)
+
+STOCK_ALLOCATIONS = Counter(
+    'stock_allocations_total',
+    'Stock reservations / consumptions by outcome',
+    ['operation', 'outcome'],
+    registry=registry
+)
+
+STOCK_SKIP_LOCKED_FALLBACKS = Counter(
+    'stock_skip_locked_fallbacks_total',
+    'FIFO picks that found too little unlocked stock and waited for locked quants',
+    ['operation'],
+    registry=registry
+)
+
+
+class InsufficientStockError(Exception):
+    """Less stock available than requested; nothing was reserved or consumed"""
+
+    def __init__(self, product_id: int, requested: Decimal, available: Decimal):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Insufficient stock. Available: {available}, Requested: {requested}")
+
+
+class StockAllocation(NamedTuple):
+    """Qty reserved / consumed from one quant"""
+
+    quant_id: int
+    location_id: int
+    lot_id: Optional[int]
+    qty: Decimal
+
+
+class StockReservationService:
+    """Reserve and consume stock_quants under deterministic row locks"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def available(
+        self,
+        product_id: int,
+        location_ids: Optional[Sequence[int]] = None,
+        lot_id: Optional[int] = None
+    ) -> Decimal:
+        """qty_on_hand - qty_reserved summed without locking (pre-checks and display only)"""
+        available = StockQuant.qty_on_hand - StockQuant.qty_reserved
+        total = self.db.scalar(
+            select(func.coalesce(func.sum(available), 0))
+            .where(*self._filters(product_id, location_ids, lot_id), available > 0)
+        )
+        return _qty(total)
+
+    # ------------------------------------------------------------------
+    # Writes (caller commits)
+    # ------------------------------------------------------------------
+    def reserve(
+        self,
+        product_id: int,
+        qty: Decimal,
+        location_ids: Optional[Sequence[int]] = None,
+        lot_id: Optional[int] = None
+    ) -> List[StockAllocation]:
+        """Reserve qty FIFO; raises InsufficientStockError if it is not all available"""
+        return self._allocate(RESERVE, product_id, qty, location_ids, lot_id, skip_locked=False, partial=False)
+
+    def consume(
+        self,
+        product_id: int,
+        qty: Decimal,
+        location_ids: Optional[Sequence[int]] = None,
+        lot_id: Optional[int] = None,
+        skip_locked: bool = False,
+        partial: bool = False
+    ) -> List[StockAllocation]:
+        """Take qty off hand FIFO.
+
+        skip_locked: first draw from quants no other transaction holds (picks).
+        partial: consume what is available instead of raising
+            InsufficientStockError; the caller handles the remainder (debt).
+        """
+        return self._allocate(CONSUME, product_id, qty, location_ids, lot_id, skip_locked, partial)
+
+    # ------------------------------------------------------------------
+    # Engine
+    # ------------------------------------------------------------------
+    def _allocate(self, operation, product_id, qty, location_ids, lot_id, skip_locked, partial):
+        qty = _qty(qty)
+        attempts = max(1, settings.STOCK_LOCK_MAX_RETRIES + 1)
+        for attempt in range(1, attempts + 1):
+            try:
+                with self.db.begin_nested():
+                    allocations = self._allocate_once(
+                        operation, product_id, qty, location_ids, lot_id, skip_locked, partial
+                    )
+                STOCK_ALLOCATIONS.labels(operation=operation, outcome="allocated").inc()
+                return allocations
+            except InsufficientStockError:
+                STOCK_ALLOCATIONS.labels(operation=operation, outcome="insufficient").inc()
+                raise
+            except OperationalError as e:
+                reason = _contention_reason(e)
+                if reason is None or attempt == attempts:
+                    STOCK_ALLOCATIONS.labels(operation=operation, outcome="failed").inc()
+                    raise
+                STOCK_LOCK_RETRIES.labels(operation=operation, reason=reason).inc()
+                logger.warning(f"Stock {operation} of product {product_id} hit {reason} "
+                               f"(attempt {attempt}/{attempts}); retrying")
+                time.sleep(settings.STOCK_LOCK_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+    def _allocate_once(self, operation, product_id, qty, location_ids, lot_id, skip_locked, partial):
+        filters = self._filters(product_id, location_ids, lot_id)
+
+        if skip_locked:
+            savepoint = self.db.begin_nested()
+            quants = self._lock(operation, filters, skip_locked=True)
+            plan, total = self._plan(quants, qty)
+            if total >= qty:
+                allocations = self._apply(operation, quants, plan)
+                savepoint.commit()
+                return allocations
+            # Not enough unlocked stock: release what we hold, then queue for the rest
+            savepoint.rollback()
+            STOCK_SKIP_LOCKED_FALLBACKS.labels(operation=operation).inc()
+
+        quants = self._lock(operation, filters, skip_locked=False)
+        plan, total = self._plan(quants, qty)
+        if total < qty and not partial:
+            raise InsufficientStockError(product_id, qty, total)
+        return self._apply(operation, quants, plan)
+
+    @staticmethod
+    def _filters(product_id, location_ids, lot_id) -> list:
+        filters = [StockQuant.product_id == product_id]
+        if location_ids is not None:
+            filters.append(StockQuant.location_id.in_(list(location_ids)))
+        if lot_id is not None:
+            filters.append(StockQuant.lot_id == lot_id)
+        return filters
+
+    def _lock(self, operation, filters, skip_locked: bool) -> dict:
+        """Lock the quants with stock available; returns them by id"""
+        query = (
+            select(StockQuant)
+            .where(*filters, StockQuant.qty_on_hand - StockQuant.qty_reserved > 0)
+            .execution_options(populate_existing=True)
+        )
+        if skip_locked:
+            query = (
+                query.outerjoin(StockLot, StockLot.id == StockQuant.lot_id)
+                .order_by(*FIFO_ORDER)
+                .with_for_update(of=StockQuant, skip_locked=True)
+            )
+        else:
+            query = query.order_by(StockQuant.id).with_for_update(of=StockQuant)
+
+        started = time.perf_counter()
+        quants = self.db.scalars(query).all()
+        STOCK_LOCK_WAIT.labels(operation=operation).observe(time.perf_counter() - started)
+        return {quant.id: quant for quant in quants}
+
+    def _plan(self, quants: dict, qty: Decimal):
+        """FIFO split of qty over the locked quants: ([(quant_id, take)], total available)"""
+        if not quants:
+            return [], Decimal("0")
+
+        available = StockQuant.qty_on_hand - StockQuant.qty_reserved
+        ranked = (
+            select(
+                StockQuant.id.label("quant_id"),
+                available.label("available"),
+                func.sum(available).over(order_by=FIFO_ORDER).label("running"),
+            )
+            .outerjoin(StockLot, StockLot.id == StockQuant.lot_id)
+            .where(StockQuant.id.in_(list(quants)))
+            .subquery()
+        )
+        before = ranked.c.running - ranked.c.available
+        take = case((ranked.c.running <= qty, ranked.c.available), else_=qty - before)
+        rows = self.db.execute(
+            select(ranked.c.quant_id, take.label("take"), ranked.c.running)
+            .where(before < qty)
+            .order_by(ranked.c.running, ranked.c.quant_id)
+        ).all()
+        total = _qty(rows[-1].running) if rows else Decimal("0")
+        return [(row.quant_id, _qty(row.take)) for row in rows], total
+
+    def _apply(self, operation, quants: dict, plan) -> List[StockAllocation]:
+        allocations = []
+        now = datetime.utcnow()
+        for quant_id, take in plan:
+            if take <= 0:
+                continue
+            quant = quants[quant_id]
+            if operation == RESERVE:
+                quant.qty_reserved = _qty(quant.qty_reserved) + take
+            else:
+                quant.qty_on_hand = _qty(quant.qty_on_hand) - take
+            quant.updated_at = now
+            allocations.append(StockAllocation(quant.id, quant.location_id, quant.lot_id, take))
+        # Inside the savepoint, so a deadlock on these UPDATEs is retried too
+        self.db.flush()
+        return allocations
+
+
+def _contention_reason(error: OperationalError) -> Optional[str]:
+    """Retry reason for lock contention errors, None for anything else"""
+    code = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    if code == "40P01":
+        return "deadlock"
+    if code == "40001":
+        return "serialization"
+    if code == "55P03":
+        return "lock_timeout"
+    if "database is locked" in str(error.orig):
+        return "locked"
+    return None
+
+
+def _qty(value) -> Decimal:
+    # SQLite hands sums back as float; amounts are stored with 2 decimals
+    return Decimal(str(value or 0)).quantize(_CENT)
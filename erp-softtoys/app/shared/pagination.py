@@ -0,0 +1,87 @@
+"""Keyset pagination and approximate counts
+For append-mostly, time-ordered tables (audit trail, security log) that
+grow by thousands of rows a day.
+
+- Keyset (seek) pagination on (timestamp DESC, id DESC): the next page is
+  `WHERE (timestamp, id) < (:last_timestamp, :last_id)`, served by a
+  composite index, so page 5,000 costs the same as page 1. The cursor is an
+  opaque token carrying the last row's key.
+- `approximate_count`: the planner's row estimate (PostgreSQL EXPLAIN)
+  instead of COUNT(*) over the filtered set; small results are counted
+  exactly.
+"""
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Query, Session
+
+logger = logging.getLogger(__name__)
+
+# Below this estimate an exact COUNT(*) is cheap enough
+EXACT_COUNT_THRESHOLD = 10000
+
+
+class InvalidCursorError(ValueError):
+    """The pagination cursor is malformed"""
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    payload = json.dumps([timestamp.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+
+
+def keyset_page(query: Query, timestamp_column, id_column, limit: int, cursor: str | None = None):
+    """Newest-first page of `query` after `cursor`.
+
+    Returns: (rows, next_cursor) - next_cursor is None on the last page.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(timestamp_column, id_column) < tuple_(timestamp, row_id))
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
+
+
+def approximate_count(db: Session, query: Query, exact_below: int = EXACT_COUNT_THRESHOLD) -> tuple[int, bool]:
+    """Row count of `query` for UI totals.
+
+    Returns: (count, is_estimate)
+    """
+    statement = query.order_by(None).statement
+    if db.get_bind().dialect.name == "postgresql":
+        estimate = _planner_estimate(db, statement)
+        if estimate is not None and estimate >= exact_below:
+            return estimate, True
+    count = db.execute(select(func.count()).select_from(statement.subquery())).scalar_one()
+    return count, False
+
+
+def _planner_estimate(db: Session, statement) -> int | None:
+    try:
+        compiled = statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+        with db.begin_nested():  # A failed EXPLAIN must not abort the request's transaction
+            plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:  # noqa: BLE001
+        logger.debug(f"Planner row estimate unavailable: {e}")
+        return None
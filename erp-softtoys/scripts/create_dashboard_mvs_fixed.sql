@@ -36,9 +36,12 @@ SELECT
     -- Metadata
     NOW() AS refreshed_at;
 
--- No unique index needed for simple single-row view
+-- Unique index required by REFRESH MATERIALIZED VIEW CONCURRENTLY (single row)
+CREATE UNIQUE INDEX idx_mv_dashboard_stats_refreshed 
+ON mv_dashboard_stats(refreshed_at);
+
 COMMENT ON MATERIALIZED VIEW mv_dashboard_stats IS 
-'Dashboard top-level statistics - refresh every 5 minutes';
+'Dashboard top-level statistics - refreshed by the application on MO/QC changes';
 
 
 -- ============================================================================
@@ -72,7 +75,7 @@ FROM work_orders
 WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
 GROUP BY department;
 
-CREATE INDEX idx_mv_production_dept_status_dept 
+CREATE UNIQUE INDEX idx_mv_production_dept_status_dept 
 ON mv_production_dept_status(dept);
 
 COMMENT ON MATERIALIZED VIEW mv_production_dept_status IS 
@@ -109,7 +112,7 @@ SELECT
     NOW() AS refreshed_at
 FROM qc_stats;
 
-CREATE INDEX idx_mv_qc_pass_rate_dept ON mv_qc_pass_rate(dept);
+CREATE UNIQUE INDEX idx_mv_qc_pass_rate_dept ON mv_qc_pass_rate(dept);
 
 COMMENT ON MATERIALIZED VIEW mv_qc_pass_rate IS 
 'QC pass rate by department (last 7 days) - refresh every 5 minutes';
@@ -143,7 +146,7 @@ LEFT JOIN stock_quants sq ON sq.product_id = p.id
 WHERE p.type IN ('Raw Material', 'WIP')
 GROUP BY p.id, p.code, p.name, p.type, p.min_stock;
 
-CREATE INDEX idx_mv_inventory_status_product ON mv_inventory_status(product_id);
+CREATE UNIQUE INDEX idx_mv_inventory_status_product ON mv_inventory_status(product_id);
 CREATE INDEX idx_mv_inventory_status_status ON mv_inventory_status(stock_status);
 
 COMMENT ON MATERIALIZED VIEW mv_inventory_status IS 
@@ -151,15 +154,16 @@ COMMENT ON MATERIALIZED VIEW mv_inventory_status IS
 
 
 -- ============================================================================
--- Refresh Function (can be called from cron or application)
+-- Refresh Function (manual use; the application refreshes the views itself
+-- when their source tables change - app/core/matview_refresher.py)
 -- ============================================================================
 CREATE OR REPLACE FUNCTION refresh_dashboard_views()
 RETURNS void AS $$
 BEGIN
-    REFRESH MATERIALIZED VIEW mv_dashboard_stats;
-    REFRESH MATERIALIZED VIEW mv_production_dept_status;
-    REFRESH MATERIALIZED VIEW mv_qc_pass_rate;
-    REFRESH MATERIALIZED VIEW mv_inventory_status;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_dashboard_stats;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_production_dept_status;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_qc_pass_rate;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_inventory_status;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -0,0 +1,48 @@
+"""Create upcoming audit log partitions and archive expired ones
+
+The application runs this every AUDIT_PARTITION_CHECK_INTERVAL_SECONDS
+(see app/core/audit_partitions.py). Run it by hand or from cron when the
+in-process maintainer is disabled, or to apply a new retention setting now:
+
+    python scripts/maintain_audit_partitions.py
+    python scripts/maintain_audit_partitions.py --retention-months 36
+    python scripts/maintain_audit_partitions.py --archive-dir /mnt/audit-archive
+
+Expired partitions are only archived and dropped when the archive directory
+is an existing absolute path on persistent storage.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.audit_partitions import archive_location_problem, audit_partition_maintainer
+from app.core.database import engine
+
+
+def maintain(retention_months: int | None = None, archive_dir: str | None = None):
+    """One maintenance pass over every partitioned audit table"""
+    if engine.dialect.name != "postgresql":
+        print("ℹ️ Audit partitioning is PostgreSQL only - nothing to do")
+        return
+    audit_partition_maintainer.engine = engine
+    if retention_months is not None:
+        audit_partition_maintainer.retention_months = retention_months
+    if archive_dir is not None:
+        audit_partition_maintainer.archive_dir = archive_dir
+    problem = archive_location_problem(audit_partition_maintainer.archive_dir)
+    if audit_partition_maintainer.retention_months > 0 and problem:
+        print(f"❌ Expired partitions are kept: {problem}")
+    summary = audit_partition_maintainer.run_once()
+    print(f"✅ Created {len(summary['created'])} partitions: {', '.join(summary['created']) or '-'}")
+    print(f"✅ Archived {len(summary['archived'])} partitions: {', '.join(summary['archived']) or '-'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--retention-months", type=int, help="Override AUDIT_RETENTION_MONTHS (0 = keep forever)")
+    parser.add_argument("--archive-dir", help="Override AUDIT_ARCHIVE_DIR (absolute path on persistent storage)")
+    args = parser.parse_args()
+    maintain(args.retention_months, args.archive_dir)
@@ -0,0 +1,43 @@
+"""Rebuild audit_summary_hourly from raw audit_logs rows
+
+The hourly buckets are maintained incrementally by the audit writer. Run
+this after bulk imports of audit data, archive restores, manual SQL fixes,
+or whenever the audit summary looks out of sync:
+
+    python scripts/rebuild_audit_summary.py
+    python scripts/rebuild_audit_summary.py --since 2026-03-01T00:00
+"""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.database import SessionLocal
+from app.services.audit_summary_service import AuditSummaryService
+
+
+def rebuild(since: datetime | None = None):
+    """Recompute all buckets, or those from `since`, in a single transaction"""
+    db = SessionLocal()
+    try:
+        count = AuditSummaryService(db).rebuild(since)
+        db.commit()
+        scope = f"since {since:%Y-%m-%d %H:00}" if since else "for all audit logs"
+        print(f"✅ Rebuilt {count} hourly audit summary buckets {scope}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="Only rebuild buckets from this hour on (ISO date/time)")
+    args = parser.parse_args()
+    rebuild(args.since)
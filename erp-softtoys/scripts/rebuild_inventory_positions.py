@@ -0,0 +1,37 @@
+"""Rebuild inventory_positions and inventory_lot_age from stock_quants
+
+Both tables are maintained incrementally whenever a StockQuant is flushed.
+Run this after SQL that changes stock_quants directly, lot receipt date
+corrections, restores, or whenever the warehouse overview looks out of sync:
+
+    python scripts/rebuild_inventory_positions.py
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.database import SessionLocal
+from app.services.inventory_position_service import InventoryPositionService
+
+
+def rebuild():
+    """Recompute the whole position store in a single transaction"""
+    db = SessionLocal()
+    try:
+        count = InventoryPositionService(db).rebuild()
+        db.commit()
+        print(f"✅ Rebuilt {count} inventory positions")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args()
+    rebuild()
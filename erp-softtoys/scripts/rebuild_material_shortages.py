@@ -0,0 +1,38 @@
+"""Rebuild material_shortages from SPK allocations and Warehouse Main stock
+
+The index is recomputed per material whenever its allocations or stock
+quants are flushed. Run this after SQL that changes spk_material_allocations
+or stock_quants directly, after renaming the Warehouse Main location, or
+whenever the shortage alerts look out of sync:
+
+    python scripts/rebuild_material_shortages.py
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.database import SessionLocal
+from app.services.material_shortage_service import MaterialShortageService
+
+
+def rebuild():
+    """Recompute the whole shortage index in a single transaction"""
+    db = SessionLocal()
+    try:
+        count = MaterialShortageService(db).rebuild()
+        db.commit()
+        print(f"✅ Rebuilt {count} material shortages")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args()
+    rebuild()
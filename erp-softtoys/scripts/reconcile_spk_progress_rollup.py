@@ -0,0 +1,49 @@
+"""Rebuild spk_progress_rollup from raw spk_daily_production rows
+
+The rollup is maintained incrementally by daily input / completion /
+modification undo. Run this after bulk imports, manual SQL fixes, or
+whenever progress figures look out of sync:
+
+    python scripts/reconcile_spk_progress_rollup.py
+    python scripts/reconcile_spk_progress_rollup.py --spk-id 42
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.database import SessionLocal
+from app.services.spk_progress_rollup_service import SPKProgressRollupService
+
+
+def reconcile(spk_id: int | None = None):
+    """Rebuild one SPK or the whole rollup table in a single transaction"""
+    db = SessionLocal()
+    try:
+        service = SPKProgressRollupService(db)
+        if spk_id is not None:
+            rollup = service.refresh(spk_id)
+            db.commit()
+            if rollup:
+                print(f"✅ SPK {spk_id}: cumulative={rollup.cumulative_qty}, days={rollup.days_tracked}")
+            else:
+                print(f"ℹ️ SPK {spk_id} has no daily production entries")
+        else:
+            count = service.rebuild_all()
+            db.commit()
+            print(f"✅ Rebuilt progress rollup for {count} SPKs")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spk-id", type=int, default=None, help="Only rebuild this SPK")
+    args = parser.parse_args()
+    reconcile(args.spk_id)
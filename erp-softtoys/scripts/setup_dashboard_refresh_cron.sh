@@ -7,6 +7,9 @@
 # Author: Daniel - IT Developer Senior
 # Date: 2026-01-21
 # Schedule: Every 5 minutes
+# Note: Optional - the backend refreshes the views itself when their source
+#       tables change (MATVIEW_REFRESH_ENABLED, app/core/matview_refresher.py).
+#       Keep the cron job only for deployments with the refresher disabled.
 # ============================================================================
 
 set -e  # Exit on error
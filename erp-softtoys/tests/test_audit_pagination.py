@@ -0,0 +1,121 @@
+"""
+Tests for audit trail keyset pagination
+Cursor pages on (timestamp, id), approximate totals and the streamed CSV
+export.
+"""
+
+import csv
+import io
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.api.v1.audit import export_audit_logs_csv, get_audit_logs, get_audit_trail_large_dataset
+from app.core.models.audit import AuditAction, AuditLog, AuditModule
+from app.shared.pagination import approximate_count, decode_cursor, encode_cursor
+
+BASE = datetime(2026, 3, 1, 8, 0, 0)
+
+
+@pytest.fixture
+def audit_logs(db, admin_user):
+    logs = []
+    for i in range(23):
+        logs.append(AuditLog(
+            timestamp=BASE + timedelta(minutes=i // 3),   # three rows share each timestamp
+            user_id=admin_user.id if i % 2 else None,
+            username="admin" if i % 2 else "System",
+            action=AuditAction.UPDATE,
+            module=AuditModule.WAREHOUSE if i % 4 else AuditModule.PPIC,
+            description=f"event {i}",
+        ))
+    db.add_all(logs)
+    db.flush()
+    return sorted(logs, key=lambda log: (log.timestamp, log.id), reverse=True)
+
+
+def _collect(db, admin_user, **filters):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = get_audit_logs(db=db, current_user=admin_user, page=1, page_size=5, cursor=cursor,
+                              user_id=None, username=None, action=None, module=None, entity_type=None,
+                              start_date=None, end_date=None, search=None, **filters)
+        ids.extend(log.id for log in page["data"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+
+class TestKeysetPagination:
+
+    def test_cursor_pages_cover_all_rows_newest_first(self, db, admin_user, audit_logs):
+        ids, pages = _collect(db, admin_user)
+        assert ids == [log.id for log in audit_logs]
+        assert pages == 5
+
+    def test_deep_pages_seek_instead_of_skipping(self, db, admin_user, audit_logs):
+        statements = []
+        listener = lambda *args: statements.append((args[2], args[3]))  # noqa: E731
+        event.listen(db.get_bind(), "before_cursor_execute", listener)
+        try:
+            _collect(db, admin_user)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", listener)
+        pages = [(sql, params) for sql, params in statements if "ORDER BY" in sql]
+        assert len(pages) == 5
+        for sql, params in pages[1:]:
+            assert "(audit_logs.timestamp, audit_logs.id) <" in sql
+            assert params[-2:] == (6, 0)  # LIMIT page_size + 1, no rows skipped
+
+    @pytest.mark.asyncio
+    async def test_audit_trail_cursor_with_module_filter(self, db, admin_user, audit_logs):
+        expected = [log.id for log in audit_logs if log.module == AuditModule.WAREHOUSE]
+        seen, cursor = [], None
+        while True:
+            page = await get_audit_trail_large_dataset(db=db, current_user=admin_user, limit=4, offset=0,
+                                                       cursor=cursor, module="Warehouse", action=None)
+            seen.extend(row["id"] for row in page["data"])
+            assert page["has_more"] is (page["next_cursor"] is not None)
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == expected
+        assert page["total"] == len(expected) and page["total_is_estimate"] is False
+
+    def test_legacy_page_numbers_still_work(self, db, admin_user, audit_logs):
+        page = get_audit_logs(db=db, current_user=admin_user, page=2, page_size=5, cursor=None,
+                              user_id=None, username=None, action=None, module=None, entity_type=None,
+                              start_date=None, end_date=None, search=None)
+        assert [log.id for log in page["data"]] == [log.id for log in audit_logs[5:10]]
+        assert decode_cursor(page["next_cursor"]) == (audit_logs[9].timestamp, audit_logs[9].id)
+
+    def test_invalid_cursor_is_rejected(self, db, admin_user, audit_logs):
+        with pytest.raises(HTTPException) as exc:
+            get_audit_logs(db=db, current_user=admin_user, page=1, page_size=5, cursor="garbage",
+                           user_id=None, username=None, action=None, module=None, entity_type=None,
+                           start_date=None, end_date=None, search=None)
+        assert exc.value.status_code == 400
+
+    def test_cursor_round_trip(self):
+        assert decode_cursor(encode_cursor(BASE, 42)) == (BASE, 42)
+
+
+class TestCountsAndExport:
+
+    def test_small_results_are_counted_exactly(self, db, audit_logs):
+        query = db.query(AuditLog).filter(AuditLog.module == AuditModule.PPIC)
+        assert approximate_count(db, query) == (6, False)
+
+    @pytest.mark.asyncio
+    async def test_csv_export_streams_every_row(self, db, admin_user, audit_logs):
+        response = export_audit_logs_csv(db=db, current_user=admin_user, start_date=None, end_date=None)
+        body = b"".join([chunk async for chunk in response.body_iterator]).decode()
+
+        records = list(csv.reader(io.StringIO(body)))
+        assert records[0][:3] == ["ID", "Timestamp", "Username"]
+        assert [int(r[0]) for r in records[1:]] == [log.id for log in audit_logs]
+        assert records[1][1] == audit_logs[0].timestamp.isoformat()
+        assert records[1][5] == "UPDATE"
@@ -0,0 +1,89 @@
+"""
+Tests for audit log partition maintenance
+Month arithmetic and partition naming, retention cut-off, the archive
+writer and archive location check, and the PostgreSQL-only startup guard.
+"""
+
+import gzip
+import json
+from datetime import date
+
+from sqlalchemy import create_engine
+
+from app.core.audit_partitions import (
+    PARTITIONED_TABLES,
+    AuditPartitionMaintainer,
+    add_months,
+    archive_location_problem,
+    expired_months,
+    months_to_create,
+    parse_partition_month,
+    partition_name,
+    write_archive,
+)
+
+
+def test_add_months_crosses_year_boundaries():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert add_months(date(2026, 3, 31), 0) == date(2026, 3, 1)
+
+
+def test_partition_names_round_trip():
+    name = partition_name("audit_logs", date(2026, 3, 1))
+    assert name == "audit_logs_y2026m03"
+    assert parse_partition_month("audit_logs", name) == date(2026, 3, 1)
+    # Default partition and other tables' partitions are not monthly partitions of this table
+    assert parse_partition_month("audit_logs", "audit_logs_default") is None
+    assert parse_partition_month("security_logs", name) is None
+
+
+def test_months_to_create_covers_current_and_ahead():
+    assert months_to_create(date(2026, 12, 15), 2) == [date(2026, 12, 1), date(2027, 1, 1), date(2027, 2, 1)]
+
+
+def test_expired_months_respects_retention():
+    months = [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1), date(2026, 3, 1)]
+    # 24 months kept on 2026-03-15: 2024-03 onwards stays online
+    assert expired_months(months, date(2026, 3, 15), 24) == [date(2024, 1, 1), date(2024, 2, 1)]
+    assert expired_months(months, date(2026, 3, 15), 0) == []
+
+
+def test_write_archive_compresses_and_writes_manifest(tmp_path):
+    rows = b"id,timestamp,action\n1,2024-01-02 10:00:00,CREATE\n2,2024-01-03 11:00:00,DELETE\n"
+
+    manifest = write_archive(lambda file: file.write(rows), tmp_path / "audit", "audit_logs_y2024m01")
+
+    archive = tmp_path / "audit" / "audit_logs_y2024m01.csv.gz"
+    assert gzip.decompress(archive.read_bytes()) == rows
+    assert manifest["rows"] == 2
+    assert not (tmp_path / "audit" / "audit_logs_y2024m01.csv.gz.partial").exists()
+    on_disk = json.loads((tmp_path / "audit" / "audit_logs_y2024m01.manifest.json").read_text())
+    assert on_disk["sha256"] == manifest["sha256"]
+
+
+def test_archive_location_must_be_an_existing_absolute_path(tmp_path):
+    assert "not set" in archive_location_problem("")
+    assert "absolute" in archive_location_problem("archives/audit")
+    assert "mounted" in archive_location_problem(str(tmp_path / "missing"))
+    assert archive_location_problem(str(tmp_path)) is None
+
+
+def test_expired_partitions_kept_without_archive_location(monkeypatch):
+    maintainer = AuditPartitionMaintainer(PARTITIONED_TABLES, retention_months=24, archive_dir="archives/audit")
+    name = partition_name("audit_logs", date(2024, 1, 1))
+    monkeypatch.setattr(maintainer, "_partitions", lambda table: ({date(2024, 1, 1): name}, {name}))
+
+    # No engine: nothing may be detached, exported or dropped
+    assert maintainer._archive_expired("audit_logs", date(2026, 3, 15)) == []
+
+
+def test_maintainer_thread_not_started_on_sqlite(tmp_path, monkeypatch):
+    from app.core import audit_partitions
+
+    maintainer = AuditPartitionMaintainer(PARTITIONED_TABLES, engine=create_engine(f"sqlite:///{tmp_path / 'a.db'}"))
+    monkeypatch.setattr(audit_partitions, "audit_partition_maintainer", maintainer)
+
+    audit_partitions.start_audit_partition_maintainer()
+
+    assert maintainer._thread is None
@@ -0,0 +1,112 @@
+"""
+Tests for the hourly audit summary store
+Buckets maintained by the audit writer, exact window counts, top lists
+and the rebuild from raw logs.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.core.audit_writer import MODE_BACKGROUND, AuditLogWriter, audit_writer, install_session_hooks
+from app.core.models.audit import AuditAction, AuditLog, AuditModule, AuditSummaryBucket
+from app.core.models.products import Category
+from app.services.audit_summary_service import AuditSummaryService
+
+NOW = datetime(2026, 3, 18, 10, 30)
+
+
+def _log(timestamp, username="tester", module=AuditModule.WAREHOUSE, action=AuditAction.UPDATE):
+    return AuditLog(timestamp=timestamp, username=username, module=module, action=action,
+                    description="summary test")
+
+
+def _buckets(db):
+    return {
+        (b.bucket_start, b.module, b.action, b.username): b.event_count
+        for b in db.scalars(select(AuditSummaryBucket))
+    }
+
+
+def test_writer_events_fold_into_hourly_buckets(db):
+    install_session_hooks()
+    category = Category(name="Audit-Summary", description="audit")
+    db.add(category)
+    for minute in (5, 40):
+        audit_writer.submit(category, {
+            'timestamp': NOW.replace(minute=minute), 'username': 'tester',
+            'action': AuditAction.CREATE, 'module': AuditModule.WAREHOUSE, 'description': "created",
+        })
+    db.flush()
+
+    assert _buckets(db) == {(datetime(2026, 3, 18, 10), AuditModule.WAREHOUSE, AuditAction.CREATE, 'tester'): 2}
+
+
+def test_directly_added_logs_are_counted(db):
+    install_session_hooks()
+    db.add_all([_log(NOW), _log(NOW, username=None, module=AuditModule.PPIC)])
+    db.flush()
+    db.add(_log(NOW + timedelta(minutes=5)))
+    db.flush()
+
+    assert _buckets(db) == {
+        (datetime(2026, 3, 18, 10), AuditModule.WAREHOUSE, AuditAction.UPDATE, 'tester'): 2,
+        (datetime(2026, 3, 18, 10), AuditModule.PPIC, AuditAction.UPDATE, ''): 1,
+    }
+
+
+def test_summary_window_counts_are_exact(db):
+    install_session_hooks()
+    db.add_all([
+        _log(NOW - timedelta(hours=24, minutes=10)),  # just outside 24h
+        _log(NOW - timedelta(hours=23, minutes=50)),  # partial first hour
+        _log(NOW - timedelta(hours=2)),
+        _log(NOW - timedelta(days=3), username="planner", module=AuditModule.PPIC),
+        _log(NOW - timedelta(days=40)),
+    ])
+    db.flush()
+
+    summary = AuditSummaryService(db).summary(NOW)
+
+    assert summary["total_events"] == 5
+    assert summary["events_last_24h"] == 2
+    assert summary["events_last_7d"] == 4
+    assert summary["top_users"][0] == {"username": "tester", "event_count": 3}
+    assert {m["module"] for m in summary["top_modules"]} == {AuditModule.WAREHOUSE, AuditModule.PPIC}
+
+
+def test_rebuild_matches_incremental_buckets(db):
+    install_session_hooks()
+    db.add_all([_log(NOW - timedelta(hours=h), username=f"user{h % 3}") for h in range(0, 48, 5)])
+    db.add(_log(NOW, username=None))
+    db.flush()
+    incremental = _buckets(db)
+
+    db.query(AuditSummaryBucket).delete()
+    AuditSummaryService(db).rebuild()
+    assert _buckets(db) == incremental
+
+    # Partial rebuild leaves older buckets alone
+    AuditSummaryService(db).rebuild(since=NOW - timedelta(hours=6))
+    assert _buckets(db) == incremental
+
+
+def test_background_batches_fold_into_buckets(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    AuditLog.__table__.create(engine)
+    AuditSummaryBucket.__table__.create(engine)
+    session_factory = sessionmaker(bind=engine)
+    writer = AuditLogWriter(mode=MODE_BACKGROUND, batch_size=10, flush_interval=0.05,
+                            session_factory=session_factory)
+    writer.start()
+    for i in range(12):
+        writer.submit(None, {'timestamp': NOW, 'username': 'tester', 'action': AuditAction.DELETE,
+                             'module': AuditModule.WAREHOUSE, 'description': f"deleted #{i}"})
+    writer.stop()
+
+    with session_factory() as db:
+        assert AuditSummaryService(db).total_events() == 12
+    engine.dispose()
@@ -0,0 +1,161 @@
+"""
+Audit Log Writer Tests
+Transaction-mode bulk insert, background batching, backpressure and spooling
+"""
+
+import threading
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.audit_writer import (
+    MODE_BACKGROUND,
+    MODE_TRANSACTION,
+    AuditLogWriter,
+    audit_writer,
+    install_session_hooks,
+)
+from app.core.models.audit import AuditAction, AuditLog, AuditModule, AuditSummaryBucket
+from app.core.models.products import Category
+
+
+def _event(i: int = 1) -> dict:
+    return {
+        'username': 'tester',
+        'action': AuditAction.UPDATE,
+        'module': AuditModule.WAREHOUSE,
+        'entity_type': 'StockQuant',
+        'entity_id': i,
+        'description': f"Stock adjusted #{i}",
+        'new_values': {'qty_on_hand': i},
+    }
+
+
+def _count(session_factory) -> int:
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(AuditLog))
+
+
+@pytest.fixture
+def audit_db(tmp_path):
+    """File-backed SQLite so the flusher thread sees the same database"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    AuditLog.__table__.create(engine)
+    AuditSummaryBucket.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+class TestTransactionMode:
+    """Events are inserted on the flushing session's own transaction"""
+
+    def test_events_written_in_same_flush(self, db):
+        install_session_hooks()
+        assert audit_writer.mode == MODE_TRANSACTION
+        category = Category(name="Audit-Tx", description="audit")
+        db.add(category)
+
+        audit_writer.submit(category, _event(1))
+        audit_writer.submit(category, _event(2))
+        db.flush()
+
+        rows = db.query(AuditLog).filter(AuditLog.username == 'tester').all()
+        assert {r.entity_id for r in rows} == {1, 2}
+
+    def test_rollback_discards_buffer(self, db):
+        install_session_hooks()
+        category = Category(name="Audit-Rollback", description="audit")
+        db.add(category)
+        audit_writer.submit(category, _event(3))
+
+        db.rollback()
+
+        assert 'audit_event_buffer' not in db.info
+
+    def test_decimal_values_are_json_safe(self, db):
+        from decimal import Decimal
+
+        install_session_hooks()
+        category = Category(name="Audit-Decimal", description="audit")
+        db.add(category)
+        event = _event(4)
+        event['new_values'] = {'qty_on_hand': Decimal("12.5")}
+
+        audit_writer.submit(category, event)
+        db.flush()
+
+        row = db.query(AuditLog).filter(AuditLog.entity_id == 4).one()
+        assert row.new_values == {'qty_on_hand': 12.5}
+
+
+class TestBackgroundMode:
+    """Bounded queue, batched flushes, backpressure and crash-safe spooling"""
+
+    def test_batches_drained_on_stop(self, audit_db):
+        writer = AuditLogWriter(mode=MODE_BACKGROUND, batch_size=10, flush_interval=0.05,
+                                session_factory=audit_db)
+        writer.start()
+        for i in range(25):
+            writer.submit(None, _event(i))
+        writer.stop()
+
+        assert _count(audit_db) == 25
+
+    def test_full_queue_falls_back_to_sync_write(self, audit_db):
+        writer = AuditLogWriter(mode=MODE_BACKGROUND, max_queue_size=1, enqueue_timeout=0.01,
+                                session_factory=audit_db)
+        # Simulate a stalled flusher thread
+        release = threading.Event()
+        writer._thread = threading.Thread(target=release.wait, daemon=True)
+        writer._thread.start()
+
+        writer.submit(None, _event(1))   # queued
+        writer.submit(None, _event(2))   # queue full -> written synchronously
+
+        assert _count(audit_db) == 1
+        assert writer._queue.qsize() == 1
+        release.set()
+        writer.stop()
+        assert _count(audit_db) == 2
+
+    def test_failed_batch_is_spooled_and_replayed(self, audit_db, tmp_path):
+        spool = tmp_path / "spool.jsonl"
+
+        def broken_factory():
+            raise RuntimeError("database unavailable")
+
+        failing = AuditLogWriter(mode=MODE_BACKGROUND, max_retries=1, spool_path=str(spool),
+                                 session_factory=broken_factory)
+        failing.submit(None, _event(7))
+        assert spool.exists()
+
+        recovering = AuditLogWriter(mode=MODE_BACKGROUND, spool_path=str(spool),
+                                    session_factory=audit_db)
+        assert recovering.replay_spool() == 1
+        assert not spool.exists()
+
+        with audit_db() as db:
+            row = db.query(AuditLog).one()
+            assert row.module == AuditModule.WAREHOUSE
+            assert row.entity_id == 7
+
+    def test_interrupted_replay_is_not_lost(self, audit_db, tmp_path):
+        spool = tmp_path / "spool.jsonl"
+
+        def broken_factory():
+            raise RuntimeError("database unavailable")
+
+        failing = AuditLogWriter(mode=MODE_BACKGROUND, max_retries=1, spool_path=str(spool),
+                                 session_factory=broken_factory)
+        failing.submit(None, _event(8))
+        spool.rename(tmp_path / "spool.jsonl.replay")  # Worker died mid-replay
+        failing.submit(None, _event(9))
+
+        recovering = AuditLogWriter(mode=MODE_BACKGROUND, spool_path=str(spool),
+                                    session_factory=audit_db)
+        assert recovering.replay_spool() == 2
+        assert not list(tmp_path.glob("spool.jsonl*"))
+
+        with audit_db() as db:
+            assert sorted(row.entity_id for row in db.query(AuditLog)) == [8, 9]
@@ -0,0 +1,164 @@
+"""
+Tests for the barcode resolution index
+Product / pallet / carton resolution, eviction on commit, the shared
+version poll, stale-load protection and the scan validation endpoint.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from app.api.v1.barcode import BarcodeValidationRequest, validate_barcode
+from app.core.barcode_index import CACHE_NAME, BarcodeIndex, barcode_index, bump_version, install_session_hooks
+from app.core.models.manufacturing import ManufacturingOrder, RoutingType
+from app.core.models.products import UOM, Category, Product, ProductType
+from app.core.models.sequences import CacheVersion
+from app.core.models.warehouse import Location, LocationType, PalletBarcode, StockLot, StockQuant
+from app.services.inventory_position_service import install_session_hooks as install_position_hooks
+from app.services.masterdata_import_service import MasterdataImportService
+
+
+@pytest.fixture
+def scan_data(db):
+    install_session_hooks()
+    install_position_hooks()
+    barcode_index.clear()
+    category = Category(name="Scan Index")
+    db.add(category)
+    db.flush()
+    bear = Product(code="IDX-BEAR", name="Index Bear", type=ProductType.FINISH_GOOD, uom=UOM.PCS,
+                   category_id=category.id, pcs_per_carton=60, cartons_per_pallet=8)
+    rack = Location(name="IDX Warehouse Rack", type=LocationType.INTERNAL)
+    db.add_all([bear, rack])
+    db.flush()
+    mo = ManufacturingOrder(product_id=bear.id, qty_planned=Decimal("480"), batch_number="IDX-BATCH",
+                            routing_type=RoutingType.ROUTE1)
+    db.add(mo)
+    db.flush()
+    pallet = PalletBarcode(barcode="PLT-2026-09999", product_id=bear.id, carton_count=8, total_pcs=480)
+    db.add(pallet)
+    db.flush()
+    yield {"db": db, "bear": bear, "rack": rack, "mo": mo, "pallet": pallet}
+    barcode_index.clear()
+
+
+def test_resolves_products_pallets_and_cartons(scan_data):
+    db, bear, mo = scan_data["db"], scan_data["bear"], scan_data["mo"]
+    index = BarcodeIndex()
+
+    product = index.resolve(db, "IDX-BEAR")
+    assert (product.kind, product.product.id, product.product.pcs_per_carton) == ("product", bear.id, 60)
+    assert index.resolve(db, "IDX-BEAR").product is product.product  # Served from memory
+
+    pallet = index.resolve(db, "PLT-2026-09999")
+    assert pallet.kind == "pallet" and pallet.pallet.total_pcs == 480 and pallet.product.code == "IDX-BEAR"
+
+    carton = index.resolve(db, f"FG-2026-{mo.id:05d}-CTN001")
+    assert carton.kind == "carton" and carton.order.id == mo.id and carton.product.id == bear.id
+
+    assert index.resolve(db, "IDX-NOPE") is None
+    assert ("product", "IDX-NOPE") not in index._entries  # Unknown codes are not cached
+
+
+def test_committed_master_data_change_evicts_and_bumps_version(scan_data):
+    db, bear = scan_data["db"], scan_data["bear"]
+    assert barcode_index.product(db, "IDX-BEAR").name == "Index Bear"
+    before = db.scalar(select(CacheVersion.version).where(CacheVersion.name == CACHE_NAME)) or 0
+
+    savepoint = db.begin_nested()
+    bear.name = "Rolled Back Bear"
+    db.flush()
+    savepoint.rollback()
+    assert barcode_index.product(db, "IDX-BEAR").name == "Index Bear"
+
+    bear.name = "Index Bear v2"
+    db.commit()
+
+    assert barcode_index.product(db, "IDX-BEAR").name == "Index Bear v2"
+    assert db.scalar(select(CacheVersion.version).where(CacheVersion.name == CACHE_NAME)) > before
+
+
+def test_bulk_upsert_clears_index_and_bumps_version(scan_data):
+    db, bear = scan_data["db"], scan_data["bear"]
+    assert barcode_index.product(db, "IDX-BEAR").uom == UOM.PCS
+    before = db.scalar(select(CacheVersion.version).where(CacheVersion.name == CACHE_NAME)) or 0
+
+    MasterdataImportService(db, user_id=1)._upsert(Product, [{
+        "code": "IDX-BEAR", "name": "Imported Bear", "type": ProductType.FINISH_GOOD, "uom": UOM.METER,
+        "category_id": bear.category_id,
+    }], ["code"], ["name", "uom"])
+    db.commit()
+
+    entry = barcode_index.product(db, "IDX-BEAR")
+    assert (entry.name, entry.uom) == ("Imported Bear", UOM.METER)
+    assert db.scalar(select(CacheVersion.version).where(CacheVersion.name == CACHE_NAME)) > before
+
+
+def test_master_entries_expire(scan_data, monkeypatch):
+    db = scan_data["db"]
+    index = BarcodeIndex(master_ttl=60)
+    entry = index.product(db, "IDX-BEAR")
+    assert index.product(db, "IDX-BEAR") is entry
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert index.product(db, "IDX-BEAR") is not entry  # Reloaded after master_ttl
+
+
+def test_pallet_status_change_keeps_index(scan_data):
+    db, pallet = scan_data["db"], scan_data["pallet"]
+    entry = barcode_index.pallet(db, "PLT-2026-09999")
+    before = db.scalar(select(CacheVersion.version).where(CacheVersion.name == CACHE_NAME))
+
+    pallet.received_at = datetime.now()  # Not an indexed column
+    db.commit()
+
+    assert barcode_index.pallet(db, "PLT-2026-09999") is entry
+    assert db.scalar(select(CacheVersion.version).where(CacheVersion.name == CACHE_NAME)) == before
+
+
+def test_version_bump_from_another_worker_clears_index(scan_data):
+    db = scan_data["db"]
+    index = BarcodeIndex()
+    connection = db.connection()
+    index.poll_version(connection)
+    index.product(db, "IDX-BEAR")
+    assert len(index) == 1
+
+    index.poll_version(connection)
+    assert len(index) == 1
+    bump_version(connection)
+    index.poll_version(connection)
+    assert len(index) == 0
+
+
+def test_load_racing_an_eviction_is_not_stored():
+    index = BarcodeIndex()
+
+    def load():
+        index.evict([("product", "IDX-RACE")])  # Commit lands while the row is being read
+        return "stale"
+
+    assert index._get(("product", "IDX-RACE"), load) == "stale"
+    assert ("product", "IDX-RACE") not in index._entries
+
+
+def test_validate_endpoint_uses_stock_snapshot(scan_data, admin_user):
+    db, bear, rack = scan_data["db"], scan_data["bear"], scan_data["rack"]
+    lot = StockLot(product_id=bear.id, lot_number="IDX-LOT-1", qty_initial=Decimal("120"),
+                   qty_remaining=Decimal("120"), received_date=datetime.now())
+    db.add(lot)
+    db.flush()
+    db.add(StockQuant(product_id=bear.id, location_id=rack.id, lot_id=lot.id, qty_on_hand=Decimal("120")))
+    db.commit()
+
+    request = BarcodeValidationRequest(barcode="IDX-BEAR", operation="pick", location="warehouse")
+    result = asyncio.run(validate_barcode(request, db=db, current_user=admin_user))
+
+    assert result.valid is True
+    assert result.current_qty == 120.0
+    assert result.lot_number == "IDX-LOT-1"
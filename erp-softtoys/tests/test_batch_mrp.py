@@ -0,0 +1,141 @@
+"""
+Tests for the batch MRP run
+Netting of many MOs against stock and open POs with a fixed query budget.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.core.models.bom import BOMDetail, BOMHeader, BOMType
+from app.core.models.manufacturing import ManufacturingOrder, MOState, RoutingType
+from app.core.models.products import UOM, Category, Partner, PartnerType, Product, ProductType
+from app.core.models.warehouse import Location, LocationType, POStatus, POType, PurchaseOrder, StockQuant
+from app.services.mrp_batch_service import BatchMRPService
+
+
+@pytest.fixture
+def plant(db):
+    """Two articles sharing fabric; stock in the warehouse, more on an open PO"""
+    category = Category(name="MRP Softtoys")
+    db.add(category)
+    db.flush()
+
+    def product(code, ptype=ProductType.RAW_MATERIAL, min_stock=0):
+        p = Product(code=code, name=code, type=ptype, uom=UOM.PCS, category_id=category.id, min_stock=min_stock)
+        db.add(p)
+        db.flush()
+        return p
+
+    def bom(parent, lines):
+        header = BOMHeader(product_id=parent.id, bom_type=BOMType.MANUFACTURING, is_active=True)
+        db.add(header)
+        db.flush()
+        for component, qty in lines:
+            db.add(BOMDetail(bom_header_id=header.id, component_id=component.id, qty_needed=Decimal(qty)))
+        db.flush()
+
+    fabric = product("MRP_FABRIC")
+    thread = product("MRP_THREAD", min_stock=Decimal("10"))
+    label = product("MRP_LABEL")
+
+    cutting = product("MRP_WIP_CUTTING", ProductType.WIP)
+    bom(cutting, [(fabric, "2")])
+    bear = product("MRP_BEAR", ProductType.FINISH_GOOD)
+    bom(bear, [(cutting, "1"), (thread, "1"), (label, "1")])
+    dog = product("MRP_DOG", ProductType.FINISH_GOOD)
+    bom(dog, [(cutting, "2"), (thread, "1")])
+
+    warehouse = Location(name="MRP Warehouse", type=LocationType.INTERNAL)
+    floor = Location(name="MRP Line", type=LocationType.PRODUCTION)
+    db.add_all([warehouse, floor])
+    db.flush()
+    db.add_all([
+        StockQuant(product_id=fabric.id, location_id=warehouse.id, qty_on_hand=Decimal("300"), qty_reserved=Decimal("50")),
+        StockQuant(product_id=fabric.id, location_id=floor.id, qty_on_hand=Decimal("999")),  # not available
+        StockQuant(product_id=thread.id, location_id=warehouse.id, qty_on_hand=Decimal("1000")),
+    ])
+
+    supplier = Partner(name="MRP Supplier", type=PartnerType.SUPPLIER)
+    db.add(supplier)
+    db.flush()
+    db.add_all([
+        PurchaseOrder(supplier_id=supplier.id, po_number="PO-MRP-1", order_date=date.today(),
+                      expected_date=date.today(), status=POStatus.SENT, po_type=POType.KAIN,
+                      extra_metadata={"items": [{"product_id": fabric.id, "quantity": 100}]}),
+        PurchaseOrder(supplier_id=supplier.id, po_number="PO-MRP-2", order_date=date.today(),
+                      expected_date=date.today(), status=POStatus.RECEIVED, po_type=POType.KAIN,
+                      extra_metadata={"items": [{"product_id": fabric.id, "quantity": 5000}]}),
+    ])
+
+    def mo(article, qty, batch, planned):
+        order = ManufacturingOrder(product_id=article.id, qty_planned=Decimal(qty), production_quantity=Decimal(qty),
+                                   routing_type=RoutingType.ROUTE1, batch_number=batch, state=MOState.DRAFT,
+                                   week="W07", planned_production_date=planned)
+        db.add(order)
+        db.flush()
+        return order
+
+    mos = [
+        mo(bear, "100", "MRP-B1", date(2026, 2, 2)),   # fabric 200
+        mo(dog, "50", "MRP-D1", date(2026, 2, 3)),     # fabric 200
+    ]
+    return {"fabric": fabric, "thread": thread, "label": label, "mos": mos}
+
+
+def _by(rows, **match):
+    return [r for r in rows if all(r[k] == v for k, v in match.items())]
+
+
+class TestBatchMRP:
+
+    def test_nets_against_stock_and_open_po(self, db, plant):
+        result = BatchMRPService(db).run(week="W07")
+        fabric = _by(result["materials"], material_id=plant["fabric"].id)[0]
+
+        assert result["mo_count"] == 2
+        assert fabric["gross_requirement"] == 400
+        assert fabric["on_hand"] == 250      # warehouse only, minus reserved
+        assert fabric["on_order"] == 100     # received PO is not incoming supply
+        assert fabric["net_requirement"] == 50
+
+    def test_allocations_follow_mo_priority(self, db, plant):
+        bear_mo, dog_mo = plant["mos"]
+        result = BatchMRPService(db).run(mo_ids=[dog_mo.id, bear_mo.id])
+
+        bear = _by(result["allocations"], mo_id=bear_mo.id, material_id=plant["fabric"].id)[0]
+        dog = _by(result["allocations"], mo_id=dog_mo.id, material_id=plant["fabric"].id)[0]
+        assert (bear["allocated_from_stock"], bear["allocated_from_po"], bear["shortage_qty"]) == (200, 0, 0)
+        assert (dog["allocated_from_stock"], dog["allocated_from_po"], dog["shortage_qty"]) == (50, 100, 50)
+
+        shortages = _by(result["shortages"], mo_id=dog_mo.id)
+        assert [s["material_code"] for s in shortages] == ["MRP_FABRIC"]
+        assert shortages[0]["severity"] == "HIGH"   # 50 of 200 missing
+
+    def test_suggested_pos_include_safety_stock(self, db, plant):
+        result = BatchMRPService(db).run(week="W07")
+        suggestions = {s["material_code"]: s for s in result["suggested_pos"]}
+
+        assert suggestions["MRP_FABRIC"]["suggested_qty"] == 50
+        assert suggestions["MRP_LABEL"]["suggested_qty"] == 100   # no stock at all
+        assert "MRP_THREAD" not in suggestions                    # 1000 on hand covers 150 + 10
+
+    def test_query_count_is_fixed(self, db, plant):
+        statements = []
+        bind = db.get_bind()
+
+        def count(*args, **kwargs):
+            statements.append(1)
+
+        event.listen(bind, "before_cursor_execute", count)
+        try:
+            BatchMRPService(db).run(week="W07")
+        finally:
+            event.remove(bind, "before_cursor_execute", count)
+        assert len(statements) <= 6
+
+    def test_requires_selection(self, db):
+        with pytest.raises(ValueError):
+            BatchMRPService(db).run()
@@ -0,0 +1,178 @@
+"""
+Tests for the memoized, set-based BOM explosion engine
+Equivalence with the recursive reference path, cycle detection and a
+query-count / timing benchmark on a deep softtoy BOM.
+"""
+
+import time
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.core.models.bom import BOMDetail, BOMHeader, BOMType
+from app.core.models.products import UOM, Category, Product, ProductType
+from app.services.bom_explosion_engine import BOMCycleError, BOMExplosionEngine
+from app.services.bom_explosion_service import BOMExplosionService
+
+STAGES = ["CUTTING", "EMBO", "SEWING", "FINISHING", "PACKING"]
+
+
+def _product(db, category, code, ptype=ProductType.RAW_MATERIAL):
+    product = Product(code=code, name=code.replace("_", " "), type=ptype, uom=UOM.PCS, category_id=category.id)
+    db.add(product)
+    db.flush()
+    return product
+
+
+def _bom(db, product, lines):
+    header = BOMHeader(product_id=product.id, bom_type=BOMType.MANUFACTURING, is_active=True)
+    db.add(header)
+    db.flush()
+    for component, qty in lines:
+        db.add(BOMDetail(bom_header_id=header.id, component_id=component.id,
+                         qty_needed=Decimal(qty), wastage_percent=Decimal("0")))
+    db.flush()
+    return header
+
+
+def seed_softtoy(db, article="BEAR", materials_per_stage=6):
+    """FG -> PACKING -> FINISHING -> SEWING (2 parts) -> EMBO -> CUTTING -> fabric
+
+    Both sewing sub-assemblies (body and clothes) share the same EMBO stage,
+    so a naive explosion visits it twice.
+    """
+    category = Category(name=f"Softtoys {article}")
+    db.add(category)
+    db.flush()
+
+    def materials(stage):
+        return [(_product(db, category, f"{article}_{stage}_MAT{i}"), f"{i + 1}.5")
+                for i in range(materials_per_stage)]
+
+    cutting = _product(db, category, f"{article}_WIP_CUTTING", ProductType.WIP)
+    _bom(db, cutting, materials("CUT"))
+    embo = _product(db, category, f"{article}_WIP_EMBO", ProductType.WIP)
+    _bom(db, embo, [(cutting, "2")] + materials("EMB"))
+    sewing_body = _product(db, category, f"{article}_WIP_SEWING_BODY", ProductType.WIP)
+    _bom(db, sewing_body, [(embo, "1")] + materials("SEWB"))
+    sewing_baju = _product(db, category, f"{article}_WIP_SEWING_BAJU", ProductType.WIP)
+    _bom(db, sewing_baju, [(embo, "3")] + materials("SEWC"))
+    finishing = _product(db, category, f"{article}_WIP_FINISHING", ProductType.WIP)
+    _bom(db, finishing, [(sewing_body, "1"), (sewing_baju, "1")] + materials("FIN"))
+    packing = _product(db, category, f"{article}_WIP_PACKING", ProductType.WIP)
+    _bom(db, packing, [(finishing, "1")] + materials("PCK"))
+    fg = _product(db, category, f"{article}_FG", ProductType.FINISH_GOOD)
+    _bom(db, fg, [(packing, "1")])
+    return fg
+
+
+class _StatementCounter:
+    def __init__(self, db):
+        self.engine = db.get_bind()
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+
+def _leaf_totals(node, totals=None):
+    totals = {} if totals is None else totals
+    for material in node.get('materials', []):
+        totals[material['component_id']] = totals.get(material['component_id'], Decimal("0")) + material['total_qty_needed']
+    for child in node.get('children', []):
+        _leaf_totals(child, totals)
+    return totals
+
+
+class TestBOMExplosionEngine:
+
+    def test_matches_recursive_reference(self, db):
+        fg = seed_softtoy(db)
+        service = BOMExplosionService(db)
+
+        fast = service.explode_bom_multi_level(fg.id, Decimal("1200"))
+        reference = service._explode_bom_recursive(fg.id, Decimal("1200"))
+
+        # The reference path reports getattr(product, 'product_type') defaults
+        assert _leaf_totals(fast) == _leaf_totals(reference)
+        assert fast['children'][0]['department'] == 'PACKING'
+        assert fast['children'][0]['children'][0]['department'] == 'FINISHING'
+        assert len(fast['children'][0]['children'][0]['children']) == 2
+
+    def test_shared_subassembly_totals(self, db):
+        fg = seed_softtoy(db, materials_per_stage=1)
+        engine = BOMExplosionEngine(db)
+        totals = engine.material_totals(fg.id, Decimal("10"))
+
+        cut_mat = db.query(Product).filter_by(code="BEAR_CUT_MAT0").one()
+        # 10 FG -> 10 body + 10 baju -> (10*1 + 10*3) EMBO -> 80 CUTTING -> 80 * 1.5
+        assert totals[cut_mat.id] == Decimal("120")
+
+    def test_scaling_reuses_unit_explosion(self, db):
+        fg = seed_softtoy(db)
+        engine = BOMExplosionEngine(db)
+        engine.explode(fg.id, Decimal("1"))
+
+        with _StatementCounter(db) as counter:
+            small = engine.material_totals(fg.id, Decimal("1"))
+            large = engine.material_totals(fg.id, Decimal("500"))
+        assert counter.count == 0
+        assert all(large[mid] == qty * 500 for mid, qty in small.items())
+
+    def test_cycle_detection(self, db):
+        category = Category(name="Cycle")
+        db.add(category)
+        db.flush()
+        a = _product(db, category, "CYC_WIP_SEWING", ProductType.WIP)
+        b = _product(db, category, "CYC_WIP_EMBO", ProductType.WIP)
+        _bom(db, a, [(b, "1")])
+        _bom(db, b, [(a, "1")])
+
+        with pytest.raises(BOMCycleError) as exc:
+            BOMExplosionEngine(db).explode(a.id, Decimal("1"))
+        assert exc.value.path == ["CYC_WIP_SEWING", "CYC_WIP_EMBO", "CYC_WIP_SEWING"]
+
+    def test_unknown_product(self, db):
+        with pytest.raises(ValueError):
+            BOMExplosionEngine(db).explode(999999, Decimal("1"))
+
+    def test_max_level_truncates(self, db):
+        fg = seed_softtoy(db)
+        tree = BOMExplosionEngine(db).explode(fg.id, Decimal("1"), max_level=1)
+        assert tree['children'][0]['children'] == [{}]
+
+
+@pytest.mark.slow
+def test_benchmark_against_recursive_path(db):
+    """Deep softtoy BOMs for several articles: bounded query count, faster than the reference"""
+    articles = [seed_softtoy(db, article=f"ART{i}", materials_per_stage=12) for i in range(5)]
+    quantities = [Decimal(q) for q in ("100", "250", "1200")]
+
+    reference = BOMExplosionService(db)
+    with _StatementCounter(db) as reference_queries:
+        start = time.perf_counter()
+        expected = [_leaf_totals(reference._explode_bom_recursive(fg.id, qty))
+                    for fg in articles for qty in quantities]
+        reference_seconds = time.perf_counter() - start
+
+    engine = BOMExplosionEngine(db)
+    with _StatementCounter(db) as engine_queries:
+        start = time.perf_counter()
+        engine.load(fg.id for fg in articles)
+        actual = [_leaf_totals(engine.explode(fg.id, qty)) for fg in articles for qty in quantities]
+        engine_seconds = time.perf_counter() - start
+
+    print(f"\nBOM explosion: recursive {reference_seconds * 1000:.1f} ms / {reference_queries.count} queries, "
+          f"engine {engine_seconds * 1000:.1f} ms / {engine_queries.count} queries")
+    assert actual == expected
+    assert engine_queries.count <= 3
+    assert engine_queries.count < reference_queries.count
+    assert engine_seconds < reference_seconds
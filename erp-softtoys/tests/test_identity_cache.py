@@ -0,0 +1,86 @@
+"""
+User Identity Cache Tests
+get_current_user snapshot cache, invalidation and shared request session
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.core.database import get_db
+from app.core.dependencies import get_current_user, get_db as dependencies_get_db
+from app.core.identity_cache import user_identity_cache
+from app.services.permission_service import PermissionService
+
+
+@pytest.fixture(autouse=True)
+def _clear_identity_cache():
+    user_identity_cache.clear()
+    yield
+    user_identity_cache.clear()
+
+
+@pytest.fixture
+def user_selects(db):
+    """Count SELECTs against the users table issued through the test session"""
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", _count)
+    yield statements
+    event.remove(bind, "before_cursor_execute", _count)
+
+
+def _resolve(token, db):
+    return asyncio.run(get_current_user(token, db))
+
+
+class TestIdentityCache:
+
+    def test_second_request_skips_user_query(self, db, admin_user, admin_token, user_selects):
+        db.expunge_all()
+        first = _resolve(admin_token, db)
+        db.expunge_all()
+        second = _resolve(admin_token, db)
+
+        assert len(user_selects) == 1
+        assert second.id == first.id and second.role == first.role
+        assert second in db  # attached to the request session
+
+    def test_unloaded_columns_load_lazily(self, db, admin_user, admin_token):
+        _resolve(admin_token, db)
+        db.expunge_all()
+
+        cached = _resolve(admin_token, db)
+
+        assert cached.hashed_password == admin_user.hashed_password
+
+    def test_admin_invalidation_forces_reload(self, db, admin_user, admin_token, user_selects):
+        _resolve(admin_token, db)
+        PermissionService().invalidate_user_cache(admin_user.id)
+        db.expunge_all()
+
+        _resolve(admin_token, db)
+
+        assert len(user_selects) == 2
+
+    def test_deactivation_is_not_served_from_cache(self, db, admin_user, admin_token):
+        _resolve(admin_token, db)
+
+        admin_user.is_active = False
+        db.flush()
+
+        with pytest.raises(HTTPException) as exc:
+            _resolve(admin_token, db)
+        assert exc.value.status_code == 403
+
+
+def test_dependencies_share_one_session_callable():
+    """Routers, auth and permission checks resolve to one per-request session"""
+    assert dependencies_get_db is get_db
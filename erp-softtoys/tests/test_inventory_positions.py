@@ -0,0 +1,166 @@
+"""
+Tests for the inventory position store
+Positions kept in step with StockQuant inserts / updates / moves / deletes,
+the warehouse overview, low-stock and aging endpoints, and the rebuild.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from app.api.v1.warehouse_endpoints import get_low_stock_alerts, get_stock_aging, get_stock_overview
+from app.core.models.products import UOM, Category, Product, ProductType
+from app.core.models.warehouse import (
+    InventoryLotAge,
+    InventoryPosition,
+    Location,
+    LocationType,
+    StockLot,
+    StockQuant,
+)
+from app.services.inventory_position_service import InventoryPositionService, install_session_hooks
+
+
+@pytest.fixture
+def stock(db):
+    install_session_hooks()
+    category = Category(name="Positions")
+    db.add(category)
+    db.flush()
+
+    def product(code, min_stock=0):
+        return Product(code=code, name=code, type=ProductType.RAW_MATERIAL, uom=UOM.PCS,
+                       category_id=category.id, min_stock=min_stock)
+
+    fabric, thread, zipper = product("POS-FABRIC", 100), product("POS-THREAD", 500), product("POS-ZIP", 10)
+    rack = Location(name="POS Rack", type=LocationType.INTERNAL, capacity=Decimal("1000"))
+    line = Location(name="POS Line", type=LocationType.PRODUCTION)
+    supplier = Location(name="POS Supplier", type=LocationType.SUPPLIER)
+    db.add_all([fabric, thread, zipper, rack, line, supplier])
+    db.flush()
+    return {"db": db, "fabric": fabric, "thread": thread, "zipper": zipper,
+            "rack": rack, "line": line, "supplier": supplier}
+
+
+def _positions(db):
+    return {
+        (p.product_id, p.location_id): (p.qty_on_hand, p.qty_reserved)
+        for p in db.scalars(select(InventoryPosition)) if p.qty_on_hand or p.qty_reserved
+    }
+
+
+def _lot(db, product, number, days_old):
+    lot = StockLot(product_id=product.id, lot_number=number, qty_initial=Decimal("100"),
+                   qty_remaining=Decimal("100"), received_date=datetime.now() - timedelta(days=days_old))
+    db.add(lot)
+    return lot
+
+
+def test_positions_follow_quant_changes(stock):
+    db, fabric, rack, line = stock["db"], stock["fabric"], stock["rack"], stock["line"]
+    quant = StockQuant(product_id=fabric.id, location_id=rack.id, qty_on_hand=Decimal("80"), qty_reserved=Decimal("0"))
+    db.add_all([quant, StockQuant(product_id=fabric.id, location_id=rack.id, qty_on_hand=Decimal("20"))])
+    db.flush()
+    assert _positions(db) == {(fabric.id, rack.id): (Decimal("100"), Decimal("0"))}
+
+    quant.qty_on_hand -= Decimal("30")
+    quant.qty_reserved += Decimal("10")
+    db.flush()
+    assert _positions(db) == {(fabric.id, rack.id): (Decimal("70"), Decimal("10"))}
+
+    quant.location_id = line.id  # Quant moved to another location
+    db.flush()
+    assert _positions(db) == {(fabric.id, rack.id): (Decimal("20"), Decimal("0")),
+                              (fabric.id, line.id): (Decimal("50"), Decimal("10"))}
+
+    db.delete(quant)
+    db.flush()
+    assert _positions(db) == {(fabric.id, rack.id): (Decimal("20"), Decimal("0"))}
+
+
+def test_rolled_back_changes_leave_positions_alone(stock):
+    db, fabric, rack = stock["db"], stock["fabric"], stock["rack"]
+    db.add(StockQuant(product_id=fabric.id, location_id=rack.id, qty_on_hand=Decimal("40")))
+    db.flush()
+
+    savepoint = db.begin_nested()
+    db.add(StockQuant(product_id=fabric.id, location_id=rack.id, qty_on_hand=Decimal("60")))
+    db.flush()
+    savepoint.rollback()
+
+    assert _positions(db) == {(fabric.id, rack.id): (Decimal("40"), Decimal("0"))}
+
+
+def test_overview_and_low_stock_endpoints(stock, admin_user):
+    db, fabric, thread, zipper = stock["db"], stock["fabric"], stock["thread"], stock["zipper"]
+    rack, line, supplier = stock["rack"], stock["line"], stock["supplier"]
+    db.add_all([
+        StockQuant(product_id=fabric.id, location_id=rack.id, qty_on_hand=Decimal("600"), qty_reserved=Decimal("100")),
+        StockQuant(product_id=thread.id, location_id=rack.id, qty_on_hand=Decimal("200")),
+        StockQuant(product_id=thread.id, location_id=line.id, qty_on_hand=Decimal("100")),
+        StockQuant(product_id=zipper.id, location_id=supplier.id, qty_on_hand=Decimal("999")),  # virtual location
+    ])
+    db.flush()
+
+    overview = asyncio.run(get_stock_overview(current_user=admin_user, db=db))
+    by_name = {loc["location"]: loc for loc in overview["locations"]}
+    assert set(by_name) == {"POS Rack", "POS Line"}
+    assert by_name["POS Rack"]["total_items"] == 2
+    assert by_name["POS Rack"]["total_qty"] == 800.0
+    assert by_name["POS Rack"]["capacity_used"] == "80%"
+    assert overview["total_items"] == 2
+    assert overview["total_quantity"] == 900.0
+
+    alerts = asyncio.run(get_low_stock_alerts(limit=100, current_user=admin_user, db=db))
+    items = {item["product_code"]: item for item in alerts["low_stock_items"]}
+    assert set(items) >= {"POS-THREAD", "POS-ZIP"}
+    assert "POS-FABRIC" not in items
+    assert items["POS-THREAD"]["current_qty"] == 300.0
+    assert items["POS-THREAD"]["action"] == "Reorder Recommended"
+    assert items["POS-ZIP"]["current_qty"] == 0.0  # Supplier stock is not on hand
+    assert items["POS-ZIP"]["action"] == "Urgent Reorder"
+    assert overview["low_stock_alerts"] == alerts["alerts_count"]
+
+
+def test_aging_buckets_by_lot_receipt(stock, admin_user):
+    db, fabric, thread, rack = stock["db"], stock["fabric"], stock["thread"], stock["rack"]
+    fresh, old = _lot(db, fabric, "POS-LOT-1", 2), _lot(db, thread, "POS-LOT-2", 120)
+    db.flush()
+    db.add_all([
+        StockQuant(product_id=fabric.id, location_id=rack.id, lot_id=fresh.id, qty_on_hand=Decimal("40")),
+        StockQuant(product_id=thread.id, location_id=rack.id, lot_id=old.id, qty_on_hand=Decimal("75")),
+        StockQuant(product_id=thread.id, location_id=rack.id, qty_on_hand=Decimal("5")),  # unlotted
+    ])
+    db.flush()
+
+    report = asyncio.run(get_stock_aging(current_user=admin_user, db=db))
+    categories = {c["category"]: c for c in report["aging_categories"]}
+    assert categories["0-7 days"]["total_qty"] == 40.0
+    assert categories["90+ days"] == {"category": "90+ days", "item_count": 1, "total_qty": 75.0,
+                                      "status": "Slow Moving"}
+    assert categories["8-30 days"]["item_count"] == 0
+    assert report["total_sku"] == 2
+
+
+def test_rebuild_matches_incremental_store(stock):
+    db, fabric, thread, rack, line = stock["db"], stock["fabric"], stock["thread"], stock["rack"], stock["line"]
+    lot = _lot(db, fabric, "POS-LOT-3", 10)
+    db.flush()
+    db.add_all([
+        StockQuant(product_id=fabric.id, location_id=rack.id, lot_id=lot.id, qty_on_hand=Decimal("12.5")),
+        StockQuant(product_id=fabric.id, location_id=line.id, qty_on_hand=Decimal("3"), qty_reserved=Decimal("1")),
+        StockQuant(product_id=thread.id, location_id=rack.id, qty_on_hand=Decimal("7")),
+    ])
+    db.flush()
+    positions = _positions(db)
+    lot_age = {(a.product_id, a.location_id, a.received_on): a.qty_on_hand for a in db.scalars(select(InventoryLotAge))}
+
+    InventoryPositionService(db).rebuild()
+    db.expire_all()
+
+    assert _positions(db) == positions
+    assert {(a.product_id, a.location_id, a.received_on): a.qty_on_hand
+            for a in db.scalars(select(InventoryLotAge))} == lot_age
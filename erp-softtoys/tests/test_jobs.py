@@ -0,0 +1,356 @@
+"""
+Tests for the background job runner
+Submission, execution on worker threads, progress, artifacts, failures,
+queue limits, reclaiming jobs of dead workers and the job status /
+artifact endpoints.
+"""
+
+import threading
+import time
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.api.v1.jobs as jobs_api
+from app.api.v1.import_export import run_import_job as run_import_export_job  # noqa: F401 - registers import_export.import
+from app.api.v1.imports import run_import_job  # noqa: F401 - registers masterdata.import
+from app.api.v1.reports import run_inventory_report_job  # noqa: F401 - registers reports.inventory
+from app.core.database import Base
+from app.core.jobs import (
+    JOB_FAILED,
+    JOB_SUCCEEDED,
+    InMemoryJobBroker,
+    JobArtifact,
+    JobError,
+    JobQueueFullError,
+    JobRunner,
+    RedisJobBroker,
+    job_handler,
+)
+from app.core.models.products import Category
+from app.core.models.users import User, UserRole
+
+
+@job_handler("test.echo")
+def _echo(ctx):
+    for done in range(1, 4):
+        ctx.progress(done, 3)
+    if ctx.params.get("fail") == "expected":
+        raise JobError({"errors": ["Row 2: bad"]})
+    if ctx.params.get("fail") == "crash":
+        raise RuntimeError("boom")
+    if ctx.params.get("file"):
+        return JobArtifact(ctx.payload.upper(), "echo.txt", "text/plain")
+    return {"echo": ctx.params, "payload_size": len(ctx.payload or b"")}
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis client calls used by the job broker"""
+
+    def __init__(self):
+        self.store = {}
+        self.lists = {}
+
+    def set(self, key, value, ex=None, px=None):
+        self.store[key] = value.encode() if isinstance(value, str) else value
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value.encode())
+
+    def blmove(self, source, destination, timeout, src, dest):
+        if not self.lists.get(source):
+            return None
+        value = self.lists[source].pop(0)
+        self.lists.setdefault(destination, []).append(value)
+        return value
+
+    def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        if value.encode() in items:
+            items.remove(value.encode())
+            return 1
+        return 0
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(InMemoryJobBroker(), workers=2, max_pending=5, poll_interval=0.01)
+    yield runner
+    runner.stop()
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _wait_for(runner, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = runner.get(job_id)
+        if job["status"] in (JOB_SUCCEEDED, JOB_FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+class TestJobRunner:
+
+    def test_job_result_and_progress(self, runner):
+        job = runner.submit("test.echo", {"a": 1}, user_id=7, payload=b"abc")
+        assert job["status"] == "queued"
+
+        assert runner.run_next() is True
+        finished = runner.get(job["id"])
+        assert finished["status"] == JOB_SUCCEEDED
+        assert finished["result"] == {"echo": {"a": 1}, "payload_size": 3}
+        assert finished["progress"] == {"done": 3, "total": 3}
+        assert finished["started_at"] and finished["finished_at"]
+        assert runner.broker.get_blob(job["id"], runner.PAYLOAD) is None  # input released
+
+    def test_artifact_is_stored(self, runner):
+        job = runner.submit("test.echo", {"file": True}, payload=b"report")
+        runner.run_next()
+
+        finished = runner.get(job["id"])
+        assert finished["artifact"] == {"filename": "echo.txt", "media_type": "text/plain", "size": 6}
+        assert runner.artifact(job["id"]) == b"REPORT"
+
+    @pytest.mark.parametrize("fail, error", [
+        ("expected", {"errors": ["Row 2: bad"]}),
+        ("crash", "boom"),
+    ])
+    def test_failures_are_recorded(self, runner, fail, error):
+        job = runner.submit("test.echo", {"fail": fail})
+        runner.run_next()
+
+        finished = runner.get(job["id"])
+        assert finished["status"] == JOB_FAILED
+        assert finished["error"] == error
+
+    def test_submissions_beyond_max_pending_are_rejected(self, runner):
+        for _ in range(5):
+            runner.submit("test.echo")
+        with pytest.raises(JobQueueFullError):
+            runner.submit("test.echo")
+        with pytest.raises(ValueError, match="Unknown job kind"):
+            runner.submit("test.unknown")
+
+    def test_worker_threads_bound_concurrency(self):
+        running, peak, lock = [0], [0], threading.Lock()
+
+        @job_handler("test.slow")
+        def slow(ctx):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        runner = JobRunner(InMemoryJobBroker(), workers=2, max_pending=10, poll_interval=0.01)
+        jobs = [runner.submit("test.slow") for _ in range(6)]
+        runner.start()
+        try:
+            assert all(_wait_for(runner, job["id"])["status"] == JOB_SUCCEEDED for job in jobs)
+        finally:
+            runner.stop()
+        assert peak[0] == 2
+
+    def test_records_expire(self):
+        broker = InMemoryJobBroker(ttl_seconds=0.01)
+        broker.save({"id": "x"})
+        assert broker.get("x") == {"id": "x"}
+        time.sleep(0.02)
+        assert broker.get("x") is None
+
+
+class TestReclaimingJobs:
+
+    @pytest.fixture
+    def redis_runner(self):
+        return JobRunner(RedisJobBroker(FakeRedis()), max_attempts=2)
+
+    def _worker_dies_running(self, runner):
+        """Claim the next job and mark it running, then vanish without acking or renewing."""
+        job_id = runner.broker.dequeue(timeout=1)
+        job = runner.get(job_id)
+        job.update(status="running", attempts=job["attempts"] + 1)
+        runner.broker.save(job)
+        runner.broker.redis.delete(runner.broker._key(job_id, "lease"))  # Lease runs out
+        return job_id
+
+    def test_finished_job_leaves_no_claim(self, redis_runner):
+        job = redis_runner.submit("test.echo")
+        redis_runner.run_next()
+
+        assert redis_runner.get(job["id"])["status"] == JOB_SUCCEEDED
+        assert redis_runner.broker.redis.llen(redis_runner.broker.processing_key) == 0
+
+    def test_job_of_dead_worker_is_requeued_and_run(self, redis_runner):
+        job = redis_runner.submit("test.echo")
+        self._worker_dies_running(redis_runner)
+        assert redis_runner.reap_stuck() == []  # Unleased once: might just be claiming it
+
+        assert redis_runner.reap_stuck() == [job["id"]]
+        assert redis_runner.get(job["id"])["status"] == "queued"
+        assert redis_runner.broker.pending() == 1
+
+        redis_runner.run_next()
+        finished = redis_runner.get(job["id"])
+        assert finished["status"] == JOB_SUCCEEDED
+        assert finished["attempts"] == 2
+
+    def test_job_fails_after_max_attempts(self, redis_runner):
+        job = redis_runner.submit("test.echo")
+        for _ in range(2):
+            self._worker_dies_running(redis_runner)
+            redis_runner.reap_stuck()
+            redis_runner.reap_stuck()
+
+        finished = redis_runner.get(job["id"])
+        assert finished["status"] == JOB_FAILED
+        assert "2 attempts" in finished["error"]
+        assert redis_runner.broker.pending() == 0
+        assert redis_runner.broker.redis.llen(redis_runner.broker.processing_key) == 0
+
+    def test_setup_failure_fails_job_and_releases_claim(self, redis_runner):
+        def no_database():
+            raise RuntimeError("database unavailable")
+        redis_runner.session_factory = no_database
+        job = redis_runner.submit("test.echo", payload=b"abc")
+
+        redis_runner.run_next()
+
+        finished = redis_runner.get(job["id"])
+        assert finished["status"] == JOB_FAILED
+        assert finished["error"] == "database unavailable"
+        assert redis_runner.broker.redis.llen(redis_runner.broker.processing_key) == 0
+        assert redis_runner.broker.get_blob(job["id"], redis_runner.PAYLOAD) is None
+        for thread in [t for t in threading.enumerate() if t.name == "job-lease"]:
+            thread.join(timeout=1)
+            assert not thread.is_alive()  # Lease no longer renewed
+
+    def test_leased_jobs_are_left_alone(self, redis_runner):
+        redis_runner.submit("test.echo")
+        redis_runner.broker.dequeue(timeout=1)
+
+        assert redis_runner.reap_stuck() == [] and redis_runner.reap_stuck() == []
+
+
+class TestJobHandlers:
+
+    def test_masterdata_import_job_reports_progress(self, file_db, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "MASTERDATA_IMPORT_CHUNK_SIZE", 2)
+        session = file_db()
+        session.add(Category(name="Fabric"))
+        user = User(username="ppic", email="ppic@test.com", hashed_password="x", full_name="PPIC", role=UserRole.PPIC_MANAGER)
+        session.add(user)
+        session.commit()
+        buffer = BytesIO()
+        pd.DataFrame([{"material_code": f"JOB-{i}", "material_name": "Fabric", "material_type": "RAW_MATERIAL",
+                       "uom": "METER", "category": "Fabric"} for i in range(5)]).to_excel(buffer, index=False)
+
+        runner = JobRunner(InMemoryJobBroker(), session_factory=file_db)
+        job = runner.submit("masterdata.import", {"import_type": "materials"}, user_id=user.id, payload=buffer.getvalue())
+        runner.run_next()
+
+        finished = runner.get(job["id"])
+        assert finished["status"] == JOB_SUCCEEDED, finished["error"]
+        assert finished["result"]["imported_count"] == 5
+        assert finished["progress"] == {"done": 5, "total": 5}
+        session.close()
+
+    def test_products_csv_import_job(self, file_db, monkeypatch):
+        import app.api.v1.import_export as import_export
+        monkeypatch.setattr(import_export, "IMPORT_PROGRESS_EVERY", 2)
+        session = file_db()
+        category = Category(name="Plush")
+        user = User(username="ppic", email="ppic@test.com", hashed_password="x", full_name="PPIC", role=UserRole.PPIC_MANAGER)
+        session.add_all([category, user])
+        session.commit()
+        rows = "".join(f"JOB-P{i},Plush {i},Finish Good,Pcs,{category.id},10\n" for i in range(3))
+        content = ("code,name,type,uom,category_id,min_stock\n" + rows + "JOB-P9,Orphan,Finish Good,Pcs,999,0\n").encode()
+
+        runner = JobRunner(InMemoryJobBroker(), session_factory=file_db)
+        job = runner.submit("import_export.import", {"import_type": "products", "filename": "products.csv"},
+                            user_id=user.id, payload=content)
+        runner.run_next()
+
+        finished = runner.get(job["id"])
+        assert finished["status"] == JOB_SUCCEEDED, finished["error"]
+        assert finished["result"]["imported"] == 3
+        assert finished["result"]["errors"] == ["Row 5: Category ID 999 not found"]
+        assert finished["progress"] == {"done": 4, "total": 4}
+        session.close()
+
+    def test_inventory_report_job_produces_excel(self, file_db):
+        runner = JobRunner(InMemoryJobBroker(), session_factory=file_db)
+        job = runner.submit("reports.inventory", {"format": "excel"})
+        runner.run_next()
+
+        finished = runner.get(job["id"])
+        assert finished["status"] == JOB_SUCCEEDED, finished["error"]
+        assert finished["artifact"]["filename"].endswith(".xlsx")
+        assert runner.artifact(job["id"])[:2] == b"PK"
+
+
+class TestJobEndpoints:
+
+    @pytest.fixture
+    def api_runner(self, runner, monkeypatch):
+        monkeypatch.setattr(jobs_api, "job_runner", runner)
+        return runner
+
+    def test_owner_polls_and_downloads(self, api_runner, admin_user):
+        submitted = jobs_api.submit_job("test.echo", admin_user, {"file": True}, payload=b"abc")
+        assert submitted["status_url"].endswith(f"/jobs/{submitted['job_id']}")
+        with pytest.raises(HTTPException) as exc:
+            jobs_api.download_job_artifact(submitted["job_id"], current_user=admin_user)
+        assert exc.value.status_code == 409
+
+        api_runner.run_next()
+        job = jobs_api.get_job(submitted["job_id"], current_user=admin_user)
+        assert job["artifact_url"].endswith("/artifact")
+        response = jobs_api.download_job_artifact(submitted["job_id"], current_user=admin_user)
+        assert response.body == b"ABC"
+        assert "echo.txt" in response.headers["content-disposition"]
+
+    def test_other_users_cannot_see_job(self, api_runner, admin_user):
+        submitted = jobs_api.submit_job("test.echo", admin_user)
+        operator = User(id=admin_user.id + 1, username="op", role=UserRole.WAREHOUSE_ADMIN)
+        with pytest.raises(HTTPException) as exc:
+            jobs_api.get_job(submitted["job_id"], current_user=operator)
+        assert exc.value.status_code == 404
+
+    def test_full_queue_answers_503(self, api_runner, admin_user):
+        for _ in range(5):
+            jobs_api.submit_job("test.echo", admin_user)
+        with pytest.raises(HTTPException) as exc:
+            jobs_api.submit_job("test.echo", admin_user)
+        assert exc.value.status_code == 503
+        assert exc.value.headers["Retry-After"] == "30"
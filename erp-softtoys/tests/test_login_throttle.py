@@ -0,0 +1,182 @@
+"""
+Tests for the login fast path
+Bounded bcrypt executor, in-memory lockout without per-failure DB writes,
+and a shift-change login burst benchmark.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api.v1.auth import login
+from app.core.login_throttle import LoginThrottle, login_throttle
+from app.core.metrics import registry
+from app.core.password_hasher import HasherBusyError, PasswordHasher, password_hasher
+from app.core.schemas import UserLogin
+from app.core.security import PasswordUtils
+
+
+def _request(ip="10.1.1.1"):
+    return Request({"type": "http", "method": "POST", "path": "/api/v1/auth/login",
+                    "headers": [], "client": (ip, 50000)})
+
+
+@pytest.fixture(autouse=True)
+def reset_throttle():
+    login_throttle.clear()
+    yield
+    login_throttle.clear()
+
+
+class TestLoginThrottle:
+
+    def test_locks_after_max_failures(self):
+        throttle = LoginThrottle(max_failures=3, lockout_seconds=60)
+        results = [throttle.record_failure("Operator1") for _ in range(3)]
+
+        assert results == [(1, False), (2, False), (3, True)]
+        assert 0 < throttle.check("operator1") <= 60   # identifiers are case-insensitive
+
+    def test_success_resets_failures(self):
+        throttle = LoginThrottle(max_failures=3, lockout_seconds=60)
+        throttle.record_failure("op")
+        throttle.record_failure("op")
+        throttle.record_success("op")
+
+        assert throttle.record_failure("op") == (1, False)
+        assert throttle.check("op") is None
+
+    def test_ip_limit_counts_failures_across_users(self):
+        throttle = LoginThrottle(max_failures=100, ip_max_failures=5)
+        for i in range(5):
+            throttle.record_failure(f"user{i}", "10.0.0.9")
+
+        assert throttle.ip_locked("10.0.0.9") is not None
+        assert throttle.ip_locked("10.0.0.10") is None
+        assert throttle.check("someone-else") is None  # The IP lock never gates an identifier
+
+
+class TestPasswordHasher:
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify(self):
+        hasher = PasswordHasher(max_workers=2)
+        try:
+            hashed = await hasher.hash("Shift@0700")
+            assert await hasher.verify("Shift@0700", hashed)
+            assert not await hasher.verify("wrong", hashed)
+        finally:
+            hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self):
+        hasher = PasswordHasher(max_workers=1, max_queue=1)
+        release = threading.Event()
+        try:
+            blocked = asyncio.ensure_future(hasher._submit("verify", release.wait))
+            await asyncio.sleep(0.01)
+            with pytest.raises(HasherBusyError):
+                await hasher.verify("x", "y")
+            release.set()
+            await blocked
+            assert hasher.pending == 0
+        finally:
+            release.set()
+            hasher.shutdown()
+
+
+class TestLoginEndpoint:
+
+    @pytest.mark.asyncio
+    async def test_failed_attempts_do_not_write_until_lockout(self, db, admin_user, mocker):
+        credentials = UserLogin(username="admin", password="wrong-password")
+        for _ in range(4):
+            with pytest.raises(HTTPException) as exc:
+                await login(credentials, _request(), db=db)
+            assert exc.value.status_code == 401
+        db.refresh(admin_user)
+        assert admin_user.login_attempts == 0
+        assert admin_user.locked_until is None
+
+        with pytest.raises(HTTPException) as exc:
+            await login(credentials, _request(), db=db)
+        assert exc.value.status_code == 429
+        db.refresh(admin_user)
+        assert admin_user.login_attempts == 5
+        assert admin_user.locked_until is not None
+
+        # Locked: rejected before the user lookup and bcrypt
+        verify = mocker.spy(password_hasher, "verify")
+        with pytest.raises(HTTPException) as exc:
+            await login(UserLogin(username="admin", password="Admin@123"), _request(), db=db)
+        assert exc.value.status_code == 429
+        assert "Retry-After" in exc.value.headers
+        assert verify.call_count == 0
+
+    @pytest.mark.asyncio
+    async def test_locked_ip_still_accepts_correct_credentials(self, db, admin_user, monkeypatch):
+        monkeypatch.setattr(login_throttle, "ip_max_failures", 3)
+        for i in range(3):
+            with pytest.raises(HTTPException):
+                await login(UserLogin(username=f"nobody{i}", password="x"), _request("10.3.0.1"), db=db)
+
+        with pytest.raises(HTTPException) as exc:
+            await login(UserLogin(username="admin", password="wrong-password"), _request("10.3.0.1"), db=db)
+        assert exc.value.status_code == 429
+        assert "Retry-After" in exc.value.headers
+
+        response = await login(UserLogin(username="admin", password="Admin@123"), _request("10.3.0.1"), db=db)
+        assert response.user.username == "admin"
+
+    @pytest.mark.asyncio
+    async def test_successful_login(self, db, admin_user):
+        response = await login(UserLogin(username="admin", password="Admin@123"), _request(), db=db)
+        assert response.access_token
+        assert response.user.username == "admin"
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_shift_change_login_burst(db, admin_user):
+    """60 simultaneous logins: bcrypt runs on the hasher pool, the loop stays responsive"""
+    logins = 60
+    gaps = []
+    done = asyncio.Event()
+
+    async def probe():
+        loop = asyncio.get_running_loop()
+        last = loop.time()
+        while not done.is_set():
+            await asyncio.sleep(0.005)
+            now = loop.time()
+            gaps.append(now - last)
+            last = now
+
+    inline = time.perf_counter()
+    PasswordUtils.verify_password("Admin@123", admin_user.hashed_password)
+    single_verify = time.perf_counter() - inline
+
+    async def operator(i):
+        await asyncio.sleep(i * 0.002)  # all operators within ~120 ms
+        return await login(UserLogin(username="admin", password="Admin@123"), _request(f"10.2.0.{i % 250}"), db=db)
+
+    probe_task = asyncio.ensure_future(probe())
+    burst_start = time.perf_counter()
+    results = await asyncio.gather(*[operator(i) for i in range(logins)])
+    burst_seconds = time.perf_counter() - burst_start
+    done.set()
+    await probe_task
+
+    inline_blocking = single_verify * logins
+    loop_blocked = sum(gap - 0.005 for gap in gaps if gap > 0.005)
+    wait_count = registry.get_sample_value("password_hash_queue_wait_seconds_count")
+    print(f"\nLogin burst: {logins} logins in {burst_seconds * 1000:.0f} ms, loop blocked "
+          f"{loop_blocked * 1000:.0f} ms (inline bcrypt: ~{inline_blocking * 1000:.0f} ms), "
+          f"max loop gap {max(gaps) * 1000:.1f} ms")
+    assert all(r.access_token for r in results)
+    assert wait_count >= logins
+    assert loop_blocked < inline_blocking * 0.25
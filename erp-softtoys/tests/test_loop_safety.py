@@ -0,0 +1,111 @@
+"""
+Tests for event loop safety
+Offloading of non-awaiting async DB handlers, blocking-step reporting and
+the loop lag monitor.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.database import get_db
+from app.core.loop_safety import LoopLagMonitor, install_loop_safety, never_awaits
+from app.core.metrics import registry
+
+
+async def plain_handler(db=Depends(get_db)):
+    return {"thread": threading.get_ident()}
+
+
+async def awaiting_handler(db=Depends(get_db)):
+    await asyncio.sleep(0)
+    return {"thread": threading.get_ident()}
+
+
+async def scheduling_handler(db=Depends(get_db)):
+    asyncio.get_running_loop()
+    return {"thread": threading.get_ident()}
+
+
+async def blocking_handler():
+    await asyncio.sleep(0)
+    time.sleep(0.05)  # synchronous work between awaits
+    return {"ok": True}
+
+
+async def no_db_handler():
+    return {"thread": threading.get_ident()}
+
+
+def _fake_db():
+    yield None
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.get("/plain")(plain_handler)
+    app.get("/awaiting")(awaiting_handler)
+    app.get("/scheduling")(scheduling_handler)
+    app.get("/blocking")(blocking_handler)
+    app.get("/no-db")(no_db_handler)
+    app.dependency_overrides[get_db] = _fake_db
+
+    stats = install_loop_safety(app, offload=True, threshold_ms=10)
+    assert stats == {"offloaded": 1, "instrumented": 4}
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _blocking_count(handler):
+    return registry.get_sample_value("event_loop_blocking_total", {"handler": handler}) or 0
+
+
+class TestHandlerAnalysis:
+
+    def test_never_awaits(self):
+        assert never_awaits(plain_handler)
+        assert not never_awaits(awaiting_handler)
+        assert not never_awaits(scheduling_handler)
+        assert not never_awaits(_fake_db)
+
+    def test_async_comprehension_counts_as_await(self):
+        async def handler(items):
+            return [item async for item in items]
+
+        assert not never_awaits(handler)
+
+
+class TestInstallLoopSafety:
+
+    def test_plain_db_handler_runs_in_threadpool(self, client):
+        loop_thread = client.get("/awaiting").json()["thread"]
+        assert client.get("/plain").json()["thread"] != loop_thread
+        # Handlers without a DB session stay on the loop
+        assert client.get("/no-db").json()["thread"] == loop_thread
+
+    def test_blocking_step_is_reported(self, client):
+        before = _blocking_count("GET /blocking")
+        assert client.get("/blocking").json() == {"ok": True}
+        assert _blocking_count("GET /blocking") == before + 1
+
+    def test_install_is_idempotent(self, client):
+        assert install_loop_safety(client.app) == {"offloaded": 0, "instrumented": 0}
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_observes_stall():
+    before = registry.get_sample_value("event_loop_lag_seconds_sum") or 0
+    monitor = LoopLagMonitor(interval=0.01, threshold_ms=20)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # stall the loop
+        await asyncio.sleep(0.03)
+    finally:
+        await monitor.stop()
+    assert registry.get_sample_value("event_loop_lag_seconds_sum") - before >= 0.05
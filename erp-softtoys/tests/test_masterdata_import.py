@@ -0,0 +1,159 @@
+"""
+Tests for the masterdata Excel import pipeline
+Vectorized validation, chunked bulk upserts of suppliers, materials and
+BOM lines, and per-chunk progress.
+"""
+
+from decimal import Decimal
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from sqlalchemy import event, select
+
+from app.core.config import settings
+from app.core.models.bom import BOMDetail, BOMHeader
+from app.core.models.products import UOM, Category, Partner, PartnerType, Product, ProductType
+from app.services.masterdata_import_service import MasterdataImportService
+
+
+def _excel(rows):
+    buffer = BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "MASTERDATA_IMPORT_CHUNK_SIZE", 4)
+
+
+@pytest.fixture
+def fabrics(db):
+    db.add(Category(name="Fabric"))
+    db.commit()
+
+
+@pytest.fixture
+def service(db, admin_user):
+    return MasterdataImportService(db, admin_user.id)
+
+
+def _material(i, **overrides):
+    row = {"material_code": f"IMP-{i:03d}", "material_name": f"Fabric {i}", "material_type": "RAW_MATERIAL",
+           "uom": "METER", "category": "Fabric", "minimum_stock": i}
+    row.update(overrides)
+    return row
+
+
+def _count_statements(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+class TestValidation:
+
+    def test_errors_are_reported_per_row_in_order(self, service, fabrics):
+        content = _excel([
+            _material(1),
+            _material(2, material_type="PLASTIC", minimum_stock=-1),
+            _material(3, material_name="  ", category="Leather"),
+            _material(4, minimum_stock="lots", uom="carton"),
+        ])
+        result = service.import_materials(content)
+
+        assert result["success"] is False
+        assert result["errors"][0].startswith("Row 3: material_type must be one of")
+        assert result["errors"][1] == "Row 3: minimum_stock must be >= 0"
+        assert result["errors"][2] == "Row 4: material_name is required"
+        assert result["errors"][3].startswith("Row 4: category 'Leather' not found")
+        assert result["errors"][4] == "Row 5: minimum_stock must be a number"
+        assert len(result["errors"]) == 5
+
+    def test_bom_validation_looks_up_only_referenced_codes(self, db, service, fabrics):
+        category_id = db.scalar(select(Category.id))
+        db.add_all([Product(code=f"OTHER-{i}", name="x", type=ProductType.WIP, uom=UOM.PCS, category_id=category_id)
+                    for i in range(20)] + [Product(code="ART-1", name="x", type=ProductType.FINISH_GOOD,
+                                                   uom=UOM.PCS, category_id=category_id)])
+        db.flush()
+        df = pd.DataFrame([{"article_code": "ART-1", "component_code": "MISSING", "quantity_required": 0}])
+
+        is_valid, errors = service.validate_bom_data(df)
+
+        assert not is_valid
+        assert errors == ["Row 2: component_code 'MISSING' not found in products",
+                          "Row 2: quantity_required must be > 0"]
+
+
+class TestImport:
+
+    def test_materials_upserted_in_chunks(self, db, service, fabrics, small_chunks):
+        progress = []
+        first = service.import_materials(_excel([_material(i) for i in range(6)]))
+        second = service.import_materials(
+            _excel([_material(i, material_name=f"Renamed {i}", uom="CARTON") for i in range(3, 10)]),
+            progress=lambda done, total: progress.append((done, total)),
+        )
+
+        assert (first["success"], first["imported_count"], first["updated_count"]) == (True, 6, 0)
+        assert (second["success"], second["imported_count"], second["updated_count"]) == (True, 4, 3)
+        assert progress == [(4, 7), (7, 7)]
+        products = {p.code: p for p in db.scalars(select(Product).where(Product.code.like("IMP-%")))}
+        assert len(products) == 10
+        assert products["IMP-001"].name == "Fabric 1"
+        assert products["IMP-004"].name == "Renamed 4"
+        assert products["IMP-004"].uom == UOM.CTN
+        assert products["IMP-004"].min_stock == Decimal("4")
+
+    def test_materials_upserted_without_on_conflict_support(self, db, service, fabrics, monkeypatch):
+        service.import_materials(_excel([_material(i) for i in range(3)]))
+        monkeypatch.setattr(db.get_bind().dialect, "name", "mssql")  # No ON CONFLICT: lookup + bulk insert / update
+
+        result = service.import_materials(_excel([_material(i, material_name=f"Renamed {i}") for i in range(2, 5)]))
+
+        assert (result["success"], result["imported_count"], result["updated_count"]) == (True, 2, 1)
+        products = {p.code: p for p in db.scalars(select(Product).where(Product.code.like("IMP-%")))}
+        assert len(products) == 5
+        assert products["IMP-001"].name == "Fabric 1"
+        assert products["IMP-002"].name == "Renamed 2"
+        assert products["IMP-004"].min_stock == Decimal("4")
+
+    def test_suppliers_match_existing_partner_by_name(self, db, service):
+        db.add(Partner(name="PT Kain Jaya", type=PartnerType.SUPPLIER))
+        db.commit()
+        result = service.import_suppliers(_excel([
+            {"supplier_code": "SUP-1", "supplier_name": "PT Kain Jaya", "supplier_type": "supplier",
+             "phone": "+62 21-555"},
+            {"supplier_code": "SUP-2", "supplier_name": "CV Benang", "supplier_type": "SUBCON"},
+        ]))
+
+        assert result["errors"] == []
+        assert (result["success"], result["imported_count"], result["updated_count"]) == (True, 1, 1)
+        partners = {p.name: p for p in db.scalars(select(Partner))}
+        assert partners["PT Kain Jaya"].phone == "+62 21-555"
+        assert partners["CV Benang"].type == PartnerType.SUBCON
+
+    def test_bom_lines_written_with_bounded_statements(self, db, service, fabrics):
+        service.import_materials(_excel(
+            [_material(i) for i in range(40)]
+            + [_material(900 + i, material_type="FINISHED_GOODS", uom="PCS") for i in range(5)]
+        ))
+        lines = [{"article_code": f"IMP-{900 + a}", "component_code": f"IMP-{c:03d}",
+                  "quantity_required": 0.25, "wastage_percent": 5}
+                 for a in range(5) for c in range(40)]
+
+        statements = _count_statements(db)
+        result = service.import_bom(_excel(lines))
+
+        assert (result["success"], result["imported_count"], result["updated_count"]) == (True, 200, 0)
+        assert len(statements) < 20  # not one query per line
+        assert db.scalar(select(BOMHeader.id).where(BOMHeader.is_active == True).limit(1)) is not None  # noqa: E712
+
+        lines[0]["quantity_required"] = 2
+        again = service.import_bom(_excel(lines + [dict(lines[1], wastage_percent=10)]))
+        assert (again["imported_count"], again["updated_count"]) == (0, 200)
+        details = db.scalars(select(BOMDetail).order_by(BOMDetail.id)).all()
+        assert len(details) == 200
+        assert details[0].qty_needed == Decimal("2")
+        assert details[1].wastage_percent == Decimal("10")
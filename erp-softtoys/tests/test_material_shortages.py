@@ -0,0 +1,150 @@
+"""
+Tests for the material shortage index
+Incremental refresh on allocation / stock / work order changes, SQL
+filters, the summary aggregates and the full rebuild.
+"""
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from app.api.v1.material_allocation import get_shortage_alerts
+from app.core.models.manufacturing import (
+    Department,
+    ManufacturingOrder,
+    MaterialShortage,
+    RoutingType,
+    SPKMaterialAllocation,
+    WorkOrder,
+)
+from app.core.models.products import UOM, Category, Product, ProductType
+from app.core.models.warehouse import Location, LocationType, StockQuant
+from app.services.material_allocation_service import MaterialAllocationService
+from app.services.material_shortage_service import MaterialShortageService, install_session_hooks
+
+
+@pytest.fixture
+def shortage_data(db):
+    install_session_hooks()
+    category = Category(name="Shortages")
+    db.add(category)
+    db.flush()
+    bear = Product(code="SHT-BEAR", name="Shortage Bear", type=ProductType.FINISH_GOOD, uom=UOM.PCS,
+                   category_id=category.id)
+    fabric = Product(code="SHT-FABRIC", name="Shortage Fabric", type=ProductType.RAW_MATERIAL, uom=UOM.METER,
+                     category_id=category.id)
+    thread = Product(code="SHT-THREAD", name="Shortage Thread", type=ProductType.RAW_MATERIAL, uom=UOM.PCS,
+                     category_id=category.id)
+    main = Location(name="Warehouse Main", type=LocationType.INTERNAL)
+    line = Location(name="SHT Line Sewing", type=LocationType.PRODUCTION)
+    db.add_all([bear, fabric, thread, main, line])
+    db.flush()
+    mo = ManufacturingOrder(product_id=bear.id, qty_planned=Decimal("100"), batch_number="SHT-BATCH",
+                            routing_type=RoutingType.ROUTE1)
+    db.add(mo)
+    db.flush()
+    cutting = WorkOrder(mo_id=mo.id, product_id=bear.id, department=Department.CUTTING, wo_number="SHT-WO-CUT",
+                        input_qty=Decimal("100"))
+    sewing = WorkOrder(mo_id=mo.id, product_id=bear.id, department=Department.SEWING, wo_number="SHT-WO-SEW",
+                       input_qty=Decimal("100"))
+    db.add_all([cutting, sewing])
+    db.flush()
+    fabric_stock = StockQuant(product_id=fabric.id, location_id=main.id, qty_on_hand=Decimal("100"))
+    db.add_all([
+        fabric_stock,
+        StockQuant(product_id=fabric.id, location_id=line.id, qty_on_hand=Decimal("500")),  # Not Warehouse Main
+    ])
+    db.flush()
+    return {"db": db, "fabric": fabric, "thread": thread, "mo": mo, "cutting": cutting, "sewing": sewing,
+            "fabric_stock": fabric_stock}
+
+
+def _allocate(db, wo, material, qty):
+    allocation = SPKMaterialAllocation(wo_id=wo.id, material_id=material.id, qty_allocated=Decimal(qty))
+    db.add(allocation)
+    db.flush()
+    return allocation
+
+
+def _shortages(db):
+    return {
+        (row.material_id, row.wo_id): (row.shortage_qty, row.severity)
+        for row in db.scalars(select(MaterialShortage))
+    }
+
+
+def test_allocation_and_stock_changes_refresh_index(shortage_data):
+    db, fabric, cutting = shortage_data["db"], shortage_data["fabric"], shortage_data["cutting"]
+
+    allocation = _allocate(db, cutting, fabric, "80")
+    assert _shortages(db) == {}  # 100 available at Warehouse Main
+
+    allocation.qty_allocated = Decimal("150")
+    db.flush()
+    assert _shortages(db) == {(fabric.id, cutting.id): (Decimal("50.000"), "HIGH")}
+
+    shortage_data["fabric_stock"].qty_reserved = Decimal("80")
+    db.flush()
+    assert _shortages(db) == {(fabric.id, cutting.id): (Decimal("130.000"), "CRITICAL")}
+
+    allocation.is_consumed = True
+    db.flush()
+    assert _shortages(db) == {}
+
+
+def test_work_order_department_change_moves_shortage(shortage_data):
+    db, thread, sewing = shortage_data["db"], shortage_data["thread"], shortage_data["sewing"]
+    _allocate(db, sewing, thread, "10")  # No thread in stock at all
+
+    service = MaterialShortageService(db)
+    assert [row.wo_number for row in service.alerts(department="SEWING")] == ["SHT-WO-SEW"]
+
+    sewing.department = Department.FINISHING
+    db.flush()
+
+    assert service.alerts(department="Sewing") == []
+    assert [row.department for row in service.alerts(department="finishing")] == [Department.FINISHING]
+
+
+def test_filters_and_ordering_in_sql(shortage_data):
+    db, fabric, thread = shortage_data["db"], shortage_data["fabric"], shortage_data["thread"]
+    cutting, sewing = shortage_data["cutting"], shortage_data["sewing"]
+    _allocate(db, cutting, fabric, "104")  # 4 short of 104: LOW
+    _allocate(db, sewing, fabric, "60")
+    _allocate(db, sewing, fabric, "60")  # Summed per WO: 20 short of 120: MEDIUM
+    _allocate(db, sewing, thread, "10")  # CRITICAL
+
+    alerts = get_shortage_alerts(mo_id=None, department=None, severity=None, db=db)
+    assert [(a.material_code, a.wo_id, a.severity) for a in alerts] == [
+        ("SHT-THREAD", sewing.id, "CRITICAL"),
+        ("SHT-FABRIC", sewing.id, "MEDIUM"),
+        ("SHT-FABRIC", cutting.id, "LOW"),
+    ]
+    assert alerts[1].required_qty == 120.0 and alerts[1].available_qty == 100.0
+
+    critical = MaterialAllocationService(db).get_material_shortage_alerts(severity="critical")
+    assert [(a.material_code, a.department, a.severity) for a in critical] == [("SHT-THREAD", "Sewing", "CRITICAL")]
+    assert get_shortage_alerts(mo_id=shortage_data["mo"].id + 1, department=None, severity=None, db=db) == []
+
+
+def test_summary_and_rebuild(shortage_data):
+    db, fabric, thread = shortage_data["db"], shortage_data["fabric"], shortage_data["thread"]
+    cutting, sewing = shortage_data["cutting"], shortage_data["sewing"]
+    _allocate(db, cutting, fabric, "130")
+    _allocate(db, sewing, fabric, "250")
+    _allocate(db, sewing, thread, "10")
+
+    summary = MaterialShortageService(db).summary()
+    assert summary["total_shortages"] == 3
+    assert summary["by_severity"] == {"CRITICAL": 2, "HIGH": 1}
+    assert summary["by_department"] == {"Cutting": 1, "Sewing": 2}
+    assert summary["top_10_materials"][0] == {
+        "material_code": "SHT-FABRIC", "material_name": "Shortage Fabric", "total_shortage": 180.0, "wo_count": 2,
+    }
+    assert summary["has_critical"] is True
+
+    before = _shortages(db)
+    db.execute(MaterialShortage.__table__.delete())
+    assert MaterialShortageService(db).rebuild() == 3
+    assert _shortages(db) == before
@@ -0,0 +1,183 @@
+"""
+Tests for the dashboard materialized view refresher
+Change-driven dirty tracking from committed sessions, refresh coalescing,
+changes arriving mid-refresh, missing views, the background thread, and
+the fallback alarm.
+"""
+
+import logging
+import time
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.dashboard import PLACEHOLDER_PRODUCTION_STATUS, get_production_status
+from app.core.database import Base
+from app.core.matview_refresher import DASHBOARD_VIEWS, MaterializedViewRefresher
+from app.core.metrics import registry
+from app.core.models.products import Category
+
+
+@pytest.fixture
+def refresher():
+    refresher = MaterializedViewRefresher(DASHBOARD_VIEWS, min_interval=60, max_age=0, poll_interval=0.01)
+    yield refresher
+    refresher.stop()
+
+
+@pytest.fixture
+def file_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'matviews.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _dirty(refresher):
+    return {view for view in refresher.views if refresher.staleness(view) > 0 or refresher._state[view].dirty_since}
+
+
+class TestDirtyTracking:
+
+    def test_only_views_reading_the_table_become_dirty(self, refresher):
+        refresher.notify_tables({"work_orders"})
+        assert _dirty(refresher) == {"mv_production_dept_status", "mv_qc_pass_rate"}
+        assert set(refresher.due_views()) == {"mv_production_dept_status", "mv_qc_pass_rate"}
+
+    def test_unrelated_tables_are_ignored(self, refresher):
+        refresher.notify_tables({"users", "kanban_cards"})
+        assert _dirty(refresher) == set()
+        assert refresher.due_views() == []
+
+    def test_committed_session_marks_views_dirty(self, refresher, file_session):
+        refresher.listen(file_session)
+        session = file_session()
+        session.add(Category(name="MV Softtoys"))
+        session.commit()
+        assert _dirty(refresher) == set()   # categories feed no view
+
+        session.execute(update(Category).values(name="MV Softtoys 2"))
+        session.commit()
+        assert _dirty(refresher) == set()
+
+        session.add_all([_product(session)])
+        session.commit()
+        assert _dirty(refresher) == {"mv_inventory_status"}
+        session.close()
+
+    def test_rolled_back_writes_are_discarded(self, refresher, file_session):
+        refresher.listen(file_session)
+        session = file_session()
+        session.add(_product(session))
+        session.flush()
+        session.rollback()
+        session.commit()
+        assert _dirty(refresher) == set()
+        session.close()
+
+
+def _product(session):
+    from app.core.models.products import UOM, Product, ProductType
+    category = Category(name=f"MV category {time.perf_counter_ns()}")
+    session.add(category)
+    session.flush()
+    return Product(code=f"MV-{time.perf_counter_ns()}", name="MV material", type=ProductType.RAW_MATERIAL,
+                   uom=UOM.METER, category_id=category.id)
+
+
+class TestRefreshing:
+
+    def test_burst_of_changes_is_coalesced(self, refresher, mocker):
+        refresh = mocker.patch.object(refresher, "_refresh_view", return_value=0.01)
+        for _ in range(50):
+            refresher.notify_tables({"stock_quants"})
+            for view in refresher.due_views():
+                refresher.refresh(view)
+
+        refresh.assert_called_once_with("mv_inventory_status")
+        # Writes after the refresh stay pending until min_interval has passed
+        assert refresher.staleness("mv_inventory_status") > 0
+
+    def test_background_thread_refreshes_after_commit(self, refresher, mocker):
+        refreshed = []
+        mocker.patch.object(refresher, "_refresh_view", side_effect=lambda view: refreshed.append(view) or 0.01)
+        refresher.start()
+        deadline = time.monotonic() + 2
+        while len(refreshed) < len(DASHBOARD_VIEWS) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sorted(refreshed) == sorted(DASHBOARD_VIEWS)   # initial refresh on start
+
+        refresher.min_interval = 0
+        refreshed.clear()
+        refresher.notify_tables({"qc_inspections"})
+        deadline = time.monotonic() + 2
+        while len(refreshed) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sorted(refreshed) == ["mv_dashboard_stats", "mv_qc_pass_rate"]
+        assert registry.get_sample_value(
+            "matview_last_refresh_timestamp_seconds", {"view": "mv_qc_pass_rate"}
+        ) > time.time() - 60
+
+    def test_failed_refresh_keeps_view_dirty(self, refresher, mocker):
+        mocker.patch.object(refresher, "_refresh_view", side_effect=RuntimeError("lock timeout"))
+        before = registry.get_sample_value("matview_refresh_failures_total", {"view": "mv_mo_trends_7days"}) or 0
+
+        refresher.notify_tables({"manufacturing_orders"})
+        assert refresher.refresh("mv_mo_trends_7days") is None
+
+        assert refresher.staleness("mv_mo_trends_7days") > 0
+        assert registry.get_sample_value("matview_refresh_failures_total", {"view": "mv_mo_trends_7days"}) == before + 1
+        assert "mv_mo_trends_7days" not in refresher.due_views()   # retried after min_interval
+
+    def test_change_during_refresh_keeps_view_dirty(self, refresher, mocker):
+        def refresh_while_committing(view):
+            refresher.notify_tables({"stock_quants"})  # Commits while REFRESH runs
+            return 0.01
+        mocker.patch.object(refresher, "_refresh_view", side_effect=refresh_while_committing)
+
+        refresher.notify_tables({"stock_quants"})
+        assert refresher.refresh("mv_inventory_status") == 0.01
+
+        assert refresher.staleness("mv_inventory_status") > 0
+        refresher.min_interval = 0
+        assert "mv_inventory_status" in refresher.due_views()
+
+    def test_missing_view_is_retried_on_slow_interval(self, refresher, mocker):
+        state = refresher._state["mv_recent_alerts"]
+        state.missing, state.last_attempt = True, time.monotonic()  # As left by a refresh that found no view
+        refresher.notify_tables({"audit_logs"})
+        assert "mv_recent_alerts" not in refresher.due_views()
+
+        refresher.missing_retry_interval = 0  # Retry interval elapsed; migration has created the view
+        assert "mv_recent_alerts" in refresher.due_views()
+        mocker.patch.object(refresher, "_refresh_view", return_value=0.01)
+        refresher.refresh("mv_recent_alerts")
+
+        assert state.missing is False
+        assert refresher.staleness("mv_recent_alerts") == 0
+
+
+class TestFallbackAlarm:
+
+    def test_fallback_counts_alarms_and_queues_refresh(self, refresher, caplog):
+        labels = {"endpoint": "stats", "reason": "view_empty"}
+        before = registry.get_sample_value("dashboard_fallback_served_total", labels) or 0
+
+        with caplog.at_level(logging.ERROR, logger="app.core.matview_refresher"):
+            for _ in range(3):
+                refresher.report_fallback("stats", "mv_dashboard_stats", "view_empty")
+
+        assert registry.get_sample_value("dashboard_fallback_served_total", labels) == before + 3
+        assert len([r for r in caplog.records if "fallback" in r.getMessage()]) == 1
+        assert "mv_dashboard_stats" in refresher.due_views()
+
+    @pytest.mark.asyncio
+    async def test_production_status_without_view_raises_alarm(self, db, admin_user):
+        labels = {"endpoint": "production-status", "reason": "view_unavailable"}
+        before = registry.get_sample_value("dashboard_fallback_served_total", labels) or 0
+
+        result = await get_production_status(db=db, current_user=admin_user)
+
+        assert result == PLACEHOLDER_PRODUCTION_STATUS
+        assert registry.get_sample_value("dashboard_fallback_served_total", labels) == before + 1
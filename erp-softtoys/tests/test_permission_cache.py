@@ -0,0 +1,141 @@
+"""
+Permission Cache Tests
+Per-worker LRU tier, Redis tier and pub/sub invalidation
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.models.users import UserRole
+from app.core.permissions import ROLE_PERMISSIONS, ModuleName, Permission
+from app.services.permission_cache import (
+    INVALIDATION_CHANNEL,
+    LocalPermissionCache,
+    UserPermissionSet,
+    permset_cache_key,
+)
+from app.services.permission_service import PermissionService
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis client calls used by the cache"""
+
+    def __init__(self):
+        self.store = {}
+        self.published = []
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value.encode() if isinstance(value, str) else value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def scan_iter(self, match=None, count=None):
+        prefix, suffix = match.split("*", 1)[0], match.rsplit("*", 1)[-1]
+        return [k for k in list(self.store) if k.startswith(prefix) and k.endswith(suffix)]
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+def _user(user_id=1, role=UserRole.WAREHOUSE_ADMIN):
+    return SimpleNamespace(id=user_id, role=role, username=f"user{user_id}")
+
+
+class TestLocalPermissionCache:
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = LocalPermissionCache(max_entries=2)
+        for uid in (1, 2):
+            cache.put(UserPermissionSet(user_id=uid, role="Admin"))
+        cache.get(1)
+        cache.put(UserPermissionSet(user_id=3, role="Admin"))
+
+        assert cache.get(2) is None
+        assert cache.get(1) is not None and cache.get(3) is not None
+
+    def test_entries_expire(self):
+        cache = LocalPermissionCache(ttl_seconds=0.01)
+        cache.put(UserPermissionSet(user_id=1, role="Admin"))
+        time.sleep(0.02)
+        assert cache.get(1) is None
+
+    def test_role_invalidation_only_hits_that_role(self):
+        cache = LocalPermissionCache()
+        cache.put(UserPermissionSet(user_id=1, role="Warehouse Admin"))
+        cache.put(UserPermissionSet(user_id=2, role="QC Lab"))
+
+        cache.apply_invalidation({"role": "Warehouse Admin"})
+
+        assert cache.get(1) is None
+        assert cache.get(2) is not None
+
+
+class TestPermissionService:
+
+    def test_matches_role_permission_matrix(self):
+        service = PermissionService()
+        user = _user(role=UserRole.WAREHOUSE_ADMIN)
+        warehouse_perms = ROLE_PERMISSIONS[UserRole.WAREHOUSE_ADMIN].get(ModuleName.WAREHOUSE, [])
+
+        assert service.has_permission(None, user, "warehouse.view") == (Permission.VIEW in warehouse_perms)
+        assert service.has_permission(None, user, "nonexistent.view") is False
+        assert service.has_permission(None, _user(2, UserRole.SUPERADMIN), "nonexistent.view") is True
+
+    def test_repeated_checks_hit_local_cache(self, mocker):
+        service = PermissionService()
+        build = mocker.spy(service, "build_permission_set")
+        user = _user()
+
+        for _ in range(100):
+            service.has_permission(None, user, "warehouse.view")
+
+        assert build.call_count == 1
+
+    def test_role_change_bypasses_stale_entry(self):
+        service = PermissionService()
+        user = _user(role=UserRole.QC_INSPECTOR)
+        service.has_permission(None, user, "warehouse.view")
+
+        user.role = UserRole.SUPERADMIN
+        assert service.get_user_permission_set(user).allow_all is True
+
+    def test_redis_tier_shared_between_workers(self, mocker):
+        redis_client = FakeRedis()
+        worker_a = PermissionService(redis_client)
+        worker_b = PermissionService(redis_client)
+        user = _user()
+
+        worker_a.has_permission(None, user, "warehouse.view")
+        assert permset_cache_key(user.id) in redis_client.store
+
+        build = mocker.spy(worker_b, "build_permission_set")
+        worker_b.has_permission(None, user, "warehouse.view")
+        assert build.call_count == 0
+
+    def test_invalidation_evicts_and_publishes(self):
+        redis_client = FakeRedis()
+        service = PermissionService(redis_client)
+        user = _user()
+        service.has_permission(None, user, "warehouse.view")
+
+        service.invalidate_user_cache(user.id)
+
+        assert service.local_cache.get(user.id) is None
+        assert permset_cache_key(user.id) not in redis_client.store
+        assert redis_client.published[-1][0] == INVALIDATION_CHANNEL
+
+    @pytest.mark.parametrize("message", [{"user_id": 1}, {"role": "Warehouse Admin"}, {"all": True}])
+    def test_published_message_evicts_on_other_worker(self, message):
+        other_worker = PermissionService()
+        other_worker.has_permission(None, _user(), "warehouse.view")
+
+        other_worker.local_cache.apply_invalidation(message)
+
+        assert other_worker.local_cache.get(1) is None
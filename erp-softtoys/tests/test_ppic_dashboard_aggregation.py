@@ -0,0 +1,136 @@
+"""
+PPIC Dashboard Aggregation Tests
+Correctness of PPICDashboardAggregator + query-count benchmark
+(query count must stay flat as the number of SPKs grows)
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.core.models import ManufacturingOrder, SPK, SPKDailyProduction
+from app.core.models.manufacturing import Department, RoutingType
+from app.core.models.products import Category, Product, ProductType
+from app.services.ppic_dashboard_service import PPICDashboardAggregator
+from app.services.spk_progress_rollup_service import SPKProgressRollupService
+
+TODAY = date(2026, 3, 10)
+
+
+def _seed_spks(db, count: int, days: int = 3, daily_qty: int = 10):
+    """Create `count` in-progress SPKs with `days` daily entries each"""
+    category = Category(name=f"Bench-{count}", description="benchmark")
+    db.add(category)
+    db.flush()
+    product = Product(
+        code=f"BENCH-FG-{count}", name="Bench Bear", type=ProductType.FINISH_GOOD,
+        uom="Pcs", category_id=category.id
+    )
+    db.add(product)
+    db.flush()
+    mo = ManufacturingOrder(
+        product_id=product.id, qty_planned=1000, routing_type=RoutingType.ROUTE1,
+        batch_number=f"BENCH-{count}"
+    )
+    db.add(mo)
+    db.flush()
+
+    for i in range(count):
+        spk = SPK(
+            mo_id=mo.id, department=Department.CUTTING, target_qty=100,
+            production_status="IN_PROGRESS", created_by_id=1,
+            start_date=TODAY - timedelta(days=days - 1),
+            target_completion_date=TODAY + timedelta(days=5)
+        )
+        db.add(spk)
+        db.flush()
+        cumulative = 0
+        for d in range(days):
+            cumulative += daily_qty
+            db.add(SPKDailyProduction(
+                spk_id=spk.id, production_date=TODAY - timedelta(days=days - 1 - d),
+                input_qty=daily_qty, cumulative_qty=cumulative, input_by_id=1,
+                status="CONFIRMED"
+            ))
+    SPKProgressRollupService(db).rebuild_all()
+
+
+class _QueryCounter:
+    def __init__(self, connection):
+        self.connection = connection
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.connection, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.connection, "before_cursor_execute", self._on_execute)
+
+
+class TestPPICDashboardAggregator:
+    """Aggregated figures match the per-SPK definitions"""
+
+    def test_progress_uses_latest_cumulative(self, db):
+        _seed_spks(db, 2, days=3, daily_qty=10)
+        rows = PPICDashboardAggregator(db, today=TODAY).get_spk_progress()
+
+        assert len(rows) == 2
+        assert all(r.actual_qty == 30 for r in rows)
+        assert all(r.days_tracked == 3 for r in rows)
+        assert rows[0].last_entry_date == TODAY
+        assert rows[0].product_name == "Bench Bear"
+
+    def test_dashboard_summary(self, db):
+        _seed_spks(db, 4)
+        data = PPICDashboardAggregator(db, today=TODAY).get_dashboard()
+
+        assert data["dashboard"]["total_spks"] == 4
+        assert data["dashboard"]["in_progress"] == 4
+        assert len(data["spks"]) == 4
+        assert data["spks"][0]["daily_rate"] == 10.0
+
+    def test_status_counts_merge_null_into_not_started(self, db):
+        _seed_spks(db, 2)
+        mo_id = db.query(ManufacturingOrder.id).filter(ManufacturingOrder.batch_number == "BENCH-2").scalar()
+        for status in (None, None, "NOT_STARTED"):
+            db.add(SPK(mo_id=mo_id, department=Department.CUTTING, target_qty=100,
+                       production_status=status, created_by_id=1))
+        db.flush()
+
+        counts = PPICDashboardAggregator(db, today=TODAY).get_status_counts()
+
+        assert counts == {"IN_PROGRESS": 2, "NOT_STARTED": 3}
+
+    def test_off_track_when_behind_schedule(self, db):
+        # 3 days into an 8-day plan for 100 pcs → expect ~37, have 3
+        _seed_spks(db, 1, days=3, daily_qty=1)
+        report = PPICDashboardAggregator(db, today=TODAY).get_on_track_report()
+
+        assert report["summary"]["off_track_count"] == 1
+        assert report["off_track"][0]["on_track_ratio"] < 0.85
+
+    def test_alert_candidates_need_two_days(self, db):
+        _seed_spks(db, 2, days=1, daily_qty=1)
+        assert PPICDashboardAggregator(db, today=TODAY).get_alert_candidates() == []
+
+
+class TestPPICDashboardQueryBenchmark:
+    """Benchmark: statements issued per endpoint payload do not scale with SPK count"""
+
+    @pytest.mark.parametrize("method", ["get_dashboard", "get_on_track_report", "get_alert_candidates"])
+    def test_query_count_flat(self, db, method):
+        counts = []
+        for size in (5, 50):
+            _seed_spks(db, size)
+            aggregator = PPICDashboardAggregator(db, today=TODAY)
+            with _QueryCounter(db.connection()) as counter:
+                getattr(aggregator, method)()
+            counts.append(counter.count)
+
+        assert counts[0] == counts[1]
+        assert counts[1] <= 2
@@ -0,0 +1,209 @@
+"""
+Tests for the report builder execution engine
+Template compilation to parameterized selects, keyset cursors (including
+NULL sort keys and grouped reports), the result cache and streamed export.
+"""
+
+import csv
+import io
+import time
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.api.v1.report_builder import ExecuteReportRequest, execute_report
+from app.core.models.products import UOM, Category, Product, ProductType
+from app.services.report_engine import (
+    ReportDefinitionError,
+    ReportEngine,
+    ReportResultCache,
+    compile_report,
+    report_result_cache,
+)
+
+SCOPE = [{"column": "code", "operator": "LIKE", "value": "RPT-"}]
+
+
+@pytest.fixture
+def catalog(db):
+    category = Category(name="Report Softtoys")
+    db.add(category)
+    db.flush()
+    products = []
+    for i in range(23):
+        products.append(Product(
+            code=f"RPT-{i:03d}",
+            name=f"Material {i % 5}",                       # duplicate sort keys
+            type=ProductType.RAW_MATERIAL if i % 3 else ProductType.WIP,
+            uom=UOM.METER,
+            category_id=category.id,
+            min_stock=Decimal(i % 7),
+        ))
+    db.add_all(products)
+    db.flush()
+    # Column default would replace None on insert
+    db.query(Product).filter(Product.id.in_([p.id for p in products[::4]])).update(
+        {Product.min_stock: None}, synchronize_session=False
+    )
+    return products
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    report_result_cache.clear()
+    yield
+    report_result_cache.clear()
+
+
+def _template(**overrides):
+    template = {
+        "id": 900,
+        "name": "Material list",
+        "data_source": "products",
+        "columns": [
+            {"name": "code", "label": "Code"},
+            {"name": "name", "label": "Name"},
+            {"name": "min_stock", "label": "Safety Stock"},
+        ],
+        "filters": SCOPE,
+        "sorts": [{"column": "min_stock", "direction": "DESC"}, {"column": "name", "direction": "ASC"}],
+        "group_by": [],
+    }
+    template.update(overrides)
+    return template
+
+
+def _all_pages(engine, template, limit, filters=None):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page = engine.execute(template, filters, limit=limit, cursor=cursor)
+        rows.extend(page["data"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return rows, pages
+
+
+class TestCompiler:
+
+    def test_filter_values_are_bound_parameters(self):
+        compiled = compile_report(_template(filters=[
+            {"column": "name", "operator": "=", "value": "x' OR '1'='1"}
+        ]))
+        sql = str(compiled.export_statement())
+        assert "OR '1'='1" not in sql
+        assert ":name_1" in sql
+
+    @pytest.mark.parametrize("change, message", [
+        ({"data_source": "users"}, "Invalid data source"),
+        ({"columns": [{"name": "hashed_password", "label": "x"}]}, "not available"),
+        ({"filters": [{"column": "code", "operator": "; DROP", "value": 1}]}, "Unsupported filter operator"),
+        ({"sorts": [{"column": "code", "direction": "SIDEWAYS"}]}, "Invalid sort direction"),
+        ({"group_by": ["name"]}, "must be aggregated or grouped"),
+    ])
+    def test_rejects_invalid_templates(self, change, message):
+        with pytest.raises(ReportDefinitionError, match=message):
+            compile_report(_template(**change))
+
+
+class TestKeysetPagination:
+
+    def test_pages_cover_every_row_once_in_order(self, db, catalog):
+        engine = ReportEngine(db, cache=ReportResultCache(ttl_seconds=0))
+        full = engine.execute(_template(), limit=1000)["data"]
+        rows, pages = _all_pages(engine, _template(), limit=4)
+
+        assert len(full) == 23
+        assert rows == full
+        assert pages == 6
+        # DESC puts NULL safety stock first, ties broken by name then id
+        assert [r["min_stock"] for r in rows[:6]] == [None] * 6
+
+    def test_grouped_report_pages_by_aggregate(self, db, catalog):
+        template = _template(
+            columns=[{"name": "type", "label": "Type"}, {"name": "id", "label": "Count", "aggregate": "count"}],
+            sorts=[{"column": "id", "direction": "DESC"}],
+            group_by=["type"],
+        )
+        engine = ReportEngine(db, cache=ReportResultCache(ttl_seconds=0))
+        rows, pages = _all_pages(engine, template, limit=1)
+
+        assert pages == 2
+        assert [(r["type"], r["id"]) for r in rows] == [(ProductType.RAW_MATERIAL, 15), (ProductType.WIP, 8)]
+
+    def test_enum_filter_accepts_display_value(self, db, catalog):
+        engine = ReportEngine(db)
+        page = engine.execute(_template(), [{"column": "type", "operator": "=", "value": "WIP"}])
+        assert page["row_count"] == 8
+
+    def test_cursor_is_bound_to_the_report(self, db, catalog):
+        engine = ReportEngine(db)
+        cursor = engine.execute(_template(), limit=5)["next_cursor"]
+        other = [{"column": "type", "operator": "=", "value": "WIP"}]
+
+        with pytest.raises(ReportDefinitionError, match="does not belong"):
+            engine.execute(_template(), other, limit=5, cursor=cursor)
+        with pytest.raises(ReportDefinitionError, match="Invalid cursor"):
+            engine.execute(_template(), limit=5, cursor="not-a-cursor")
+
+
+class TestResultCache:
+
+    def test_identical_execution_served_from_cache(self, db, catalog):
+        statements = []
+        bind = db.get_bind()
+        listener = lambda *args: statements.append(args[2])  # noqa: E731
+        event.listen(bind, "before_cursor_execute", listener)
+        try:
+            engine = ReportEngine(db)
+            first = engine.execute(_template(), limit=10)
+            executed = len(statements)
+            second = engine.execute(_template(), limit=10)
+        finally:
+            event.remove(bind, "before_cursor_execute", listener)
+
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["data"] == first["data"]
+        assert executed == 1
+        assert len(statements) == executed
+
+    def test_different_filters_miss(self, db, catalog):
+        engine = ReportEngine(db)
+        engine.execute(_template(), limit=10)
+        page = engine.execute(_template(), [{"column": "type", "operator": "=", "value": "WIP"}], limit=10)
+        assert page["cached"] is False
+
+    def test_entries_expire(self):
+        cache = ReportResultCache(ttl_seconds=0.01)
+        cache.put("k", {"data": []})
+        assert cache.get("k") is not None
+        time.sleep(0.02)
+        assert cache.get("k") is None
+
+
+class TestExecuteEndpoint:
+
+    @pytest.mark.asyncio
+    async def test_unknown_template(self, db, admin_user):
+        with pytest.raises(HTTPException) as exc:
+            await execute_report(ExecuteReportRequest(template_id=12345), current_user=admin_user, db=db)
+        assert exc.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_builtin_template_runs(self, db, admin_user):
+        result = await execute_report(ExecuteReportRequest(template_id=2), current_user=admin_user, db=db)
+        assert result["template_name"] == "QC Defects Summary"
+        assert result["next_cursor"] is None
+
+    @pytest.mark.asyncio
+    async def test_csv_export_streams_all_rows(self, db, catalog):
+        engine = ReportEngine(db)
+        response = engine.export(_template(), None, format="csv", name="materials")
+        body = b"".join([chunk async for chunk in response.body_iterator]).decode()
+
+        records = list(csv.reader(io.StringIO(body)))
+        assert records[0] == ["Code", "Name", "Safety Stock"]
+        assert len(records) == 24
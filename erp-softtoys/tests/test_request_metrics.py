@@ -0,0 +1,97 @@
+"""
+Tests for request and database metrics
+Route-template labels, per-request SQL accounting and pool gauges.
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.db_metrics import InstrumentedQueuePool, count_queries, install_pool_metrics
+from app.core.metrics import registry
+from app.core.request_metrics import PrometheusMiddleware
+
+sql_engine = create_engine("sqlite://")
+
+
+def read_order(order_id: int):
+    with sql_engine.connect() as connection:
+        for _ in range(3):
+            connection.execute(text("SELECT 1"))
+    return {"id": order_id}
+
+
+async def read_line(order_id: int, line_id: int):
+    return {"id": line_id}
+
+
+def build_app():
+    app = FastAPI()
+    app.add_middleware(PrometheusMiddleware)
+    app.get("/orders/{order_id}")(read_order)
+    app.get("/orders/{order_id}/lines/{line_id}")(read_line)
+    app.get("/legacy/orders/{order_id}/lines/{line_id}")(read_line)  # Alias, same handler
+    return app
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_labeled_by_route_template():
+    client = TestClient(build_app())
+    template = "/orders/{order_id}"
+    before = sample("http_requests_total", method="GET", endpoint=template, status="200")
+
+    for order_id in (1, 2, 3):
+        assert client.get(f"/orders/{order_id}").status_code == 200
+    client.get("/legacy/orders/7/lines/9")
+    client.get("/no/such/route/42")
+
+    assert sample("http_requests_total", method="GET", endpoint=template, status="200") == before + 3
+    assert registry.get_sample_value("http_requests_total",
+                                     {"method": "GET", "endpoint": "/orders/1", "status": "200"}) is None
+    assert sample("http_requests_total", method="GET", endpoint="/legacy/orders/{order_id}/lines/{line_id}",
+                  status="200") >= 1
+    assert sample("http_requests_total", method="GET", endpoint="<unmatched>", status="404") >= 1
+
+
+def test_sql_statements_and_time_per_request():
+    client = TestClient(build_app())
+    labels = {"method": "GET", "endpoint": "/orders/{order_id}"}
+    count_before = sample("http_request_sql_statements_count", **labels)
+    statements_before = sample("http_request_sql_statements_sum", **labels)
+
+    client.get("/orders/5")
+
+    assert sample("http_request_sql_statements_count", **labels) == count_before + 1
+    assert sample("http_request_sql_statements_sum", **labels) == statements_before + 3
+    assert sample("http_request_sql_duration_seconds_sum", **labels) > 0
+
+
+def test_queries_outside_a_scope_are_not_counted():
+    with count_queries() as stats:
+        with sql_engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    with sql_engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert stats.statements == 1 and stats.seconds > 0
+
+
+def test_pool_gauges_and_checkout_wait():
+    engine = create_engine("sqlite:///:memory:", poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=1)
+    install_pool_metrics(engine)
+    waits_before = sample("db_pool_checkout_wait_seconds_count")
+    opened_before = sample("database_connections_total", status="opened")
+
+    connections = [engine.connect() for _ in range(3)]
+    assert sample("db_pool_checked_out_connections") == 3
+    assert sample("db_pool_overflow_connections") == 1
+    assert sample("db_pool_size") == 2
+    assert sample("db_pool_checkout_wait_seconds_count") == waits_before + 3
+    assert sample("database_connections_total", status="opened") == opened_before + 3
+
+    for connection in connections:
+        connection.close()
+    assert sample("db_pool_checked_out_connections") == 0
+    assert sample("db_pool_idle_connections") == 2
@@ -0,0 +1,138 @@
+"""
+Tests for the document sequence service
+Block reservation, seeding from legacy numbers, and uniqueness under
+concurrent allocation from several threads.
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.barcode import scan_lot_number
+from app.core.database import Base
+from app.core.models.sequences import DocumentSequence
+from app.core.models.warehouse import PalletBarcode, StockLot
+from app.services.pallet_service import PalletService
+from app.services.sequence_service import SequenceAllocator, sequence_allocator
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """File-based SQLite: reservations run on their own connections"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'sequences.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+class TestSequenceAllocator:
+
+    def test_numbers_come_from_reserved_blocks(self, file_engine):
+        allocator = SequenceAllocator(block_size=10)
+        session = sessionmaker(bind=file_engine)()
+        statements = _count_statements(file_engine)
+
+        values = [allocator.next_value(session, "PLT", "2026") for _ in range(25)]
+
+        assert values == list(range(1, 26))
+        updates = [s for s in statements if s.lstrip().upper().startswith("UPDATE")]
+        assert len(updates) == 3   # 3 blocks of 10, no scan of any document table
+        row = session.execute(select(DocumentSequence)).scalar_one()
+        assert (row.prefix, row.period, row.next_value) == ("PLT", "2026", 31)
+        session.close()
+
+    def test_counters_are_per_prefix_and_period(self, file_engine):
+        allocator = SequenceAllocator(block_size=5)
+        session = sessionmaker(bind=file_engine)()
+
+        assert allocator.next_value(session, "KAN", "2026") == 1
+        assert allocator.next_value(session, "KAN", "2027") == 1
+        assert allocator.next_value(session, "PO-KAIN", "2026") == 1
+        assert allocator.next_value(session, "KAN", "2026") == 2
+        session.close()
+
+    def test_seed_only_used_when_row_is_created(self, file_engine):
+        allocator = SequenceAllocator(block_size=2)
+        session = sessionmaker(bind=file_engine)()
+        seed_calls = []
+
+        def seed(conn):
+            seed_calls.append(conn)
+            return 41
+
+        values = [allocator.next_value(session, "LOT", "2026", seed=seed) for _ in range(5)]
+
+        assert values == [42, 43, 44, 45, 46]
+        assert len(seed_calls) == 1
+        session.close()
+
+    def test_workers_never_hand_out_the_same_number(self, file_engine):
+        """Separate allocators = separate worker processes sharing the DB"""
+        Session = sessionmaker(bind=file_engine)
+        workers = [SequenceAllocator(block_size=7) for _ in range(4)]
+        results = []
+        lock = threading.Lock()
+        errors = []
+
+        def run(allocator):
+            session = Session()
+            try:
+                got = [allocator.next_value(session, "PLT", "2026") for _ in range(50)]
+                with lock:
+                    results.extend(got)
+            except Exception as e:   # pragma: no cover - reported below
+                errors.append(e)
+            finally:
+                session.close()
+
+        threads = [threading.Thread(target=run, args=(workers[i % 4],)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert not errors
+        assert len(results) == 400
+        assert len(set(results)) == 400   # unique; gaps allowed
+
+
+class TestDocumentGenerators:
+
+    def test_pallet_barcode_continues_after_legacy_numbers(self, db):
+        sequence_allocator.reset()
+        year = datetime.now().year
+        db.add(PalletBarcode(barcode=f"PLT-{year}-00041", product_id=1, carton_count=1, total_pcs=1))
+        db.flush()
+
+        service = PalletService(db)
+        first = service.generate_pallet_barcode()
+        second = service.generate_pallet_barcode()
+
+        assert first == f"PLT-{year}-00042"
+        assert second == f"PLT-{year}-00043"
+        sequence_allocator.reset()
+
+    def test_scan_lot_numbers_never_match_legacy_lots(self, db):
+        sequence_allocator.reset()
+        now = datetime(2026, 3, 2)
+        db.add(StockLot(product_id=1, lot_number="BEAR-20260302-001", qty_initial=1, qty_remaining=1,
+                     received_date=now))
+        db.flush()
+
+        lot_number = scan_lot_number(db, "BEAR", now)
+
+        assert lot_number == "BEAR-20260302-S000001"
+        assert db.scalar(select(StockLot.id).where(StockLot.lot_number == lot_number)) is None
+        sequence_allocator.reset()
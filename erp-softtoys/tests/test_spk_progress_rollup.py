@@ -0,0 +1,136 @@
+"""
+SPK Progress Rollup Tests
+Incremental maintenance vs. full rebuild from raw daily rows
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import update
+
+from app.core.models import SPK, SPKDailyProduction, SPKModification, SPKProgressRollup
+from app.core.models.manufacturing import Department
+from app.services.daily_production_service import DailyProductionService, SPKModificationService
+from app.services.spk_progress_rollup_service import SPKProgressRollupService
+
+START = date(2026, 3, 1)
+
+
+def _create_spk(db, target_qty=100):
+    spk = SPK(
+        mo_id=1, department=Department.SEWING, target_qty=target_qty,
+        production_status="NOT_STARTED", created_by_id=1
+    )
+    db.add(spk)
+    db.flush()
+    return spk
+
+
+class TestIncrementalRollup:
+    """record_daily_input / complete_production keep the rollup current"""
+
+    def test_record_daily_input_updates_rollup(self, db):
+        spk = _create_spk(db)
+        service = DailyProductionService(db)
+
+        service.record_daily_input(spk.id, START, 30, user_id=1)
+        service.record_daily_input(spk.id, START + timedelta(days=1), 20, user_id=1, status="PENDING")
+
+        rollup = db.get(SPKProgressRollup, spk.id)
+        assert rollup.confirmed_qty == 30
+        assert rollup.pending_qty == 20
+        assert rollup.cumulative_qty == 50
+        assert rollup.days_tracked == 2
+        assert rollup.first_entry_date == START
+        assert rollup.last_entry_date == START + timedelta(days=1)
+
+    def test_apply_entry_builds_on_locked_row_not_cached_one(self, db):
+        spk = _create_spk(db)
+        service = DailyProductionService(db)
+        service.record_daily_input(spk.id, START, 30, user_id=1)
+        db.flush()
+        rollups = SPKProgressRollupService(db)
+        cached = rollups.get(spk.id)  # Instance held in the session's identity map
+        assert cached.confirmed_qty == 30
+
+        # Another worker's entry commits behind the cached instance
+        db.execute(
+            update(SPKProgressRollup).where(SPKProgressRollup.spk_id == spk.id)
+            .values(confirmed_qty=SPKProgressRollup.confirmed_qty + 25, days_tracked=2),
+            execution_options={"synchronize_session": False},
+        )
+        rollups.apply_entry(spk.id, START + timedelta(days=2), 10, 65, "CONFIRMED")
+        rollups.apply_entry(spk.id, START + timedelta(days=3), 5, 70, "CONFIRMED")
+
+        assert cached.confirmed_qty == 70
+        assert cached.days_tracked == 4
+
+    def test_progress_reads_rollup(self, db):
+        spk = _create_spk(db)
+        service = DailyProductionService(db)
+        service.record_daily_input(spk.id, START, 40, user_id=1)
+        service.record_daily_input(spk.id, START + timedelta(days=1), 20, user_id=1)
+
+        progress = service.get_production_progress(spk.id)
+        assert progress["actual_qty"] == 60
+        assert progress["days_tracked"] == 2
+        assert progress["daily_average"] == 30
+
+        calendar = service.get_calendar_data(spk.id)
+        assert calendar["summary"]["confirmed_qty"] == 60
+        assert len(calendar["daily_entries"]) == 2
+
+    def test_complete_production_marks_rollup(self, db):
+        spk = _create_spk(db, target_qty=50)
+        service = DailyProductionService(db)
+        service.record_daily_input(spk.id, START, 50, user_id=1)
+
+        result = service.complete_production(spk.id, user_id=1)
+
+        assert result["actual_qty"] == 50
+        assert db.get(SPKProgressRollup, spk.id).completed_date == date.today()
+
+
+class TestRollupReconcile:
+    """rebuild_all() / refresh() reproduce the incremental totals"""
+
+    def test_rebuild_matches_incremental(self, db):
+        spk = _create_spk(db)
+        service = DailyProductionService(db)
+        for day, qty in enumerate([10, 15, 25]):
+            service.record_daily_input(spk.id, START + timedelta(days=day), qty, user_id=1)
+        incremental = db.get(SPKProgressRollup, spk.id)
+        expected = (incremental.confirmed_qty, incremental.cumulative_qty, incremental.days_tracked)
+
+        rebuilt_count = SPKProgressRollupService(db).rebuild_all()
+        rebuilt = db.get(SPKProgressRollup, spk.id)
+
+        assert rebuilt_count >= 1
+        assert (rebuilt.confirmed_qty, rebuilt.cumulative_qty, rebuilt.days_tracked) == expected
+        assert rebuilt.last_entry_date == START + timedelta(days=2)
+
+    def test_rebuild_repairs_drift(self, db):
+        spk = _create_spk(db)
+        db.add(SPKDailyProduction(
+            spk_id=spk.id, production_date=START, input_qty=70,
+            cumulative_qty=70, input_by_id=1, status="CONFIRMED"
+        ))
+        db.flush()
+        assert SPKProgressRollupService(db).get(spk.id) is None
+
+        SPKProgressRollupService(db).rebuild_all()
+
+        assert db.get(SPKProgressRollup, spk.id).cumulative_qty == 70
+
+    def test_undo_modification_refreshes_rollup(self, db):
+        spk = _create_spk(db)
+        DailyProductionService(db).record_daily_input(spk.id, START, 10, user_id=1)
+        modification = SPKModification(
+            spk_id=spk.id, field_name="target_qty", old_value="100",
+            new_value="120", modified_by_id=1, modification_reason="Buyer top-up"
+        )
+        db.add(modification)
+        db.flush()
+
+        SPKModificationService(db).undo_modification(modification.id, user_id=1)
+
+        assert db.get(SPKProgressRollup, spk.id).cumulative_qty == 10
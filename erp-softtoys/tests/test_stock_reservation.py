@@ -0,0 +1,133 @@
+"""
+Tests for the stock reservation engine
+FIFO reservation / consumption over locked quants, insufficient stock,
+partial consumption, contention retries and the barcode pick endpoint.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app.api.v1.barcode import PickGoodsRequest, pick_goods
+from app.core.models.products import UOM, Category, Product, ProductType
+from app.core.models.warehouse import InventoryPosition, Location, LocationType, StockLot, StockMove, StockQuant
+from app.services import stock_reservation_service
+from app.services.inventory_position_service import install_session_hooks
+from app.services.stock_reservation_service import InsufficientStockError, StockReservationService
+
+
+@pytest.fixture
+def stock(db):
+    install_session_hooks()
+    category = Category(name="Reservations")
+    db.add(category)
+    db.flush()
+    fabric = Product(code="RSV-FABRIC", name="Reservation Fabric", type=ProductType.RAW_MATERIAL, uom=UOM.METER,
+                     category_id=category.id)
+    rack = Location(name="RSV Warehouse Rack", type=LocationType.INTERNAL)
+    line = Location(name="RSV Line Sewing", type=LocationType.PRODUCTION)
+    db.add_all([fabric, rack, line])
+    db.flush()
+
+    def lot(number, days_old):
+        return StockLot(product_id=fabric.id, lot_number=number, qty_initial=Decimal("100"),
+                        qty_remaining=Decimal("100"), received_date=datetime.now() - timedelta(days=days_old))
+
+    new_lot, old_lot = lot("RSV-NEW", 1), lot("RSV-OLD", 30)
+    db.add_all([new_lot, old_lot])
+    db.flush()
+    quants = {
+        "new": StockQuant(product_id=fabric.id, location_id=rack.id, lot_id=new_lot.id, qty_on_hand=Decimal("50")),
+        "old": StockQuant(product_id=fabric.id, location_id=rack.id, lot_id=old_lot.id, qty_on_hand=Decimal("30"),
+                          qty_reserved=Decimal("10")),
+        "loose": StockQuant(product_id=fabric.id, location_id=rack.id, qty_on_hand=Decimal("5")),
+    }
+    db.add_all(quants.values())
+    db.flush()
+    return {"db": db, "fabric": fabric, "rack": rack, "line": line, "quants": quants}
+
+
+def test_reserve_takes_oldest_lot_first(stock):
+    db, fabric, quants = stock["db"], stock["fabric"], stock["quants"]
+
+    allocations = StockReservationService(db).reserve(fabric.id, Decimal("35"))
+
+    assert [(a.quant_id, a.qty) for a in allocations] == [
+        (quants["old"].id, Decimal("20.00")),  # 30 on hand - 10 already reserved
+        (quants["new"].id, Decimal("15.00")),
+    ]
+    assert quants["old"].qty_reserved == Decimal("30")
+    assert quants["new"].qty_reserved == Decimal("15")
+    assert quants["loose"].qty_reserved in (None, Decimal("0"))
+    position = db.get(InventoryPosition, (fabric.id, stock["rack"].id))
+    assert position.qty_reserved == Decimal("45")
+
+
+def test_insufficient_stock_changes_nothing(stock):
+    db, fabric, quants = stock["db"], stock["fabric"], stock["quants"]
+    service = StockReservationService(db)
+    assert service.available(fabric.id) == Decimal("75.00")
+
+    with pytest.raises(InsufficientStockError) as error:
+        service.consume(fabric.id, Decimal("80"))
+
+    assert error.value.available == Decimal("75.00")
+    db.expire_all()
+    assert [quants[k].qty_on_hand for k in ("old", "new", "loose")] == [Decimal("30"), Decimal("50"), Decimal("5")]
+
+
+def test_partial_consume_returns_what_was_taken(stock):
+    db, fabric, quants = stock["db"], stock["fabric"], stock["quants"]
+
+    allocations = StockReservationService(db).consume(fabric.id, Decimal("100"), partial=True)
+
+    assert sum(a.qty for a in allocations) == Decimal("75.00")
+    assert [a.quant_id for a in allocations] == [quants["old"].id, quants["new"].id, quants["loose"].id]
+    assert quants["old"].qty_on_hand == Decimal("10")  # Reserved stock stays on hand
+    assert quants["loose"].qty_on_hand == Decimal("0")
+
+
+def test_deadlock_is_retried(stock, monkeypatch):
+    db, fabric = stock["db"], stock["fabric"]
+    service = StockReservationService(db)
+    allocate_once = service._allocate_once
+    calls = []
+
+    class Deadlock(Exception):
+        pgcode = "40P01"
+
+    def flaky(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OperationalError("SELECT ... FOR UPDATE", {}, Deadlock("deadlock detected"))
+        return allocate_once(*args)
+
+    monkeypatch.setattr(service, "_allocate_once", flaky)
+    monkeypatch.setattr(stock_reservation_service.settings, "STOCK_LOCK_RETRY_BACKOFF_SECONDS", 0)
+    retries = stock_reservation_service.STOCK_LOCK_RETRIES.labels(operation="reserve", reason="deadlock")
+    before = retries._value.get()
+
+    allocations = service.reserve(fabric.id, Decimal("5"))
+
+    assert len(calls) == 2
+    assert sum(a.qty for a in allocations) == Decimal("5.00")
+    assert retries._value.get() == before + 1
+
+
+def test_pick_goods_moves_fifo_lots(stock, admin_user):
+    db, line, quants = stock["db"], stock["line"], stock["quants"]
+    request = PickGoodsRequest(barcode="RSV-FABRIC", qty=25, location="warehouse", work_order_id=7)
+
+    result = asyncio.run(pick_goods(request, db=db, current_user=admin_user))
+
+    assert result["picked_lots"] == [{"lot_number": "RSV-OLD", "qty": 20.0}, {"lot_number": "RSV-NEW", "qty": 5.0}]
+    moves = db.scalars(select(StockMove).where(StockMove.reference_doc == "WO-7")).all()
+    assert sorted(m.qty for m in moves) == [Decimal("5"), Decimal("20")]
+    assert {m.location_id_to for m in moves} == {line.id}
+    db.expire_all()
+    assert quants["old"].qty_on_hand == Decimal("10")
+    assert quants["new"].qty_on_hand == Decimal("45")
@@ -0,0 +1,98 @@
+"""
+WebSocket Backplane Tests
+Notifications raised in one worker reach sockets connected to other workers
+"""
+
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+
+from app.core.websocket import ConnectionManager
+from app.core.ws_backplane import InMemoryBackplane, InMemoryBackplaneHub, build_backplane
+
+
+class FakeWebSocket:
+    """Client socket recording every message it receives"""
+
+    def __init__(self):
+        self.received: list[dict] = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        self.received.append(json.loads(payload))
+
+    async def close(self, code: int = 1000, reason: str = None):
+        pass
+
+    def alerts(self) -> list[dict]:
+        return [m for m in self.received if m.get("type") != "connection"]
+
+
+@pytest_asyncio.fixture
+async def workers():
+    """Two ConnectionManagers ('workers') sharing one in-memory backplane"""
+    hub = InMemoryBackplaneHub()
+    managers = [ConnectionManager(), ConnectionManager()]
+    for manager in managers:
+        await manager.attach_backplane(InMemoryBackplane(hub))
+    yield managers
+    for manager in managers:
+        await manager.shutdown()
+
+
+async def _settle():
+    await asyncio.sleep(0.05)
+
+
+@pytest.mark.asyncio
+async def test_department_alert_reaches_every_worker(workers):
+    worker_a, worker_b = workers
+    socket_a, socket_b = FakeWebSocket(), FakeWebSocket()
+    await worker_a.connect(socket_a, user_id=1, department="QC")
+    await worker_b.connect(socket_b, user_id=2, department="QC")
+
+    await worker_a.notify_qc_failure("Sewing", {"test_type": "Metal Detector"})
+    await _settle()
+
+    for socket in (socket_a, socket_b):
+        assert [m["alert_type"] for m in socket.alerts()] == ["QC_FAILURE"]
+
+
+@pytest.mark.asyncio
+async def test_user_notification_reaches_other_worker_only_for_that_user(workers):
+    worker_a, worker_b = workers
+    target, other = FakeWebSocket(), FakeWebSocket()
+    await worker_b.connect(target, user_id=42, department="PPIC")
+    await worker_b.connect(other, user_id=7, department="PPIC")
+
+    await worker_a.send_to_user(42, {"type": "notification", "notification_type": "KANBAN_APPROVED"})
+    await _settle()
+
+    assert len(target.alerts()) == 1
+    assert other.alerts() == []
+
+
+@pytest.mark.asyncio
+async def test_publish_failure_falls_back_to_local_delivery(workers):
+    worker_a, _ = workers
+    socket = FakeWebSocket()
+    await worker_a.connect(socket, user_id=1, department="Admin")
+
+    async def broken_publish(envelope):
+        raise ConnectionError("redis down")
+
+    worker_a.backplane.publish = broken_publish
+    await worker_a.notify_segregation_alarm("Cutting", {"article": "A-1"})
+    await _settle()
+
+    assert [m["alert_type"] for m in socket.alerts()] == ["SEGREGATION_ALARM"]
+
+
+def test_build_backplane_defaults_to_worker_local():
+    assert build_backplane("local") is None
+    assert build_backplane("redis", redis_url=None) is None
+    assert isinstance(build_backplane("memory"), InMemoryBackplane)
@@ -0,0 +1,196 @@
+"""
+WebSocket Fan-out Tests
+Serialize-once broadcast, per-client queues, slow-consumer policy and a
+load test measuring end-to-end alert latency across hundreds of clients
+"""
+
+import asyncio
+import json
+import statistics
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.core import websocket as ws_module
+from app.core.websocket import SLOW_CONSUMER_CLOSE_CODE, ConnectionManager
+
+
+class FakeWebSocket:
+    """Client socket recording receive times; `send_delay` simulates a slow tablet"""
+
+    def __init__(self, send_delay: float = 0.0, block: asyncio.Event | None = None):
+        self.send_delay = send_delay
+        self.block = block
+        self.received: list[tuple[float, dict]] = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        if self.block is not None:
+            await self.block.wait()
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.received.append((time.perf_counter(), json.loads(payload)))
+
+    async def close(self, code: int = 1000, reason: str = None):
+        self.closed_with = code
+
+    def alerts(self) -> list[dict]:
+        return [m for _, m in self.received if m.get("type") != "connection"]
+
+
+@pytest_asyncio.fixture
+async def make_manager():
+    """ConnectionManager factory; writer tasks are stopped after the test"""
+    managers = []
+
+    def _make(**kwargs):
+        managers.append(ConnectionManager(**kwargs))
+        return managers[-1]
+
+    yield _make
+    for manager in managers:
+        await manager.shutdown()
+
+
+async def _connect(manager, count, department="Sewing", **socket_kwargs):
+    sockets = [FakeWebSocket(**socket_kwargs) for _ in range(count)]
+    for i, socket in enumerate(sockets):
+        await manager.connect(socket, user_id=i + 1, department=department)
+    return sockets
+
+
+async def _settle(seconds: float = 0.05):
+    await asyncio.sleep(seconds)
+
+
+class TestFanOut:
+
+    @pytest.mark.asyncio
+    async def test_message_serialized_once_for_all_clients(self, mocker, make_manager):
+        manager = make_manager()
+        sockets = await _connect(manager, 50)
+        dumps = mocker.spy(ws_module.json, "dumps")
+
+        await manager.notify_qc_failure("Sewing", {"test_type": "Metal Detector"})
+        await _settle()
+
+        # Department + QC fan-outs: one serialization each, not one per client
+        assert dumps.call_count == 2
+        assert all(len(s.alerts()) == 1 for s in sockets)
+
+    @pytest.mark.asyncio
+    async def test_slow_client_does_not_stall_others(self, make_manager):
+        manager = make_manager(send_timeout=5.0)
+        blocked = asyncio.Event()
+        fast = await _connect(manager, 20)
+        slow = FakeWebSocket(block=blocked)
+        await manager.connect(slow, user_id=999, department="Sewing")
+
+        started = time.perf_counter()
+        await manager.notify_segregation_alarm("Sewing", {"article": "A-1"})
+        await _settle()
+
+        assert time.perf_counter() - started < 1.0
+        assert all(len(s.alerts()) == 1 for s in fast)
+        assert slow.alerts() == []
+        blocked.set()
+
+
+class TestSlowConsumerPolicy:
+
+    @pytest.mark.asyncio
+    async def test_work_order_updates_coalesce(self, make_manager):
+        manager = make_manager()
+        blocked = asyncio.Event()
+        socket = (await _connect(manager, 1, block=blocked))[0]
+
+        for status in ("RUNNING", "PAUSED", "DONE"):
+            await manager.notify_work_order_update("Sewing", 7, status)
+        blocked.set()
+        await _settle()
+
+        updates = [m for m in socket.alerts() if m.get("notification_type") == "WORK_ORDER_UPDATE"]
+        assert [u["details"]["status"] for u in updates] == ["DONE"]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_oldest_informational_message(self, make_manager):
+        manager = make_manager(max_queue=3)
+        blocked = asyncio.Event()
+        socket = (await _connect(manager, 1, block=blocked))[0]
+        await _settle()  # writer picks up the connection message and blocks on it
+
+        await manager.notify_transfer_received("Sewing", {"seq": 1})
+        await manager.notify_line_clearance_required("Sewing", {"seq": 2})
+        await manager.notify_transfer_received("Sewing", {"seq": 3})
+        await manager.notify_transfer_received("Sewing", {"seq": 4})
+        blocked.set()
+        await _settle()
+
+        assert [m["details"]["seq"] for m in socket.alerts()] == [2, 3, 4]
+        assert socket.closed_with is None
+
+    @pytest.mark.asyncio
+    async def test_queue_of_critical_alerts_disconnects_client(self, make_manager):
+        manager = make_manager(max_queue=2)
+        blocked = asyncio.Event()
+        socket = (await _connect(manager, 1, block=blocked))[0]
+        await _settle()
+
+        for i in range(3):
+            await manager.notify_segregation_alarm("Sewing", {"seq": i})
+        await _settle()
+
+        assert socket.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert socket not in manager.channels
+        assert socket not in manager.dept_connections["Sewing"]
+        blocked.set()
+
+    @pytest.mark.asyncio
+    async def test_send_timeout_disconnects_client(self, make_manager):
+        manager = make_manager(send_timeout=0.05)
+        socket = (await _connect(manager, 1, send_delay=1.0))[0]
+        await _settle(0.2)
+
+        assert socket.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert socket not in manager.broadcast_connections
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_load_alert_latency_with_hundreds_of_clients(make_manager):
+    """500 clients (5% slow tablets), 20 alerts: healthy clients get every alert quickly"""
+    manager = make_manager(max_queue=50, send_timeout=2.0)
+    healthy = await _connect(manager, 475, send_delay=0.001)
+    slow = [FakeWebSocket(send_delay=0.5) for _ in range(25)]
+    for i, socket in enumerate(slow):
+        await manager.connect(socket, user_id=10_000 + i, department="Sewing")
+    await _settle(0.1)
+
+    sent_at = {}
+    fan_out_times = []
+    for seq in range(20):
+        sent_at[seq] = time.perf_counter()
+        await manager.notify_line_clearance_required("Sewing", {"seq": seq})
+        fan_out_times.append(time.perf_counter() - sent_at[seq])
+        await asyncio.sleep(0.01)
+    await _settle(0.5)
+
+    latencies = [
+        received_at - sent_at[message["details"]["seq"]]
+        for socket in healthy
+        for received_at, message in socket.received
+        if message.get("type") == "alert"
+    ]
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"\nfan-out p_max={max(fan_out_times) * 1000:.2f}ms "
+          f"delivery p50={p50 * 1000:.2f}ms p99={p99 * 1000:.2f}ms over {len(latencies)} deliveries")
+
+    assert len(latencies) == 475 * 20
+    assert max(fan_out_times) < 0.05
+    assert p99 < 0.5